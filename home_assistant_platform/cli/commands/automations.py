@@ -96,6 +96,19 @@ def list_patterns(ctx):
     click.echo(format_json(patterns))
 
 
+@automations_group.command('mine-patterns')
+@click.option('--days', type=int, default=30, help='Days of action history to mine')
+@click.option('--timeout', type=float, default=300, help='Seconds to wait for the server')
+@click.pass_context
+def mine_patterns(ctx, days, timeout):
+    """Re-mine patterns for all devices and users"""
+    client = get_client(ctx)
+    result = client.post('automation/patterns/mine', params={'days': days}, timeout=timeout)
+    click.echo(f"✓ Mined {result.get('patterns', 0)} patterns from {result.get('actions', 0)} actions "
+               f"({result.get('created', 0)} new, {result.get('updated', 0)} updated) "
+               f"in {result.get('duration_ms', 0) / 1000:.2f}s")
+
+
 @automations_group.command('suggestions')
 @click.pass_context
 def list_suggestions(ctx):
@@ -26,11 +26,18 @@ class APIClient:
         except requests.exceptions.HTTPError as e:
             raise click.ClickException(f"API error: {e.response.status_code} - {e.response.text}")
     
-    def post(self, endpoint: str, data: Optional[Dict] = None, json_data: Optional[Dict] = None) -> Dict[str, Any]:
+    def post(
+        self,
+        endpoint: str,
+        data: Optional[Dict] = None,
+        json_data: Optional[Dict] = None,
+        params: Optional[Dict] = None,
+        timeout: float = 10
+    ) -> Dict[str, Any]:
         """POST request"""
         url = f"{self.api_url}/{endpoint.lstrip('/')}"
         try:
-            response = self.session.post(url, json=json_data or data, timeout=10)
+            response = self.session.post(url, json=json_data or data, params=params, timeout=timeout)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.ConnectionError:
@@ -13,17 +13,26 @@ def devices_group():
 
 @devices_group.command('list')
 @click.option('--format', 'output_format', type=click.Choice(['json', 'table']), default='table', help='Output format')
+@click.option('--since-version', type=int, help='Only devices changed after this state version')
 @click.pass_context
-def list_devices(ctx, output_format):
+def list_devices(ctx, output_format, since_version):
     """List all devices"""
     client = get_client(ctx)
-    devices = client.get('devices')
+    params = {'since_version': since_version} if since_version is not None else None
+    response = client.get('devices', params=params)
+    if not isinstance(response, dict):
+        response = {'devices': response}
+    devices = response.get('devices', [])
     
     if output_format == 'json':
-        click.echo(format_json(devices))
+        click.echo(format_json(response))
     else:
+        if response.get('removed'):
+            click.echo(f"Removed: {', '.join(response['removed'])}")
         if not devices:
-            click.echo("No devices found")
+            click.echo("No devices found" if since_version is None else "No device changes")
+            if 'version' in response:
+                click.echo(f"State version: {response['version']}")
             return
         
         click.echo("\nDevices:")
@@ -39,6 +48,8 @@ def list_devices(ctx, output_format):
             if 'brightness' in device:
                 click.echo(f"    Brightness: {device['brightness']}%")
             click.echo()
+        if 'version' in response:
+            click.echo(f"State version: {response['version']} (use --since-version {response['version']} for changes)")
 
 
 @devices_group.command('get')
@@ -90,12 +101,18 @@ def set_brightness(ctx, device_id, brightness):
 
 
 @devices_group.command('discover')
+@click.option('--force', is_flag=True, help='Rescan instead of using cached results')
+@click.option('--refresh', is_flag=True, help='Only re-probe devices that have gone stale')
 @click.pass_context
-def discover_devices(ctx):
+def discover_devices(ctx, force, refresh):
     """Discover new devices"""
     client = get_client(ctx)
+    if refresh:
+        result = client.post('devices/discover/refresh')
+        click.echo(f"✓ Re-probed {result.get('probed', 0)} devices, {result.get('lost', 0)} no longer answering")
+        return
     click.echo("Discovering devices...")
-    result = client.post('devices/discover')
-    click.echo(f"✓ Discovery started")
-    click.echo(f"  Found {result.get('count', 0)} devices")
+    result = client.post('devices/discover', params={'force': 'true'} if force else None, timeout=60)
+    click.echo(f"✓ Discovery finished")
+    click.echo(f"  Found {result.get('discovered', 0)} devices")
 
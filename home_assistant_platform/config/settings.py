@@ -27,6 +27,7 @@ class Settings(BaseSettings):
     marketplace_db_name: str = Field(default="marketplace", env="MARKETPLACE_DB_NAME")
     marketplace_db_user: str = Field(default="marketplace_user", env="MARKETPLACE_DB_USER")
     marketplace_db_password: str = Field(default="changeme", env="MARKETPLACE_DB_PASSWORD")
+    db_worker_threads: int = Field(default=4, env="DB_WORKER_THREADS")  # Threads for blocking DB calls
     
     # Licensing
     license_server_url: str = Field(default="https://license.example.com", env="LICENSE_SERVER_URL")
@@ -67,11 +68,55 @@ class Settings(BaseSettings):
     jwt_algorithm: str = Field(default="HS256", env="JWT_ALGORITHM")
     jwt_expiration_hours: int = Field(default=24, env="JWT_EXPIRATION_HOURS")
     
+    # Automation
+    automation_max_concurrency: int = Field(default=8, env="AUTOMATION_MAX_CONCURRENCY")  # Devices commanded in parallel
+    
+    # Energy retention in days (0 = keep forever)
+    energy_raw_retention_days: int = Field(default=7, env="ENERGY_RAW_RETENTION_DAYS")
+    energy_minute_retention_days: int = Field(default=30, env="ENERGY_MINUTE_RETENTION_DAYS")
+    energy_hour_retention_days: int = Field(default=365, env="ENERGY_HOUR_RETENTION_DAYS")
+    energy_day_retention_days: int = Field(default=0, env="ENERGY_DAY_RETENTION_DAYS")
+    
+    # Energy anomaly detection
+    energy_anomaly_sigma: float = Field(default=3.0, env="ENERGY_ANOMALY_SIGMA")  # Flag readings beyond k standard deviations
+    energy_anomaly_alpha: float = Field(default=0.02, env="ENERGY_ANOMALY_ALPHA")  # EWMA weight once the baseline is warm
+    energy_anomaly_min_samples: int = Field(default=20, env="ENERGY_ANOMALY_MIN_SAMPLES")  # History needed before scoring
+    energy_anomaly_cooldown_minutes: int = Field(default=15, env="ENERGY_ANOMALY_COOLDOWN_MINUTES")  # Per device
+    
+    # Live stream (/api/v1/stream)
+    stream_max_pending: int = Field(default=1000, env="STREAM_MAX_PENDING")  # Queued messages per client before dropping
+    stream_heartbeat_seconds: float = Field(default=15.0, env="STREAM_HEARTBEAT_SECONDS")  # Keep-alive for idle SSE streams
+    
+    # Device registry
+    device_registry_persist: bool = Field(default=True, env="DEVICE_REGISTRY_PERSIST")  # Save devices for warm starts
+    device_registry_flush_interval: float = Field(default=2.0, env="DEVICE_REGISTRY_FLUSH_INTERVAL")  # Seconds between saves
+    device_startup_discovery: bool = Field(default=True, env="DEVICE_STARTUP_DISCOVERY")  # Reconcile saved devices at boot
+    
+    # Device discovery
+    discovery_cache_ttl: float = Field(default=300.0, env="DISCOVERY_CACHE_TTL")  # Seconds before a scan or device is stale
+    discovery_timeout: float = Field(default=10.0, env="DISCOVERY_TIMEOUT")  # Per protocol scan or device probe
+    hue_bridge_ip: Optional[str] = Field(default=None, env="HUE_BRIDGE_IP")
+    
+    # Webhook delivery
+    webhook_workers: int = Field(default=4, env="WEBHOOK_WORKERS")  # Concurrent outbound requests
+    webhook_per_host_limit: int = Field(default=2, env="WEBHOOK_PER_HOST_LIMIT")  # Concurrent requests to one host
+    webhook_backoff_base: float = Field(default=2.0, env="WEBHOOK_BACKOFF_BASE")  # Seconds before the first retry, doubled per attempt
+    webhook_backoff_max: float = Field(default=300.0, env="WEBHOOK_BACKOFF_MAX")  # Longest delay between attempts
+    webhook_poll_interval: float = Field(default=1.0, env="WEBHOOK_POLL_INTERVAL")  # Seconds between checks for due retries
+    webhook_log_flush_ms: int = Field(default=500, env="WEBHOOK_LOG_FLUSH_MS")  # Buffered delivery logs are written this often
+    webhook_log_batch_size: int = Field(default=200, env="WEBHOOK_LOG_BATCH_SIZE")  # Buffered logs that trigger an early write
+    webhook_log_retention_days: int = Field(default=30, env="WEBHOOK_LOG_RETENTION_DAYS")  # 0 = keep forever
+    webhook_log_max_rows: int = Field(default=10000, env="WEBHOOK_LOG_MAX_ROWS")  # Newest logs kept per webhook (0 = all)
+    
     # MQTT
     mqtt_broker_host: str = Field(default="localhost", env="MQTT_BROKER_HOST")
     mqtt_broker_port: int = Field(default=1883, env="MQTT_BROKER_PORT")
     mqtt_username: Optional[str] = Field(default=None, env="MQTT_USERNAME")
     mqtt_password: Optional[str] = Field(default=None, env="MQTT_PASSWORD")
+    mqtt_publish_timeout: float = Field(default=5.0, env="MQTT_PUBLISH_TIMEOUT")  # Seconds to wait for a PUBACK
+    mqtt_max_inflight: int = Field(default=100, env="MQTT_MAX_INFLIGHT")  # Unacknowledged publishes allowed at once
+    mqtt_reconnect_min_delay: int = Field(default=1, env="MQTT_RECONNECT_MIN_DELAY")
+    mqtt_reconnect_max_delay: int = Field(default=60, env="MQTT_RECONNECT_MAX_DELAY")
     
     # Paths
     base_dir: Path = Path(__file__).parent.parent.parent
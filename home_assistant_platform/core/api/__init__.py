@@ -21,6 +21,7 @@ from home_assistant_platform.core.api.webhooks import router as webhooks_router
 from home_assistant_platform.core.api.automation_advanced import router as automation_advanced_router
 from home_assistant_platform.core.api.onboarding import router as onboarding_router
 from home_assistant_platform.core.api.ml_metrics import router as ml_metrics_router
+from home_assistant_platform.core.api.stream import router as stream_router
 
 router = APIRouter()
 
@@ -42,6 +43,7 @@ router.include_router(webhooks_router, prefix="", tags=["webhooks"])
 router.include_router(automation_advanced_router, prefix="", tags=["automation-advanced"])
 router.include_router(onboarding_router, prefix="", tags=["onboarding"])
 router.include_router(ml_metrics_router, prefix="", tags=["ml-metrics"])
+router.include_router(stream_router, prefix="", tags=["stream"])
 
 
 @router.get("/status")
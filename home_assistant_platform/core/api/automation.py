@@ -1,18 +1,22 @@
 """Automation API endpoints"""
 
 import logging
-from fastapi import APIRouter, Request, HTTPException
+from fastapi import APIRouter, Request, HTTPException, Depends
+from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
-from home_assistant_platform.core.automation.pattern_learner import PatternLearner
+from home_assistant_platform.core.automation.pattern_learner import PatternLearner, HISTORY_DAYS
+from home_assistant_platform.core.automation.pattern_miner import mine_patterns
 from home_assistant_platform.core.automation.suggestion_engine import SuggestionEngine
 from home_assistant_platform.core.automation.executor import AutomationExecutor
 from home_assistant_platform.core.automation.device_manager import MockDeviceManager
 from home_assistant_platform.core.automation.models import (
-    Pattern, Automation, AutomationSuggestion, get_automation_db
+    Pattern, Automation, AutomationSuggestion, get_automation_session,
+    notify_automations_changed
 )
+from home_assistant_platform.core.database import run_in_db_thread
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -79,6 +83,7 @@ async def record_action(request: Request, action_req: DeviceActionRequest):
     """Record a device action for pattern learning"""
     pattern_learner, _, _, _ = get_automation_components(request)
     
+    # Counted in memory and queued; the learner's worker persists it
     pattern_learner.record_action(
         device_id=action_req.device_id,
         device_type=action_req.device_type,
@@ -94,139 +99,184 @@ async def record_action(request: Request, action_req: DeviceActionRequest):
 @router.get("/patterns")
 async def get_patterns(request: Request, device_id: Optional[str] = None, user_id: str = "default"):
     """Get detected patterns"""
-    pattern_learner, _, _, _ = get_automation_components(request)
+    def _handle():
+        pattern_learner, _, _, _ = get_automation_components(request)
+        
+        patterns = pattern_learner.get_patterns(device_id=device_id, user_id=user_id)
+        
+        return {
+            "patterns": [
+                {
+                    "id": p.id,
+                    "device_id": p.device_id,
+                    "device_type": p.device_type,
+                    "action": p.action,
+                    "pattern_type": p.pattern_type,
+                    "conditions": p.conditions,
+                    "confidence": p.confidence,
+                    "occurrence_count": p.occurrence_count,
+                    "last_occurrence": p.last_occurrence.isoformat() if p.last_occurrence else None
+                }
+                for p in patterns
+            ]
+        }
     
-    patterns = pattern_learner.get_patterns(device_id=device_id, user_id=user_id)
+    return await run_in_db_thread(_handle)
+
+
+@router.post("/patterns/mine")
+async def mine_all_patterns(request: Request, days: int = HISTORY_DAYS):
+    """Re-mine patterns for every device and user from the stored action history"""
+    if days < 1:
+        raise HTTPException(status_code=400, detail="days must be at least 1")
     
-    return {
-        "patterns": [
-            {
-                "id": p.id,
-                "device_id": p.device_id,
-                "device_type": p.device_type,
-                "action": p.action,
-                "pattern_type": p.pattern_type,
-                "conditions": p.conditions,
-                "confidence": p.confidence,
-                "occurrence_count": p.occurrence_count,
-                "last_occurrence": p.last_occurrence.isoformat() if p.last_occurrence else None
-            }
-            for p in patterns
-        ]
-    }
+    def _handle():
+        pattern_learner, _, _, _ = get_automation_components(request)
+        
+        # Include actions still queued in the incremental learner
+        pattern_learner.flush()
+        summary = mine_patterns(
+            days=days,
+            min_occurrences=pattern_learner.min_occurrences,
+            confidence_threshold=pattern_learner.confidence_threshold
+        )
+        return {"success": True, **summary}
+    
+    return await run_in_db_thread(_handle)
 
 
 @router.get("/suggestions")
 async def get_suggestions(request: Request, user_id: str = "default"):
     """Get automation suggestions"""
-    _, suggestion_engine, _, _ = get_automation_components(request)
-    
-    suggestions = suggestion_engine.get_pending_suggestions(user_id=user_id)
+    def _handle():
+        _, suggestion_engine, _, _ = get_automation_components(request)
+        
+        suggestions = suggestion_engine.get_pending_suggestions(user_id=user_id)
+        
+        return {
+            "suggestions": [
+                {
+                    "id": s.id,
+                    "pattern_id": s.pattern_id,
+                    "suggestion_text": s.suggestion_text,
+                    "automation_name": s.automation_name,
+                    "automation_config": s.automation_config,
+                    "created_at": s.created_at.isoformat()
+                }
+                for s in suggestions
+            ]
+        }
     
-    return {
-        "suggestions": [
-            {
-                "id": s.id,
-                "pattern_id": s.pattern_id,
-                "suggestion_text": s.suggestion_text,
-                "automation_name": s.automation_name,
-                "automation_config": s.automation_config,
-                "created_at": s.created_at.isoformat()
-            }
-            for s in suggestions
-        ]
-    }
+    return await run_in_db_thread(_handle)
 
 
 @router.post("/suggestions/{suggestion_id}/accept")
 async def accept_suggestion(request: Request, suggestion_id: int, user_id: str = "default"):
     """Accept an automation suggestion"""
-    _, suggestion_engine, automation_executor, _ = get_automation_components(request)
-    
-    success = suggestion_engine.accept_suggestion(suggestion_id, user_id)
-    if not success:
-        raise HTTPException(status_code=404, detail="Suggestion not found")
-    
-    # Create automation from suggestion
-    automation = automation_executor.create_automation_from_suggestion(suggestion_id, user_id)
+    def _handle():
+        _, suggestion_engine, automation_executor, _ = get_automation_components(request)
+        
+        success = suggestion_engine.accept_suggestion(suggestion_id, user_id)
+        if not success:
+            raise HTTPException(status_code=404, detail="Suggestion not found")
+        
+        # Create automation from suggestion
+        automation = automation_executor.create_automation_from_suggestion(suggestion_id, user_id)
+        
+        if automation:
+            return {
+                "success": True,
+                "message": "Suggestion accepted and automation created",
+                "automation_id": automation.id
+            }
+        else:
+            return {
+                "success": False,
+                "message": "Suggestion accepted but failed to create automation"
+            }
     
-    if automation:
-        return {
-            "success": True,
-            "message": "Suggestion accepted and automation created",
-            "automation_id": automation.id
-        }
-    else:
-        return {
-            "success": False,
-            "message": "Suggestion accepted but failed to create automation"
-        }
+    return await run_in_db_thread(_handle)
 
 
 @router.post("/suggestions/{suggestion_id}/reject")
 async def reject_suggestion(request: Request, suggestion_id: int, user_id: str = "default"):
     """Reject an automation suggestion"""
-    _, suggestion_engine, _, _ = get_automation_components(request)
-    
-    success = suggestion_engine.reject_suggestion(suggestion_id, user_id)
-    if not success:
-        raise HTTPException(status_code=404, detail="Suggestion not found")
+    def _handle():
+        _, suggestion_engine, _, _ = get_automation_components(request)
+        
+        success = suggestion_engine.reject_suggestion(suggestion_id, user_id)
+        if not success:
+            raise HTTPException(status_code=404, detail="Suggestion not found")
+        
+        return {"success": True, "message": "Suggestion rejected"}
     
-    return {"success": True, "message": "Suggestion rejected"}
+    return await run_in_db_thread(_handle)
 
 
 @router.get("/automations")
-async def list_automations(request: Request, user_id: str = "default"):
+async def list_automations(
+    request: Request,
+    user_id: str = "default",
+    db: Session = Depends(get_automation_session)
+):
     """List all automations"""
-    db = get_automation_db()
-    
-    automations = db.query(Automation).filter(
-        Automation.user_id == user_id
-    ).all()
+    def _handle():
+        automations = db.query(Automation).filter(
+            Automation.user_id == user_id
+        ).all()
+        
+        return {
+            "automations": [
+                {
+                    "id": a.id,
+                    "name": a.name,
+                    "description": a.description,
+                    "trigger_type": a.trigger_type,
+                    "trigger_config": a.trigger_config,
+                    "actions": a.actions,
+                    "is_enabled": a.is_enabled,
+                    "is_active": a.is_active,
+                    "created_at": a.created_at.isoformat()
+                }
+                for a in automations
+            ]
+        }
     
-    return {
-        "automations": [
-            {
-                "id": a.id,
-                "name": a.name,
-                "description": a.description,
-                "trigger_type": a.trigger_type,
-                "trigger_config": a.trigger_config,
-                "actions": a.actions,
-                "is_enabled": a.is_enabled,
-                "is_active": a.is_active,
-                "created_at": a.created_at.isoformat()
-            }
-            for a in automations
-        ]
-    }
+    return await run_in_db_thread(_handle)
 
 
 @router.post("/automations")
-async def create_automation(request: Request, automation_req: AutomationCreateRequest, user_id: str = "default"):
+async def create_automation(
+    request: Request,
+    automation_req: AutomationCreateRequest,
+    user_id: str = "default",
+    db: Session = Depends(get_automation_session)
+):
     """Create a new automation"""
-    db = get_automation_db()
-    
-    automation = Automation(
-        name=automation_req.name,
-        description=automation_req.description,
-        trigger_type=automation_req.trigger_type,
-        trigger_config=automation_req.trigger_config,
-        actions=automation_req.actions,
-        conditions=automation_req.conditions,
-        user_id=user_id,
-        is_enabled=True,
-        is_active=True
-    )
-    
-    db.add(automation)
-    db.commit()
+    def _handle():
+        automation = Automation(
+            name=automation_req.name,
+            description=automation_req.description,
+            trigger_type=automation_req.trigger_type,
+            trigger_config=automation_req.trigger_config,
+            actions=automation_req.actions,
+            conditions=automation_req.conditions,
+            user_id=user_id,
+            is_enabled=True,
+            is_active=True
+        )
+        
+        db.add(automation)
+        db.commit()
+        notify_automations_changed(automation.id)
+        
+        return {
+            "success": True,
+            "message": "Automation created",
+            "automation_id": automation.id
+        }
     
-    return {
-        "success": True,
-        "message": "Automation created",
-        "automation_id": automation.id
-    }
+    return await run_in_db_thread(_handle)
 
 
 @router.post("/automations/{automation_id}/execute")
@@ -256,7 +306,7 @@ async def execute_device_action(
     value: Optional[str] = None
 ):
     """Execute a device action and record it for pattern learning"""
-    pattern_learner, _, automation_executor, device_manager = get_automation_components(request)
+    pattern_learner, suggestion_engine, automation_executor, device_manager = get_automation_components(request)
     
     # Get device info
     device_state = await device_manager.get_device_state(device_id)
@@ -287,10 +337,12 @@ async def execute_device_action(
         )
         
         # Check for new suggestions
-        _, suggestion_engine, _, _ = get_automation_components(request)
-        patterns = pattern_learner.get_patterns(device_id=device_id, min_confidence=0.6)
-        for pattern in patterns:
-            suggestion_engine.generate_suggestions(pattern)
+        def _suggest():
+            patterns = pattern_learner.get_patterns(device_id=device_id, min_confidence=0.6)
+            for pattern in patterns:
+                suggestion_engine.generate_suggestions(pattern)
+        
+        await run_in_db_thread(_suggest)
     
     return {"success": success, "message": f"Action {action} executed" if success else "Failed to execute action"}
 
@@ -4,6 +4,8 @@ import logging
 from fastapi import APIRouter, Request, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
+from home_assistant_platform.core.automation.event_bus import get_event_bus, DEVICE_COMMAND
+from home_assistant_platform.core.devices.state_store import StaleVersionError
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -14,6 +16,31 @@ class DeviceControlRequest(BaseModel):
     value: Optional[Any] = None
 
 
+class DeviceCommand(BaseModel):
+    device_id: str
+    action: str  # turn_on, turn_off, set_brightness, set_color, set_temperature
+    value: Optional[Any] = None
+
+
+class DeviceBatchRequest(BaseModel):
+    commands: List[DeviceCommand]
+
+
+# Converters for the value of each supported action (None = no value)
+COMMAND_VALUE_TYPES = {
+    "turn_on": None,
+    "turn_off": None,
+    "set_brightness": int,
+    "set_color": str,
+    "set_temperature": float,
+}
+
+
+class DeviceStateUpdateRequest(BaseModel):
+    state: Dict[str, Any]
+    expected_version: Optional[int] = None  # Compare-and-set: reject if the device moved on
+
+
 class DeviceAddRequest(BaseModel):
     id: str
     name: str
@@ -33,11 +60,26 @@ def get_device_manager(request: Request):
 
 
 @router.get("")
-async def list_devices(request: Request):
-    """List all devices"""
+async def list_devices(request: Request, since_version: Optional[int] = None):
+    """List all devices
+    
+    Each device carries its state ``version`` and the response the store
+    ``version``. Pass that as ``since_version`` to get only the devices
+    changed (and ids removed) since; ``full`` means the delta could not be
+    computed and ``devices`` is the complete list.
+    """
     device_manager = get_device_manager(request)
-    devices = device_manager.list_devices()
-    return {"devices": devices, "count": len(devices)}
+    if not hasattr(device_manager, 'registry'):
+        devices = device_manager.list_devices()
+        return {"devices": devices, "count": len(devices)}
+    
+    store = device_manager.registry.store
+    if since_version is None:
+        snapshot = store.snapshot()
+        return {"devices": snapshot["devices"], "count": len(snapshot["devices"]), "version": snapshot["version"]}
+    
+    delta = store.diff(since_version)
+    return {**delta, "count": len(delta["devices"])}
 
 
 @router.get("/{device_id}")
@@ -102,6 +144,19 @@ async def control_device(request: Request, device_id: str, control_req: DeviceCo
         previous_state = device.get("state", "unknown")
         new_state = updated_state.get("state", "unknown")
         
+        # Notify event-triggered automations
+        get_event_bus().publish(
+            DEVICE_COMMAND,
+            device_id,
+            {
+                "action": action,
+                "value": control_req.value,
+                "state": new_state,
+                "previous_state": previous_state
+            },
+            source="api"
+        )
+        
         # Trigger webhook event
         if hasattr(request.app.state, 'event_dispatcher') and previous_state != new_state:
             await request.app.state.event_dispatcher.device_changed(
@@ -175,13 +230,63 @@ async def turn_off_device(request: Request, device_id: str):
     return {"success": True, "device": state}
 
 
+@router.post("/batch")
+async def batch_control(request: Request, batch_req: DeviceBatchRequest):
+    """Apply several device commands in one call
+    
+    Commands for the same device are merged where the protocol allows it
+    (one MQTT message per device) and all devices are sent in one pass.
+    """
+    device_manager = get_device_manager(request)
+    
+    commands = []
+    for command in batch_req.commands:
+        action = command.action.lower()
+        if action not in COMMAND_VALUE_TYPES:
+            raise HTTPException(status_code=400, detail=f"Unknown action: {action}")
+        converter = COMMAND_VALUE_TYPES[action]
+        value = None
+        if converter is not None:
+            if command.value is None:
+                raise HTTPException(status_code=400, detail=f"Value required for {action} on {command.device_id}")
+            try:
+                value = converter(command.value)
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail=f"Invalid value for {action}: {command.value}")
+        commands.append({"device_id": command.device_id, "action": action, "value": value})
+    
+    results = await device_manager.apply_batch(commands)
+    
+    bus = get_event_bus()
+    for command, success in zip(commands, results):
+        if not success:
+            continue
+        bus.publish(
+            DEVICE_COMMAND,
+            command["device_id"],
+            {"action": command["action"], "value": command["value"]},
+            source="api"
+        )
+    
+    return {
+        "success": all(results),
+        "results": [
+            {**command, "success": success}
+            for command, success in zip(commands, results)
+        ]
+    }
+
+
 @router.post("/discover")
-async def discover_devices(request: Request):
-    """Discover WiFi devices on the network"""
+async def discover_devices(request: Request, force: bool = False):
+    """Discover WiFi devices on the network
+    
+    Results are cached for ``discovery_cache_ttl``; ``force`` rescans.
+    """
     device_manager = get_device_manager(request)
     
     if hasattr(device_manager, 'discover_wifi_devices'):
-        devices = await device_manager.discover_wifi_devices()
+        devices = await device_manager.discover_wifi_devices(force=force)
         return {
             "success": True,
             "discovered": len(devices),
@@ -194,6 +299,19 @@ async def discover_devices(request: Request):
         }
 
 
+@router.post("/discover/refresh")
+async def refresh_discovered_devices(request: Request):
+    """Re-probe only discovered devices that have gone stale"""
+    device_manager = get_device_manager(request)
+    
+    if hasattr(device_manager, 'refresh_wifi_devices'):
+        return {"success": True, **await device_manager.refresh_wifi_devices()}
+    return {
+        "success": False,
+        "message": "WiFi device discovery not available"
+    }
+
+
 @router.post("/add")
 async def add_device(request: Request, device_req: DeviceAddRequest):
     """Manually add a device"""
@@ -214,6 +332,31 @@ async def add_device(request: Request, device_req: DeviceAddRequest):
         raise HTTPException(status_code=500, detail="Device registry not available")
 
 
+@router.patch("/{device_id}/state")
+async def update_device_state(request: Request, device_id: str, update_req: DeviceStateUpdateRequest):
+    """Merge reported attributes into a device's stored state
+    
+    Records state only; use ``/control`` to command the device. With
+    ``expected_version`` the update is applied only if the device is still
+    at that version, otherwise 409 with the current version.
+    """
+    device_manager = get_device_manager(request)
+    if not hasattr(device_manager, 'registry'):
+        raise HTTPException(status_code=500, detail="Device registry not available")
+    
+    store = device_manager.registry.store
+    if device_id not in store:
+        raise HTTPException(status_code=404, detail="Device not found")
+    try:
+        store.update(device_id, update_req.state, source="api", expected_version=update_req.expected_version)
+    except StaleVersionError as e:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": str(e), "current_version": e.current, "device": store.get(device_id)}
+        )
+    return {"success": True, "device": store.get(device_id)}
+
+
 @router.delete("/{device_id}")
 async def remove_device(request: Request, device_id: str):
     """Remove a device"""
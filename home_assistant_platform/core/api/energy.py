@@ -1,12 +1,14 @@
 """Energy monitoring API endpoints"""
 
 import logging
-from fastapi import APIRouter, Request, HTTPException
+from fastapi import APIRouter, Request, HTTPException, Query
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
+from home_assistant_platform.core.energy.ingest import IngestError, parse_payload
 from home_assistant_platform.core.energy.monitor import EnergyMonitor
+from home_assistant_platform.core.database import run_in_db_thread
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -32,7 +34,7 @@ class DeviceProfileRequest(BaseModel):
 
 class EnergyAlertRequest(BaseModel):
     device_id: str
-    alert_type: str  # high_consumption, threshold_exceeded
+    alert_type: str  # high_consumption, threshold_exceeded (anomaly alerts are raised automatically)
     threshold_value: float
 
 
@@ -47,25 +49,52 @@ def get_energy_monitor(request: Request) -> EnergyMonitor:
 async def record_reading(request: Request, reading_req: EnergyReadingRequest, user_id: str = "default"):
     """Record an energy reading"""
     monitor = get_energy_monitor(request)
-    reading = monitor.record_reading(
-        device_id=reading_req.device_id,
-        power_watts=reading_req.power_watts,
-        device_name=reading_req.device_name,
-        voltage=reading_req.voltage,
-        current=reading_req.current,
-        energy_kwh=reading_req.energy_kwh,
-        user_id=user_id
-    )
     
-    return {
-        "success": True,
-        "reading": {
-            "id": reading.id,
-            "device_id": reading.device_id,
-            "power_watts": reading.power_watts,
-            "timestamp": reading.timestamp.isoformat()
+    def _record():
+        reading = monitor.record_reading(
+            device_id=reading_req.device_id,
+            power_watts=reading_req.power_watts,
+            device_name=reading_req.device_name,
+            voltage=reading_req.voltage,
+            current=reading_req.current,
+            energy_kwh=reading_req.energy_kwh,
+            user_id=user_id
+        )
+        return {
+            "success": True,
+            "reading": {
+                "id": reading.id,
+                "device_id": reading.device_id,
+                "power_watts": reading.power_watts,
+                "timestamp": reading.timestamp.isoformat()
+            }
         }
-    }
+    
+    return await run_in_db_thread(_record)
+
+
+@router.post("/readings/bulk")
+async def record_readings_bulk(request: Request, user_id: str = "default", precision: str = "ns"):
+    """Record many readings at once
+    
+    The body is a JSON array (``application/json``), NDJSON
+    (``application/x-ndjson``) or line protocol (``text/plain``, timestamps in
+    ``precision`` units). The whole batch is validated first and stored in one
+    transaction; any invalid reading rejects the request.
+    """
+    monitor = get_energy_monitor(request)
+    body = await request.body()
+    
+    def _record():
+        readings = parse_payload(body, request.headers.get("content-type"), user_id, precision)
+        return monitor.record_readings(readings)
+    
+    try:
+        result = await run_in_db_thread(_record)
+    except IngestError as e:
+        raise HTTPException(status_code=400, detail={"errors": e.errors})
+    
+    return {"success": True, **result}
 
 
 @router.get("/readings/{device_id}")
@@ -82,10 +111,9 @@ async def get_device_readings(
     start_dt = datetime.fromisoformat(start_time) if start_time else None
     end_dt = datetime.fromisoformat(end_time) if end_time else None
     
-    readings = monitor.get_device_readings(device_id, start_dt, end_dt, user_id)
-    
-    return {
-        "readings": [
+    def _readings():
+        readings = monitor.get_device_readings(device_id, start_dt, end_dt, user_id)
+        return [
             {
                 "id": r.id,
                 "power_watts": r.power_watts,
@@ -96,7 +124,8 @@ async def get_device_readings(
             }
             for r in readings
         ]
-    }
+    
+    return {"readings": await run_in_db_thread(_readings)}
 
 
 @router.get("/current")
@@ -105,7 +134,7 @@ async def get_current_power(request: Request, device_id: Optional[str] = None, u
     monitor = get_energy_monitor(request)
     
     if device_id:
-        power = monitor.get_current_power(device_id, user_id)
+        power = await run_in_db_thread(monitor.get_current_power, device_id, user_id)
         if power is None:
             raise HTTPException(status_code=404, detail="Device not found or no readings")
         return {
@@ -114,7 +143,7 @@ async def get_current_power(request: Request, device_id: Optional[str] = None, u
             "power_kilowatts": power / 1000
         }
     else:
-        total_power = monitor.get_total_power(user_id)
+        total_power = await run_in_db_thread(monitor.get_total_power, user_id)
         return {
             "total_power_watts": total_power,
             "total_power_kilowatts": total_power / 1000
@@ -135,7 +164,9 @@ async def get_energy_consumption(
     start_dt = datetime.fromisoformat(start_time)
     end_dt = datetime.fromisoformat(end_time)
     
-    consumption = monitor.calculate_energy_consumption(device_id, start_dt, end_dt, user_id)
+    consumption = await run_in_db_thread(
+        monitor.calculate_energy_consumption, device_id, start_dt, end_dt, user_id
+    )
     
     return {
         "device_id": device_id,
@@ -155,7 +186,7 @@ async def get_daily_summary(request: Request, date: Optional[str] = None, user_i
     else:
         summary_date = datetime.now()
     
-    summary = monitor.get_daily_summary(summary_date, user_id)
+    summary = await run_in_db_thread(monitor.get_daily_summary, summary_date, user_id)
     return {"summary": summary}
 
 
@@ -163,7 +194,7 @@ async def get_daily_summary(request: Request, date: Optional[str] = None, user_i
 async def get_energy_insights(request: Request, days: int = 7, user_id: str = "default"):
     """Get energy consumption insights"""
     monitor = get_energy_monitor(request)
-    insights = monitor.get_energy_insights(days=days, user_id=user_id)
+    insights = await run_in_db_thread(monitor.get_energy_insights, days=days, user_id=user_id)
     return {"insights": insights}
 
 
@@ -171,46 +202,91 @@ async def get_energy_insights(request: Request, days: int = 7, user_id: str = "d
 async def create_device_profile(request: Request, profile_req: DeviceProfileRequest, user_id: str = "default"):
     """Create or update device energy profile"""
     monitor = get_energy_monitor(request)
-    profile = monitor.create_device_profile(
-        device_id=profile_req.device_id,
-        device_name=profile_req.device_name,
-        rated_power_watts=profile_req.rated_power_watts,
-        typical_power_watts=profile_req.typical_power_watts,
-        standby_power_watts=profile_req.standby_power_watts,
-        cost_per_kwh=profile_req.cost_per_kwh,
-        user_id=user_id
-    )
     
-    return {
-        "success": True,
-        "profile": {
-            "id": profile.id,
-            "device_id": profile.device_id,
-            "device_name": profile.device_name,
-            "rated_power_watts": profile.rated_power_watts,
-            "typical_power_watts": profile.typical_power_watts
+    def _create():
+        profile = monitor.create_device_profile(
+            device_id=profile_req.device_id,
+            device_name=profile_req.device_name,
+            rated_power_watts=profile_req.rated_power_watts,
+            typical_power_watts=profile_req.typical_power_watts,
+            standby_power_watts=profile_req.standby_power_watts,
+            cost_per_kwh=profile_req.cost_per_kwh,
+            user_id=user_id
+        )
+        return {
+            "success": True,
+            "profile": {
+                "id": profile.id,
+                "device_id": profile.device_id,
+                "device_name": profile.device_name,
+                "rated_power_watts": profile.rated_power_watts,
+                "typical_power_watts": profile.typical_power_watts
+            }
         }
-    }
+    
+    return await run_in_db_thread(_create)
 
 
 @router.post("/alerts")
 async def create_alert(request: Request, alert_req: EnergyAlertRequest, user_id: str = "default"):
     """Create an energy alert"""
     monitor = get_energy_monitor(request)
-    alert = monitor.create_alert(
-        device_id=alert_req.device_id,
-        alert_type=alert_req.alert_type,
-        threshold_value=alert_req.threshold_value,
-        user_id=user_id
-    )
     
-    return {
-        "success": True,
-        "alert": {
-            "id": alert.id,
-            "device_id": alert.device_id,
-            "alert_type": alert.alert_type,
-            "threshold_value": alert.threshold_value
+    def _create():
+        alert = monitor.create_alert(
+            device_id=alert_req.device_id,
+            alert_type=alert_req.alert_type,
+            threshold_value=alert_req.threshold_value,
+            user_id=user_id
+        )
+        return {
+            "success": True,
+            "alert": {
+                "id": alert.id,
+                "device_id": alert.device_id,
+                "alert_type": alert.alert_type,
+                "threshold_value": alert.threshold_value
+            }
         }
-    }
+    
+    return await run_in_db_thread(_create)
+
+
+@router.get("/anomalies")
+async def get_anomalies(request: Request, limit: int = 100, user_id: str = "default"):
+    """Get the most recent anomaly alerts"""
+    monitor = get_energy_monitor(request)
+    
+    def _anomalies():
+        return [
+            {
+                "id": alert.id,
+                "device_id": alert.device_id,
+                "threshold_value": alert.threshold_value,
+                "triggered_at": alert.triggered_at.isoformat() if alert.triggered_at else None,
+                "acknowledged_at": alert.acknowledged_at.isoformat() if alert.acknowledged_at else None
+            }
+            for alert in monitor.get_anomalies(user_id, limit)
+        ]
+    
+    return {"anomalies": await run_in_db_thread(_anomalies)}
+
 
+@router.post("/anomalies/replay")
+async def replay_anomalies(
+    request: Request,
+    days: int = 7,
+    sigma: Optional[List[float]] = Query(default=None),
+    device_id: Optional[str] = None,
+    user_id: Optional[str] = None
+):
+    """Run the anomaly detector over stored readings to tune the threshold
+    
+    Reports how many readings (and alerts, after the cooldown) each
+    candidate ``sigma`` would flag; no alerts are stored.
+    """
+    monitor = get_energy_monitor(request)
+    result = await run_in_db_thread(
+        monitor.replay_anomalies, days=days, sigmas=sigma, device_id=device_id, user_id=user_id
+    )
+    return {"replay": result}
@@ -8,6 +8,7 @@ from typing import List, Optional, Dict, Any
 from home_assistant_platform.core.media.device_manager import MediaDeviceManager
 from home_assistant_platform.core.media.spotify_integration import SpotifyIntegration
 from home_assistant_platform.core.media.youtube_integration import YouTubeIntegration
+from home_assistant_platform.core.database import run_in_db_thread
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -66,51 +67,57 @@ def get_youtube_integration(request: Request) -> YouTubeIntegration:
 @router.get("/devices")
 async def list_devices(request: Request, device_type: Optional[str] = None, user_id: str = "default"):
     """List all media devices"""
-    manager = get_media_manager(request)
-    devices = manager.list_devices(device_type=device_type, user_id=user_id)
-    
-    return {
-        "devices": [
-            {
-                "id": d.id,
-                "name": d.name,
-                "device_type": d.device_type,
-                "device_id": d.device_id,
-                "capabilities": d.capabilities,
-                "current_state": d.current_state,
-                "manufacturer": d.manufacturer,
-                "model": d.model
-            }
-            for d in devices
-        ]
-    }
+    def _handle():
+        manager = get_media_manager(request)
+        devices = manager.list_devices(device_type=device_type, user_id=user_id)
+        
+        return {
+            "devices": [
+                {
+                    "id": d.id,
+                    "name": d.name,
+                    "device_type": d.device_type,
+                    "device_id": d.device_id,
+                    "capabilities": d.capabilities,
+                    "current_state": d.current_state,
+                    "manufacturer": d.manufacturer,
+                    "model": d.model
+                }
+                for d in devices
+            ]
+        }
+    
+    return await run_in_db_thread(_handle)
 
 
 @router.post("/devices")
 async def register_device(request: Request, device_req: MediaDeviceCreateRequest, user_id: str = "default"):
     """Register a media device"""
-    manager = get_media_manager(request)
-    device = manager.register_device(
-        name=device_req.name,
-        device_type=device_req.device_type,
-        device_id=device_req.device_id,
-        ip_address=device_req.ip_address,
-        port=device_req.port,
-        protocol=device_req.protocol,
-        capabilities=device_req.capabilities,
-        manufacturer=device_req.manufacturer,
-        model=device_req.model,
-        user_id=user_id
-    )
-    
-    return {
-        "success": True,
-        "device": {
-            "id": device.id,
-            "name": device.name,
-            "device_type": device.device_type
+    def _handle():
+        manager = get_media_manager(request)
+        device = manager.register_device(
+            name=device_req.name,
+            device_type=device_req.device_type,
+            device_id=device_req.device_id,
+            ip_address=device_req.ip_address,
+            port=device_req.port,
+            protocol=device_req.protocol,
+            capabilities=device_req.capabilities,
+            manufacturer=device_req.manufacturer,
+            model=device_req.model,
+            user_id=user_id
+        )
+        
+        return {
+            "success": True,
+            "device": {
+                "id": device.id,
+                "name": device.name,
+                "device_type": device.device_type
+            }
         }
-    }
+    
+    return await run_in_db_thread(_handle)
 
 
 @router.post("/play")
@@ -188,23 +195,26 @@ async def previous_track(request: Request, device_id: int, user_id: str = "defau
 @router.get("/sessions/{device_id}")
 async def get_session(request: Request, device_id: int, user_id: str = "default"):
     """Get current playback session"""
-    manager = get_media_manager(request)
-    session = manager.get_current_session(device_id, user_id=user_id)
-    
-    if not session:
-        raise HTTPException(status_code=404, detail="No active session")
-    
-    return {
-        "session": {
-            "id": session.id,
-            "title": session.title,
-            "artist": session.artist,
-            "album": session.album,
-            "is_playing": session.is_playing,
-            "volume": session.volume,
-            "source": session.source
+    def _handle():
+        manager = get_media_manager(request)
+        session = manager.get_current_session(device_id, user_id=user_id)
+        
+        if not session:
+            raise HTTPException(status_code=404, detail="No active session")
+        
+        return {
+            "session": {
+                "id": session.id,
+                "title": session.title,
+                "artist": session.artist,
+                "album": session.album,
+                "is_playing": session.is_playing,
+                "volume": session.volume,
+                "source": session.source
+            }
         }
-    }
+    
+    return await run_in_db_thread(_handle)
 
 
 @router.get("/spotify/search")
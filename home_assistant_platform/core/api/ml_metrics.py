@@ -5,6 +5,8 @@ from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
 
+from home_assistant_platform.core.database import run_in_db_thread
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -37,37 +39,46 @@ class TrainingLogRequest(BaseModel):
 @router.get("/ml-metrics/models")
 async def list_models(request: Request):
     """List all tracked models"""
-    tracker = request.app.state.ml_tracker
-    models = tracker.get_all_model_performance()
-    return {"models": models}
+    def _handle():
+        tracker = request.app.state.ml_tracker
+        models = tracker.get_all_model_performance()
+        return {"models": models}
+    
+    return await run_in_db_thread(_handle)
 
 
 @router.get("/ml-metrics/models/{model_name}")
 async def get_model_performance(request: Request, model_name: str):
     """Get performance metrics for a specific model"""
-    tracker = request.app.state.ml_tracker
-    performance = tracker.get_model_performance(model_name)
+    def _handle():
+        tracker = request.app.state.ml_tracker
+        performance = tracker.get_model_performance(model_name)
+        
+        if not performance:
+            raise HTTPException(status_code=404, detail=f"Model {model_name} not found")
+        
+        return performance
     
-    if not performance:
-        raise HTTPException(status_code=404, detail=f"Model {model_name} not found")
-    
-    return performance
+    return await run_in_db_thread(_handle)
 
 
 @router.post("/ml-metrics/predictions")
 async def log_prediction(request: Request, log_req: PredictionLogRequest):
     """Log a prediction for performance tracking"""
-    tracker = request.app.state.ml_tracker
-    prediction_id = tracker.log_prediction(
-        model_name=log_req.model_name,
-        input_data=log_req.input_data,
-        prediction=log_req.prediction,
-        confidence=log_req.confidence,
-        ground_truth=log_req.ground_truth,
-        context=log_req.context
-    )
+    def _handle():
+        tracker = request.app.state.ml_tracker
+        prediction_id = tracker.log_prediction(
+            model_name=log_req.model_name,
+            input_data=log_req.input_data,
+            prediction=log_req.prediction,
+            confidence=log_req.confidence,
+            ground_truth=log_req.ground_truth,
+            context=log_req.context
+        )
+        
+        return {"success": True, "prediction_id": prediction_id}
     
-    return {"success": True, "prediction_id": prediction_id}
+    return await run_in_db_thread(_handle)
 
 
 @router.get("/ml-metrics/models/{model_name}/predictions")
@@ -78,55 +89,67 @@ async def get_prediction_history(
     user_id: Optional[str] = None
 ):
     """Get prediction history for a model"""
-    tracker = request.app.state.ml_tracker
-    history = tracker.get_prediction_history(model_name, limit, user_id)
-    return {"predictions": history}
+    def _handle():
+        tracker = request.app.state.ml_tracker
+        history = tracker.get_prediction_history(model_name, limit, user_id)
+        return {"predictions": history}
+    
+    return await run_in_db_thread(_handle)
 
 
 @router.post("/ml-metrics/training")
 async def log_training(request: Request, training_req: TrainingLogRequest):
     """Log a model training session"""
-    tracker = request.app.state.ml_tracker
-    tracker.log_training(
-        model_name=training_req.model_name,
-        training_session_id=training_req.training_session_id,
-        training_samples=training_req.training_samples,
-        validation_samples=training_req.validation_samples,
-        training_accuracy=training_req.training_accuracy,
-        validation_accuracy=training_req.validation_accuracy,
-        training_loss=training_req.training_loss,
-        validation_loss=training_req.validation_loss,
-        hyperparameters=training_req.hyperparameters,
-        training_duration_seconds=training_req.training_duration_seconds,
-        final_metrics=training_req.final_metrics,
-        status=training_req.status
-    )
+    def _handle():
+        tracker = request.app.state.ml_tracker
+        tracker.log_training(
+            model_name=training_req.model_name,
+            training_session_id=training_req.training_session_id,
+            training_samples=training_req.training_samples,
+            validation_samples=training_req.validation_samples,
+            training_accuracy=training_req.training_accuracy,
+            validation_accuracy=training_req.validation_accuracy,
+            training_loss=training_req.training_loss,
+            validation_loss=training_req.validation_loss,
+            hyperparameters=training_req.hyperparameters,
+            training_duration_seconds=training_req.training_duration_seconds,
+            final_metrics=training_req.final_metrics,
+            status=training_req.status
+        )
+        
+        return {"success": True, "message": "Training logged"}
     
-    return {"success": True, "message": "Training logged"}
+    return await run_in_db_thread(_handle)
 
 
 @router.get("/ml-metrics/models/{model_name}/training")
 async def get_training_history(request: Request, model_name: str, limit: int = 20):
     """Get training history for a model"""
-    tracker = request.app.state.ml_tracker
-    history = tracker.get_training_history(model_name, limit)
-    return {"training_sessions": history}
+    def _handle():
+        tracker = request.app.state.ml_tracker
+        history = tracker.get_training_history(model_name, limit)
+        return {"training_sessions": history}
+    
+    return await run_in_db_thread(_handle)
 
 
 @router.get("/ml-metrics/models/{model_name}/metrics")
 async def get_detailed_metrics(request: Request, model_name: str):
     """Get detailed metrics including precision, recall, F1"""
-    tracker = request.app.state.ml_tracker
-    metrics = tracker.calculate_precision_recall(model_name)
-    performance = tracker.get_model_performance(model_name)
-    
-    if not performance:
-        raise HTTPException(status_code=404, detail=f"Model {model_name} not found")
+    def _handle():
+        tracker = request.app.state.ml_tracker
+        metrics = tracker.calculate_precision_recall(model_name)
+        performance = tracker.get_model_performance(model_name)
+        
+        if not performance:
+            raise HTTPException(status_code=404, detail=f"Model {model_name} not found")
+        
+        return {
+            **performance,
+            **metrics
+        }
     
-    return {
-        **performance,
-        **metrics
-    }
+    return await run_in_db_thread(_handle)
 
 
 @router.post("/ml-metrics/models/{model_name}/compare")
@@ -137,11 +160,14 @@ async def compare_models(
     version_b: str
 ):
     """Compare two model versions"""
-    tracker = request.app.state.ml_tracker
-    comparison = tracker.compare_models(model_name, version_a, version_b)
-    
-    if "error" in comparison:
-        raise HTTPException(status_code=404, detail=comparison["error"])
+    def _handle():
+        tracker = request.app.state.ml_tracker
+        comparison = tracker.compare_models(model_name, version_a, version_b)
+        
+        if "error" in comparison:
+            raise HTTPException(status_code=404, detail=comparison["error"])
+        
+        return comparison
     
-    return comparison
+    return await run_in_db_thread(_handle)
 
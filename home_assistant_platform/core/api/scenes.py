@@ -8,6 +8,7 @@ from datetime import datetime
 
 from home_assistant_platform.core.automation.scene_manager import SceneManager
 from home_assistant_platform.core.automation.enhanced_automation import EnhancedAutomationManager
+from home_assistant_platform.core.database import run_in_db_thread
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -56,65 +57,74 @@ def get_enhanced_automation_manager(request: Request) -> EnhancedAutomationManag
 @router.get("/scenes")
 async def list_scenes(request: Request, user_id: str = "default"):
     """List all scenes"""
-    manager = get_scene_manager(request)
-    scenes = manager.list_scenes(user_id=user_id)
+    def _handle():
+        manager = get_scene_manager(request)
+        scenes = manager.list_scenes(user_id=user_id)
+        
+        return {
+            "scenes": [
+                {
+                    "id": s.id,
+                    "name": s.name,
+                    "description": s.description,
+                    "icon": s.icon,
+                    "device_count": len(s.device_states),
+                    "created_at": s.created_at.isoformat()
+                }
+                for s in scenes
+            ]
+        }
     
-    return {
-        "scenes": [
-            {
-                "id": s.id,
-                "name": s.name,
-                "description": s.description,
-                "icon": s.icon,
-                "device_count": len(s.device_states),
-                "created_at": s.created_at.isoformat()
-            }
-            for s in scenes
-        ]
-    }
+    return await run_in_db_thread(_handle)
 
 
 @router.get("/scenes/{scene_id}")
 async def get_scene(request: Request, scene_id: int, user_id: str = "default"):
     """Get scene details"""
-    manager = get_scene_manager(request)
-    scene = manager.get_scene(scene_id, user_id=user_id)
-    
-    if not scene:
-        raise HTTPException(status_code=404, detail="Scene not found")
-    
-    return {
-        "scene": {
-            "id": scene.id,
-            "name": scene.name,
-            "description": scene.description,
-            "icon": scene.icon,
-            "device_states": scene.device_states,
-            "created_at": scene.created_at.isoformat()
+    def _handle():
+        manager = get_scene_manager(request)
+        scene = manager.get_scene(scene_id, user_id=user_id)
+        
+        if not scene:
+            raise HTTPException(status_code=404, detail="Scene not found")
+        
+        return {
+            "scene": {
+                "id": scene.id,
+                "name": scene.name,
+                "description": scene.description,
+                "icon": scene.icon,
+                "device_states": scene.device_states,
+                "created_at": scene.created_at.isoformat()
+            }
         }
-    }
+    
+    return await run_in_db_thread(_handle)
 
 
 @router.post("/scenes")
 async def create_scene(request: Request, scene_req: SceneCreateRequest, user_id: str = "default"):
     """Create a new scene"""
-    manager = get_scene_manager(request)
-    scene = manager.create_scene(
-        name=scene_req.name,
-        device_states=scene_req.device_states,
-        description=scene_req.description,
-        icon=scene_req.icon,
-        user_id=user_id
-    )
-    
-    return {
-        "success": True,
-        "scene": {
-            "id": scene.id,
-            "name": scene.name,
-            "device_states": scene.device_states
+    def _handle():
+        manager = get_scene_manager(request)
+        scene = manager.create_scene(
+            name=scene_req.name,
+            device_states=scene_req.device_states,
+            description=scene_req.description,
+            icon=scene_req.icon,
+            user_id=user_id
+        )
+        
+        return {
+            "success": True,
+            "scene": {
+                "id": scene.id,
+                "name": scene.name,
+                "device_states": scene.device_states
+            }
         }
-    }
+    
+    return await run_in_db_thread(_handle)
 
 
 @router.post("/scenes/{scene_id}/activate")
@@ -178,79 +188,94 @@ async def activate_scene_by_name(request: Request, scene_name: str, user_id: str
 @router.put("/scenes/{scene_id}")
 async def update_scene(request: Request, scene_id: int, scene_req: SceneUpdateRequest, user_id: str = "default"):
     """Update a scene"""
-    manager = get_scene_manager(request)
-    success = manager.update_scene(
-        scene_id=scene_id,
-        name=scene_req.name,
-        device_states=scene_req.device_states,
-        description=scene_req.description,
-        user_id=user_id
-    )
-    
-    if not success:
-        raise HTTPException(status_code=404, detail="Scene not found")
+    def _handle():
+        manager = get_scene_manager(request)
+        success = manager.update_scene(
+            scene_id=scene_id,
+            name=scene_req.name,
+            device_states=scene_req.device_states,
+            description=scene_req.description,
+            user_id=user_id
+        )
+        
+        if not success:
+            raise HTTPException(status_code=404, detail="Scene not found")
+        
+        return {"success": True, "message": "Scene updated"}
     
-    return {"success": True, "message": "Scene updated"}
+    return await run_in_db_thread(_handle)
 
 
 @router.delete("/scenes/{scene_id}")
 async def delete_scene(request: Request, scene_id: int, user_id: str = "default"):
     """Delete a scene"""
-    manager = get_scene_manager(request)
-    success = manager.delete_scene(scene_id, user_id=user_id)
+    def _handle():
+        manager = get_scene_manager(request)
+        success = manager.delete_scene(scene_id, user_id=user_id)
+        
+        if not success:
+            raise HTTPException(status_code=404, detail="Scene not found")
+        
+        return {"success": True, "message": "Scene deleted"}
     
-    if not success:
-        raise HTTPException(status_code=404, detail="Scene not found")
-    
-    return {"success": True, "message": "Scene deleted"}
+    return await run_in_db_thread(_handle)
 
 
 @router.post("/automations/scene")
 async def create_scene_automation(request: Request, automation_req: SceneAutomationRequest, user_id: str = "default"):
     """Create automation that activates a scene"""
-    manager = get_enhanced_automation_manager(request)
-    automation = manager.create_scene_automation(
-        name=automation_req.name,
-        scene_name=automation_req.scene_name,
-        trigger_type=automation_req.trigger_type,
-        trigger_config=automation_req.trigger_config,
-        conditions=automation_req.conditions,
-        user_id=user_id
-    )
-    
-    if not automation:
-        raise HTTPException(status_code=400, detail="Failed to create scene automation")
-    
-    return {
-        "success": True,
-        "automation": {
-            "id": automation.id,
-            "name": automation.name,
-            "scene_name": automation_req.scene_name
+    def _handle():
+        manager = get_enhanced_automation_manager(request)
+        automation = manager.create_scene_automation(
+            name=automation_req.name,
+            scene_name=automation_req.scene_name,
+            trigger_type=automation_req.trigger_type,
+            trigger_config=automation_req.trigger_config,
+            conditions=automation_req.conditions,
+            user_id=user_id
+        )
+        
+        if not automation:
+            raise HTTPException(status_code=400, detail="Failed to create scene automation")
+        
+        return {
+            "success": True,
+            "automation": {
+                "id": automation.id,
+                "name": automation.name,
+                "scene_name": automation_req.scene_name
+            }
         }
-    }
+    
+    return await run_in_db_thread(_handle)
 
 
 @router.post("/automations/{automation_id}/enable")
 async def enable_automation(request: Request, automation_id: int, user_id: str = "default"):
     """Enable an automation"""
-    manager = get_enhanced_automation_manager(request)
-    success = manager.enable_automation(automation_id, user_id=user_id)
-    
-    if not success:
-        raise HTTPException(status_code=404, detail="Automation not found")
+    def _handle():
+        manager = get_enhanced_automation_manager(request)
+        success = manager.enable_automation(automation_id, user_id=user_id)
+        
+        if not success:
+            raise HTTPException(status_code=404, detail="Automation not found")
+        
+        return {"success": True, "message": "Automation enabled"}
     
-    return {"success": True, "message": "Automation enabled"}
+    return await run_in_db_thread(_handle)
 
 
 @router.post("/automations/{automation_id}/disable")
 async def disable_automation(request: Request, automation_id: int, user_id: str = "default"):
     """Disable an automation"""
-    manager = get_enhanced_automation_manager(request)
-    success = manager.disable_automation(automation_id, user_id=user_id)
-    
-    if not success:
-        raise HTTPException(status_code=404, detail="Automation not found")
+    def _handle():
+        manager = get_enhanced_automation_manager(request)
+        success = manager.disable_automation(automation_id, user_id=user_id)
+        
+        if not success:
+            raise HTTPException(status_code=404, detail="Automation not found")
+        
+        return {"success": True, "message": "Automation disabled"}
     
-    return {"success": True, "message": "Automation disabled"}
+    return await run_in_db_thread(_handle)
 
@@ -0,0 +1,116 @@
+"""Live stream API - power, device and automation events over WebSocket or SSE"""
+
+import asyncio
+import json
+import logging
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from home_assistant_platform.config.settings import settings
+from home_assistant_platform.core.database import run_in_db_thread
+from home_assistant_platform.core.streaming.hub import StreamHub
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+async def get_stream_hub(app) -> StreamHub:
+    """Get stream hub from app state, seeded with the energy monitor's latest power"""
+    if not hasattr(app.state, 'stream_hub'):
+        app.state.stream_hub = StreamHub()
+    if not app.state.stream_hub.running:
+        monitor = getattr(app.state, 'energy_monitor', None)
+        latest_power = await run_in_db_thread(monitor.get_latest_power) if monitor else None
+        app.state.stream_hub.start(latest_power)
+    return app.state.stream_hub
+
+
+def _encode(message) -> str:
+    return json.dumps(message, default=str)
+
+
+@router.websocket("/stream")
+async def stream_websocket(
+    websocket: WebSocket,
+    topics: Optional[str] = None,
+    device_id: Optional[List[str]] = Query(default=None),
+    user_id: Optional[str] = None
+):
+    """Push live events to a WebSocket client
+    
+    ``topics`` is a comma-separated subset of ``power``, ``devices`` and
+    ``automations``; ``device_id`` may be repeated. The client receives a
+    snapshot of the latest values, then one JSON message per event. It may
+    send ``{"topics": [...], "device_ids": [...]}`` to change its filters.
+    """
+    hub = await get_stream_hub(websocket.app)
+    await websocket.accept()
+    try:
+        client = hub.connect(topics and [topics], device_id, user_id)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    
+    async def send():
+        while hub.running:
+            for message in await client.next_batch(settings.stream_heartbeat_seconds):
+                await websocket.send_text(_encode(message))
+    
+    async def receive():
+        while True:
+            request = await websocket.receive_json()
+            try:
+                hub.update(client, request.get("topics"), request.get("device_ids"))
+            except (AttributeError, ValueError) as e:
+                await websocket.send_text(_encode({"error": str(e)}))
+    
+    tasks = [asyncio.create_task(send()), asyncio.create_task(receive())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() and not isinstance(task.exception(), WebSocketDisconnect):
+                logger.warning(f"Stream client error: {task.exception()}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        hub.disconnect(client)
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    topics: Optional[str] = None,
+    device_id: Optional[List[str]] = Query(default=None),
+    user_id: Optional[str] = None
+):
+    """Push live events as Server-Sent Events (same filters as the WebSocket)"""
+    hub = await get_stream_hub(request.app)
+    try:
+        client = hub.connect(topics and [topics], device_id, user_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def events():
+        try:
+            while hub.running:
+                batch = await client.next_batch(settings.stream_heartbeat_seconds)
+                if await request.is_disconnected():
+                    break
+                if not batch:
+                    yield ": keep-alive\n\n"
+                for message in batch:
+                    yield f"event: {message['topic']}\ndata: {_encode(message)}\n\n"
+        finally:
+            hub.disconnect(client)
+    
+    return StreamingResponse(
+        events(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/stream/stats")
+async def stream_stats(request: Request):
+    """Connected clients and cached values"""
+    return (await get_stream_hub(request.app)).get_stats()
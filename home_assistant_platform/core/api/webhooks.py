@@ -6,6 +6,8 @@ from pydantic import BaseModel, HttpUrl
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
+from home_assistant_platform.core.database import run_in_db_thread
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -27,6 +29,10 @@ class WebhookCreate(BaseModel):
     enabled: bool = True
     timeout: int = 10
     retry_count: int = 3
+    delivery_mode: str = "immediate"  # immediate, batch or coalesce
+    batch_window_ms: int = 1000
+    batch_max_size: int = 100
+    coalesce_key: str = "device_id"
 
 
 class WebhookUpdate(BaseModel):
@@ -35,93 +41,173 @@ class WebhookUpdate(BaseModel):
     method: Optional[str] = None
     headers: Optional[Dict[str, str]] = None
     payload_template: Optional[str] = None
+    secret: Optional[str] = None
+    trigger_on_device_change: Optional[bool] = None
+    trigger_on_scene_activate: Optional[bool] = None
+    trigger_on_automation_run: Optional[bool] = None
+    trigger_on_voice_command: Optional[bool] = None
+    trigger_on_custom_event: Optional[bool] = None
+    custom_event_types: Optional[List[str]] = None
     enabled: Optional[bool] = None
     timeout: Optional[int] = None
     retry_count: Optional[int] = None
+    delivery_mode: Optional[str] = None
+    batch_window_ms: Optional[int] = None
+    batch_max_size: Optional[int] = None
+    coalesce_key: Optional[str] = None
 
 
 @router.get("/webhooks")
 async def list_webhooks(request: Request):
     """List all webhooks"""
-    webhook_manager = request.app.state.webhook_manager
-    webhooks = webhook_manager.list_webhooks()
-    return [
-        {
-            "id": w.id,
-            "name": w.name,
-            "url": w.url,
-            "method": w.method,
-            "enabled": w.enabled,
-            "triggers": {
-                "device_change": w.trigger_on_device_change,
-                "scene_activate": w.trigger_on_scene_activate,
-                "automation_run": w.trigger_on_automation_run,
-                "voice_command": w.trigger_on_voice_command,
-                "custom_event": w.trigger_on_custom_event
-            },
-            "created_at": w.created_at.isoformat()
-        }
-        for w in webhooks
-    ]
+    def _handle():
+        webhook_manager = request.app.state.webhook_manager
+        webhooks = webhook_manager.list_webhooks()
+        return [
+            {
+                "id": w.id,
+                "name": w.name,
+                "url": w.url,
+                "method": w.method,
+                "enabled": w.enabled,
+                "triggers": {
+                    "device_change": w.trigger_on_device_change,
+                    "scene_activate": w.trigger_on_scene_activate,
+                    "automation_run": w.trigger_on_automation_run,
+                    "voice_command": w.trigger_on_voice_command,
+                    "custom_event": w.trigger_on_custom_event
+                },
+                "created_at": w.created_at.isoformat()
+            }
+            for w in webhooks
+        ]
+    
+    return await run_in_db_thread(_handle)
 
 
 @router.post("/webhooks")
 async def create_webhook(request: Request, webhook_data: WebhookCreate):
     """Create a new webhook"""
+    def _handle():
+        webhook_manager = request.app.state.webhook_manager
+        try:
+            webhook = webhook_manager.create_webhook(
+                name=webhook_data.name,
+                url=webhook_data.url,
+                method=webhook_data.method,
+                headers=webhook_data.headers,
+                payload_template=webhook_data.payload_template,
+                secret=webhook_data.secret,
+                trigger_on_device_change=webhook_data.trigger_on_device_change,
+                trigger_on_scene_activate=webhook_data.trigger_on_scene_activate,
+                trigger_on_automation_run=webhook_data.trigger_on_automation_run,
+                trigger_on_voice_command=webhook_data.trigger_on_voice_command,
+                trigger_on_custom_event=webhook_data.trigger_on_custom_event,
+                custom_event_types=webhook_data.custom_event_types,
+                enabled=webhook_data.enabled,
+                timeout=webhook_data.timeout,
+                retry_count=webhook_data.retry_count,
+                delivery_mode=webhook_data.delivery_mode,
+                batch_window_ms=webhook_data.batch_window_ms,
+                batch_max_size=webhook_data.batch_max_size,
+                coalesce_key=webhook_data.coalesce_key
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {
+            "id": webhook.id,
+            "name": webhook.name,
+            "url": webhook.url,
+            "created_at": webhook.created_at.isoformat()
+        }
+    
+    return await run_in_db_thread(_handle)
+
+
+@router.get("/webhooks/deliveries/stats")
+async def get_delivery_stats(request: Request):
+    """Delivery queue depth, outcome counters and latency"""
+    webhook_manager = request.app.state.webhook_manager
+    stats = await run_in_db_thread(webhook_manager.queue.get_stats)
+    stats["batching"] = {**webhook_manager.batches.stats, "buffered": len(webhook_manager.batches)}
+    return stats
+
+
+@router.get("/webhooks/deliveries/dead")
+async def list_dead_deliveries(request: Request, webhook_id: Optional[int] = None, limit: int = 100):
+    """Deliveries that failed every attempt"""
     webhook_manager = request.app.state.webhook_manager
-    webhook = webhook_manager.create_webhook(
-        name=webhook_data.name,
-        url=webhook_data.url,
-        method=webhook_data.method,
-        headers=webhook_data.headers,
-        payload_template=webhook_data.payload_template,
-        secret=webhook_data.secret,
-        trigger_on_device_change=webhook_data.trigger_on_device_change,
-        trigger_on_scene_activate=webhook_data.trigger_on_scene_activate,
-        trigger_on_automation_run=webhook_data.trigger_on_automation_run,
-        trigger_on_voice_command=webhook_data.trigger_on_voice_command,
-        trigger_on_custom_event=webhook_data.trigger_on_custom_event,
-        custom_event_types=webhook_data.custom_event_types,
-        enabled=webhook_data.enabled,
-        timeout=webhook_data.timeout,
-        retry_count=webhook_data.retry_count
-    )
-    return {
-        "id": webhook.id,
-        "name": webhook.name,
-        "url": webhook.url,
-        "created_at": webhook.created_at.isoformat()
-    }
+    return await run_in_db_thread(webhook_manager.queue.list_dead, webhook_id, limit)
+
+
+@router.post("/webhooks/deliveries/{delivery_id}/retry")
+async def retry_delivery(request: Request, delivery_id: int):
+    """Send a dead-lettered delivery again"""
+    webhook_manager = request.app.state.webhook_manager
+    if not await webhook_manager.queue.retry(delivery_id):
+        raise HTTPException(status_code=404, detail="Dead-lettered delivery not found")
+    return {"success": True, "message": "Delivery requeued"}
 
 
 @router.get("/webhooks/{webhook_id}")
 async def get_webhook(request: Request, webhook_id: int):
     """Get webhook details"""
-    webhook_manager = request.app.state.webhook_manager
-    webhook = webhook_manager.get_webhook(webhook_id)
-    if not webhook:
-        raise HTTPException(status_code=404, detail="Webhook not found")
+    def _handle():
+        webhook_manager = request.app.state.webhook_manager
+        webhook = webhook_manager.get_webhook(webhook_id)
+        if not webhook:
+            raise HTTPException(status_code=404, detail="Webhook not found")
+        
+        return {
+            "id": webhook.id,
+            "name": webhook.name,
+            "url": webhook.url,
+            "method": webhook.method,
+            "headers": webhook.headers,
+            "payload_template": webhook.payload_template,
+            "enabled": webhook.enabled,
+            "triggers": {
+                "device_change": webhook.trigger_on_device_change,
+                "scene_activate": webhook.trigger_on_scene_activate,
+                "automation_run": webhook.trigger_on_automation_run,
+                "voice_command": webhook.trigger_on_voice_command,
+                "custom_event": webhook.trigger_on_custom_event,
+                "custom_event_types": webhook.custom_event_types
+            },
+            "timeout": webhook.timeout,
+            "retry_count": webhook.retry_count,
+            "delivery": {
+                "mode": webhook.delivery_mode,
+                "batch_window_ms": webhook.batch_window_ms,
+                "batch_max_size": webhook.batch_max_size,
+                "coalesce_key": webhook.coalesce_key
+            },
+            "created_at": webhook.created_at.isoformat()
+        }
+    
+    return await run_in_db_thread(_handle)
+
+
+@router.put("/webhooks/{webhook_id}")
+async def update_webhook(request: Request, webhook_id: int, webhook_data: WebhookUpdate):
+    """Update a webhook"""
+    def _handle():
+        webhook_manager = request.app.state.webhook_manager
+        try:
+            webhook = webhook_manager.update_webhook(webhook_id, **webhook_data.model_dump(exclude_unset=True))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not webhook:
+            raise HTTPException(status_code=404, detail="Webhook not found")
+        return {
+            "id": webhook.id,
+            "name": webhook.name,
+            "url": webhook.url,
+            "enabled": webhook.enabled,
+            "updated_at": webhook.updated_at.isoformat()
+        }
     
-    return {
-        "id": webhook.id,
-        "name": webhook.name,
-        "url": webhook.url,
-        "method": webhook.method,
-        "headers": webhook.headers,
-        "payload_template": webhook.payload_template,
-        "enabled": webhook.enabled,
-        "triggers": {
-            "device_change": webhook.trigger_on_device_change,
-            "scene_activate": webhook.trigger_on_scene_activate,
-            "automation_run": webhook.trigger_on_automation_run,
-            "voice_command": webhook.trigger_on_voice_command,
-            "custom_event": webhook.trigger_on_custom_event,
-            "custom_event_types": webhook.custom_event_types
-        },
-        "timeout": webhook.timeout,
-        "retry_count": webhook.retry_count,
-        "created_at": webhook.created_at.isoformat()
-    }
+    return await run_in_db_thread(_handle)
 
 
 @router.post("/webhooks/{webhook_id}/trigger")
@@ -131,42 +217,48 @@ async def trigger_webhook(
     event_type: str,
     event_data: Dict[str, Any]
 ):
-    """Manually trigger a webhook"""
+    """Manually trigger a webhook (the request is sent by the delivery queue)"""
     webhook_manager = request.app.state.webhook_manager
     success = await webhook_manager.trigger_webhook(webhook_id, event_type, event_data)
     if not success:
         raise HTTPException(status_code=400, detail="Failed to trigger webhook")
-    return {"success": True, "message": "Webhook triggered"}
+    return {"success": True, "message": "Webhook queued"}
 
 
 @router.get("/webhooks/{webhook_id}/logs")
 async def get_webhook_logs(request: Request, webhook_id: int, limit: int = 100):
     """Get webhook execution logs"""
-    webhook_manager = request.app.state.webhook_manager
-    logs = webhook_manager.get_webhook_logs(webhook_id, limit)
-    return [
-        {
-            "id": log.id,
-            "webhook_id": log.webhook_id,
-            "url": log.url,
-            "method": log.method,
-            "response_status": log.response_status,
-            "response_time_ms": log.response_time_ms,
-            "success": log.success,
-            "error_message": log.error_message,
-            "triggered_by": log.triggered_by,
-            "created_at": log.created_at.isoformat()
-        }
-        for log in logs
-    ]
+    def _handle():
+        webhook_manager = request.app.state.webhook_manager
+        logs = webhook_manager.get_webhook_logs(webhook_id, limit)
+        return [
+            {
+                "id": log.id,
+                "webhook_id": log.webhook_id,
+                "url": log.url,
+                "method": log.method,
+                "response_status": log.response_status,
+                "response_time_ms": log.response_time_ms,
+                "success": log.success,
+                "error_message": log.error_message,
+                "triggered_by": log.triggered_by,
+                "created_at": log.created_at.isoformat()
+            }
+            for log in logs
+        ]
+    
+    return await run_in_db_thread(_handle)
 
 
 @router.delete("/webhooks/{webhook_id}")
 async def delete_webhook(request: Request, webhook_id: int):
     """Delete a webhook"""
-    webhook_manager = request.app.state.webhook_manager
-    success = webhook_manager.delete_webhook(webhook_id)
-    if not success:
-        raise HTTPException(status_code=404, detail="Webhook not found")
-    return {"success": True, "message": "Webhook deleted"}
+    def _handle():
+        webhook_manager = request.app.state.webhook_manager
+        success = webhook_manager.delete_webhook(webhook_id)
+        if not success:
+            raise HTTPException(status_code=404, detail="Webhook not found")
+        return {"success": True, "message": "Webhook deleted"}
+    
+    return await run_in_db_thread(_handle)
 
@@ -0,0 +1,208 @@
+"""Action runner - executes device actions concurrently across devices"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Any, Sequence
+from home_assistant_platform.core.automation.device_manager import DeviceManager
+from home_assistant_platform.core.automation.rule_cache import CompiledAction, compile_action
+from home_assistant_platform.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ActionResult:
+    """Outcome and timing of one action"""
+    action: CompiledAction
+    success: bool
+    started_ms: float = 0.0  # Offset from the start of the run
+    duration_ms: float = 0.0
+    error: Optional[str] = None
+    
+    def to_log(self) -> Dict[str, Any]:
+        """Entry for AutomationExecution.actions_executed"""
+        entry = {
+            "action": self.action.raw,
+            "success": self.success,
+            "started_ms": round(self.started_ms, 3),
+            "duration_ms": round(self.duration_ms, 3)
+        }
+        if self.error:
+            entry["error"] = self.error
+        return entry
+
+
+def device_state_to_actions(device_state: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Expand a scene device state into actions (on/off -> brightness -> color -> temperature)"""
+    device_id = device_state.get("device_id")
+    device_type = device_state.get("device_type", "unknown")
+    actions = []
+    
+    state = device_state.get("state")
+    if state in ("on", "off"):
+        actions.append({"device_id": device_id, "device_type": device_type, "action": f"turn_{state}"})
+    if device_state.get("brightness") is not None:
+        actions.append({
+            "device_id": device_id, "device_type": device_type,
+            "action": "set_brightness", "value": str(device_state["brightness"])
+        })
+    if device_state.get("color"):
+        actions.append({
+            "device_id": device_id, "device_type": device_type,
+            "action": "set_color", "value": device_state["color"]
+        })
+    if device_state.get("temperature") is not None:
+        actions.append({
+            "device_id": device_id, "device_type": device_type,
+            "action": "set_temperature", "value": str(device_state["temperature"])
+        })
+    return actions
+
+
+class ActionRunner:
+    """Runs actions grouped by device
+    
+    Actions of one device run sequentially in their original order (so
+    turn_on lands before set_brightness), while different devices run
+    concurrently. A semaphore shared by every run caps how many devices
+    are commanded at once, so latency stays roughly flat as scenes grow
+    without flooding the broker or bridge. Device managers overriding
+    ``apply_batch`` receive each device's actions in one call instead.
+    """
+    
+    def __init__(self, device_manager: Optional[Any] = None, max_concurrency: Optional[int] = None):
+        self.device_manager = device_manager
+        self.max_concurrency = max(1, max_concurrency or settings.automation_max_concurrency)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+    
+    async def run(self, actions: Sequence[CompiledAction]) -> List[ActionResult]:
+        """Execute actions and return their results in the original order"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self._batches_commands():
+            return await self._run_batch(actions)
+        
+        by_device: Dict[Optional[str], List[int]] = OrderedDict()
+        for index, action in enumerate(actions):
+            by_device.setdefault(action.device_id, []).append(index)
+        
+        results: List[Optional[ActionResult]] = [None] * len(actions)
+        start = time.perf_counter()
+        
+        async def run_device(indexes: List[int]):
+            async with self._semaphore:
+                for index in indexes:
+                    results[index] = await self._run_one(actions[index], start)
+        
+        await asyncio.gather(*(run_device(indexes) for indexes in by_device.values()))
+        return results
+    
+    async def run_raw(self, actions: Sequence[Dict[str, Any]]) -> List[ActionResult]:
+        """Compile JSON actions and execute them"""
+        return await self.run([compile_action(action) for action in actions])
+    
+    def _batches_commands(self) -> bool:
+        """Whether the device manager merges commands itself
+        
+        The base ``DeviceManager.apply_batch`` only runs commands one by one,
+        so managers that inherit it go through the per-device runner, which
+        keeps per-action timing.
+        """
+        apply_batch = getattr(type(self.device_manager), "apply_batch", None)
+        return apply_batch is not None and apply_batch is not DeviceManager.apply_batch
+    
+    async def _run_batch(self, actions: Sequence[CompiledAction]) -> List[ActionResult]:
+        """Send each device's valid actions to the device manager as one batch
+        
+        The manager merges a device's commands (one MQTT message per light
+        instead of one per attribute), so the actions of a device share the
+        timing of its batch. Devices run concurrently, as in ``run``.
+        """
+        by_device: Dict[Optional[str], List[int]] = OrderedDict()
+        for index, action in enumerate(actions):
+            if action.error:
+                logger.error(action.error)
+            else:
+                by_device.setdefault(action.device_id, []).append(index)
+        
+        results = [
+            ActionResult(action=action, success=False, error=action.error)
+            for action in actions
+        ]
+        start = time.perf_counter()
+        
+        async def run_device(indexes: List[int]):
+            commands = [
+                {"device_id": actions[i].device_id, "action": actions[i].action, "value": actions[i].value}
+                for i in indexes
+            ]
+            async with self._semaphore:
+                started = time.perf_counter()
+                error = None
+                try:
+                    outcomes = await self.device_manager.apply_batch(commands)
+                except Exception as e:
+                    logger.error(f"Error executing action batch: {e}", exc_info=True)
+                    outcomes, error = [False] * len(commands), str(e)
+                finished = time.perf_counter()
+            for index, success in zip(indexes, outcomes):
+                results[index] = ActionResult(
+                    action=actions[index],
+                    success=bool(success),
+                    started_ms=(started - start) * 1000,
+                    duration_ms=(finished - started) * 1000,
+                    error=error
+                )
+        
+        await asyncio.gather(*(run_device(indexes) for indexes in by_device.values()))
+        return results
+    
+    async def _run_one(self, action: CompiledAction, start: float) -> ActionResult:
+        started = time.perf_counter()
+        error = None
+        try:
+            success = await self._execute(action)
+        except Exception as e:
+            logger.error(f"Error executing action {action.raw}: {e}", exc_info=True)
+            success, error = False, str(e)
+        finished = time.perf_counter()
+        return ActionResult(
+            action=action,
+            success=success,
+            started_ms=(started - start) * 1000,
+            duration_ms=(finished - started) * 1000,
+            error=error or action.error
+        )
+    
+    async def _execute(self, action: CompiledAction) -> bool:
+        """Execute a single compiled action"""
+        if action.error:
+            logger.error(action.error)
+            return False
+        
+        device_id = action.device_id
+        action_type = action.action
+        value = action.value
+        
+        # Use device manager if available
+        if self.device_manager:
+            if action_type == "turn_on":
+                return await self.device_manager.turn_on_device(device_id)
+            elif action_type == "turn_off":
+                return await self.device_manager.turn_off_device(device_id)
+            elif action_type == "set_temperature":
+                return await self.device_manager.set_temperature(device_id, value)
+            elif action_type == "set_brightness":
+                return await self.device_manager.set_brightness(device_id, value)
+            elif action_type == "set_color":
+                return await self.device_manager.set_color(device_id, value)
+            else:
+                logger.warning(f"Unknown action type: {action_type}")
+                return False
+        else:
+            # Fallback: just log the action
+            logger.info(f"Would execute: {device_id} -> {action_type} ({value})")
+            return True
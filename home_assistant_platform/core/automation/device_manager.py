@@ -1,8 +1,10 @@
 """Device manager - abstraction layer for device control"""
 
+import asyncio
 import logging
 from typing import Dict, Optional, List, Any
 from abc import ABC, abstractmethod
+from home_assistant_platform.config.settings import settings
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +31,60 @@ class DeviceManager(ABC):
     def list_devices(self) -> List[Dict[str, Any]]:
         """List all available devices"""
         pass
+    
+    async def apply_command(self, device_id: str, action: str, value: Any = None) -> bool:
+        """Apply a single command by action name"""
+        if action == "turn_on":
+            return await self.turn_on_device(device_id)
+        elif action == "turn_off":
+            return await self.turn_off_device(device_id)
+        
+        method = COMMAND_METHODS.get(action)
+        if method is None or not hasattr(self, method):
+            logger.warning(f"Unsupported action for {device_id}: {action}")
+            return False
+        return await getattr(self, method)(device_id, value)
+    
+    async def apply_batch(self, commands: List[Dict[str, Any]]) -> List[bool]:
+        """Apply several commands, returning one result per command
+        
+        Commands are ``{"device_id", "action", "value"}`` dicts. The default
+        runs different devices concurrently and each device's commands in
+        order; protocol managers override it to merge a device's commands
+        into a single message.
+        """
+        results = [False] * len(commands)
+        semaphore = asyncio.Semaphore(max(1, settings.automation_max_concurrency))
+        
+        async def run_device(indexes: List[int]):
+            async with semaphore:
+                for index in indexes:
+                    command = commands[index]
+                    try:
+                        results[index] = await self.apply_command(
+                            command["device_id"], command["action"], command.get("value")
+                        )
+                    except Exception as e:
+                        logger.error(f"Error applying {command}: {e}", exc_info=True)
+        
+        await asyncio.gather(*(run_device(indexes) for indexes in group_by_device(commands).values()))
+        return results
+
+
+# Action name -> DeviceManager method taking (device_id, value)
+COMMAND_METHODS = {
+    "set_temperature": "set_temperature",
+    "set_brightness": "set_brightness",
+    "set_color": "set_color",
+}
+
+
+def group_by_device(commands: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """Indexes of the commands of each device, in submission order"""
+    groups: Dict[str, List[int]] = {}
+    for index, command in enumerate(commands):
+        groups.setdefault(command.get("device_id"), []).append(index)
+    return groups
 
 
 class MockDeviceManager(DeviceManager):
@@ -3,8 +3,11 @@
 import logging
 from datetime import datetime, time
 from typing import List, Dict, Optional, Any
-from home_assistant_platform.core.automation.models import Automation, get_automation_db
+from home_assistant_platform.core.automation.models import (
+    Automation, get_automation_db, notify_automations_changed
+)
 from home_assistant_platform.core.automation.executor import AutomationExecutor
+from home_assistant_platform.core.automation.action_runner import device_state_to_actions
 
 logger = logging.getLogger(__name__)
 
@@ -36,40 +39,12 @@ class EnhancedAutomationManager:
             logger.error(f"Scene '{scene_name}' not found")
             return None
         
-        # Convert scene device states to automation actions
-        actions = []
-        for device_state in scene.device_states:
-            action = {
-                "device_id": device_state.get("device_id"),
-                "device_type": device_state.get("device_type", "unknown"),
-                "action": "turn_on" if device_state.get("state") == "on" else "turn_off"
-            }
-            
-            if device_state.get("brightness"):
-                actions.append({
-                    "device_id": device_state.get("device_id"),
-                    "device_type": device_state.get("device_type", "unknown"),
-                    "action": "set_brightness",
-                    "value": str(device_state.get("brightness"))
-                })
-            
-            if device_state.get("color"):
-                actions.append({
-                    "device_id": device_state.get("device_id"),
-                    "device_type": device_state.get("device_type", "unknown"),
-                    "action": "set_color",
-                    "value": device_state.get("color")
-                })
-            
-            if device_state.get("temperature"):
-                actions.append({
-                    "device_id": device_state.get("device_id"),
-                    "device_type": device_state.get("device_type", "unknown"),
-                    "action": "set_temperature",
-                    "value": str(device_state.get("temperature"))
-                })
-            
-            actions.append(action)
+        # Convert scene device states to automation actions (per-device order preserved)
+        actions = [
+            action
+            for device_state in scene.device_states
+            for action in device_state_to_actions(device_state)
+        ]
         
         automation = Automation(
             name=name,
@@ -85,6 +60,7 @@ class EnhancedAutomationManager:
         
         self.db.add(automation)
         self.db.commit()
+        notify_automations_changed(automation.id)
         
         logger.info(f"Created scene automation: {name}")
         return automation
@@ -116,6 +92,7 @@ class EnhancedAutomationManager:
         
         self.db.add(automation)
         self.db.commit()
+        notify_automations_changed(automation.id)
         
         logger.info(f"Created event-based automation: {name}")
         return automation
@@ -144,6 +121,7 @@ class EnhancedAutomationManager:
         
         self.db.add(automation)
         self.db.commit()
+        notify_automations_changed(automation.id)
         
         logger.info(f"Created conditional automation: {name}")
         return automation
@@ -167,6 +145,7 @@ class EnhancedAutomationManager:
         if automation:
             automation.is_enabled = True
             self.db.commit()
+            notify_automations_changed(automation_id)
             return True
         return False
     
@@ -180,6 +159,7 @@ class EnhancedAutomationManager:
         if automation:
             automation.is_enabled = False
             self.db.commit()
+            notify_automations_changed(automation_id)
             return True
         return False
 
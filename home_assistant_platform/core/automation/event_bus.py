@@ -0,0 +1,122 @@
+"""In-process event bus - device events for event-triggered automations and live streams"""
+
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# Event types published by the device layer
+DEVICE_STATE_CHANGE = "device_state_change"
+DEVICE_COMMAND = "device_command"
+DEVICE_ADDED = "device_added"
+DEVICE_REMOVED = "device_removed"
+
+# Event types published by other subsystems
+ENERGY_READING = "energy_reading"
+AUTOMATION_EXECUTED = "automation_executed"
+
+
+@dataclass
+class DeviceEvent:
+    """Event published on the bus"""
+    event_type: str
+    device_id: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    source: Optional[str] = None
+    timestamp: datetime = field(default_factory=datetime.now)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "event_type": self.event_type,
+            "device_id": self.device_id,
+            "source": self.source,
+            "timestamp": self.timestamp.isoformat(),
+            **self.data
+        }
+
+
+EventHandler = Callable[[DeviceEvent], None]
+
+
+class EventBus:
+    """Fan-out of device events to subscribers on the event loop
+    
+    ``publish`` may be called from any thread (the MQTT client calls it from
+    its network thread); events are always delivered on the bound event
+    loop. Handlers run synchronously and must not block - schedule a task
+    for anything slow.
+    """
+    
+    def __init__(self):
+        self._subscribers: Dict[Optional[str], List[EventHandler]] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def bind_loop(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Bind the loop events are delivered on (defaults to the running loop)"""
+        self._loop = loop or asyncio.get_running_loop()
+    
+    def subscribe(self, handler: EventHandler, event_type: Optional[str] = None):
+        """Subscribe to one event type, or to all events when None"""
+        with self._lock:
+            handlers = list(self._subscribers.get(event_type, []))
+            if handler not in handlers:
+                handlers.append(handler)
+            self._subscribers[event_type] = handlers
+    
+    def unsubscribe(self, handler: EventHandler, event_type: Optional[str] = None):
+        """Remove a subscription"""
+        with self._lock:
+            handlers = [h for h in self._subscribers.get(event_type, []) if h != handler]
+            self._subscribers[event_type] = handlers
+    
+    def publish(
+        self,
+        event_type: str,
+        device_id: Optional[str] = None,
+        data: Optional[Dict[str, Any]] = None,
+        source: Optional[str] = None
+    ) -> DeviceEvent:
+        """Publish an event (thread-safe)"""
+        event = DeviceEvent(event_type=event_type, device_id=device_id, data=data or {}, source=source)
+        
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        
+        if running is not None and (self._loop is None or self._loop.is_closed()):
+            self._loop = running
+        
+        if running is not None and running is self._loop:
+            self._deliver(event)
+        elif self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._deliver, event)
+        else:
+            logger.debug(f"No event loop bound, dropping {event_type} event for {device_id}")
+        return event
+    
+    def _deliver(self, event: DeviceEvent):
+        """Call subscribers of the event's type and catch-all subscribers"""
+        handlers = self._subscribers.get(event.event_type, []) + self._subscribers.get(None, [])
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                logger.error(f"Error in event handler for {event.event_type}: {e}", exc_info=True)
+
+
+# Global event bus instance
+_event_bus: Optional[EventBus] = None
+
+
+def get_event_bus() -> EventBus:
+    """Get global event bus"""
+    global _event_bus
+    if _event_bus is None:
+        _event_bus = EventBus()
+    return _event_bus
@@ -0,0 +1,219 @@
+"""Event trigger engine - runs event-based automations from the event bus"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from home_assistant_platform.core.automation.event_bus import EventBus, DeviceEvent, get_event_bus
+from home_assistant_platform.core.automation.models import (
+    add_automation_change_listener, remove_automation_change_listener
+)
+from home_assistant_platform.core.automation.rule_cache import CompiledRule
+from home_assistant_platform.core.database import run_in_db_thread
+
+logger = logging.getLogger(__name__)
+
+# Event fields an automation can filter on in its trigger_config
+MATCH_FIELDS = ("state", "previous_state")
+
+
+@dataclass
+class EventTrigger:
+    """Parsed trigger of an event-based automation"""
+    automation_id: int
+    name: str
+    event_type: str
+    device_id: Optional[str] = None  # None = any device
+    match: Dict[str, str] = field(default_factory=dict)
+    debounce: float = 0.0  # Seconds of quiet before firing with the latest event
+    throttle: float = 0.0  # Minimum seconds between two executions
+    
+    def matches(self, event: DeviceEvent) -> bool:
+        """Check the event against the trigger's field filters"""
+        for key, expected in self.match.items():
+            if str(event.data.get(key, "")).lower() != expected:
+                return False
+        return True
+
+
+def parse_event_trigger(rule: CompiledRule) -> Optional[EventTrigger]:
+    """Build an EventTrigger from a compiled event automation"""
+    config = rule.trigger_config
+    event_type = config.get("event_type")
+    if not event_type:
+        logger.warning(f"Event automation {rule.automation_id} has no event_type")
+        return None
+    
+    try:
+        debounce = float(config.get("debounce_seconds") or 0)
+        throttle = float(config.get("throttle_seconds") or 0)
+    except (TypeError, ValueError):
+        logger.warning(f"Event automation {rule.automation_id} has invalid debounce/throttle")
+        return None
+    
+    return EventTrigger(
+        automation_id=rule.automation_id,
+        name=rule.name,
+        event_type=event_type,
+        device_id=config.get("device_id"),
+        match={key: str(config[key]).lower() for key in MATCH_FIELDS if config.get(key) is not None},
+        debounce=max(0.0, debounce),
+        throttle=max(0.0, throttle)
+    )
+
+
+@dataclass
+class _TriggerState:
+    """Debounce/throttle bookkeeping of one automation"""
+    last_fired: Optional[float] = None
+    pending: Optional[DeviceEvent] = None
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class EventTriggerEngine:
+    """Routes bus events to event-based automations
+    
+    Enabled ``event`` automations are indexed by ``(event_type, device_id)``
+    (device_id None for automations that match any device), so each event
+    is matched with two dict lookups regardless of how many automations
+    exist. Per-automation debounce and throttle keep chatty sensors from
+    flooding the executor.
+    """
+    
+    def __init__(self, executor, event_bus: Optional[EventBus] = None):
+        self.executor = executor
+        self.event_bus = event_bus or get_event_bus()
+        self.running = False
+        
+        self.triggers: Dict[int, EventTrigger] = {}
+        self._index: Dict[Tuple[str, Optional[str]], List[EventTrigger]] = {}
+        self._states: Dict[int, _TriggerState] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reload_task: Optional[asyncio.Task] = None
+        self._reload_again = False
+        self._fire_tasks: Set[asyncio.Task] = set()
+    
+    async def start(self):
+        """Start routing events"""
+        if self.running:
+            return
+        
+        self.running = True
+        self._loop = asyncio.get_running_loop()
+        self.event_bus.bind_loop(self._loop)
+        add_automation_change_listener(self.notify_changed)
+        await self.reload()
+        self.event_bus.subscribe(self.handle_event)
+        logger.info(f"Event trigger engine started ({len(self.triggers)} event triggers)")
+    
+    async def stop(self):
+        """Stop routing events"""
+        self.running = False
+        self.event_bus.unsubscribe(self.handle_event)
+        remove_automation_change_listener(self.notify_changed)
+        for state in self._states.values():
+            if state.timer:
+                state.timer.cancel()
+        self._states.clear()
+        if self._reload_task:
+            self._reload_task.cancel()
+        logger.info("Event trigger engine stopped")
+    
+    def notify_changed(self, automation_id: Optional[int] = None):
+        """Rebuild the index after an automation change (safe from any thread)"""
+        if not self._loop or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._schedule_reload)
+    
+    def _schedule_reload(self):
+        if self._reload_task and not self._reload_task.done():
+            self._reload_again = True
+            return
+        self._reload_task = asyncio.create_task(self._reload_loop())
+    
+    async def _reload_loop(self):
+        """Reload until no change arrived during the previous reload"""
+        while True:
+            self._reload_again = False
+            try:
+                await self.reload()
+            except Exception as e:
+                logger.error(f"Error reloading event triggers: {e}", exc_info=True)
+            if not self._reload_again:
+                return
+    
+    async def reload(self):
+        """Rebuild the trigger index from the rule cache"""
+        rules = await run_in_db_thread(self.executor.rules.by_trigger, "event")
+        self.set_rules(rules)
+    
+    def set_rules(self, rules: List[CompiledRule]):
+        """Replace the indexed triggers"""
+        triggers: Dict[int, EventTrigger] = {}
+        index: Dict[Tuple[str, Optional[str]], List[EventTrigger]] = {}
+        for rule in rules:
+            trigger = parse_event_trigger(rule)
+            if trigger:
+                triggers[trigger.automation_id] = trigger
+                index.setdefault((trigger.event_type, trigger.device_id), []).append(trigger)
+        
+        # Drop pending debounces of automations that went away
+        for automation_id in set(self._states) - set(triggers):
+            state = self._states.pop(automation_id)
+            if state.timer:
+                state.timer.cancel()
+        
+        self.triggers = triggers
+        self._index = index
+    
+    def handle_event(self, event: DeviceEvent):
+        """Bus subscriber - route an event to matching automations"""
+        candidates = self._index.get((event.event_type, event.device_id), [])
+        if event.device_id is not None:
+            candidates = candidates + self._index.get((event.event_type, None), [])
+        
+        for trigger in candidates:
+            if trigger.matches(event):
+                self._submit(trigger, event)
+    
+    def _submit(self, trigger: EventTrigger, event: DeviceEvent):
+        state = self._states.setdefault(trigger.automation_id, _TriggerState())
+        if trigger.debounce <= 0:
+            self._fire(trigger, event)
+            return
+        
+        # Restart the quiet period; the latest event wins
+        if state.timer:
+            state.timer.cancel()
+        state.pending = event
+        state.timer = asyncio.get_running_loop().call_later(
+            trigger.debounce, self._debounce_elapsed, trigger.automation_id
+        )
+    
+    def _debounce_elapsed(self, automation_id: int):
+        state = self._states.get(automation_id)
+        trigger = self.triggers.get(automation_id)
+        if not state or not trigger or not state.pending:
+            return
+        event, state.pending, state.timer = state.pending, None, None
+        self._fire(trigger, event)
+    
+    def _fire(self, trigger: EventTrigger, event: DeviceEvent):
+        state = self._states.setdefault(trigger.automation_id, _TriggerState())
+        now = time.monotonic()
+        if trigger.throttle and state.last_fired is not None and now - state.last_fired < trigger.throttle:
+            logger.debug(f"Throttled automation {trigger.automation_id} on {event.event_type}")
+            return
+        state.last_fired = now
+        
+        logger.info(f"Triggering automation: {trigger.name} ({event.event_type} {event.device_id})")
+        trigger_data = {
+            **event.to_dict(),
+            "trigger_type": "event",
+            "triggered_at": datetime.now().isoformat()
+        }
+        task = asyncio.create_task(self.executor.execute_automation(trigger.automation_id, trigger_data=trigger_data))
+        self._fire_tasks.add(task)
+        task.add_done_callback(self._fire_tasks.discard)
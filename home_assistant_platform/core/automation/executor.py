@@ -2,11 +2,15 @@
 
 import logging
 import asyncio
-from datetime import datetime, time
+from datetime import datetime
 from typing import List, Dict, Optional, Any, Callable
 from home_assistant_platform.core.automation.models import (
-    Automation, AutomationExecution, AutomationSuggestion, get_automation_db
+    Automation, AutomationExecution, AutomationSuggestion, get_automation_db,
+    notify_automations_changed
 )
+from home_assistant_platform.core.automation.event_bus import get_event_bus, AUTOMATION_EXECUTED
+from home_assistant_platform.core.automation.rule_cache import RuleCache, CompiledConditions
+from home_assistant_platform.core.automation.action_runner import ActionRunner
 
 logger = logging.getLogger(__name__)
 
@@ -17,8 +21,14 @@ class AutomationExecutor:
     def __init__(self, device_manager: Optional[Any] = None):
         self.db = get_automation_db()
         self.device_manager = device_manager
+        self.rules = RuleCache()
+        self.action_runner = ActionRunner(device_manager)
         self.running_automations: Dict[int, asyncio.Task] = {}
     
+    def close(self):
+        """Stop the rule cache listening for automation changes"""
+        self.rules.close()
+    
     async def execute_automation(
         self,
         automation_id: int,
@@ -26,130 +36,57 @@ class AutomationExecutor:
     ) -> bool:
         """Execute an automation"""
         try:
-            automation = self.db.query(Automation).filter(
-                Automation.id == automation_id,
-                Automation.is_enabled == True,
-                Automation.is_active == True
-            ).first()
+            rule = await self.rules.get_async(automation_id)
             
-            if not automation:
+            if not rule:
                 logger.warning(f"Automation {automation_id} not found or disabled")
                 return False
             
             # Check conditions if any
-            if automation.conditions:
-                if not self._check_conditions(automation.conditions, trigger_data):
+            if rule.conditions:
+                if not self._check_conditions(rule.conditions, trigger_data):
                     logger.debug(f"Automation {automation_id} conditions not met")
                     return False
             
-            # Execute actions
-            success = True
-            executed_actions = []
-            
-            for action in automation.actions:
-                try:
-                    action_result = await self._execute_action(action, trigger_data)
-                    executed_actions.append({
-                        "action": action,
-                        "success": action_result
-                    })
-                    if not action_result:
-                        success = False
-                except Exception as e:
-                    logger.error(f"Error executing action {action}: {e}", exc_info=True)
-                    executed_actions.append({
-                        "action": action,
-                        "success": False,
-                        "error": str(e)
-                    })
-                    success = False
+            # Execute actions (devices in parallel, each device in order)
+            results = await self.action_runner.run(rule.actions)
+            success = all(result.success for result in results)
+            executed_actions = [result.to_log() for result in results]
             
             # Log execution
             execution_log = AutomationExecution(
                 automation_id=automation_id,
-                trigger_type=automation.trigger_type,
+                trigger_type=rule.trigger_type,
                 trigger_data=trigger_data or {},
                 actions_executed=executed_actions,
                 success=success
             )
             self.db.add(execution_log)
             self.db.commit()
+            get_event_bus().publish(AUTOMATION_EXECUTED, data={
+                "automation_id": automation_id,
+                "execution_id": execution_log.id,
+                "name": rule.name,
+                "trigger_type": rule.trigger_type,
+                "success": success
+            }, source="automation")
             
-            logger.info(f"Executed automation {automation_id}: {automation.name} (success: {success})")
+            logger.info(f"Executed automation {automation_id}: {rule.name} (success: {success})")
             return success
-            
+        
         except Exception as e:
             logger.error(f"Error executing automation {automation_id}: {e}", exc_info=True)
             self.db.rollback()
             return False
     
-    async def _execute_action(
-        self,
-        action: Dict[str, Any],
-        trigger_data: Optional[Dict[str, Any]] = None
-    ) -> bool:
-        """Execute a single action"""
-        device_id = action.get("device_id")
-        device_type = action.get("device_type")
-        action_type = action.get("action")
-        value = action.get("value")
-        
-        if not device_id or not action_type:
-            logger.error(f"Invalid action: missing device_id or action")
-            return False
-        
-        # Use device manager if available
-        if self.device_manager:
-            try:
-                if action_type == "turn_on":
-                    return await self.device_manager.turn_on_device(device_id)
-                elif action_type == "turn_off":
-                    return await self.device_manager.turn_off_device(device_id)
-                elif action_type == "set_temperature":
-                    return await self.device_manager.set_temperature(device_id, float(value))
-                elif action_type == "set_brightness":
-                    return await self.device_manager.set_brightness(device_id, int(value))
-                elif action_type == "set_color":
-                    return await self.device_manager.set_color(device_id, value)
-                else:
-                    logger.warning(f"Unknown action type: {action_type}")
-                    return False
-            except Exception as e:
-                logger.error(f"Error executing device action: {e}", exc_info=True)
-                return False
-        else:
-            # Fallback: just log the action
-            logger.info(f"Would execute: {device_id} -> {action_type} ({value})")
-            return True
-    
     def _check_conditions(
         self,
-        conditions: Dict[str, Any],
+        conditions: CompiledConditions,
         trigger_data: Optional[Dict[str, Any]] = None
     ) -> bool:
         """Check if conditions are met"""
-        # Simple condition checking
-        # Can be extended for more complex logic
-        
-        # Time conditions
-        if "time" in conditions:
-            current_time = datetime.now().time()
-            condition_time = time.fromisoformat(conditions["time"])
-            if current_time < condition_time:
-                return False
-        
-        # Day of week conditions
-        if "days_of_week" in conditions:
-            current_day = datetime.now().weekday()
-            if current_day not in conditions["days_of_week"]:
-                return False
-        
-        # Device state conditions
-        if "device_states" in conditions:
-            # Would need device manager to check states
-            pass
-        
-        return True
+        # Time and day-of-week conditions were parsed when the rule was compiled
+        return conditions.check(datetime.now())
     
     def create_automation_from_suggestion(
         self,
@@ -188,10 +125,11 @@ class AutomationExecutor:
             
             self.db.add(automation)
             self.db.commit()
+            notify_automations_changed(automation.id)
             
             logger.info(f"Created automation from suggestion {suggestion_id}: {automation.name}")
             return automation
-            
+        
         except Exception as e:
             logger.error(f"Error creating automation from suggestion: {e}", exc_info=True)
             self.db.rollback()
@@ -2,15 +2,18 @@
 
 import logging
 from datetime import datetime
-from typing import Optional, Dict, List, Any
-from sqlalchemy import create_engine, Column, String, Float, Integer, Boolean, DateTime, Text, ForeignKey, JSON
+from typing import Optional, Dict, List, Any, Callable
+from sqlalchemy import Column, String, Float, Integer, Boolean, DateTime, Text, ForeignKey, JSON
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
-from home_assistant_platform.config.settings import settings
+from sqlalchemy.orm import relationship
+from home_assistant_platform.core.database import (
+    register_store, get_scoped_session, session_dependency
+)
 
 logger = logging.getLogger(__name__)
 
 Base = declarative_base()
+register_store("automation", Base.metadata)
 
 
 class DeviceAction(Base):
@@ -144,12 +147,37 @@ class AutomationExecution(Base):
     automation = relationship("Automation", foreign_keys=[automation_id])
 
 
+# Change notifications - schedulers and caches subscribe to these
+_change_listeners: List[Callable[[Optional[int]], None]] = []
+
+
+def add_automation_change_listener(callback: Callable[[Optional[int]], None]):
+    """Register a callback invoked with the id of a changed automation (None = all)"""
+    if callback not in _change_listeners:
+        _change_listeners.append(callback)
+
+
+def remove_automation_change_listener(callback: Callable[[Optional[int]], None]):
+    """Unregister a change callback"""
+    if callback in _change_listeners:
+        _change_listeners.remove(callback)
+
+
+def notify_automations_changed(automation_id: Optional[int] = None):
+    """Tell listeners that an automation was created, updated or deleted"""
+    for callback in list(_change_listeners):
+        try:
+            callback(automation_id)
+        except Exception as e:
+            logger.error(f"Error in automation change listener: {e}", exc_info=True)
+
+
 # Database setup
 def get_automation_db():
     """Get database session for automation system"""
-    db_path = settings.data_dir / "automation.db"
-    engine = create_engine(f"sqlite:///{db_path}", echo=False)
-    Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
-    return Session()
+    return get_scoped_session("automation")
+
+
+# FastAPI dependency yielding a per-request session
+get_automation_session = session_dependency("automation")
 
@@ -1,23 +1,109 @@
 """Pattern learning system - records and analyzes device usage patterns"""
 
 import logging
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Any
-from collections import defaultdict
+import queue
+import threading
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Optional, Any, Deque, Tuple
 from home_assistant_platform.core.automation.models import (
     DeviceAction, Pattern, get_automation_db
 )
+from home_assistant_platform.core.database import new_session
 
 logger = logging.getLogger(__name__)
 
 
+# Time windows kept in the histograms
+HISTORY_DAYS = 30
+MINUTE_WINDOW = 5  # Minutes are bucketed into 5-minute windows
+
+
+@dataclass
+class ActionStats:
+    """Rolling histograms of one (user, device, action, value) over HISTORY_DAYS"""
+    device_type: str
+    count: int = 0
+    hours: List[int] = field(default_factory=lambda: [0] * 24)
+    windows: List[int] = field(default_factory=lambda: [0] * (60 // MINUTE_WINDOW))
+    weekdays: List[int] = field(default_factory=lambda: [0] * 7)
+    last_occurrence: Optional[datetime] = None
+    # Per-day contributions, oldest first, so expired days can be subtracted
+    days: Deque[Tuple[int, int, Counter, Counter]] = field(default_factory=deque)  # (ordinal, count, hours, windows)
+    
+    def add(self, timestamp: datetime):
+        """Count one occurrence - O(1)"""
+        day = timestamp.toordinal()
+        if not self.days or self.days[-1][0] != day:
+            self.days.append((day, 0, Counter(), Counter()))
+        ordinal, count, hours, windows = self.days[-1]
+        window = timestamp.minute // MINUTE_WINDOW
+        hours[timestamp.hour] += 1
+        windows[window] += 1
+        self.days[-1] = (ordinal, count + 1, hours, windows)
+        
+        self.count += 1
+        self.hours[timestamp.hour] += 1
+        self.windows[window] += 1
+        self.weekdays[timestamp.weekday()] += 1
+        if self.last_occurrence is None or timestamp > self.last_occurrence:
+            self.last_occurrence = timestamp
+    
+    def expire(self, today: int):
+        """Drop days that fell out of the history window (amortized O(1))"""
+        while self.days and self.days[0][0] <= today - HISTORY_DAYS:
+            ordinal, count, hours, windows = self.days.popleft()
+            self.count -= count
+            self.weekdays[date.fromordinal(ordinal).weekday()] -= count
+            for hour, n in hours.items():
+                self.hours[hour] -= n
+            for window, n in windows.items():
+                self.windows[window] -= n
+
+
 class PatternLearner:
-    """Learns usage patterns from device actions"""
+    """Learns usage patterns from device actions
+    
+    Recording is O(1): the action is counted in in-memory hour, 5-minute
+    window and weekday histograms and queued. A background worker inserts
+    queued actions in batches and re-scores only the keys that changed,
+    reading confidence straight from the histograms.
+    """
     
-    def __init__(self):
+    FLUSH_INTERVAL = 2.0  # Seconds between background batches
+    MAX_BATCH = 500
+    
+    def __init__(self, autostart: bool = True):
         self.db = get_automation_db()
+        self.autostart = autostart  # Start the worker on the first recorded action
         self.min_occurrences = 3  # Minimum occurrences to detect a pattern
         self.confidence_threshold = 0.6  # Minimum confidence to suggest automation
+        
+        self.stats: Dict[Tuple[str, str, str, Optional[str]], ActionStats] = {}
+        self._lock = threading.RLock()
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._dirty: set = set()
+        self._warm = False
+        self._warm_lock = threading.Lock()  # Serializes warm-up without holding _lock
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+    
+    def start(self):
+        """Start the background detection worker"""
+        with self._lock:
+            if self._worker and self._worker.is_alive():
+                return
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._run, name="pattern-learner", daemon=True)
+            self._worker.start()
+    
+    def stop(self, timeout: float = 5.0):
+        """Stop the worker after flushing queued actions"""
+        self._stop.set()
+        if self._worker:
+            self._worker.join(timeout)
+            self._worker = None
     
     def record_action(
         self,
@@ -28,129 +114,184 @@ class PatternLearner:
         context: Optional[Dict[str, Any]] = None,
         user_id: str = "default"
     ) -> None:
-        """Record a device action for pattern learning"""
+        """Record a device action for pattern learning (returns immediately)"""
         try:
             # Use local time for pattern detection (more intuitive for users)
-            from datetime import datetime as dt
-            now = dt.now()
-            action_record = DeviceAction(
-                device_id=device_id,
-                device_type=device_type,
-                action=action,
-                value=value,
-                timestamp=now,
-                day_of_week=now.weekday(),
-                hour=now.hour,
-                minute=now.minute,
-                context=context or {},
-                user_id=user_id
-            )
-            
-            self.db.add(action_record)
-            self.db.commit()
+            now = datetime.now()
+            key = (user_id, device_id, action, value)
+            with self._lock:
+                stats = self.stats.get(key)
+                if stats is None:
+                    stats = self.stats[key] = ActionStats(device_type=device_type)
+                stats.add(now)
+                self._dirty.add(key)
             
+            self._queue.put({
+                "device_id": device_id,
+                "device_type": device_type,
+                "action": action,
+                "value": value,
+                "timestamp": now,
+                "day_of_week": now.weekday(),
+                "hour": now.hour,
+                "minute": now.minute,
+                "context": context or {},
+                "user_id": user_id
+            })
             logger.debug(f"Recorded action: {device_id} -> {action}")
             
-            # Trigger pattern detection after recording
-            self._detect_patterns(device_id, user_id)
-            
+            if self.autostart and not self._worker:
+                self.start()
+        
         except Exception as e:
             logger.error(f"Error recording action: {e}", exc_info=True)
-            self.db.rollback()
     
-    def _detect_patterns(self, device_id: str, user_id: str) -> None:
-        """Detect patterns for a specific device"""
+    def _run(self):
+        """Worker loop - batch inserts and incremental detection"""
+        while not self._stop.is_set():
+            self._stop.wait(self.FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error in pattern learner worker: {e}", exc_info=True)
+        self.flush()
+    
+    def flush(self) -> int:
+        """Persist queued actions and re-score changed keys; returns actions written"""
+        if not self._warm:
+            self._warm_start()
+        
+        written = 0
+        session = new_session("automation")
         try:
-            # Get recent actions for this device (last 30 days)
-            cutoff_date = datetime.utcnow() - timedelta(days=30)
-            actions = self.db.query(DeviceAction).filter(
-                DeviceAction.device_id == device_id,
-                DeviceAction.user_id == user_id,
-                DeviceAction.timestamp >= cutoff_date
-            ).order_by(DeviceAction.timestamp).all()
+            while True:
+                batch = []
+                while len(batch) < self.MAX_BATCH:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    break
+                session.bulk_insert_mappings(DeviceAction, batch)
+                session.commit()
+                written += len(batch)
             
-            if len(actions) < self.min_occurrences:
+            self._detect_dirty(session)
+        except Exception as e:
+            logger.error(f"Error flushing recorded actions: {e}", exc_info=True)
+            session.rollback()
+        finally:
+            session.close()
+        return written
+    
+    def _warm_start(self):
+        """Rebuild the histograms from the stored history (once)
+        
+        The history is loaded without holding ``_lock`` so ``record_action``
+        never waits on the query; the counts are swapped in under the lock.
+        """
+        with self._warm_lock:
+            if self._warm:
                 return
+            cutoff = datetime.now() - timedelta(days=HISTORY_DAYS)
+            session = new_session("automation")
+            try:
+                rows = session.query(
+                    DeviceAction.user_id, DeviceAction.device_id, DeviceAction.action,
+                    DeviceAction.value, DeviceAction.device_type, DeviceAction.timestamp
+                ).filter(DeviceAction.timestamp >= cutoff).order_by(DeviceAction.timestamp).all()
+            finally:
+                session.close()
             
-            # Group by action type
-            action_groups = defaultdict(list)
-            for action in actions:
-                key = (action.action, action.value)
-                action_groups[key].append(action)
+            history: Dict[Tuple[str, str, str, Optional[str]], ActionStats] = {}
+            for user_id, device_id, action, value, device_type, timestamp in rows:
+                key = (user_id, device_id, action, value)
+                stats = history.get(key)
+                if stats is None:
+                    stats = history[key] = ActionStats(device_type=device_type)
+                stats.add(timestamp)
             
-            # Detect time-based patterns
-            for (action_type, value), action_list in action_groups.items():
-                if len(action_list) >= self.min_occurrences:
-                    pattern = self._detect_time_pattern(
-                        device_id, device_type=actions[0].device_type,
-                        action=action_type, value=value,
-                        actions=action_list, user_id=user_id
-                    )
-                    if pattern:
-                        self._save_pattern(pattern)
+            with self._lock:
+                # Actions recorded before warm-up finished are counted after history
+                recent, self.stats = self.stats, history
+                for key, pending in recent.items():
+                    stats = self.stats.setdefault(key, ActionStats(device_type=pending.device_type))
+                    for ordinal, count, hours, windows in pending.days:
+                        self._merge_day(stats, ordinal, count, hours, windows)
+                    stats.last_occurrence = max(filter(None, [stats.last_occurrence, pending.last_occurrence]))
+                self._dirty.update(self.stats)
+                self._warm = True
+        logger.info(f"Pattern learner warmed up from {len(rows)} stored actions")
+    
+    @staticmethod
+    def _merge_day(stats: ActionStats, ordinal: int, count: int, hours: Counter, windows: Counter):
+        """Add one day of counts to a key"""
+        if not stats.days or stats.days[-1][0] != ordinal:
+            stats.days.append((ordinal, 0, Counter(), Counter()))
+        day, day_count, day_hours, day_windows = stats.days[-1]
+        day_hours.update(hours)
+        day_windows.update(windows)
+        stats.days[-1] = (day, day_count + count, day_hours, day_windows)
+        stats.count += count
+        stats.weekdays[date.fromordinal(ordinal).weekday()] += count
+        for hour, n in hours.items():
+            stats.hours[hour] += n
+        for window, n in windows.items():
+            stats.windows[window] += n
+    
+    def _detect_dirty(self, session):
+        """Re-score the keys that received actions since the last batch"""
+        today = date.today().toordinal()
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            candidates = []
+            for key in dirty:
+                stats = self.stats.get(key)
+                if stats is None:
+                    continue
+                stats.expire(today)
+                pattern = self._pattern_from_stats(key, stats)
+                if pattern:
+                    candidates.append(pattern)
         
-        except Exception as e:
-            logger.error(f"Error detecting patterns: {e}", exc_info=True)
+        for pattern in candidates:
+            self._save_pattern(pattern, session)
     
-    def _detect_time_pattern(
+    def _pattern_from_stats(
         self,
-        device_id: str,
-        device_type: str,
-        action: str,
-        value: Optional[str],
-        actions: List[DeviceAction],
-        user_id: str
+        key: Tuple[str, str, str, Optional[str]],
+        stats: ActionStats
     ) -> Optional[Dict[str, Any]]:
-        """Detect time-based patterns from actions"""
-        if len(actions) < self.min_occurrences:
+        """Detect a time-based pattern from the histograms of one key"""
+        total = stats.count
+        if total < self.min_occurrences:
             return None
+        user_id, device_id, action, value = key
         
-        # Analyze time patterns
-        hours = [a.hour for a in actions]
-        minutes = [a.minute for a in actions]
-        days_of_week = [a.day_of_week for a in actions]
-        
-        # Check for consistent time pattern
-        hour_counts = defaultdict(int)
-        minute_counts = defaultdict(int)
-        day_counts = defaultdict(int)
-        
-        for hour in hours:
-            hour_counts[hour] += 1
-        for minute in minutes:
-            minute_counts[minute] += 1
-        for day in days_of_week:
-            day_counts[day] += 1
+        # Most common hour and 5-minute window
+        hour_count = max(stats.hours)
+        most_common_hour = stats.hours.index(hour_count)
+        hour_confidence = hour_count / total
         
-        # Find most common hour (must occur in at least 60% of actions)
-        most_common_hour = max(hour_counts.items(), key=lambda x: x[1])
-        hour_confidence = most_common_hour[1] / len(actions)
-        
-        # Find most common minute (within 5-minute window)
-        minute_window = defaultdict(int)
-        for minute in minutes:
-            # Group minutes into 5-minute windows
-            window = (minute // 5) * 5
-            minute_window[window] += 1
-        
-        most_common_minute_window = max(minute_window.items(), key=lambda x: x[1]) if minute_window else (None, 0)
-        minute_confidence = most_common_minute_window[1] / len(actions) if minute_window else 0
+        window_count = max(stats.windows)
+        most_common_minute_window = stats.windows.index(window_count) * MINUTE_WINDOW
+        minute_confidence = window_count / total
         
         # Check day pattern (weekdays vs weekends, or specific days)
-        weekday_count = sum(1 for d in days_of_week if d < 5)
-        weekend_count = len(days_of_week) - weekday_count
+        weekday_count = sum(stats.weekdays[:5])
+        weekend_count = total - weekday_count
         
-        # Determine day pattern
-        if weekday_count / len(days_of_week) > 0.7:
+        if weekday_count / total > 0.7:
             day_pattern = list(range(5))  # Weekdays
-            day_confidence = weekday_count / len(days_of_week)
-        elif weekend_count / len(days_of_week) > 0.7:
+            day_confidence = weekday_count / total
+        elif weekend_count / total > 0.7:
             day_pattern = [5, 6]  # Weekends
-            day_confidence = weekend_count / len(days_of_week)
+            day_confidence = weekend_count / total
         else:
             # Check for specific days
-            day_pattern = list(set(days_of_week))
-            day_confidence = max(day_counts.values()) / len(actions) if day_counts else 0
+            day_pattern = [day for day, count in enumerate(stats.weekdays) if count]
+            day_confidence = max(stats.weekdays) / total
         
         # Calculate overall confidence
         overall_confidence = (hour_confidence * 0.5 + minute_confidence * 0.3 + day_confidence * 0.2)
@@ -158,28 +299,29 @@ class PatternLearner:
         if overall_confidence >= self.confidence_threshold:
             return {
                 "device_id": device_id,
-                "device_type": device_type,
+                "device_type": stats.device_type,
                 "action": action,
                 "value": value,
                 "pattern_type": "time_based",
                 "conditions": {
-                    "hour": most_common_hour[0],
-                    "minute": most_common_minute_window[0],
+                    "hour": most_common_hour,
+                    "minute": most_common_minute_window,
                     "days_of_week": day_pattern
                 },
-                "occurrence_count": len(actions),
+                "occurrence_count": total,
                 "confidence": overall_confidence,
-                "last_occurrence": actions[-1].timestamp,
+                "last_occurrence": stats.last_occurrence,
                 "user_id": user_id
             }
         
         return None
     
-    def _save_pattern(self, pattern_data: Dict[str, Any]) -> None:
+    def _save_pattern(self, pattern_data: Dict[str, Any], session=None) -> None:
         """Save or update a detected pattern"""
+        db = session or self.db
         try:
             # Check if pattern already exists
-            existing = self.db.query(Pattern).filter(
+            existing = db.query(Pattern).filter(
                 Pattern.device_id == pattern_data["device_id"],
                 Pattern.action == pattern_data["action"],
                 Pattern.user_id == pattern_data["user_id"]
@@ -195,15 +337,15 @@ class PatternLearner:
             else:
                 # Create new pattern
                 pattern = Pattern(**pattern_data)
-                self.db.add(pattern)
+                db.add(pattern)
             
-            self.db.commit()
+            db.commit()
             logger.info(f"Saved pattern: {pattern_data['device_id']} -> {pattern_data['action']} "
                        f"(confidence: {pattern_data['confidence']:.2f})")
-            
+        
         except Exception as e:
             logger.error(f"Error saving pattern: {e}", exc_info=True)
-            self.db.rollback()
+            db.rollback()
     
     def get_patterns(
         self,
@@ -0,0 +1,219 @@
+"""Pattern miner - batch re-mining of every pattern with NumPy histograms"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from home_assistant_platform.core.automation.models import DeviceAction, Pattern
+from home_assistant_platform.core.automation.pattern_learner import HISTORY_DAYS, MINUTE_WINDOW
+from home_assistant_platform.core.database import new_session
+
+logger = logging.getLogger(__name__)
+
+WINDOWS = 60 // MINUTE_WINDOW
+
+
+class _Codes(dict):
+    """Maps values to dense integer codes in first-seen order"""
+    
+    def __init__(self):
+        super().__init__()
+        self.values: List[Optional[str]] = []
+    
+    def __missing__(self, value: Optional[str]) -> int:
+        code = self[value] = len(self.values)
+        self.values.append(value)
+        return code
+    
+    def encode(self, column: Sequence[Optional[str]]) -> np.ndarray:
+        return np.fromiter(map(self.__getitem__, column), dtype=np.int64, count=len(column))
+
+
+def mine_patterns(
+    session: Optional[Session] = None,
+    days: int = HISTORY_DAYS,
+    min_occurrences: int = 3,
+    confidence_threshold: float = 0.6,
+    chunk_size: int = 100_000
+) -> Dict[str, Any]:
+    """Re-mine time-based patterns for every device and user in one pass
+    
+    Loads ``device_actions`` in chunks as integer-coded NumPy arrays, builds
+    hour / 5-minute window / weekday histograms per (user, device, action,
+    value) with ``np.bincount`` and scores them with the same weights as
+    ``PatternLearner``. Patterns are upserted in bulk with a single commit.
+    """
+    own_session = session is None
+    session = session or new_session("automation")
+    started = time.perf_counter()
+    cutoff = datetime.now() - timedelta(days=days)
+    try:
+        users, devices, actions, values = _Codes(), _Codes(), _Codes(), _Codes()
+        key_parts: List[np.ndarray] = []
+        hour_parts: List[np.ndarray] = []
+        window_parts: List[np.ndarray] = []
+        weekday_parts: List[np.ndarray] = []
+        
+        stmt = select(
+            DeviceAction.user_id, DeviceAction.device_id, DeviceAction.action,
+            DeviceAction.value, DeviceAction.hour, DeviceAction.minute, DeviceAction.day_of_week
+        ).where(
+            DeviceAction.timestamp >= cutoff,
+            DeviceAction.hour.is_not(None),
+            DeviceAction.minute.is_not(None),
+            DeviceAction.day_of_week.is_not(None)
+        )
+        # Core rows (no ORM loading), streamed in chunks
+        result = session.connection().execution_options(stream_results=True).execute(stmt)
+        for rows in result.partitions(chunk_size):
+            user_col, device_col, action_col, value_col, hour_col, minute_col, weekday_col = zip(*rows)
+            key_parts.append(np.column_stack([
+                users.encode(user_col), devices.encode(device_col),
+                actions.encode(action_col), values.encode(value_col)
+            ]))
+            hour_parts.append(np.fromiter(hour_col, dtype=np.int64, count=len(rows)))
+            window_parts.append(np.fromiter(minute_col, dtype=np.int64, count=len(rows)) // MINUTE_WINDOW)
+            weekday_parts.append(np.fromiter(weekday_col, dtype=np.int64, count=len(rows)))
+        
+        summary = {"actions": 0, "groups": 0, "patterns": 0, "created": 0, "updated": 0}
+        if not key_parts:
+            summary["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            return summary
+        
+        # One integer per (user, device, action, value), then dense group ids
+        dims = (len(users.values), len(devices.values), len(actions.values), len(values.values))
+        keys = np.concatenate(key_parts)
+        flat_keys, group = np.unique(np.ravel_multi_index(keys.T, dims), return_inverse=True)
+        group = group.reshape(-1)
+        group_keys = np.column_stack(np.unravel_index(flat_keys, dims))
+        n_groups = len(group_keys)
+        summary["actions"] = len(group)
+        summary["groups"] = n_groups
+        
+        # Histograms for every group at once
+        counts = np.bincount(group, minlength=n_groups)
+        hours = np.bincount(group * 24 + np.concatenate(hour_parts), minlength=n_groups * 24).reshape(n_groups, 24)
+        windows = np.bincount(
+            group * WINDOWS + np.concatenate(window_parts), minlength=n_groups * WINDOWS
+        ).reshape(n_groups, WINDOWS)
+        weekdays = np.bincount(group * 7 + np.concatenate(weekday_parts), minlength=n_groups * 7).reshape(n_groups, 7)
+        
+        # Confidence, mirroring PatternLearner._pattern_from_stats
+        total = counts.astype(np.float64)
+        hour_confidence = hours.max(axis=1) / total
+        minute_confidence = windows.max(axis=1) / total
+        weekday_ratio = weekdays[:, :5].sum(axis=1) / total
+        weekend_ratio = 1.0 - weekday_ratio
+        day_kind = np.where(weekday_ratio > 0.7, 0, np.where(weekend_ratio > 0.7, 1, 2))
+        day_confidence = np.select(
+            [day_kind == 0, day_kind == 1], [weekday_ratio, weekend_ratio], weekdays.max(axis=1) / total
+        )
+        confidence = hour_confidence * 0.5 + minute_confidence * 0.3 + day_confidence * 0.2
+        
+        selected = np.flatnonzero((counts >= min_occurrences) & (confidence >= confidence_threshold))
+        if len(selected) == 0:
+            summary["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            return summary
+        
+        best_hour = hours.argmax(axis=1)
+        best_window = windows.argmax(axis=1) * MINUTE_WINDOW
+        details = _group_details(session, cutoff)
+        
+        # Patterns are unique per (user, device, action); keep the most confident value
+        patterns: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        for g in selected[np.argsort(-confidence[selected], kind="stable")]:
+            user_id = users.values[group_keys[g, 0]]
+            device_id = devices.values[group_keys[g, 1]]
+            action = actions.values[group_keys[g, 2]]
+            value = values.values[group_keys[g, 3]]
+            if (user_id, device_id, action) in patterns:
+                continue
+            if day_kind[g] == 0:
+                day_pattern = list(range(5))
+            elif day_kind[g] == 1:
+                day_pattern = [5, 6]
+            else:
+                day_pattern = np.flatnonzero(weekdays[g]).tolist()
+            device_type, last_occurrence = details.get((user_id, device_id, action, value), ("unknown", None))
+            patterns[(user_id, device_id, action)] = {
+                "device_id": device_id,
+                "device_type": device_type,
+                "action": action,
+                "value": value,
+                "pattern_type": "time_based",
+                "conditions": {
+                    "hour": int(best_hour[g]),
+                    "minute": int(best_window[g]),
+                    "days_of_week": day_pattern
+                },
+                "occurrence_count": int(counts[g]),
+                "confidence": float(confidence[g]),
+                "last_occurrence": last_occurrence,
+                "user_id": user_id
+            }
+        
+        created, updated = _upsert_patterns(session, patterns)
+        summary.update(patterns=len(patterns), created=created, updated=updated)
+        summary["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"Mined {len(patterns)} patterns from {summary['actions']} actions "
+                    f"in {summary['duration_ms']:.0f} ms")
+        return summary
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        if own_session:
+            session.close()
+
+
+def _group_details(session: Session, cutoff: datetime) -> Dict[Tuple, Tuple[str, Optional[datetime]]]:
+    """Device type and latest timestamp per group, aggregated in SQL"""
+    rows = session.execute(
+        select(
+            DeviceAction.user_id, DeviceAction.device_id, DeviceAction.action, DeviceAction.value,
+            func.max(DeviceAction.device_type), func.max(DeviceAction.timestamp)
+        ).where(DeviceAction.timestamp >= cutoff).group_by(
+            DeviceAction.user_id, DeviceAction.device_id, DeviceAction.action, DeviceAction.value
+        )
+    ).all()
+    details = {}
+    for user_id, device_id, action, value, device_type, last_occurrence in rows:
+        if isinstance(last_occurrence, str):  # func.max() loses the DateTime type on SQLite
+            last_occurrence = datetime.fromisoformat(last_occurrence)
+        details[(user_id, device_id, action, value)] = (device_type, last_occurrence)
+    return details
+
+
+def _upsert_patterns(session: Session, patterns: Dict[Tuple[str, str, str], Dict[str, Any]]) -> Tuple[int, int]:
+    """Insert new patterns and update existing ones with one commit"""
+    existing = {
+        (user_id, device_id, action): pattern_id
+        for pattern_id, user_id, device_id, action in session.query(
+            Pattern.id, Pattern.user_id, Pattern.device_id, Pattern.action
+        )
+    }
+    now = datetime.utcnow()
+    inserts, updates = [], []
+    for key, data in patterns.items():
+        pattern_id = existing.get(key)
+        if pattern_id is None:
+            inserts.append(data)
+        else:
+            updates.append({
+                "id": pattern_id,
+                "occurrence_count": data["occurrence_count"],
+                "confidence": data["confidence"],
+                "last_occurrence": data["last_occurrence"],
+                "conditions": data["conditions"],
+                "updated_at": now
+            })
+    
+    if inserts:
+        session.bulk_insert_mappings(Pattern, inserts)
+    if updates:
+        session.bulk_update_mappings(Pattern, updates)
+    session.commit()
+    return len(inserts), len(updates)
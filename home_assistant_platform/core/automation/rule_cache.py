@@ -0,0 +1,242 @@
+"""Compiled automation rules - prevalidated execution plans cached in memory"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, time
+from typing import List, Dict, Optional, Any, Iterable, Set, Tuple
+from home_assistant_platform.core.automation.models import (
+    Automation, get_automation_db, add_automation_change_listener,
+    remove_automation_change_listener
+)
+from home_assistant_platform.core.database import run_in_db_thread
+
+logger = logging.getLogger(__name__)
+
+# Supported action types and the converter applied to their value
+ACTION_VALUE_TYPES = {
+    "turn_on": None,
+    "turn_off": None,
+    "set_temperature": float,
+    "set_brightness": int,
+    "set_color": None,
+}
+
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class CompiledAction:
+    """Validated device action with its value already converted"""
+    device_id: Optional[str]
+    device_type: Optional[str]
+    action: Optional[str]
+    value: Any = None
+    raw: Optional[Dict[str, Any]] = None  # Original JSON, reported in the execution log
+    error: Optional[str] = None  # Set when the action can never succeed
+
+
+@dataclass(frozen=True)
+class CompiledConditions:
+    """Conditions with parsed times and a day-of-week bitmask"""
+    not_before: Optional[time] = None
+    days_mask: Optional[int] = None  # Bit n set = weekday n allowed (0=Monday); None = any day
+    device_states: Optional[Dict[str, Any]] = None
+    
+    def check(self, now: datetime) -> bool:
+        """Check the conditions against the current time"""
+        if self.not_before is not None and now.time() < self.not_before:
+            return False
+        if self.days_mask is not None and not (self.days_mask >> now.weekday()) & 1:
+            return False
+        # Device state conditions need the device manager (not evaluated yet)
+        return True
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    """Executable plan of one enabled automation"""
+    automation_id: int
+    name: str
+    trigger_type: str
+    trigger_config: Dict[str, Any]
+    actions: Tuple[CompiledAction, ...]
+    conditions: Optional[CompiledConditions] = None
+
+
+def days_to_mask(days: Iterable[int]) -> int:
+    """Convert a list of weekdays (0=Monday) to a bitmask"""
+    mask = 0
+    for day in days:
+        day = int(day)
+        if not 0 <= day <= 6:
+            raise ValueError(f"Invalid day of week: {day}")
+        mask |= 1 << day
+    return mask
+
+
+def compile_action(action: Dict[str, Any]) -> CompiledAction:
+    """Validate a JSON action and convert its value once"""
+    if not isinstance(action, dict):
+        return CompiledAction(None, None, None, raw=action, error=f"Invalid action: {action!r}")
+    
+    device_id = action.get("device_id")
+    action_type = action.get("action")
+    compiled = dict(
+        device_id=device_id,
+        device_type=action.get("device_type"),
+        action=action_type,
+        raw=action
+    )
+    
+    if not device_id or not action_type:
+        return CompiledAction(**compiled, error="Invalid action: missing device_id or action")
+    if action_type not in ACTION_VALUE_TYPES:
+        return CompiledAction(**compiled, error=f"Unknown action type: {action_type}")
+    
+    value = action.get("value")
+    converter = ACTION_VALUE_TYPES[action_type]
+    if converter is not None:
+        try:
+            value = converter(value)
+        except (TypeError, ValueError):
+            return CompiledAction(**compiled, error=f"Invalid value for {action_type}: {value!r}")
+    
+    return CompiledAction(**compiled, value=value)
+
+
+def compile_conditions(conditions: Optional[Dict[str, Any]]) -> Optional[CompiledConditions]:
+    """Parse condition times and days once"""
+    if not conditions:
+        return None
+    
+    not_before = None
+    if "time" in conditions:
+        not_before = time.fromisoformat(conditions["time"])
+    
+    days_mask = None
+    if "days_of_week" in conditions:
+        days_mask = days_to_mask(conditions["days_of_week"])
+    
+    return CompiledConditions(
+        not_before=not_before,
+        days_mask=days_mask,
+        device_states=conditions.get("device_states")
+    )
+
+
+def compile_rule(automation: Automation) -> CompiledRule:
+    """Turn an Automation row into an executable plan
+    
+    Raises ValueError if the conditions cannot be parsed.
+    """
+    return CompiledRule(
+        automation_id=automation.id,
+        name=automation.name,
+        trigger_type=automation.trigger_type,
+        trigger_config=dict(automation.trigger_config or {}),
+        actions=tuple(compile_action(action) for action in automation.actions or []),
+        conditions=compile_conditions(automation.conditions)
+    )
+
+
+class RuleCache:
+    """In-memory index of compiled rules keyed by id and trigger type
+    
+    Plans are compiled on first use and reused until the automation changes:
+    every create/enable/disable path calls ``notify_automations_changed``,
+    which drops the affected entries. Disabled or unknown ids are cached as
+    absent, so executing a rule only reads SQLite after a change.
+    """
+    
+    def __init__(self):
+        self.db = get_automation_db()
+        self._lock = threading.RLock()
+        self._rules: Dict[int, Optional[CompiledRule]] = {}  # None = disabled/missing/invalid
+        self._by_trigger: Dict[str, Dict[int, CompiledRule]] = {}
+        self._stale: Set[int] = set()
+        self._loaded_all = False
+        add_automation_change_listener(self.invalidate)
+    
+    def close(self):
+        """Stop listening for automation changes"""
+        remove_automation_change_listener(self.invalidate)
+    
+    def invalidate(self, automation_id: Optional[int] = None):
+        """Drop the plan of one automation (or all, when None)"""
+        with self._lock:
+            if automation_id is None:
+                self._rules.clear()
+                self._by_trigger.clear()
+                self._stale.clear()
+                self._loaded_all = False
+                return
+            
+            rule = self._rules.pop(automation_id, None)
+            if rule is not None:
+                self._by_trigger.get(rule.trigger_type, {}).pop(automation_id, None)
+            if self._loaded_all:
+                self._stale.add(automation_id)
+    
+    def peek(self, automation_id: int) -> Any:
+        """Cached plan without touching the database (``_MISSING`` if not cached)"""
+        return self._rules.get(automation_id, _MISSING)
+    
+    def get(self, automation_id: int) -> Optional[CompiledRule]:
+        """Get the plan of an enabled automation, compiling it if needed"""
+        rule = self._rules.get(automation_id, _MISSING)
+        if rule is not _MISSING:
+            return rule
+        
+        with self._lock:
+            self._refresh([automation_id])
+            return self._rules.get(automation_id)
+    
+    async def get_async(self, automation_id: int) -> Optional[CompiledRule]:
+        """Like ``get``, but compiles on the DB thread pool on a cache miss"""
+        rule = self.peek(automation_id)
+        if rule is not _MISSING:
+            return rule
+        return await run_in_db_thread(self.get, automation_id)
+    
+    def by_trigger(self, trigger_type: str) -> List[CompiledRule]:
+        """Plans of all enabled automations with the given trigger type"""
+        with self._lock:
+            if not self._loaded_all:
+                self._refresh(None)
+            elif self._stale:
+                self._refresh(list(self._stale))
+            return list(self._by_trigger.get(trigger_type, {}).values())
+    
+    def _refresh(self, automation_ids: Optional[List[int]]):
+        """Load and compile automations from the database (lock held)"""
+        query = self.db.query(Automation).filter(
+            Automation.is_enabled == True,
+            Automation.is_active == True
+        )
+        if automation_ids is not None:
+            query = query.filter(Automation.id.in_(automation_ids))
+        automations = query.all()
+        
+        if automation_ids is None:
+            self._rules.clear()
+            self._by_trigger.clear()
+        else:
+            for automation_id in automation_ids:
+                self._rules[automation_id] = None
+        
+        for automation in automations:
+            try:
+                rule = compile_rule(automation)
+            except (TypeError, ValueError) as e:
+                logger.error(f"Automation {automation.id} has invalid conditions: {e}")
+                self._rules[automation.id] = None
+                continue
+            self._rules[rule.automation_id] = rule
+            self._by_trigger.setdefault(rule.trigger_type, {})[rule.automation_id] = rule
+        
+        if automation_ids is None:
+            self._loaded_all = True
+            self._stale.clear()
+        else:
+            self._stale.difference_update(automation_ids)
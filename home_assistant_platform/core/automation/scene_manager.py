@@ -5,6 +5,7 @@ from typing import List, Dict, Optional, Any
 from datetime import datetime
 from sqlalchemy import Column, Integer, String, JSON, DateTime, Boolean
 from home_assistant_platform.core.automation.models import get_automation_db, Base
+from home_assistant_platform.core.automation.action_runner import ActionRunner, device_state_to_actions
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +35,7 @@ class SceneManager:
     
     def __init__(self, device_manager=None):
         self.device_manager = device_manager
+        self.action_runner = ActionRunner(device_manager)
         self.db = get_automation_db()
         # Initialize scenes table
         try:
@@ -109,36 +111,13 @@ class SceneManager:
             logger.error("Device manager not available")
             return False
         
-        success = True
-        for device_state in scene.device_states:
-            device_id = device_state.get("device_id")
-            state = device_state.get("state")
-            brightness = device_state.get("brightness")
-            color = device_state.get("color")
-            temperature = device_state.get("temperature")
-            
-            try:
-                if state == "on":
-                    result = await self.device_manager.turn_on_device(device_id)
-                    if not result:
-                        success = False
-                elif state == "off":
-                    result = await self.device_manager.turn_off_device(device_id)
-                    if not result:
-                        success = False
-                
-                if brightness is not None:
-                    await self.device_manager.set_brightness(device_id, brightness)
-                
-                if color:
-                    await self.device_manager.set_color(device_id, color)
-                
-                if temperature is not None:
-                    await self.device_manager.set_temperature(device_id, temperature)
-                
-            except Exception as e:
-                logger.error(f"Error setting device {device_id} state: {e}")
-                success = False
+        actions = [
+            action
+            for device_state in scene.device_states
+            for action in device_state_to_actions(device_state)
+        ]
+        results = await self.action_runner.run_raw(actions)
+        success = all(result.success for result in results)
         
         logger.info(f"Activated scene: {scene.name} (success: {success})")
         return success
@@ -1,23 +1,102 @@
 """Automation scheduler - handles time-based automation triggers"""
 
+import heapq
+import itertools
 import logging
 import asyncio
-from datetime import datetime, time
-from typing import List, Dict, Optional
-from home_assistant_platform.core.automation.models import Automation, get_automation_db
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from typing import List, Dict, Optional, Set, Tuple, Any
+from home_assistant_platform.core.automation.models import (
+    Automation, get_automation_db, add_automation_change_listener,
+    remove_automation_change_listener
+)
 from home_assistant_platform.core.automation.executor import AutomationExecutor
+from home_assistant_platform.core.database import run_in_db_thread
 
 logger = logging.getLogger(__name__)
 
+# Unique stamp per scheduling, used to lazily invalidate heap entries
+_generations = itertools.count(1)
+
+
+@dataclass
+class TimeTrigger:
+    """Parsed trigger of a time-based automation"""
+    automation_id: int
+    name: str
+    at: time
+    days_of_week: Optional[frozenset] = None  # None = every day
+    last_slot: Optional[datetime] = None
+    generation: int = 0
+    
+    def next_fire(self, after: datetime) -> Optional[datetime]:
+        """First slot strictly after ``after``"""
+        day = after.date()
+        for offset in range(8):
+            candidate = datetime.combine(day + timedelta(days=offset), self.at)
+            if candidate <= after:
+                continue
+            if self.days_of_week is None or candidate.weekday() in self.days_of_week:
+                return candidate
+        return None
+
+
+def parse_time_trigger(automation_id: int, name: str, trigger_config: Optional[Dict[str, Any]]) -> Optional[TimeTrigger]:
+    """Build a TimeTrigger from an automation's trigger_config"""
+    trigger_config = trigger_config or {}
+    trigger_time_str = trigger_config.get("time")
+    if not trigger_time_str:
+        return None
+    
+    try:
+        at = time.fromisoformat(trigger_time_str)  # HH:MM or HH:MM:SS
+    except (TypeError, ValueError):
+        logger.warning(f"Automation {automation_id} has invalid trigger time: {trigger_time_str!r}")
+        return None
+    
+    days = trigger_config.get("days_of_week") or None
+    try:
+        days_of_week = frozenset(int(d) for d in days) if days else None
+    except (TypeError, ValueError):
+        logger.warning(f"Automation {automation_id} has invalid trigger days: {days!r}")
+        return None
+    
+    return TimeTrigger(
+        automation_id=automation_id,
+        name=name,
+        at=at.replace(tzinfo=None),
+        days_of_week=days_of_week
+    )
+
 
 class AutomationScheduler:
-    """Schedules and triggers time-based automations"""
+    """Schedules and triggers time-based automations
+    
+    Each enabled ``time`` automation is parsed once into a TimeTrigger and
+    its next slot pushed onto a min-heap. The loop sleeps until the nearest
+    deadline, fires due slots (O(log n) each) and reschedules them strictly
+    after the slot just fired, so every slot fires exactly once. The heap is
+    rebuilt only when automations change.
+    """
+    
+    # Slots missed by more than this (suspend, clock jump) are skipped
+    MISFIRE_GRACE = timedelta(seconds=60)
+    # Upper bound on a single sleep so wall-clock changes are noticed
+    MAX_SLEEP_SECONDS = 60.0
     
     def __init__(self, executor: AutomationExecutor):
         self.executor = executor
         self.db = get_automation_db()
         self.running = False
         self.scheduler_task: Optional[asyncio.Task] = None
+        
+        self.triggers: Dict[int, TimeTrigger] = {}
+        self._heap: List[Tuple[datetime, int, int]] = []  # (fire_at, automation_id, generation)
+        self._pending_changes: Set[Optional[int]] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._fire_tasks: Set[asyncio.Task] = set()
     
     async def start(self):
         """Start the scheduler"""
@@ -25,12 +104,17 @@ class AutomationScheduler:
             return
         
         self.running = True
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        add_automation_change_listener(self.notify_changed)
+        await self.reload()
         self.scheduler_task = asyncio.create_task(self._scheduler_loop())
-        logger.info("Automation scheduler started")
+        logger.info(f"Automation scheduler started ({len(self.triggers)} time triggers)")
     
     async def stop(self):
         """Stop the scheduler"""
         self.running = False
+        remove_automation_change_listener(self.notify_changed)
         if self.scheduler_task:
             self.scheduler_task.cancel()
             try:
@@ -39,59 +123,146 @@ class AutomationScheduler:
                 pass
         logger.info("Automation scheduler stopped")
     
+    def notify_changed(self, automation_id: Optional[int] = None):
+        """Mark an automation (or all, when None) for rescheduling
+        
+        Safe to call from any thread.
+        """
+        if not self._loop or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._mark_changed, automation_id)
+    
+    def _mark_changed(self, automation_id: Optional[int]):
+        self._pending_changes.add(automation_id)
+        if self._wakeup:
+            self._wakeup.set()
+    
+    def _load_triggers(self, automation_id: Optional[int] = None) -> List[Tuple[int, str, Dict[str, Any]]]:
+        """Load enabled time automations (runs on the DB thread pool)"""
+        query = self.db.query(
+            Automation.id, Automation.name, Automation.trigger_config
+        ).filter(
+            Automation.is_enabled == True,
+            Automation.is_active == True,
+            Automation.trigger_type == "time"
+        )
+        if automation_id is not None:
+            query = query.filter(Automation.id == automation_id)
+        return [(row.id, row.name, row.trigger_config) for row in query.all()]
+    
+    async def reload(self, automation_id: Optional[int] = None):
+        """Reparse triggers from the database and rebuild their schedule"""
+        rows = await run_in_db_thread(self._load_triggers, automation_id)
+        now = datetime.now()
+        
+        if automation_id is None:
+            previous = self.triggers
+            self.triggers = {}
+            self._heap = []
+            for row_id, name, trigger_config in rows:
+                self._schedule(parse_time_trigger(row_id, name, trigger_config), now, previous.get(row_id))
+        else:
+            previous = self.triggers.pop(automation_id, None)
+            for row_id, name, trigger_config in rows:
+                self._schedule(parse_time_trigger(row_id, name, trigger_config), now, previous)
+    
+    def _schedule(self, trigger: Optional[TimeTrigger], now: datetime, previous: Optional[TimeTrigger] = None):
+        """Register a trigger and push its next slot onto the heap"""
+        if trigger is None:
+            return
+        if previous is not None:
+            # Keep the fired-slot marker so a reload never refires a slot
+            trigger.last_slot = previous.last_slot
+        trigger.generation = next(_generations)
+        
+        self.triggers[trigger.automation_id] = trigger
+        after = max(now, trigger.last_slot) if trigger.last_slot else now
+        fire_at = trigger.next_fire(after)
+        if fire_at:
+            heapq.heappush(self._heap, (fire_at, trigger.automation_id, trigger.generation))
+    
+    def next_deadline(self) -> Optional[datetime]:
+        """Nearest scheduled fire time"""
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+    
+    def _discard_stale(self):
+        """Drop heap entries whose trigger was removed or rescheduled"""
+        while self._heap:
+            _, automation_id, generation = self._heap[0]
+            trigger = self.triggers.get(automation_id)
+            if trigger is not None and trigger.generation == generation:
+                return
+            heapq.heappop(self._heap)
+    
     async def _scheduler_loop(self):
         """Main scheduler loop"""
         while self.running:
             try:
-                await self._check_and_trigger_automations()
-                # Check every minute
-                await asyncio.sleep(60)
+                await self._apply_pending_changes()
+                await self._fire_due(datetime.now())
+                await self._sleep_until_next()
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"Error in scheduler loop: {e}", exc_info=True)
-                await asyncio.sleep(60)
+                await asyncio.sleep(1)
     
-    async def _check_and_trigger_automations(self):
-        """Check for automations that should be triggered"""
+    async def _apply_pending_changes(self):
+        """Reschedule automations changed since the last wake-up"""
+        if not self._pending_changes:
+            return
+        changes, self._pending_changes = self._pending_changes, set()
+        if None in changes:
+            await self.reload()
+        else:
+            for automation_id in changes:
+                await self.reload(automation_id)
+    
+    async def _sleep_until_next(self):
+        """Sleep until the nearest deadline or a change notification"""
+        deadline = self.next_deadline()
+        timeout = self.MAX_SLEEP_SECONDS
+        if deadline is not None:
+            timeout = min(timeout, max(0.0, (deadline - datetime.now()).total_seconds()))
+        
+        self._wakeup.clear()
+        if self._pending_changes:
+            return
         try:
-            now = datetime.now()
-            current_time = now.time()
-            current_day = now.weekday()
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+    
+    async def _fire_due(self, now: datetime):
+        """Fire every slot that is due, each exactly once"""
+        while True:
+            self._discard_stale()
+            if not self._heap or self._heap[0][0] > now:
+                return
             
-            # Get all enabled time-based automations
-            automations = self.db.query(Automation).filter(
-                Automation.is_enabled == True,
-                Automation.is_active == True,
-                Automation.trigger_type == "time"
-            ).all()
+            fire_at, automation_id, _ = heapq.heappop(self._heap)
+            trigger = self.triggers[automation_id]
+            already_fired = trigger.last_slot is not None and fire_at <= trigger.last_slot
+            trigger.last_slot = max(fire_at, trigger.last_slot or fire_at)
             
-            for automation in automations:
-                trigger_config = automation.trigger_config or {}
-                
-                # Check time match (within 1 minute window)
-                trigger_time_str = trigger_config.get("time")
-                if trigger_time_str:
-                    trigger_time = time.fromisoformat(trigger_time_str)
-                    time_diff = abs(
-                        (current_time.hour * 60 + current_time.minute) -
-                        (trigger_time.hour * 60 + trigger_time.minute)
-                    )
-                    
-                    if time_diff <= 1:  # Within 1 minute
-                        # Check day of week
-                        days_of_week = trigger_config.get("days_of_week", [])
-                        if not days_of_week or current_day in days_of_week:
-                            # Trigger automation
-                            logger.info(f"Triggering automation: {automation.name}")
-                            await self.executor.execute_automation(
-                                automation.id,
-                                trigger_data={
-                                    "triggered_at": now.isoformat(),
-                                    "trigger_type": "time"
-                                }
-                            )
-        
-        except Exception as e:
-            logger.error(f"Error checking automations: {e}", exc_info=True)
-
+            if already_fired:
+                logger.debug(f"Slot {fire_at.isoformat()} of automation {automation_id} already fired")
+            elif now - fire_at <= self.MISFIRE_GRACE:
+                logger.info(f"Triggering automation: {trigger.name}")
+                task = asyncio.create_task(self.executor.execute_automation(
+                    automation_id,
+                    trigger_data={
+                        "triggered_at": now.isoformat(),
+                        "scheduled_for": fire_at.isoformat(),
+                        "trigger_type": "time"
+                    }
+                ))
+                self._fire_tasks.add(task)
+                task.add_done_callback(self._fire_tasks.discard)
+            else:
+                logger.warning(f"Skipping missed slot {fire_at.isoformat()} of automation: {trigger.name}")
+            
+            next_fire = trigger.next_fire(max(trigger.last_slot, now - self.MISFIRE_GRACE))
+            if next_fire:
+                heapq.heappush(self._heap, (next_fire, automation_id, trigger.generation))
@@ -3,14 +3,17 @@
 import logging
 from datetime import datetime, time
 from typing import Optional, Dict, List, Any
-from sqlalchemy import create_engine, Column, String, Float, Integer, Boolean, DateTime, Text, ForeignKey, JSON, Time, Date
+from sqlalchemy import Column, String, Float, Integer, Boolean, DateTime, Text, ForeignKey, JSON, Time, Date
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
-from home_assistant_platform.config.settings import settings
+from sqlalchemy.orm import relationship
+from home_assistant_platform.core.database import (
+    register_store, get_scoped_session, session_dependency
+)
 
 logger = logging.getLogger(__name__)
 
 Base = declarative_base()
+register_store("calendar", Base.metadata)
 
 
 class Calendar(Base):
@@ -118,9 +121,9 @@ class ReminderNotification(Base):
 # Database setup
 def get_calendar_db():
     """Get database session for calendar system"""
-    db_path = settings.data_dir / "calendar.db"
-    engine = create_engine(f"sqlite:///{db_path}", echo=False)
-    Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
-    return Session()
+    return get_scoped_session("calendar")
+
+
+# FastAPI dependency yielding a per-request session
+get_calendar_session = session_dependency("calendar")
 
@@ -0,0 +1,244 @@
+"""Shared database layer - pooled SQLite engines and sessions per store"""
+
+import asyncio
+import functools
+import importlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, Optional, TypeVar
+from sqlalchemy import create_engine, event, MetaData
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker, scoped_session, Session
+from home_assistant_platform.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Pragmas applied to every new SQLite connection
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",  # Readers don't block the writer
+    "synchronous": "NORMAL",  # Safe with WAL, far fewer fsyncs
+    "busy_timeout": 5000,  # ms to wait on a locked database
+    "temp_store": "MEMORY",
+    "cache_size": -8000,  # ~8 MB page cache per connection
+}
+
+# Modules declaring the models of each store (imported before schema creation)
+MODEL_MODULES = [
+    "home_assistant_platform.core.automation.models",
+    "home_assistant_platform.core.automation.scene_manager",
+    "home_assistant_platform.core.calendar.models",
+    "home_assistant_platform.core.devices.models",
+    "home_assistant_platform.core.energy.models",
+    "home_assistant_platform.core.media.models",
+    "home_assistant_platform.core.ml_metrics.models",
+    "home_assistant_platform.core.personality.memory_system",
+    "home_assistant_platform.core.users.models",
+    "home_assistant_platform.core.webhooks.models",
+]
+
+_lock = threading.RLock()
+_metadata: Dict[str, MetaData] = {}
+_engines: Dict[str, Engine] = {}
+_session_factories: Dict[str, sessionmaker] = {}
+_scoped_sessions: Dict[str, scoped_session] = {}
+_initialized: set = set()
+_executor: Optional[ThreadPoolExecutor] = None
+
+T = TypeVar("T")
+
+
+def register_store(store: str, metadata: MetaData):
+    """Register the metadata backing a store (one SQLite file per store)"""
+    with _lock:
+        _metadata[store] = metadata
+
+
+def _apply_pragmas(dbapi_connection, connection_record):
+    """Tune each new SQLite connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def get_engine(store: str) -> Engine:
+    """Get the pooled engine for a store, creating it on first use"""
+    engine = _engines.get(store)
+    if engine is not None:
+        return engine
+    
+    with _lock:
+        engine = _engines.get(store)
+        if engine is None:
+            db_path = settings.data_dir / f"{store}.db"
+            engine = create_engine(
+                f"sqlite:///{db_path}",
+                echo=False,
+                pool_size=5,
+                max_overflow=10,
+                pool_pre_ping=True,
+                connect_args={"check_same_thread": False, "timeout": 30},
+            )
+            event.listen(engine, "connect", _apply_pragmas)
+            _engines[store] = engine
+            logger.debug(f"Created engine for store '{store}' at {db_path}")
+        return engine
+
+
+def init_store(store: str, force: bool = False):
+    """Create a store's tables (only once per process unless forced)"""
+    if store in _initialized and not force:
+        return
+    
+    with _lock:
+        if store in _initialized and not force:
+            return
+        metadata = _metadata.get(store)
+        if metadata is None:
+            raise KeyError(f"Unknown database store: {store}")
+        metadata.create_all(get_engine(store))
+        _initialized.add(store)
+
+
+def init_databases():
+    """Create tables for every registered store - called once at boot"""
+    for module in MODEL_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            logger.warning(f"Could not import models from {module}: {e}")
+    
+    with _lock:
+        stores = list(_metadata)
+    for store in stores:
+        init_store(store, force=True)
+    logger.info(f"Initialized {len(stores)} database stores")
+
+
+def get_session_factory(store: str) -> sessionmaker:
+    """Get the session factory for a store"""
+    factory = _session_factories.get(store)
+    if factory is not None:
+        return factory
+    
+    with _lock:
+        factory = _session_factories.get(store)
+        if factory is None:
+            init_store(store)
+            factory = sessionmaker(bind=get_engine(store))
+            _session_factories[store] = factory
+        return factory
+
+
+def get_scoped_session(store: str) -> scoped_session:
+    """Get the thread-local session registry for a store
+    
+    Managers keep this as their long-lived ``self.db``; each thread that
+    uses it gets its own underlying Session, so the event loop and worker
+    threads never share a connection or identity map.
+    """
+    registry = _scoped_sessions.get(store)
+    if registry is not None:
+        return registry
+    
+    with _lock:
+        registry = _scoped_sessions.get(store)
+        if registry is None:
+            registry = scoped_session(get_session_factory(store))
+            _scoped_sessions[store] = registry
+        return registry
+
+
+def new_session(store: str) -> Session:
+    """Open a fresh, independent session for a store"""
+    return get_session_factory(store)()
+
+
+def session_dependency(store: str):
+    """Build a FastAPI dependency yielding a per-request session"""
+    def _get_session() -> Iterator[Session]:
+        session = new_session(store)
+        try:
+            yield session
+        finally:
+            session.close()
+    
+    _get_session.__name__ = f"get_{store}_session"
+    return _get_session
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Get the bounded thread pool used for blocking database work"""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.db_worker_threads,
+                    thread_name_prefix="db-worker",
+                )
+    return _executor
+
+
+def _close_thread_sessions():
+    """Release the calling thread's scoped sessions"""
+    for registry in list(_scoped_sessions.values()):
+        registry.remove()
+
+
+def _run_and_release(func: Callable[..., T], *args, **kwargs) -> T:
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _close_thread_sessions()
+
+
+async def run_in_db_thread(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run blocking database work on the bounded DB thread pool
+    
+    Keeps slow queries off the event loop. ``func`` should return plain
+    data (dicts, lists, scalars): the worker's sessions are closed as soon
+    as it returns, so ORM objects must be serialized inside ``func``.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(_run_and_release, func, *args, **kwargs)
+    return await loop.run_in_executor(_get_executor(), call)
+
+
+def shutdown_db_executor():
+    """Stop the DB thread pool, waiting for queued work"""
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+def dispose_engines(store: Optional[str] = None):
+    """Close pooled connections (all stores, or a single store)"""
+    with _lock:
+        stores = [store] if store else list(_engines)
+        for name in stores:
+            registry = _scoped_sessions.get(name)
+            if registry is not None:
+                registry.remove()
+            engine = _engines.get(name)
+            if engine is not None:
+                engine.dispose()
+
+
+def reset_stores():
+    """Dispose every engine and forget cached engines, sessions and schemas
+    
+    The next access recreates them from the current settings, e.g. after
+    ``settings.base_dir`` points at another data directory.
+    """
+    with _lock:
+        dispose_engines()
+        _engines.clear()
+        _session_factories.clear()
+        _scoped_sessions.clear()
+        _initialized.clear()
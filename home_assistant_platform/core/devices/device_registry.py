@@ -1,145 +1,254 @@
 """Device registry - unified device management"""
 
+import asyncio
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Any
 from datetime import datetime
-from home_assistant_platform.core.automation.device_manager import DeviceManager
+from home_assistant_platform.core.automation.device_manager import DeviceManager, COMMAND_METHODS
+from home_assistant_platform.core.devices.state_store import DeviceStateStore
 
 logger = logging.getLogger(__name__)
 
 
 class DeviceRegistry:
-    """Unified device registry that combines multiple device sources"""
+    """Unified device registry that combines multiple device sources
     
-    def __init__(self):
-        self.devices: Dict[str, Dict[str, Any]] = {}
+    Device state lives in a versioned ``DeviceStateStore``; managers report
+    into it (directly, for managers with a ``state_store`` attribute) and
+    successful commands are mirrored into it. The store publishes the
+    device events.
+    
+    Commands are routed through a device id -> manager table. It is filled
+    when a manager registers and kept current from the store, so devices a
+    manager discovers later (or a bridge announces in bulk) are routable as
+    soon as they are stored, and removed devices stop routing. Devices
+    without a manager (added manually) are not routed anywhere.
+    """
+    
+    def __init__(self, store: Optional[DeviceStateStore] = None):
+        self.store = store or DeviceStateStore()
         self.device_managers: List[DeviceManager] = []
-        self.device_sources: Dict[str, str] = {}  # device_id -> source name
+        self.managers: Dict[str, DeviceManager] = {}  # source name -> manager
+        self.routes: Dict[str, DeviceManager] = {}  # device_id -> manager
+        self._owned: Dict[str, Set[str]] = {}  # source name -> routed device ids
+        self.store.subscribe(self._on_store_change)
     
     def register_manager(self, manager: DeviceManager, source_name: str):
-        """Register a device manager"""
+        """Register a device manager (replacing one registered under the same name)"""
+        if source_name in self.managers:
+            self.unregister_manager(source_name)
         self.device_managers.append(manager)
+        self.managers[source_name] = manager
+        self._owned[source_name] = set()
+        if hasattr(manager, 'state_store'):
+            manager.state_store = self.store  # Pushes state updates as they arrive
         logger.info(f"Registered device manager: {source_name}")
         
+        # Restored devices of this source are routable before it re-reports them
+        self.route_devices(source_name, self.store.device_ids(source_name))
+        
         # Load devices from this manager
         try:
-            devices = manager.list_devices()
+            devices = [device for device in manager.list_devices() if device.get("id")]
+            self.route_devices(source_name, [device["id"] for device in devices])
             for device in devices:
-                device_id = device.get("id")
-                if device_id:
-                    self.devices[device_id] = device
-                    self.device_sources[device_id] = source_name
-                    logger.debug(f"Registered device from {source_name}: {device_id}")
+                self.store.update(device["id"], device, source=source_name)
+            logger.debug(f"Registered {len(devices)} devices from {source_name}")
         except Exception as e:
             logger.error(f"Error loading devices from {source_name}: {e}")
     
+    def unregister_manager(self, source_name: str):
+        """Stop routing to a manager; its devices stay in the store"""
+        manager = self.managers.pop(source_name, None)
+        if manager is None:
+            return
+        self.device_managers = [m for m in self.device_managers if m is not manager]
+        for device_id in self._owned.pop(source_name, ()):
+            if self.routes.get(device_id) is manager:
+                del self.routes[device_id]
+        if getattr(manager, 'state_store', None) is self.store:
+            manager.state_store = None
+        logger.info(f"Unregistered device manager: {source_name}")
+    
+    def route_devices(self, source_name: str, device_ids: Iterable[str]):
+        """Route devices to a registered manager in one pass
+        
+        For managers that learn many devices at once, e.g. a bridge
+        announcing its whole device list.
+        """
+        manager = self.managers.get(source_name)
+        if manager is None:
+            raise ValueError(f"Unknown device source: {source_name}")
+        owned = self._owned[source_name]
+        for device_id in device_ids:
+            current = self.routes.get(device_id)
+            if current is not None and current is not manager:
+                logger.warning(f"Device {device_id} moved to {source_name}")
+                self._disown(device_id, current)
+            self.routes[device_id] = manager
+            owned.add(device_id)
+    
     def get_device_manager(self, device_id: str) -> Optional[DeviceManager]:
         """Get the device manager for a specific device"""
-        source = self.device_sources.get(device_id)
-        if source:
-            # Find manager by source name (simplified - in production use a mapping)
-            for manager in self.device_managers:
-                if hasattr(manager, 'source_name') and manager.source_name == source:
-                    return manager
-            # Fallback: return first manager
-            return self.device_managers[0] if self.device_managers else None
-        return None
+        return self.routes.get(device_id)
+    
+    def _on_store_change(
+        self,
+        device_id: str,
+        state: Optional[Dict[str, Any]],
+        previous: Optional[Dict[str, Any]],
+        version: int
+    ):
+        """Store listener - route unrouted devices of known sources, drop removed ones"""
+        if state is None:
+            manager = self.routes.pop(device_id, None)
+            if manager is not None:
+                self._disown(device_id, manager)
+        elif device_id not in self.routes:
+            source = self.store.source(device_id)
+            if source in self.managers:
+                self.route_devices(source, (device_id,))
+    
+    def restore(self, devices: Iterable[Tuple[str, Dict[str, Any], Optional[str]]]) -> List[str]:
+        """Load saved devices (warm start) and route those of registered sources"""
+        restored = self.store.restore(devices)
+        for device_id in restored:
+            source = self.store.source(device_id)
+            if source in self.managers and device_id not in self.routes:
+                self.route_devices(source, (device_id,))
+        return restored
+    
+    def capabilities(self, device_id: str) -> List[str]:
+        """Commands the device's manager supports"""
+        manager = self.routes.get(device_id)
+        if manager is None:
+            return []
+        return ["turn_on", "turn_off"] + [
+            action for action, method in COMMAND_METHODS.items() if hasattr(manager, method)
+        ]
+    
+    def _disown(self, device_id: str, manager: DeviceManager):
+        for source_name, registered in self.managers.items():
+            if registered is manager:
+                self._owned[source_name].discard(device_id)
     
     async def turn_on_device(self, device_id: str) -> bool:
         """Turn on a device"""
-        manager = self.get_device_manager(device_id)
-        if manager:
-            result = await manager.turn_on_device(device_id)
-            if result:
-                # Update local state
-                if device_id in self.devices:
-                    self.devices[device_id]["state"] = "on"
-                    if "brightness" in self.devices[device_id]:
-                        self.devices[device_id]["brightness"] = 100
-            return result
-        logger.warning(f"No manager found for device: {device_id}")
-        return False
+        return await self._command(device_id, "turn_on")
     
     async def turn_off_device(self, device_id: str) -> bool:
         """Turn off a device"""
-        manager = self.get_device_manager(device_id)
-        if manager:
-            result = await manager.turn_off_device(device_id)
-            if result:
-                # Update local state
-                if device_id in self.devices:
-                    self.devices[device_id]["state"] = "off"
-                    if "brightness" in self.devices[device_id]:
-                        self.devices[device_id]["brightness"] = 0
-            return result
-        logger.warning(f"No manager found for device: {device_id}")
-        return False
+        return await self._command(device_id, "turn_off")
     
     async def set_temperature(self, device_id: str, temperature: float) -> bool:
         """Set device temperature"""
-        manager = self.get_device_manager(device_id)
-        if manager and hasattr(manager, 'set_temperature'):
-            result = await manager.set_temperature(device_id, temperature)
-            if result and device_id in self.devices:
-                self.devices[device_id]["temperature"] = temperature
-            return result
-        return False
+        return await self._command(device_id, "set_temperature", temperature)
     
     async def set_brightness(self, device_id: str, brightness: int) -> bool:
         """Set device brightness"""
-        manager = self.get_device_manager(device_id)
-        if manager and hasattr(manager, 'set_brightness'):
-            result = await manager.set_brightness(device_id, brightness)
-            if result and device_id in self.devices:
-                self.devices[device_id]["brightness"] = brightness
-            return result
-        return False
+        return await self._command(device_id, "set_brightness", brightness)
     
     async def set_color(self, device_id: str, color: str) -> bool:
         """Set device color"""
+        return await self._command(device_id, "set_color", color)
+    
+    async def _command(self, device_id: str, action: str, value: Any = None) -> bool:
+        """Send one command to the device's manager and mirror it in the store"""
         manager = self.get_device_manager(device_id)
-        if manager and hasattr(manager, 'set_color'):
-            result = await manager.set_color(device_id, color)
-            if result and device_id in self.devices:
-                self.devices[device_id]["color"] = color
-            return result
-        return False
+        if not manager:
+            logger.warning(f"No manager found for device: {device_id}")
+            return False
+        if action in COMMAND_METHODS and not hasattr(manager, COMMAND_METHODS[action]):
+            return False
+        result = await manager.apply_command(device_id, action, value)
+        if result:
+            self._apply_local(device_id, action, value)
+        return result
+    
+    async def apply_batch(self, commands: List[Dict[str, Any]]) -> List[bool]:
+        """Apply commands, sending each manager its share as one batch"""
+        results = [False] * len(commands)
+        by_manager: Dict[int, Any] = {}
+        for index, command in enumerate(commands):
+            manager = self.get_device_manager(command.get("device_id"))
+            if manager is None:
+                logger.warning(f"No manager found for device: {command.get('device_id')}")
+                continue
+            by_manager.setdefault(id(manager), (manager, []))[1].append(index)
+        
+        async def run_manager(manager, indexes: List[int]):
+            try:
+                manager_results = await manager.apply_batch([commands[i] for i in indexes])
+            except Exception as e:
+                logger.error(f"Error applying batch on {getattr(manager, 'source_name', manager)}: {e}", exc_info=True)
+                return
+            for index, result in zip(indexes, manager_results):
+                results[index] = result
+        
+        await asyncio.gather(*(run_manager(manager, indexes) for manager, indexes in by_manager.values()))
+        
+        # Mirror successful commands in the store, one change per device
+        changes: Dict[str, Dict[str, Any]] = {}
+        for command, result in zip(commands, results):
+            if result:
+                changes.setdefault(command["device_id"], {}).update(
+                    self._command_changes(command["device_id"], command["action"], command.get("value"))
+                )
+        for device_id, device_changes in changes.items():
+            self.store.update(device_id, device_changes)
+        return results
+    
+    def _command_changes(self, device_id: str, action: str, value: Any = None) -> Dict[str, Any]:
+        """State attributes a successful command sets"""
+        if action in ("turn_on", "turn_off"):
+            changes = {"state": "on" if action == "turn_on" else "off"}
+            device = self.store.get(device_id) or {}
+            if "brightness" in device:
+                changes["brightness"] = 100 if action == "turn_on" else 0
+            return changes
+        elif action == "set_brightness":
+            return {"brightness": value}
+        elif action == "set_color":
+            return {"color": value}
+        elif action == "set_temperature":
+            return {"temperature": value}
+        return {}
+    
+    def _apply_local(self, device_id: str, action: str, value: Any = None):
+        """Update the stored state after a successful command"""
+        if device_id in self.store:
+            self.store.update(device_id, self._command_changes(device_id, action, value))
     
     async def get_device_state(self, device_id: str) -> Optional[Dict[str, Any]]:
-        """Get device state"""
-        # Try to get fresh state from manager
+        """Get device state
+        
+        A fresh state from the device's manager is merged into the store
+        (attributes the manager does not report are kept).
+        """
         manager = self.get_device_manager(device_id)
         if manager:
             state = await manager.get_device_state(device_id)
             if state:
-                # Update local cache
-                self.devices[device_id] = state
-                return state
+                self.store.update(device_id, state)
         
-        # Fallback to cached state
-        return self.devices.get(device_id)
+        return self.store.get(device_id)
     
     def list_devices(self) -> List[Dict[str, Any]]:
-        """List all registered devices"""
-        return list(self.devices.values())
+        """List all registered devices (with their state versions)"""
+        return self.store.snapshot()["devices"]
     
     def get_device(self, device_id: str) -> Optional[Dict[str, Any]]:
         """Get device info"""
-        return self.devices.get(device_id)
+        return self.store.get(device_id)
     
     def add_device(self, device: Dict[str, Any], source: str = "manual"):
         """Manually add a device"""
         device_id = device.get("id")
         if device_id:
-            self.devices[device_id] = device
-            self.device_sources[device_id] = source
+            self.store.put(device_id, device, source=source)
             logger.info(f"Added device: {device_id} from {source}")
     
     def remove_device(self, device_id: str):
         """Remove a device"""
-        if device_id in self.devices:
-            del self.devices[device_id]
-            if device_id in self.device_sources:
-                del self.device_sources[device_id]
+        if self.store.remove(device_id):
             logger.info(f"Removed device: {device_id}")
-
@@ -0,0 +1,167 @@
+"""Device discovery - runs protocol scanners concurrently and caches what they find"""
+
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from home_assistant_platform.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DiscoveredDevice:
+    info: Dict[str, Any]  # Device description as stored in the registry
+    source: str
+    handle: Any = None  # SDK object the source's manager controls the device with
+    seen_at: float = field(default_factory=time.monotonic)
+    
+    @property
+    def device_id(self) -> str:
+        return self.info["id"]
+
+
+class Scanner(ABC):
+    """Finds the devices of one protocol
+    
+    Blocking SDK calls must run in a thread (``asyncio.to_thread``); the
+    orchestrator runs every scanner on the event loop at the same time.
+    """
+    
+    name: str = ""
+    
+    @abstractmethod
+    async def scan(self) -> List[DiscoveredDevice]:
+        """Find every device of this protocol"""
+        pass
+    
+    @abstractmethod
+    async def probe(self, device: DiscoveredDevice) -> Optional[DiscoveredDevice]:
+        """Re-check one known device; None when it no longer answers"""
+        pass
+
+
+class DiscoveryOrchestrator:
+    """Concurrent discovery across scanners with a TTL cache
+    
+    ``discover`` scans only the protocols whose last full scan is older
+    than ``ttl`` (all of them with ``force``); callers arriving while a
+    scan runs wait for it instead of starting another. A scanner that fails
+    or exceeds ``timeout`` keeps its previous results. ``refresh`` is the
+    incremental path: it re-probes only devices not seen within ``ttl`` and
+    drops the ones that stopped answering.
+    """
+    
+    def __init__(
+        self,
+        scanners: Iterable[Scanner],
+        ttl: Optional[float] = None,
+        timeout: Optional[float] = None,
+        max_probes: int = 32,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.scanners: Dict[str, Scanner] = {scanner.name: scanner for scanner in scanners}
+        self.ttl = settings.discovery_cache_ttl if ttl is None else ttl
+        self.timeout = settings.discovery_timeout if timeout is None else timeout
+        self.max_probes = max_probes
+        self.clock = clock
+        self.devices: Dict[str, DiscoveredDevice] = {}
+        self.scanned_at: Dict[str, float] = {}  # source -> time of the last successful scan
+        self.stats = {"scans": 0, "scan_failures": 0, "cache_hits": 0, "probes": 0}
+        self._lock = asyncio.Lock()
+    
+    def is_fresh(self, source: str) -> bool:
+        scanned_at = self.scanned_at.get(source)
+        return scanned_at is not None and self.clock() - scanned_at < self.ttl
+    
+    async def discover(self, force: bool = False) -> List[Dict[str, Any]]:
+        """Devices of every protocol, scanning those not cached"""
+        requested_at = self.clock()
+        if not force and all(self.is_fresh(name) for name in self.scanners):
+            self.stats["cache_hits"] += 1
+            return self.list_devices()
+        
+        async with self._lock:
+            # A scan that finished while we waited counts as ours
+            names = [
+                name for name in self.scanners
+                if self.scanned_at.get(name, float("-inf")) <= requested_at
+                and (force or not self.is_fresh(name))
+            ]
+            if names:
+                results = await asyncio.gather(*(self._scan(self.scanners[name]) for name in names))
+                for name, found in zip(names, results):
+                    if found is not None:
+                        self._replace(name, found)
+        
+        logger.info(f"Total discovered devices: {len(self.devices)}")
+        return self.list_devices()
+    
+    async def refresh(self) -> Dict[str, int]:
+        """Re-probe devices not seen within ``ttl``"""
+        now = self.clock()
+        stale = [device for device in self.devices.values() if now - device.seen_at >= self.ttl]
+        semaphore = asyncio.Semaphore(self.max_probes)
+        
+        async def probe(device: DiscoveredDevice) -> Optional[DiscoveredDevice]:
+            async with semaphore:
+                return await self._probe(device)
+        
+        results = await asyncio.gather(*(probe(device) for device in stale))
+        lost = 0
+        for device, probed in zip(stale, results):
+            if probed is None:
+                if self.devices.get(device.device_id) is device:
+                    del self.devices[device.device_id]
+                lost += 1
+            else:
+                probed.seen_at = self.clock()
+                self.devices[probed.device_id] = probed
+        
+        if stale:
+            logger.info(f"Re-probed {len(stale)} stale devices, {lost} lost")
+        return {"probed": len(stale), "refreshed": len(stale) - lost, "lost": lost}
+    
+    def list_devices(self) -> List[Dict[str, Any]]:
+        return [device.info for device in self.devices.values()]
+    
+    def by_source(self, source: str) -> List[DiscoveredDevice]:
+        return [device for device in self.devices.values() if device.source == source]
+    
+    async def _scan(self, scanner: Scanner) -> Optional[List[DiscoveredDevice]]:
+        self.stats["scans"] += 1
+        try:
+            found = await asyncio.wait_for(scanner.scan(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{scanner.name} discovery timed out after {self.timeout}s")
+        except Exception as e:
+            logger.error(f"Error discovering {scanner.name} devices: {e}")
+        else:
+            logger.info(f"Discovered {len(found)} {scanner.name} devices")
+            return found
+        self.stats["scan_failures"] += 1
+        return None
+    
+    async def _probe(self, device: DiscoveredDevice) -> Optional[DiscoveredDevice]:
+        self.stats["probes"] += 1
+        scanner = self.scanners.get(device.source)
+        if scanner is None:
+            return None
+        try:
+            return await asyncio.wait_for(scanner.probe(device), timeout=self.timeout)
+        except Exception as e:
+            logger.debug(f"Probe of {device.device_id} failed: {e}")
+            return None
+    
+    def _replace(self, source: str, found: List[DiscoveredDevice]):
+        """Make ``found`` the cached devices of ``source``"""
+        now = self.clock()
+        for device_id in [d.device_id for d in self.by_source(source)]:
+            del self.devices[device_id]
+        for device in found:
+            device.source = source
+            device.seen_at = now
+            self.devices[device.device_id] = device
+        self.scanned_at[source] = now
@@ -0,0 +1,27 @@
+"""Device data models"""
+
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, JSON
+from sqlalchemy.ext.declarative import declarative_base
+from home_assistant_platform.core.database import register_store, get_scoped_session
+
+Base = declarative_base()
+register_store("devices", Base.metadata)
+
+
+class DeviceRecord(Base):
+    """Last known state of a device, for warm starts"""
+    __tablename__ = "devices"
+    
+    device_id = Column(String, primary_key=True)
+    source = Column(String, index=True)  # Registry source name (mqtt, tplink, manual, ...)
+    name = Column(String)
+    device_type = Column(String)
+    capabilities = Column(JSON)  # Commands the device's manager supports
+    state = Column(JSON)  # Every stored attribute, including metadata
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+def get_devices_db():
+    """Get database session for the device registry"""
+    return get_scoped_session("devices")
@@ -6,13 +6,23 @@ import asyncio
 from typing import Dict, Optional, List, Any, Callable
 import paho.mqtt.client as mqtt
 from home_assistant_platform.core.automation.device_manager import DeviceManager
+from home_assistant_platform.core.automation.event_bus import (
+    get_event_bus, DEVICE_STATE_CHANGE, DEVICE_ADDED
+)
 from home_assistant_platform.config.settings import settings
 
 logger = logging.getLogger(__name__)
 
 
 class MQTTDeviceManager(DeviceManager):
-    """MQTT-based device manager"""
+    """MQTT-based device manager
+    
+    Publishing never blocks the event loop: paho runs its network loop in a
+    background thread and its ``on_publish`` callback resolves an asyncio
+    future per message id. A semaphore bounds the number of unacknowledged
+    publishes, each publish times out after ``mqtt_publish_timeout`` and
+    paho reconnects with exponential backoff after the first connection.
+    """
     
     def __init__(self, broker_host: Optional[str] = None, broker_port: int = 1883,
                  username: Optional[str] = None, password: Optional[str] = None):
@@ -27,6 +37,15 @@ class MQTTDeviceManager(DeviceManager):
         self.devices: Dict[str, Dict[str, Any]] = {}
         self.device_states: Dict[str, Dict[str, Any]] = {}
         self.state_callbacks: Dict[str, Callable] = {}
+        self.state_store = None  # Set by DeviceRegistry; receives state updates when present
+        
+        # Publish acknowledgements, bridged from the paho thread to asyncio
+        self.publish_timeout = settings.mqtt_publish_timeout
+        self.max_inflight = max(1, settings.mqtt_max_inflight)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._inflight: Optional[asyncio.Semaphore] = None
+        self._connected_event: Optional[asyncio.Event] = None
         
         # MQTT topic patterns
         self.command_topic_pattern = "homeassistant/{device_id}/set"
@@ -45,6 +64,14 @@ class MQTTDeviceManager(DeviceManager):
             self.client.on_connect = self._on_connect
             self.client.on_message = self._on_message
             self.client.on_disconnect = self._on_disconnect
+            self.client.on_publish = self._on_publish
+            
+            # Let paho retry dropped connections with exponential backoff
+            self.client.reconnect_delay_set(
+                min_delay=settings.mqtt_reconnect_min_delay,
+                max_delay=settings.mqtt_reconnect_max_delay
+            )
+            self.client.max_inflight_messages_set(self.max_inflight)
             
             # Connect
             self.client.connect(self.broker_host, self.broker_port, 60)
@@ -52,9 +79,10 @@ class MQTTDeviceManager(DeviceManager):
             
             logger.info(f"MQTT client connecting to {self.broker_host}:{self.broker_port}")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Failed to connect to MQTT broker: {e}")
+            self.client = None  # The next command tries a fresh connection
             return False
     
     def _on_connect(self, client, userdata, flags, rc):
@@ -67,6 +95,7 @@ class MQTTDeviceManager(DeviceManager):
             self.client.subscribe(self.state_topic_pattern.format(device_id="+"))
             self.client.subscribe(self.discovery_topic)
             logger.info("Subscribed to MQTT topics")
+            self._call_in_loop(self._set_connected, True)
         else:
             logger.error(f"MQTT connection failed with code {rc}")
             self.connected = False
@@ -85,6 +114,7 @@ class MQTTDeviceManager(DeviceManager):
                 if '/state' in topic:
                     # State update
                     state_data = json.loads(payload)
+                    previous = self.device_states.get(device_id) or {}
                     self.device_states[device_id] = state_data
                     
                     # Update device info
@@ -95,6 +125,21 @@ class MQTTDeviceManager(DeviceManager):
                     if device_id in self.state_callbacks:
                         self.state_callbacks[device_id](state_data)
                     
+                    # Runs on the MQTT network thread; the store and the bus are thread-safe
+                    if self.state_store is not None:
+                        self.state_store.update(device_id, state_data, source=self.source_name)
+                    else:
+                        get_event_bus().publish(
+                            DEVICE_STATE_CHANGE,
+                            device_id,
+                            {
+                                "state": state_data.get("state"),
+                                "previous_state": previous.get("state"),
+                                "changes": state_data
+                            },
+                            source=self.source_name
+                        )
+                    
                     logger.debug(f"State update for {device_id}: {state_data}")
                 
                 elif '/config' in topic:
@@ -108,7 +153,100 @@ class MQTTDeviceManager(DeviceManager):
     def _on_disconnect(self, client, userdata, rc):
         """MQTT disconnection callback"""
         self.connected = False
-        logger.warning("MQTT client disconnected")
+        self._call_in_loop(self._set_connected, False)
+        if rc != 0:
+            logger.warning(f"MQTT client disconnected unexpectedly (rc={rc}), reconnecting")
+        else:
+            logger.warning("MQTT client disconnected")
+    
+    def _on_publish(self, client, userdata, mid):
+        """MQTT publish acknowledgement callback (paho network thread)"""
+        self._call_in_loop(self._resolve_publish, mid)
+    
+    def _call_in_loop(self, callback: Callable, *args):
+        """Run a callback on the event loop from the paho thread"""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(callback, *args)
+    
+    def _set_connected(self, connected: bool):
+        if self._connected_event is None:
+            return
+        if connected:
+            self._connected_event.set()
+        else:
+            self._connected_event.clear()
+    
+    def _resolve_publish(self, mid: int):
+        future = self._pending.pop(mid, None)
+        if future is not None and not future.done():
+            future.set_result(True)
+    
+    def _bind_loop(self):
+        """Create the asyncio primitives on the running loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._pending = {}
+        self._inflight = asyncio.Semaphore(self.max_inflight)
+        self._connected_event = asyncio.Event()
+        if self.connected:
+            self._connected_event.set()
+    
+    async def _ensure_connected(self) -> bool:
+        """Wait (bounded) for a broker connection without blocking the loop"""
+        self._bind_loop()
+        if self.connected:
+            return True
+        if self.client is None:
+            # First connection: the blocking socket connect runs in a thread
+            if not await asyncio.to_thread(self.connect):
+                return False
+        try:
+            await asyncio.wait_for(self._connected_event.wait(), timeout=self.publish_timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"MQTT broker {self.broker_host}:{self.broker_port} not connected")
+            return False
+    
+    def _start_publish(self, device_id: str, payload: Dict[str, Any]) -> Optional[asyncio.Future]:
+        """Hand a command to paho and return the future of its PUBACK"""
+        topic = self.command_topic_pattern.format(device_id=device_id)
+        try:
+            info = self.client.publish(topic, json.dumps(payload), qos=1)
+        except Exception as e:
+            logger.error(f"Error publishing to {topic}: {e}")
+            return None
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            logger.error(f"Error publishing to {topic}: {mqtt.error_string(info.rc)}")
+            return None
+        
+        # on_publish is delivered through call_soon_threadsafe, so it cannot
+        # run before the future is registered here
+        future = self._loop.create_future()
+        if info.is_published():
+            future.set_result(True)
+        else:
+            self._pending[info.mid] = future
+            future.add_done_callback(lambda _, mid=info.mid: self._pending.pop(mid, None))
+        return future
+    
+    async def _wait_published(self, future: Optional[asyncio.Future], device_id: str) -> bool:
+        if future is None:
+            return False
+        try:
+            return await asyncio.wait_for(future, timeout=self.publish_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Publish to {device_id} not acknowledged within {self.publish_timeout}s")
+            return False
+    
+    async def publish_command(self, device_id: str, payload: Dict[str, Any]) -> bool:
+        """Publish a command payload and await its acknowledgement"""
+        if not await self._ensure_connected():
+            return False
+        async with self._inflight:
+            return await self._wait_published(self._start_publish(device_id, payload), device_id)
     
     def _handle_device_discovery(self, device_id: str, config: Dict[str, Any]):
         """Handle device discovery message"""
@@ -121,89 +259,94 @@ class MQTTDeviceManager(DeviceManager):
             "config": config
         }
         
+        is_new = device_id not in self.devices
         self.devices[device_id] = device_info
         logger.info(f"Discovered MQTT device: {device_id} ({device_info['name']})")
+        if self.state_store is not None:
+            self.state_store.update(device_id, device_info, source=self.source_name)
+        elif is_new:
+            get_event_bus().publish(DEVICE_ADDED, device_id, {"state": "unknown"}, source=self.source_name)
     
     async def turn_on_device(self, device_id: str) -> bool:
         """Turn on device via MQTT"""
-        if not self.connected:
-            if not self.connect():
-                return False
-        
-        try:
-            topic = self.command_topic_pattern.format(device_id=device_id)
-            payload = json.dumps({"state": "ON"})
-            
-            result = self.client.publish(topic, payload, qos=1)
-            result.wait_for_publish()
-            
-            logger.info(f"Published turn_on command to {topic}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error turning on device {device_id}: {e}")
-            return False
+        result = await self.publish_command(device_id, {"state": "ON"})
+        if result:
+            logger.info(f"Published turn_on command for {device_id}")
+        return result
     
     async def turn_off_device(self, device_id: str) -> bool:
         """Turn off device via MQTT"""
-        if not self.connected:
-            if not self.connect():
-                return False
-        
-        try:
-            topic = self.command_topic_pattern.format(device_id=device_id)
-            payload = json.dumps({"state": "OFF"})
-            
-            result = self.client.publish(topic, payload, qos=1)
-            result.wait_for_publish()
-            
-            logger.info(f"Published turn_off command to {topic}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error turning off device {device_id}: {e}")
-            return False
+        result = await self.publish_command(device_id, {"state": "OFF"})
+        if result:
+            logger.info(f"Published turn_off command for {device_id}")
+        return result
     
     async def set_brightness(self, device_id: str, brightness: int) -> bool:
         """Set device brightness via MQTT"""
-        if not self.connected:
-            if not self.connect():
-                return False
-        
-        try:
-            topic = self.command_topic_pattern.format(device_id=device_id)
-            payload = json.dumps({"brightness": brightness})
-            
-            result = self.client.publish(topic, payload, qos=1)
-            result.wait_for_publish()
-            
-            logger.info(f"Published brightness command to {topic}: {brightness}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error setting brightness for {device_id}: {e}")
-            return False
+        result = await self.publish_command(device_id, {"brightness": brightness})
+        if result:
+            logger.info(f"Published brightness command for {device_id}: {brightness}")
+        return result
     
     async def set_color(self, device_id: str, color: str) -> bool:
         """Set device color via MQTT"""
-        if not self.connected:
-            if not self.connect():
-                return False
+        # Convert color name to RGB if needed
+        result = await self.publish_command(device_id, {"color": color})
+        if result:
+            logger.info(f"Published color command for {device_id}: {color}")
+        return result
+    
+    async def apply_batch(self, commands: List[Dict[str, Any]]) -> List[bool]:
+        """Apply several commands with one publish per device
         
-        try:
-            topic = self.command_topic_pattern.format(device_id=device_id)
-            # Convert color name to RGB if needed
-            payload = json.dumps({"color": color})
-            
-            result = self.client.publish(topic, payload, qos=1)
-            result.wait_for_publish()
-            
-            logger.info(f"Published color command to {topic}: {color}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error setting color for {device_id}: {e}")
-            return False
+        Attributes of each device are merged into a single payload (later
+        commands win), every device is published in one pass and all publish
+        acknowledgements are awaited together.
+        """
+        results = [False] * len(commands)
+        if not commands or not await self._ensure_connected():
+            return results
+        
+        payloads: Dict[str, Dict[str, Any]] = {}
+        indexes: Dict[str, List[int]] = {}
+        for index, command in enumerate(commands):
+            device_id = command.get("device_id")
+            try:
+                attribute = self._command_attribute(command.get("action"), command.get("value"))
+            except (TypeError, ValueError):
+                attribute = None
+            if not device_id or attribute is None:
+                logger.warning(f"Unsupported MQTT command: {command}")
+                continue
+            payloads.setdefault(device_id, {}).update(attribute)
+            indexes.setdefault(device_id, []).append(index)
+        
+        async def publish(device_id: str, payload: Dict[str, Any]) -> bool:
+            async with self._inflight:
+                return await self._wait_published(self._start_publish(device_id, payload), device_id)
+        
+        device_ids = list(payloads)
+        outcomes = await asyncio.gather(*(publish(d, payloads[d]) for d in device_ids))
+        for device_id, published in zip(device_ids, outcomes):
+            if published:
+                for index in indexes[device_id]:
+                    results[index] = True
+        
+        logger.info(f"Published batch of {len(commands)} commands to {sum(outcomes)}/{len(payloads)} devices")
+        return results
+    
+    @staticmethod
+    def _command_attribute(action: Optional[str], value: Any) -> Optional[Dict[str, Any]]:
+        """Payload fragment of a single command"""
+        if action == "turn_on":
+            return {"state": "ON"}
+        elif action == "turn_off":
+            return {"state": "OFF"}
+        elif action == "set_brightness":
+            return {"brightness": int(value)}
+        elif action == "set_color":
+            return {"color": value}
+        return None
     
     async def get_device_state(self, device_id: str) -> Optional[Dict[str, Any]]:
         """Get device state"""
@@ -221,8 +364,18 @@ class MQTTDeviceManager(DeviceManager):
     def disconnect(self):
         """Disconnect from MQTT broker"""
         if self.client:
-            self.client.loop_stop()
             self.client.disconnect()
+            self.client.loop_stop()
             self.connected = False
             logger.info("MQTT client disconnected")
+        
+        # Fail publishes still waiting for an acknowledgement
+        for future in list(self._pending.values()):
+            future.get_loop().call_soon_threadsafe(self._fail_publish, future)
+        self._pending.clear()
+    
+    @staticmethod
+    def _fail_publish(future: asyncio.Future):
+        if not future.done():
+            future.set_result(False)
 
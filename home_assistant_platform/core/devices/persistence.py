@@ -0,0 +1,113 @@
+"""Device registry persistence - last known devices saved to SQLite for warm starts"""
+
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+from home_assistant_platform.config.settings import settings
+from home_assistant_platform.core.database import run_in_db_thread
+from home_assistant_platform.core.devices.device_registry import DeviceRegistry
+from home_assistant_platform.core.devices.models import DeviceRecord, get_devices_db
+
+logger = logging.getLogger(__name__)
+
+
+class DevicePersistence:
+    """Keeps the ``devices`` store in step with the registry
+    
+    Changes are only marked dirty when they happen (the MQTT thread must
+    not wait on SQLite); every ``flush_interval`` the dirty devices are
+    written in one transaction on the DB thread pool, so a chatty device
+    costs one row write per interval. ``load`` reads the saved devices for
+    ``DeviceRegistry.restore``.
+    """
+    
+    def __init__(self, registry: DeviceRegistry, flush_interval: Optional[float] = None):
+        self.registry = registry
+        self.store = registry.store
+        self.flush_interval = settings.device_registry_flush_interval if flush_interval is None else flush_interval
+        self.db = get_devices_db()
+        self._dirty: Set[str] = set(self.store.device_ids())  # Devices known before persistence started
+        self._lock = threading.Lock()
+        self.flush_task: Optional[asyncio.Task] = None
+        self.store.subscribe(self._on_change)
+    
+    def _on_change(self, device_id: str, state, previous, version: int):
+        with self._lock:
+            self._dirty.add(device_id)
+    
+    def load(self) -> List[Tuple[str, Dict[str, Any], Optional[str]]]:
+        """Saved ``(device_id, state, source)`` entries"""
+        try:
+            rows = self.db.query(DeviceRecord.device_id, DeviceRecord.state, DeviceRecord.source).all()
+            self.db.rollback()  # End the read transaction
+        except Exception as e:
+            logger.error(f"Error loading saved devices: {e}", exc_info=True)
+            self.db.rollback()
+            return []
+        return [(device_id, state or {}, source) for device_id, state, source in rows]
+    
+    async def warm_start(self) -> List[str]:
+        """Restore saved devices into the registry; returns the restored ids"""
+        restored = self.registry.restore(await run_in_db_thread(self.load))
+        logger.info(f"Restored {len(restored)} saved devices")
+        return restored
+    
+    def flush(self) -> int:
+        """Write the devices changed since the last flush; returns how many"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return 0
+        
+        try:
+            existing = {
+                record.device_id: record
+                for record in self.db.query(DeviceRecord).filter(DeviceRecord.device_id.in_(dirty))
+            }
+            for device_id in dirty:
+                state = self.store.get(device_id)
+                record = existing.get(device_id)
+                if state is None:
+                    if record is not None:
+                        self.db.delete(record)
+                    continue
+                if record is None:
+                    record = DeviceRecord(device_id=device_id)
+                    self.db.add(record)
+                state.pop("version", None)
+                record.source = self.store.source(device_id)
+                record.name = state.get("name")
+                record.device_type = state.get("type")
+                record.capabilities = self.registry.capabilities(device_id)
+                record.state = state
+            self.db.commit()
+            return len(dirty)
+        except Exception as e:
+            logger.error(f"Error saving devices: {e}", exc_info=True)
+            self.db.rollback()
+            with self._lock:
+                self._dirty |= dirty  # Retry on the next flush
+            return 0
+    
+    async def start(self):
+        """Start the periodic flush"""
+        if self.flush_task:
+            return
+        self.flush_task = asyncio.create_task(self._flush_loop())
+    
+    async def stop(self):
+        """Stop the periodic flush and write what is still pending"""
+        if self.flush_task:
+            self.flush_task.cancel()
+            try:
+                await self.flush_task
+            except asyncio.CancelledError:
+                pass
+            self.flush_task = None
+        await run_in_db_thread(self.flush)
+    
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await run_in_db_thread(self.flush)
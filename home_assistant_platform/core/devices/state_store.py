@@ -0,0 +1,273 @@
+"""Device state store - versioned latest state of every device"""
+
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from home_assistant_platform.core.automation.event_bus import (
+    get_event_bus, DEVICE_STATE_CHANGE, DEVICE_ADDED, DEVICE_REMOVED
+)
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "version"
+
+# (device_id, state or None when removed, previous state or None when added, version)
+StateListener = Callable[[str, Optional[Dict[str, Any]], Optional[Dict[str, Any]], int], None]
+
+
+class StaleVersionError(ValueError):
+    """Raised when a compare-and-set update names an outdated version"""
+    
+    def __init__(self, device_id: str, expected: int, current: int):
+        self.device_id = device_id
+        self.expected = expected
+        self.current = current
+        super().__init__(f"{device_id} is at version {current}, not {expected}")
+
+
+@dataclass
+class StateEntry:
+    state: Dict[str, Any]
+    version: int
+    source: Optional[str] = None
+    updated_at: datetime = field(default_factory=datetime.utcnow)
+
+
+class DeviceStateStore:
+    """Authoritative latest state of every device
+    
+    Every change takes the next value of a store-wide counter as the
+    device's version, so versions are monotonic per device and ``diff(N)``
+    returns exactly the devices changed after a client saw version ``N``.
+    Entries are kept in version order, which makes a diff proportional to
+    the number of changes. Writes that change nothing keep the version and
+    publish nothing. Safe to call from any thread (the MQTT client writes
+    from its network thread); listeners and bus events run after the lock
+    is released.
+    """
+    
+    MAX_TOMBSTONES = 10_000  # Removed devices remembered for diffs
+    
+    def __init__(self, publish_events: bool = True):
+        self.publish_events = publish_events
+        self._entries: "OrderedDict[str, StateEntry]" = OrderedDict()
+        self._removed: "OrderedDict[str, int]" = OrderedDict()  # device_id -> version of removal
+        self._forgotten = 0  # Highest version of a tombstone dropped from _removed
+        self._version = 0
+        self._lock = threading.RLock()
+        self._listeners: List[StateListener] = []
+    
+    @property
+    def version(self) -> int:
+        """Version of the latest change"""
+        return self._version
+    
+    def __contains__(self, device_id: str) -> bool:
+        return device_id in self._entries
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, device_id: str) -> Optional[Dict[str, Any]]:
+        """Copy of the device state, with its ``version``"""
+        with self._lock:
+            entry = self._entries.get(device_id)
+            return self._export(entry) if entry else None
+    
+    def get_version(self, device_id: str) -> int:
+        """Current version of a device (0 if unknown)"""
+        entry = self._entries.get(device_id)
+        return entry.version if entry else 0
+    
+    def source(self, device_id: str) -> Optional[str]:
+        entry = self._entries.get(device_id)
+        return entry.source if entry else None
+    
+    def put(
+        self,
+        device_id: str,
+        state: Dict[str, Any],
+        source: Optional[str] = None,
+        expected_version: Optional[int] = None
+    ) -> int:
+        """Replace a device's state; returns its version
+        
+        With ``expected_version`` the write only happens if the device is at
+        that version (0 = the device must not exist yet), else
+        ``StaleVersionError`` is raised.
+        """
+        return self._write(device_id, state, source, expected_version, merge=False)
+    
+    def update(
+        self,
+        device_id: str,
+        changes: Dict[str, Any],
+        source: Optional[str] = None,
+        expected_version: Optional[int] = None
+    ) -> int:
+        """Merge attributes into a device's state (creating it if needed)"""
+        return self._write(device_id, changes, source, expected_version, merge=True)
+    
+    def restore(self, devices: Iterable[Tuple[str, Dict[str, Any], Optional[str]]]) -> List[str]:
+        """Load saved ``(device_id, state, source)`` entries without notifying
+        
+        Devices already in the store are newer and are skipped. Returns the
+        ids restored.
+        """
+        restored = []
+        with self._lock:
+            for device_id, state, source in devices:
+                if device_id in self._entries:
+                    continue
+                self._version += 1
+                state = {k: v for k, v in state.items() if k != VERSION_KEY}
+                self._entries[device_id] = StateEntry(state=state, version=self._version, source=source)
+                self._removed.pop(device_id, None)
+                restored.append(device_id)
+        return restored
+    
+    def device_ids(self, source: Optional[str] = None) -> List[str]:
+        """Ids of every device, or of the devices from one source"""
+        with self._lock:
+            return [
+                device_id for device_id, entry in self._entries.items()
+                if source is None or entry.source == source
+            ]
+    
+    def remove(self, device_id: str, expected_version: Optional[int] = None) -> bool:
+        """Remove a device; returns whether it existed"""
+        with self._lock:
+            entry = self._entries.get(device_id)
+            self._check(device_id, entry, expected_version)
+            if entry is None:
+                return False
+            del self._entries[device_id]
+            self._version += 1
+            version = self._version
+            self._removed[device_id] = version
+            self._removed.move_to_end(device_id)
+            while len(self._removed) > self.MAX_TOMBSTONES:
+                _, self._forgotten = self._removed.popitem(last=False)
+        self._notify(device_id, None, entry.state, version, entry.source)
+        return True
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Every device (with versions) and the store version"""
+        with self._lock:
+            return {
+                "version": self._version,
+                "devices": [self._export(entry) for entry in self._entries.values()]
+            }
+    
+    def diff(self, since: int) -> Dict[str, Any]:
+        """Devices changed and removed after version ``since``
+        
+        ``full`` is true when removals that old are no longer remembered, or
+        when ``since`` is ahead of the store (versions restart with the
+        process); the client should then replace its copy with ``devices``.
+        """
+        with self._lock:
+            if since < self._forgotten or since > self._version:
+                return {**self.snapshot(), "removed": [], "full": True}
+            changed = []
+            for entry in reversed(self._entries.values()):
+                if entry.version <= since:
+                    break
+                changed.append(self._export(entry))
+            removed = []
+            for device_id, version in reversed(self._removed.items()):
+                if version <= since:
+                    break
+                removed.append(device_id)
+            changed.reverse()
+            removed.reverse()
+            return {"version": self._version, "devices": changed, "removed": removed, "full": False}
+    
+    def subscribe(self, listener: StateListener):
+        """Call ``listener`` after every change"""
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners = self._listeners + [listener]
+    
+    def unsubscribe(self, listener: StateListener):
+        with self._lock:
+            self._listeners = [l for l in self._listeners if l != listener]
+    
+    def _write(
+        self,
+        device_id: str,
+        state: Dict[str, Any],
+        source: Optional[str],
+        expected_version: Optional[int],
+        merge: bool
+    ) -> int:
+        state = {k: v for k, v in state.items() if k != VERSION_KEY}
+        with self._lock:
+            entry = self._entries.get(device_id)
+            self._check(device_id, entry, expected_version)
+            previous = entry.state if entry else None
+            new_state = {**previous, **state} if merge and previous else state
+            if previous is not None and new_state == previous:
+                if source and not entry.source:
+                    entry.source = source
+                return entry.version
+            
+            self._version += 1
+            version = self._version
+            self._entries[device_id] = StateEntry(
+                state=new_state, version=version, source=source or (entry.source if entry else None)
+            )
+            self._entries.move_to_end(device_id)
+            self._removed.pop(device_id, None)
+            source = self._entries[device_id].source
+        self._notify(device_id, new_state, previous, version, source)
+        return version
+    
+    @staticmethod
+    def _check(device_id: str, entry: Optional[StateEntry], expected_version: Optional[int]):
+        if expected_version is None:
+            return
+        current = entry.version if entry else 0
+        if current != expected_version:
+            raise StaleVersionError(device_id, expected_version, current)
+    
+    @staticmethod
+    def _export(entry: StateEntry) -> Dict[str, Any]:
+        return {**entry.state, VERSION_KEY: entry.version}
+    
+    def _notify(
+        self,
+        device_id: str,
+        state: Optional[Dict[str, Any]],
+        previous: Optional[Dict[str, Any]],
+        version: int,
+        source: Optional[str]
+    ):
+        for listener in self._listeners:
+            try:
+                listener(device_id, state, previous, version)
+            except Exception as e:
+                logger.error(f"Error in device state listener: {e}", exc_info=True)
+        
+        if not self.publish_events:
+            return
+        bus = get_event_bus()
+        if state is None:
+            bus.publish(DEVICE_REMOVED, device_id, {VERSION_KEY: version}, source=source)
+        elif previous is None:
+            bus.publish(DEVICE_ADDED, device_id, {"state": state.get("state"), VERSION_KEY: version}, source=source)
+        else:
+            bus.publish(
+                DEVICE_STATE_CHANGE,
+                device_id,
+                {
+                    "state": state.get("state"),
+                    "previous_state": previous.get("state"),
+                    "changes": {k: v for k, v in state.items() if previous.get(k) != v},
+                    VERSION_KEY: version
+                },
+                source=source
+            )
@@ -1,11 +1,13 @@
 """Unified device manager - combines all device sources"""
 
+import asyncio
 import logging
 from typing import Dict, List, Optional, Any
 from home_assistant_platform.core.automation.device_manager import DeviceManager
 from home_assistant_platform.core.devices.device_registry import DeviceRegistry
 from home_assistant_platform.core.devices.mqtt_manager import MQTTDeviceManager
 from home_assistant_platform.core.automation.device_manager import MockDeviceManager
+from home_assistant_platform.config.settings import settings
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +17,9 @@ class UnifiedDeviceManager(DeviceManager):
     
     def __init__(self):
         self.registry = DeviceRegistry()
+        self._discovery = None
+        self.persistence = None
+        self.startup_task: Optional[asyncio.Task] = None
         
         # Register mock devices by default
         mock_manager = MockDeviceManager()
@@ -29,6 +34,56 @@ class UnifiedDeviceManager(DeviceManager):
         except Exception as e:
             logger.warning(f"Could not initialize MQTT manager: {e}")
     
+    async def start(self):
+        """Restore saved devices and reconcile them with discovery, in the background
+        
+        Returns immediately: the API serves live devices at once and saved
+        ones as soon as they are loaded.
+        """
+        if settings.device_registry_persist and self.persistence is None:
+            from home_assistant_platform.core.devices.persistence import DevicePersistence
+            self.persistence = DevicePersistence(self.registry)
+            await self.persistence.start()
+        if self.startup_task is None:
+            self.startup_task = asyncio.create_task(self._warm_start())
+    
+    async def stop(self):
+        """Stop background work and save pending device changes"""
+        if self.startup_task:
+            self.startup_task.cancel()
+            try:
+                await self.startup_task
+            except asyncio.CancelledError:
+                pass
+            self.startup_task = None
+        if self.persistence:
+            await self.persistence.stop()
+    
+    async def _warm_start(self):
+        try:
+            restored = await self.persistence.warm_start() if self.persistence else []
+            if settings.device_startup_discovery:
+                await self.reconcile(restored)
+        except Exception as e:
+            logger.error(f"Error during device warm start: {e}", exc_info=True)
+    
+    async def reconcile(self, restored: List[str]):
+        """Run discovery and flag restored devices it did not find as unavailable
+        
+        Only devices of protocols that were scanned successfully are flagged;
+        MQTT devices are confirmed when the broker replays their config.
+        """
+        await self.discover_wifi_devices()
+        store = self.registry.store
+        missing = 0
+        for device_id in restored:
+            source = store.source(device_id)
+            if source in self.discovery.scanners and self.discovery.is_fresh(source):
+                available = device_id in self.discovery.devices
+                store.update(device_id, {"available": available})
+                missing += not available
+        logger.info(f"Reconciled {len(restored)} restored devices, {missing} not found")
+    
     async def turn_on_device(self, device_id: str) -> bool:
         """Turn on a device"""
         return await self.registry.turn_on_device(device_id)
@@ -49,6 +104,10 @@ class UnifiedDeviceManager(DeviceManager):
         """Set device color"""
         return await self.registry.set_color(device_id, color)
     
+    async def apply_batch(self, commands: List[Dict[str, Any]]) -> List[bool]:
+        """Apply several commands, batched per device manager"""
+        return await self.registry.apply_batch(commands)
+    
     async def get_device_state(self, device_id: str) -> Optional[Dict[str, Any]]:
         """Get device state"""
         return await self.registry.get_device_state(device_id)
@@ -57,32 +116,44 @@ class UnifiedDeviceManager(DeviceManager):
         """List all devices"""
         return self.registry.list_devices()
     
+    @property
+    def discovery(self):
+        """WiFi discovery, kept so its cache outlives a single request"""
+        if self._discovery is None:
+            from home_assistant_platform.core.devices.wifi_discovery import WiFiDeviceDiscovery
+            self._discovery = WiFiDeviceDiscovery()
+        return self._discovery
+    
     def register_wifi_manager(self, manager: DeviceManager, source_name: str):
         """Register a WiFi device manager"""
         self.registry.register_manager(manager, source_name)
     
-    async def discover_wifi_devices(self):
-        """Discover WiFi devices"""
-        from home_assistant_platform.core.devices.wifi_discovery import (
-            WiFiDeviceDiscovery, TPLinkDeviceManager, HueDeviceManager
-        )
-        
-        discovery = WiFiDeviceDiscovery()
-        devices = await discovery.discover_all()
-        
-        # Register TP-Link devices if found
-        tplink_devices = [d for d in devices if d.get("source") == "tplink"]
-        if tplink_devices:
-            tplink_manager = TPLinkDeviceManager()
-            await tplink_manager.discover_devices()
-            self.registry.register_manager(tplink_manager, "tplink")
+    async def discover_wifi_devices(self, force: bool = False):
+        """Discover WiFi devices
         
-        # Register Hue devices if found
-        hue_devices = [d for d in devices if d.get("source") == "hue"]
-        if hue_devices:
-            hue_manager = HueDeviceManager()
-            await hue_manager.connect()
-            self.registry.register_manager(hue_manager, "hue")
+        All protocols are scanned concurrently and results are cached for
+        ``discovery_cache_ttl``; the managers are loaded from the same scan.
+        """
+        await self.discovery.discover_all(force=force)
+        self._load_wifi_managers()
+        return self.discovery.list_devices()
+    
+    async def refresh_wifi_devices(self) -> Dict[str, int]:
+        """Re-probe WiFi devices that have not been seen recently"""
+        result = await self.discovery.refresh()
+        self._load_wifi_managers()
+        return result
+    
+    def _load_wifi_managers(self):
+        from home_assistant_platform.core.devices.wifi_discovery import TPLinkDeviceManager, HueDeviceManager
         
-        return devices
-
+        for source, manager_class in (("tplink", TPLinkDeviceManager), ("hue", HueDeviceManager)):
+            discovered = self.discovery.by_source(source)
+            if not discovered:
+                continue
+            manager = self.registry.managers.get(source) or manager_class()
+            manager.load(discovered)
+            self.registry.register_manager(manager, source)
+            for device in discovered:
+                if self.registry.store.get(device.device_id).get("available") is False:
+                    self.registry.store.update(device.device_id, {"available": True})
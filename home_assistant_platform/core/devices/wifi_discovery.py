@@ -3,114 +3,111 @@
 import logging
 import asyncio
 from typing import Dict, List, Optional, Any
+from home_assistant_platform.config.settings import settings
 from home_assistant_platform.core.automation.device_manager import DeviceManager
+from home_assistant_platform.core.devices.discovery import DiscoveredDevice, DiscoveryOrchestrator, Scanner
 
 logger = logging.getLogger(__name__)
 
 
-class WiFiDeviceDiscovery:
-    """Discovers WiFi smart devices on the network"""
+DEFAULT_HUE_BRIDGE_IP = "192.168.1.1"  # Used when no bridge IP is configured
+
+
+class TPLinkScanner(Scanner):
+    """Discovers TP-Link Kasa devices (python-kasa is asyncio-native)"""
     
-    def __init__(self):
-        self.discovered_devices: Dict[str, Dict[str, Any]] = {}
+    name = "tplink"
     
-    async def discover_tplink_devices(self) -> List[Dict[str, Any]]:
-        """Discover TP-Link Kasa devices"""
-        devices = []
-        
+    async def scan(self) -> List[DiscoveredDevice]:
         try:
-            # Try to import python-kasa if available
-            try:
-                from kasa import Discover
-                
-                found_devices = await Discover.discover()
-                for device in found_devices.values():
-                    device_info = {
-                        "id": f"tplink_{device.device_id}",
-                        "name": device.alias or device.host,
-                        "type": "light" if device.is_light else "switch",
-                        "state": "on" if device.is_on else "off",
-                        "source": "tplink",
-                        "host": device.host,
-                        "device_id": device.device_id,
-                        "model": device.model,
-                        "brightness": device.brightness if hasattr(device, 'brightness') else None,
-                        "color_temp": device.color_temp if hasattr(device, 'color_temp') else None,
-                    }
-                    devices.append(device_info)
-                    self.discovered_devices[device_info["id"]] = device_info
-                
-                logger.info(f"Discovered {len(devices)} TP-Link devices")
-                
-            except ImportError:
-                logger.info("python-kasa not installed. Install with: pip install python-kasa")
-            except Exception as e:
-                logger.error(f"Error discovering TP-Link devices: {e}")
-        
-        except Exception as e:
-            logger.error(f"Error in TP-Link discovery: {e}")
+            from kasa import Discover
+        except ImportError:
+            logger.info("python-kasa not installed. Install with: pip install python-kasa")
+            return []
         
-        return devices
+        found_devices = await Discover.discover()
+        return [self._discovered(device) for device in found_devices.values()]
     
-    async def discover_hue_devices(self, bridge_ip: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Discover Philips Hue devices"""
-        devices = []
-        
+    async def probe(self, device: DiscoveredDevice) -> Optional[DiscoveredDevice]:
+        await device.handle.update()
+        return self._discovered(device.handle)
+    
+    def _discovered(self, device) -> DiscoveredDevice:
+        info = {
+            "id": f"tplink_{device.device_id}",
+            "name": device.alias or device.host,
+            "type": "light" if device.is_light else "switch",
+            "state": "on" if device.is_on else "off",
+            "source": self.name,
+            "host": device.host,
+            "device_id": device.device_id,
+            "model": device.model,
+            "brightness": device.brightness if hasattr(device, 'brightness') else None,
+            "color_temp": device.color_temp if hasattr(device, 'color_temp') else None,
+        }
+        return DiscoveredDevice(info=info, source=self.name, handle=device)
+
+
+class HueScanner(Scanner):
+    """Discovers Philips Hue lights; phue is blocking, so it runs in a thread"""
+    
+    name = "hue"
+    
+    def __init__(self, bridge_ip: Optional[str] = None):
+        self.bridge_ip = bridge_ip or settings.hue_bridge_ip or DEFAULT_HUE_BRIDGE_IP
+    
+    async def scan(self) -> List[DiscoveredDevice]:
         try:
-            # Try to import phue if available
-            try:
-                from phue import Bridge
-                
-                # Auto-discover bridge if IP not provided
-                if not bridge_ip:
-                    # Try common IPs or use UPnP discovery
-                    bridge_ip = "192.168.1.1"  # Default, should be discovered
-                
-                bridge = Bridge(bridge_ip)
-                bridge.connect()
-                
-                lights = bridge.lights
-                for light in lights:
-                    device_info = {
-                        "id": f"hue_{light.light_id}",
-                        "name": light.name,
-                        "type": "light",
-                        "state": "on" if light.on else "off",
-                        "source": "hue",
-                        "brightness": light.brightness,
-                        "hue": light.hue,
-                        "saturation": light.saturation,
-                        "color_mode": light.colormode,
-                    }
-                    devices.append(device_info)
-                    self.discovered_devices[device_info["id"]] = device_info
-                
-                logger.info(f"Discovered {len(devices)} Hue devices")
-                
-            except ImportError:
-                logger.info("phue not installed. Install with: pip install phue")
-            except Exception as e:
-                logger.error(f"Error discovering Hue devices: {e}")
+            from phue import Bridge
+        except ImportError:
+            logger.info("phue not installed. Install with: pip install phue")
+            return []
         
-        except Exception as e:
-            logger.error(f"Error in Hue discovery: {e}")
+        def connect():
+            bridge = Bridge(self.bridge_ip)
+            bridge.connect()
+            return bridge, bridge.get_light()  # Every light in one request
         
-        return devices
+        bridge, lights = await asyncio.to_thread(connect)
+        return [self._discovered(bridge, int(light_id), light) for light_id, light in lights.items()]
+    
+    async def probe(self, device: DiscoveredDevice) -> Optional[DiscoveredDevice]:
+        light_id = device.info["light_id"]
+        light = await asyncio.to_thread(device.handle.get_light, light_id)
+        if not isinstance(light, dict) or "state" not in light:
+            return None
+        return self._discovered(device.handle, light_id, light)
+    
+    def _discovered(self, bridge, light_id: int, light: Dict[str, Any]) -> DiscoveredDevice:
+        state = light.get("state", {})
+        info = {
+            "id": f"hue_{light_id}",
+            "name": light.get("name", f"Hue light {light_id}"),
+            "type": "light",
+            "state": "on" if state.get("on") else "off",
+            "source": self.name,
+            "light_id": light_id,
+            "brightness": state.get("bri"),
+            "hue": state.get("hue"),
+            "saturation": state.get("sat"),
+            "color_mode": state.get("colormode"),
+        }
+        return DiscoveredDevice(info=info, source=self.name, handle=bridge)
+
+
+class WiFiDeviceDiscovery(DiscoveryOrchestrator):
+    """Discovers WiFi smart devices on the network (TP-Link Kasa and Hue)"""
+    
+    def __init__(self, scanners: Optional[List[Scanner]] = None, **kwargs):
+        super().__init__(scanners if scanners is not None else [TPLinkScanner(), HueScanner()], **kwargs)
     
-    async def discover_all(self) -> List[Dict[str, Any]]:
+    @property
+    def discovered_devices(self) -> Dict[str, Dict[str, Any]]:
+        return {device_id: device.info for device_id, device in self.devices.items()}
+    
+    async def discover_all(self, force: bool = False) -> List[Dict[str, Any]]:
         """Discover all WiFi devices"""
-        all_devices = []
-        
-        # Discover TP-Link devices
-        tplink_devices = await self.discover_tplink_devices()
-        all_devices.extend(tplink_devices)
-        
-        # Discover Hue devices
-        hue_devices = await self.discover_hue_devices()
-        all_devices.extend(hue_devices)
-        
-        logger.info(f"Total discovered WiFi devices: {len(all_devices)}")
-        return all_devices
+        return await self.discover(force=force)
 
 
 class TPLinkDeviceManager(DeviceManager):
@@ -124,28 +121,16 @@ class TPLinkDeviceManager(DeviceManager):
     async def discover_devices(self):
         """Discover TP-Link devices"""
         try:
-            from kasa import Discover
-            
-            found_devices = await Discover.discover()
-            for device in found_devices.values():
-                device_id = f"tplink_{device.device_id}"
-                self.kasa_devices[device_id] = device
-                self.devices[device_id] = {
-                    "id": device_id,
-                    "name": device.alias or device.host,
-                    "type": "light" if device.is_light else "switch",
-                    "state": "on" if device.is_on else "off",
-                    "source": "tplink",
-                    "host": device.host,
-                }
-            
+            self.load(await TPLinkScanner().scan())
             logger.info(f"Discovered {len(self.devices)} TP-Link devices")
-            
-        except ImportError:
-            logger.warning("python-kasa not installed. Install with: pip install python-kasa")
         except Exception as e:
             logger.error(f"Error discovering TP-Link devices: {e}")
     
+    def load(self, discovered: List[DiscoveredDevice]):
+        """Take over devices found by a discovery scan (replacing the previous ones)"""
+        self.kasa_devices = {device.device_id: device.handle for device in discovered}
+        self.devices = {device.device_id: dict(device.info) for device in discovered}
+    
     async def turn_on_device(self, device_id: str) -> bool:
         """Turn on TP-Link device"""
         if device_id in self.kasa_devices:
@@ -208,92 +193,69 @@ class TPLinkDeviceManager(DeviceManager):
 
 
 class HueDeviceManager(DeviceManager):
-    """Philips Hue device manager"""
+    """Philips Hue device manager
+    
+    phue talks to the bridge with blocking HTTP calls, so every bridge call
+    runs in a thread.
+    """
     
     def __init__(self, bridge_ip: Optional[str] = None):
         self.source_name = "hue"
-        self.bridge_ip = bridge_ip
+        self.bridge_ip = bridge_ip or settings.hue_bridge_ip or DEFAULT_HUE_BRIDGE_IP
         self.bridge: Optional[Any] = None
         self.devices: Dict[str, Dict[str, Any]] = {}
     
     async def connect(self) -> bool:
         """Connect to Hue bridge"""
         try:
-            from phue import Bridge
-            
-            if not self.bridge_ip:
-                self.bridge_ip = "192.168.1.1"  # Should be discovered
-            
-            self.bridge = Bridge(self.bridge_ip)
-            self.bridge.connect()
-            
-            # Load lights
-            for light in self.bridge.lights:
-                device_id = f"hue_{light.light_id}"
-                self.devices[device_id] = {
-                    "id": device_id,
-                    "name": light.name,
-                    "type": "light",
-                    "state": "on" if light.on else "off",
-                    "source": "hue",
-                }
-            
-            logger.info(f"Connected to Hue bridge, found {len(self.devices)} lights")
-            return True
-            
-        except ImportError:
-            logger.warning("phue not installed. Install with: pip install phue")
-            return False
+            discovered = await HueScanner(self.bridge_ip).scan()
         except Exception as e:
             logger.error(f"Error connecting to Hue bridge: {e}")
             return False
+        self.load(discovered)
+        if self.bridge is None:
+            return False
+        logger.info(f"Connected to Hue bridge, found {len(self.devices)} lights")
+        return True
     
-    async def turn_on_device(self, device_id: str) -> bool:
-        """Turn on Hue device"""
+    def load(self, discovered: List[DiscoveredDevice]):
+        """Take over lights found by a discovery scan (replacing the previous ones)"""
+        if discovered:
+            self.bridge = discovered[0].handle
+        self.devices = {device.device_id: dict(device.info) for device in discovered}
+    
+    async def _set_light(self, device_id: str, parameter: str, value: Any) -> bool:
         if not self.bridge:
             await self.connect()
         
         if self.bridge and device_id in self.devices:
             try:
                 light_id = int(device_id.split('_')[1])
-                light = self.bridge.lights[light_id]
-                light.on = True
-                self.devices[device_id]["state"] = "on"
+                await asyncio.to_thread(self.bridge.set_light, light_id, parameter, value)
                 return True
             except Exception as e:
-                logger.error(f"Error turning on {device_id}: {e}")
+                logger.error(f"Error setting {parameter} for {device_id}: {e}")
+        return False
+    
+    async def turn_on_device(self, device_id: str) -> bool:
+        """Turn on Hue device"""
+        if await self._set_light(device_id, 'on', True):
+            self.devices[device_id]["state"] = "on"
+            return True
         return False
     
     async def turn_off_device(self, device_id: str) -> bool:
         """Turn off Hue device"""
-        if not self.bridge:
-            await self.connect()
-        
-        if self.bridge and device_id in self.devices:
-            try:
-                light_id = int(device_id.split('_')[1])
-                light = self.bridge.lights[light_id]
-                light.on = False
-                self.devices[device_id]["state"] = "off"
-                return True
-            except Exception as e:
-                logger.error(f"Error turning off {device_id}: {e}")
+        if await self._set_light(device_id, 'on', False):
+            self.devices[device_id]["state"] = "off"
+            return True
         return False
     
     async def set_brightness(self, device_id: str, brightness: int) -> bool:
         """Set Hue device brightness"""
-        if not self.bridge:
-            await self.connect()
-        
-        if self.bridge and device_id in self.devices:
-            try:
-                light_id = int(device_id.split('_')[1])
-                light = self.bridge.lights[light_id]
-                light.brightness = brightness
-                self.devices[device_id]["brightness"] = brightness
-                return True
-            except Exception as e:
-                logger.error(f"Error setting brightness for {device_id}: {e}")
+        if await self._set_light(device_id, 'bri', brightness):
+            self.devices[device_id]["brightness"] = brightness
+            return True
         return False
     
     async def get_device_state(self, device_id: str) -> Optional[Dict[str, Any]]:
@@ -304,14 +266,15 @@ class HueDeviceManager(DeviceManager):
         if self.bridge and device_id in self.devices:
             try:
                 light_id = int(device_id.split('_')[1])
-                light = self.bridge.lights[light_id]
+                light = await asyncio.to_thread(self.bridge.get_light, light_id)
+                state = light.get("state", {})
                 return {
                     "id": device_id,
-                    "name": light.name,
-                    "state": "on" if light.on else "off",
-                    "brightness": light.brightness,
-                    "hue": light.hue,
-                    "saturation": light.saturation,
+                    "name": light.get("name"),
+                    "state": "on" if state.get("on") else "off",
+                    "brightness": state.get("bri"),
+                    "hue": state.get("hue"),
+                    "saturation": state.get("sat"),
                 }
             except Exception as e:
                 logger.error(f"Error getting state for {device_id}: {e}")
@@ -320,4 +283,3 @@ class HueDeviceManager(DeviceManager):
     def list_devices(self) -> List[Dict[str, Any]]:
         """List Hue devices"""
         return list(self.devices.values())
-
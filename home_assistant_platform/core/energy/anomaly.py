@@ -0,0 +1,249 @@
+"""Energy anomaly detection - online per-device power baselines"""
+
+import copy
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from home_assistant_platform.config.settings import settings
+from home_assistant_platform.core.energy.models import DeviceEnergyReading
+
+logger = logging.getLogger(__name__)
+
+HOURS_OF_WEEK = 7 * 24
+MIN_STD_WATTS = 1.0  # Floor for the deviation so steady devices don't flag on noise
+
+
+class OnlineStats:
+    """Running mean and variance in O(1) memory
+    
+    Exact (Welford) while fewer than ``1 / alpha`` values have been seen,
+    exponentially weighted afterwards so the baseline follows slow drift.
+    """
+    
+    __slots__ = ("count", "mean", "variance")
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.variance = 0.0
+    
+    def update(self, value: float, alpha: Optional[float] = None):
+        self.count += 1
+        weight = 1.0 / self.count
+        if alpha and alpha > weight:
+            weight = alpha
+        delta = value - self.mean
+        self.mean += weight * delta
+        self.variance = (1.0 - weight) * (self.variance + weight * delta * delta)
+    
+    @property
+    def std(self) -> float:
+        return self.variance ** 0.5
+
+
+@dataclass
+class DeviceBaseline:
+    """Overall and hour-of-week statistics of one device"""
+    overall: OnlineStats = field(default_factory=OnlineStats)
+    slots: List[Optional[OnlineStats]] = field(default_factory=lambda: [None] * HOURS_OF_WEEK)
+    last_flagged: Optional[datetime] = None
+
+
+@dataclass
+class Anomaly:
+    """A reading outside its baseline"""
+    user_id: str
+    device_id: str
+    timestamp: datetime
+    power_watts: float
+    expected_watts: float
+    std_watts: float
+    z_score: float
+    
+    @property
+    def bound_watts(self) -> float:
+        """The k-sigma bound the reading crossed"""
+        sign = 1.0 if self.z_score >= 0 else -1.0
+        return self.expected_watts + sign * abs(self.z_score) * self.std_watts
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "user_id": self.user_id,
+            "device_id": self.device_id,
+            "timestamp": self.timestamp.isoformat(),
+            "power_watts": self.power_watts,
+            "expected_watts": self.expected_watts,
+            "std_watts": self.std_watts,
+            "z_score": self.z_score
+        }
+
+
+class AnomalyDetector:
+    """Flags readings more than ``sigma`` standard deviations from the device baseline
+    
+    Each reading is scored against the statistics of its hour of the week
+    (stored, UTC time) once that slot has ``min_samples`` values, else
+    against the device's overall statistics, and then folded into both. A
+    device keeps at most 169 ``OnlineStats``, so memory does not grow with
+    the number of readings. Devices are not flagged again within
+    ``cooldown`` of their last anomaly.
+    """
+    
+    def __init__(
+        self,
+        sigma: Optional[float] = None,
+        alpha: Optional[float] = None,
+        min_samples: Optional[int] = None,
+        cooldown: Optional[timedelta] = None
+    ):
+        self.sigma = sigma if sigma is not None else settings.energy_anomaly_sigma
+        self.alpha = alpha if alpha is not None else settings.energy_anomaly_alpha
+        self.min_samples = min_samples if min_samples is not None else settings.energy_anomaly_min_samples
+        self.cooldown = cooldown if cooldown is not None else timedelta(
+            minutes=settings.energy_anomaly_cooldown_minutes
+        )
+        self.baselines: Dict[Tuple[str, str], DeviceBaseline] = {}
+    
+    def score(self, user_id: str, device_id: str, timestamp: datetime, power_watts: float) -> Optional[Anomaly]:
+        """Score a reading and fold it into the baseline
+        
+        Returns the deviation (as an ``Anomaly``, flagged or not), or None
+        while the device has too little history.
+        """
+        baseline = self.baselines.get((user_id, device_id))
+        if baseline is None:
+            baseline = self.baselines[(user_id, device_id)] = DeviceBaseline()
+        slot_index = timestamp.weekday() * 24 + timestamp.hour
+        slot = baseline.slots[slot_index]
+        if slot is None:
+            slot = baseline.slots[slot_index] = OnlineStats()
+        
+        reference = slot if slot.count >= self.min_samples else baseline.overall
+        result = None
+        if reference.count >= self.min_samples:
+            std = max(reference.std, MIN_STD_WATTS)
+            result = Anomaly(
+                user_id, device_id, timestamp, power_watts, reference.mean, std,
+                (power_watts - reference.mean) / std
+            )
+        
+        slot.update(power_watts, self.alpha)
+        baseline.overall.update(power_watts, self.alpha)
+        return result
+    
+    def observe(self, user_id: str, device_id: str, timestamp: datetime, power_watts: float) -> Optional[Anomaly]:
+        """Score a reading; returns an Anomaly only if it should be raised"""
+        result = self.score(user_id, device_id, timestamp, power_watts)
+        if result is None or abs(result.z_score) <= self.sigma:
+            return None
+        baseline = self.baselines[(user_id, device_id)]
+        if baseline.last_flagged is not None and timestamp - baseline.last_flagged < self.cooldown:
+            return None
+        baseline.last_flagged = timestamp
+        return result
+    
+    def snapshot(self, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], Optional[DeviceBaseline]]:
+        """Copy the baselines of (user_id, device_id) keys for ``restore``"""
+        return {key: copy.deepcopy(self.baselines.get(key)) for key in keys}
+    
+    def restore(self, snapshot: Dict[Tuple[str, str], Optional[DeviceBaseline]]):
+        """Put back baselines taken with ``snapshot``, e.g. after a rollback"""
+        for key, baseline in snapshot.items():
+            if baseline is None:
+                self.baselines.pop(key, None)
+            else:
+                self.baselines[key] = baseline
+    
+    def observe_many(self, samples: Iterable[Tuple[str, str, datetime, float]]) -> List[Anomaly]:
+        """Observe (user_id, device_id, timestamp, power_watts) samples in order"""
+        anomalies = []
+        for user_id, device_id, timestamp, power_watts in samples:
+            anomaly = self.observe(user_id, device_id, timestamp, power_watts)
+            if anomaly is not None:
+                anomalies.append(anomaly)
+        return anomalies
+
+
+def replay(
+    session: Session,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    user_id: Optional[str] = None,
+    device_id: Optional[str] = None,
+    sigmas: Sequence[float] = (2.0, 2.5, 3.0, 3.5, 4.0),
+    detector: Optional[AnomalyDetector] = None,
+    chunk_size: int = 50_000,
+    max_anomalies: int = 100
+) -> Dict[str, Any]:
+    """Run a fresh detector over stored raw readings to tune the threshold
+    
+    Readings are streamed in timestamp order and scored once; the number of
+    readings (and of alerts after the cooldown) beyond each candidate sigma
+    is then counted with NumPy. Nothing is written. Only raw readings within
+    their retention can be replayed. Pass ``detector`` to keep the learned
+    baselines afterwards.
+    """
+    detector = detector or AnomalyDetector()
+    stmt = select(
+        DeviceEnergyReading.user_id, DeviceEnergyReading.device_id,
+        DeviceEnergyReading.timestamp, DeviceEnergyReading.power_watts
+    ).order_by(DeviceEnergyReading.timestamp, DeviceEnergyReading.id)
+    if start is not None:
+        stmt = stmt.where(DeviceEnergyReading.timestamp >= start)
+    if end is not None:
+        stmt = stmt.where(DeviceEnergyReading.timestamp < end)
+    if user_id is not None:
+        stmt = stmt.where(DeviceEnergyReading.user_id == user_id)
+    if device_id is not None:
+        stmt = stmt.where(DeviceEnergyReading.device_id == device_id)
+    
+    # Only deviations past the lowest threshold are kept as objects
+    floor = min(list(sigmas) + [detector.sigma])
+    readings = scored = 0
+    candidates: List[Anomaly] = []
+    result = session.connection().execution_options(stream_results=True).execute(stmt)
+    for rows in result.partitions(chunk_size):
+        readings += len(rows)
+        for row_user, row_device, timestamp, power_watts in rows:
+            deviation = detector.score(row_user, row_device, timestamp, power_watts)
+            if deviation is not None:
+                scored += 1
+                if abs(deviation.z_score) > floor:
+                    candidates.append(deviation)
+    
+    z = np.abs(np.fromiter((a.z_score for a in candidates), dtype=np.float64, count=len(candidates)))
+    thresholds = []
+    for sigma in sigmas:
+        flagged = [candidates[i] for i in np.flatnonzero(z > sigma)]
+        thresholds.append({
+            "sigma": sigma,
+            "flagged_readings": len(flagged),
+            "alerts": _after_cooldown(flagged, detector.cooldown)
+        })
+    
+    top = [i for i in np.argsort(-z, kind="stable")[:max_anomalies] if z[i] > detector.sigma]
+    return {
+        "readings": readings,
+        "scored_readings": scored,
+        "devices": len(detector.baselines),
+        "sigma": detector.sigma,
+        "thresholds": thresholds,
+        "anomalies": [candidates[i].to_dict() for i in top]
+    }
+
+
+def _after_cooldown(flagged: List[Anomaly], cooldown: timedelta) -> int:
+    """How many of the (time-ordered) flagged readings would raise an alert"""
+    last: Dict[Tuple[str, str], datetime] = {}
+    alerts = 0
+    for anomaly in flagged:
+        key = (anomaly.user_id, anomaly.device_id)
+        previous = last.get(key)
+        if previous is None or anomaly.timestamp - previous >= cooldown:
+            last[key] = anomaly.timestamp
+            alerts += 1
+    return alerts
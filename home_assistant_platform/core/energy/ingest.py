@@ -0,0 +1,206 @@
+"""Energy ingest - parsing and validation of bulk reading payloads
+
+Accepted formats:
+
+* JSON: an array of readings, or ``{"readings": [...]}``
+* NDJSON: one reading object per line
+* Line protocol: ``energy,device_id=plug_1[,device_name=Plug] power_watts=55.2[,voltage=230,...] [timestamp]``
+
+Readings are validated in one pass and normalized to the column names of
+``DeviceEnergyReading`` with naive UTC timestamps.
+"""
+
+import json
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+OPTIONAL_FIELDS = ("energy_kwh", "voltage", "current")
+LINE_PROTOCOL_MEASUREMENT = "energy"
+PRECISIONS = {"s": 1, "ms": 10 ** 3, "us": 10 ** 6, "ns": 10 ** 9}
+MAX_REPORTED_ERRORS = 20
+
+
+class IngestError(ValueError):
+    """Raised when a payload contains invalid readings; nothing is stored"""
+    
+    def __init__(self, errors: List[str]):
+        self.errors = errors[:MAX_REPORTED_ERRORS]
+        more = len(errors) - len(self.errors)
+        super().__init__("; ".join(self.errors) + (f" (and {more} more)" if more else ""))
+
+
+def _number(value: Any, field: str) -> float:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a number")
+    except OverflowError:
+        raise ValueError(f"{field} is out of range")
+    if not math.isfinite(value):
+        raise ValueError(f"{field} must be finite")
+    return value
+
+
+def _timestamp(value: Any, received_at: datetime) -> datetime:
+    if value is None:
+        return received_at
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            return datetime.fromtimestamp(value, tz=timezone.utc).replace(tzinfo=None)
+        except (ValueError, OverflowError, OSError):
+            raise ValueError("timestamp is out of range")
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError("timestamp must be ISO 8601 or epoch seconds")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def normalize_reading(item: Any, received_at: datetime, user_id: str) -> Dict[str, Any]:
+    """Validate one reading object and map it to DeviceEnergyReading columns"""
+    if not isinstance(item, dict):
+        raise ValueError("reading must be an object")
+    device_id = item.get("device_id")
+    if not isinstance(device_id, str) or not device_id:
+        raise ValueError("device_id is required")
+    if item.get("power_watts") is None:
+        raise ValueError("power_watts is required")
+    
+    reading = {
+        "device_id": device_id,
+        "device_name": item.get("device_name") or device_id,
+        "power_watts": _number(item["power_watts"], "power_watts"),
+        "timestamp": _timestamp(item.get("timestamp"), received_at),
+        "user_id": user_id,
+    }
+    for field in OPTIONAL_FIELDS:
+        value = item.get(field)
+        reading[field] = None if value is None else _number(value, field)
+    return reading
+
+
+def _normalize_all(items: Iterable[Tuple[int, Any]], user_id: str, label: str) -> List[Dict[str, Any]]:
+    received_at = datetime.utcnow()
+    readings, errors = [], []
+    for position, item in items:
+        try:
+            readings.append(normalize_reading(item, received_at, user_id))
+        except ValueError as e:
+            errors.append(f"{label} {position}: {e}")
+    if errors:
+        raise IngestError(errors)
+    return readings
+
+
+def parse_json(body: bytes, user_id: str = "default") -> List[Dict[str, Any]]:
+    """Parse a JSON array (or ``{"readings": [...]}``) of readings"""
+    try:
+        payload = json.loads(body)
+    except ValueError as e:
+        raise IngestError([f"invalid JSON: {e}"])
+    if isinstance(payload, dict):
+        payload = payload.get("readings")
+    if not isinstance(payload, list):
+        raise IngestError(["expected an array of readings"])
+    return _normalize_all(enumerate(payload), user_id, "reading")
+
+
+def _lines(body: bytes) -> List[str]:
+    try:
+        return body.decode("utf-8").splitlines()
+    except UnicodeDecodeError:
+        raise IngestError(["body is not valid UTF-8"])
+
+
+def parse_ndjson(body: bytes, user_id: str = "default") -> List[Dict[str, Any]]:
+    """Parse newline-delimited JSON readings"""
+    items, errors = [], []
+    for number, line in enumerate(_lines(body), start=1):
+        if not line.strip():
+            continue
+        try:
+            items.append((number, json.loads(line)))
+        except ValueError as e:
+            errors.append(f"line {number}: invalid JSON: {e}")
+    if errors:
+        raise IngestError(errors)
+    return _normalize_all(items, user_id, "line")
+
+
+def _split_unescaped(text: str, separator: str) -> List[str]:
+    """Split on a separator not preceded by a backslash"""
+    parts, current, escaped = [], [], False
+    for char in text:
+        if escaped:
+            current.append(char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == separator:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    parts.append("".join(current))
+    return parts
+
+
+def _parse_line(line: str, precision: int) -> Dict[str, Any]:
+    sections = _split_unescaped(line.strip(), " ")
+    if len(sections) not in (2, 3):
+        raise ValueError("expected '<measurement>,<tags> <fields> [timestamp]'")
+    
+    series = _split_unescaped(sections[0], ",")
+    if series[0] != LINE_PROTOCOL_MEASUREMENT:
+        raise ValueError(f"unknown measurement {series[0]!r}")
+    item: Dict[str, Any] = {}
+    for pair in series[1:] + _split_unescaped(sections[1], ","):
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise ValueError(f"malformed key=value {pair!r}")
+        item[key] = value[:-1] if value.endswith("i") and value[:-1].lstrip("-").isdigit() else value.strip('"')
+    if len(sections) == 3:
+        try:
+            item["timestamp"] = int(sections[2]) / precision
+        except ValueError:
+            raise ValueError("timestamp must be an integer")
+        except OverflowError:
+            raise ValueError("timestamp is out of range")
+    return item
+
+
+def parse_line_protocol(body: bytes, user_id: str = "default", precision: str = "ns") -> List[Dict[str, Any]]:
+    """Parse line-protocol readings (timestamps in ``precision`` units since the epoch)"""
+    if precision not in PRECISIONS:
+        raise IngestError([f"precision must be one of {', '.join(PRECISIONS)}"])
+    items, errors = [], []
+    for number, line in enumerate(_lines(body), start=1):
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        try:
+            items.append((number, _parse_line(line, PRECISIONS[precision])))
+        except ValueError as e:
+            errors.append(f"line {number}: {e}")
+    if errors:
+        raise IngestError(errors)
+    return _normalize_all(items, user_id, "line")
+
+
+def parse_payload(
+    body: bytes,
+    content_type: Optional[str],
+    user_id: str = "default",
+    precision: str = "ns"
+) -> List[Dict[str, Any]]:
+    """Dispatch on the request content type"""
+    media_type = (content_type or "application/json").split(";")[0].strip().lower()
+    if media_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        return parse_ndjson(body, user_id)
+    if media_type in ("text/plain", "application/x-line-protocol"):
+        return parse_line_protocol(body, user_id, precision)
+    if media_type == "application/json":
+        return parse_json(body, user_id)
+    raise IngestError([f"unsupported content type {media_type!r}"])
@@ -5,13 +5,15 @@ from datetime import datetime
 from typing import Optional, Dict, List, Any
 from sqlalchemy import Column, String, Float, Integer, Boolean, DateTime, Text, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
-from home_assistant_platform.config.settings import settings
+from sqlalchemy.orm import declared_attr
+from home_assistant_platform.core.database import (
+    register_store, get_scoped_session, session_dependency
+)
 
 logger = logging.getLogger(__name__)
 
 Base = declarative_base()
+register_store("energy", Base.metadata)
 
 
 class DeviceEnergyReading(Base):
@@ -109,6 +111,7 @@ class EnergySummary(Base):
     
     # Metadata
     user_id = Column(String, default="default", index=True)
+    needs_recompute = Column(Boolean, nullable=False, default=False)  # Rollups changed since it was written
     
     # Index for efficient queries
     __table_args__ = (
@@ -116,12 +119,65 @@ class EnergySummary(Base):
     )
 
 
+# Columns added after release; create_all does not add them to existing tables
+ENERGY_SUMMARY_ADDED_COLUMNS = {
+    "needs_recompute": "BOOLEAN NOT NULL DEFAULT 0",
+}
+
+
+class EnergyRollupMixin:
+    """Columns shared by the 1-minute, 1-hour and 1-day rollup tiers"""
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    device_id = Column(String, nullable=False)
+    user_id = Column(String, nullable=False, default="default")
+    bucket_start = Column(DateTime, nullable=False)  # Start of the minute / hour / day
+    
+    # Aggregates
+    energy_kwh = Column(Float, nullable=False, default=0)  # Trapezoidal energy of intervals ending in the bucket
+    min_power_watts = Column(Float)
+    max_power_watts = Column(Float)
+    sum_power_watts = Column(Float, nullable=False, default=0)  # avg = sum / sample_count
+    sample_count = Column(Integer, nullable=False, default=0)
+    peak_time = Column(DateTime)  # When max_power_watts was read
+    
+    # Latest sample, to continue the trapezoid chain after a restart
+    last_timestamp = Column(DateTime)
+    last_power_watts = Column(Float)
+    
+    @declared_attr
+    def __table_args__(cls):
+        return (
+            Index(f'idx_{cls.__tablename__}_key', 'user_id', 'device_id', 'bucket_start', unique=True),
+            Index(f'idx_{cls.__tablename__}_user_bucket', 'user_id', 'bucket_start'),
+        )
+    
+    @property
+    def average_power_watts(self) -> float:
+        return self.sum_power_watts / self.sample_count if self.sample_count else 0.0
+
+
+class EnergyRollupMinute(EnergyRollupMixin, Base):
+    """Per-device energy per minute"""
+    __tablename__ = "energy_rollups_1m"
+
+
+class EnergyRollupHour(EnergyRollupMixin, Base):
+    """Per-device energy per hour"""
+    __tablename__ = "energy_rollups_1h"
+
+
+class EnergyRollupDay(EnergyRollupMixin, Base):
+    """Per-device energy per day"""
+    __tablename__ = "energy_rollups_1d"
+
+
 # Database setup
 def get_energy_db():
     """Get database session for energy system"""
-    db_path = settings.data_dir / "energy.db"
-    engine = create_engine(f"sqlite:///{db_path}", echo=False)
-    Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
-    return Session()
+    return get_scoped_session("energy")
+
+
+# FastAPI dependency yielding a per-request session
+get_energy_session = session_dependency("energy")
 
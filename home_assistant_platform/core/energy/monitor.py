@@ -1,22 +1,160 @@
 """Energy monitor - tracks and analyzes energy consumption"""
 
+import asyncio
 import logging
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Any, Tuple
+import numpy as np
+from sqlalchemy import func, insert, update
 from home_assistant_platform.core.energy.models import (
     DeviceEnergyReading, DeviceEnergyProfile, EnergyAlert, EnergySummary,
-    get_energy_db
+    EnergyRollupDay, get_energy_db
 )
+from home_assistant_platform.core.automation.event_bus import get_event_bus, ENERGY_READING
+from home_assistant_platform.core.energy.anomaly import Anomaly, AnomalyDetector, replay
+from home_assistant_platform.core.energy.rollups import DAY, EnergyRollups
+from home_assistant_platform.core.energy.summarizer import EnergySummarizer
+from home_assistant_platform.core.database import run_in_db_thread
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class AlertRule:
+    """In-memory copy of an active EnergyAlert"""
+    alert_id: int
+    alert_type: str
+    threshold_value: Optional[float]
+    triggered: bool
+
+
 class EnergyMonitor:
-    """Monitors and analyzes energy consumption"""
+    """Monitors and analyzes energy consumption
+    
+    Raw readings are folded into 1-minute, 1-hour and 1-day rollups as they
+    are recorded. Completed days are closed into ``energy_summaries``, so
+    summaries and insights read one stored row per past day and compute only
+    the current day from the rollups. A maintenance task summarizes closed
+    days and applies each tier's retention. Every reading is also scored by
+    an online ``AnomalyDetector``; anomalies are stored as ``anomaly`` alerts.
+    The latest power of each device is kept in memory and published on the
+    event bus, so current-power queries and live streams need no SQL.
+    """
+    
+    MAINTENANCE_INTERVAL = 3600  # Seconds between retention passes
+    SUMMARY_INTERVAL = 60  # Seconds between summary passes
     
     def __init__(self):
         self.db = get_energy_db()
         self.default_cost_per_kwh = 0.12  # Default $0.12 per kWh
+        self.rollups = EnergyRollups()
+        self.summarizer = EnergySummarizer(self.rollups, self._cost_per_kwh)
+        self.anomalies = AnomalyDetector()
+        self._latest_power: Optional[Dict[Tuple[str, str], Tuple[datetime, float]]] = None  # (user, device) -> latest
+        self._alerts: Optional[Dict[Tuple[str, str], List[AlertRule]]] = None  # (user, device) -> active alerts
+        self.maintenance_task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        """Backfill rollups if needed and start the summary and retention task"""
+        if self.maintenance_task:
+            return
+        await run_in_db_thread(self.summarizer.ensure_schema)
+        self.maintenance_task = asyncio.create_task(self._maintenance_loop())
+    
+    async def stop(self):
+        """Stop the summary and retention task"""
+        if self.maintenance_task:
+            self.maintenance_task.cancel()
+            try:
+                await self.maintenance_task
+            except asyncio.CancelledError:
+                pass
+            self.maintenance_task = None
+    
+    async def _maintenance_loop(self):
+        await run_in_db_thread(self.backfill_rollups)
+        await run_in_db_thread(self.warm_anomaly_detector)
+        last_retention = None
+        while True:
+            try:
+                await run_in_db_thread(self.summarize)
+            except Exception as e:
+                logger.error(f"Error summarizing energy days: {e}", exc_info=True)
+            now = asyncio.get_running_loop().time()
+            if last_retention is None or now - last_retention >= self.MAINTENANCE_INTERVAL:
+                last_retention = now
+                try:
+                    await run_in_db_thread(self.apply_retention)
+                except Exception as e:
+                    logger.error(f"Error applying energy retention: {e}", exc_info=True)
+            await asyncio.sleep(self.SUMMARY_INTERVAL)
+    
+    def backfill_rollups(self) -> int:
+        """Build rollups from raw readings recorded before they existed"""
+        with self.rollups.lock:
+            try:
+                folded = self.rollups.backfill(self.db)
+                self.db.commit()
+                self.rollups.committed()
+                return folded
+            except Exception as e:
+                logger.error(f"Error backfilling energy rollups: {e}", exc_info=True)
+                self.db.rollback()
+                self.rollups.rolled_back()
+                return 0
+    
+    def summarize(self) -> int:
+        """Close completed days (and days changed by late readings) into summaries"""
+        return self.summarizer.run(self.db)
+    
+    def warm_anomaly_detector(self) -> int:
+        """Rebuild anomaly baselines from the retained raw readings"""
+        detector = AnomalyDetector()
+        try:
+            result = replay(self.db, detector=detector, sigmas=(), max_anomalies=0)
+            self.db.rollback()  # End the read transaction
+        except Exception as e:
+            logger.error(f"Error warming energy anomaly baselines: {e}", exc_info=True)
+            self.db.rollback()
+            return 0
+        with self.rollups.lock:
+            self.anomalies = detector
+        logger.info(f"Warmed anomaly baselines for {result['devices']} devices from {result['readings']} readings")
+        return result["readings"]
+    
+    def replay_anomalies(
+        self,
+        days: int = 7,
+        sigmas: Optional[List[float]] = None,
+        device_id: Optional[str] = None,
+        user_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Run a fresh detector over recent raw readings without storing alerts"""
+        kwargs = {"sigmas": sigmas} if sigmas else {}
+        try:
+            return replay(
+                self.db, start=datetime.utcnow() - timedelta(days=days),
+                user_id=user_id, device_id=device_id, **kwargs
+            )
+        finally:
+            self.db.rollback()
+    
+    def get_anomalies(self, user_id: str = "default", limit: int = 100) -> List[EnergyAlert]:
+        """Most recent anomaly alerts"""
+        return self.db.query(EnergyAlert).filter(
+            EnergyAlert.user_id == user_id,
+            EnergyAlert.alert_type == "anomaly"
+        ).order_by(EnergyAlert.triggered_at.desc()).limit(limit).all()
+    
+    def apply_retention(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Delete raw readings and rollups past their retention"""
+        with self.rollups.lock:
+            deleted = self.rollups.apply_retention(self.db, now)
+            self.db.commit()
+        if any(deleted.values()):
+            logger.info(f"Energy retention removed {deleted}")
+        return deleted
     
     def record_reading(
         self,
@@ -26,7 +164,8 @@ class EnergyMonitor:
         voltage: Optional[float] = None,
         current: Optional[float] = None,
         energy_kwh: Optional[float] = None,
-        user_id: str = "default"
+        user_id: str = "default",
+        timestamp: Optional[datetime] = None
     ) -> DeviceEnergyReading:
         """Record an energy reading"""
         reading = DeviceEnergyReading(
@@ -36,18 +175,84 @@ class EnergyMonitor:
             energy_kwh=energy_kwh,
             voltage=voltage,
             current=current,
+            timestamp=timestamp or datetime.utcnow(),
             user_id=user_id
         )
         
-        self.db.add(reading)
-        self.db.commit()
-        
-        # Check for alerts
-        self._check_alerts(device_id, power_watts, user_id)
+        with self.rollups.lock:
+            baselines = self.anomalies.snapshot([(user_id, device_id)])
+            try:
+                self.db.add(reading)
+                self.rollups.ingest(self.db, [(user_id, device_id, reading.timestamp, power_watts)])
+                
+                # Check for alerts
+                self._check_alerts(device_id, power_watts, user_id)
+                anomaly = self.anomalies.observe(user_id, device_id, reading.timestamp, power_watts)
+                if anomaly:
+                    self._raise_anomalies([anomaly])
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                self.rollups.rolled_back()
+                self.anomalies.restore(baselines)
+                self._alerts = None  # Triggered flags may not have been stored
+                raise
+            self.rollups.committed()
+            self._update_latest_power([(user_id, device_id, reading.timestamp, power_watts)])
         
         logger.debug(f"Recorded energy reading: {device_id} = {power_watts}W")
         return reading
     
+    def record_readings(self, readings: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Record many validated readings in one transaction
+        
+        ``readings`` hold DeviceEnergyReading column values (see
+        ``energy.ingest``). Rows go in with a single executemany, rollups are
+        updated once per batch and alerts are checked against the in-memory
+        alert index with each device's peak power in the batch. Every reading
+        is scored for anomalies in timestamp order.
+        """
+        if not readings:
+            return {"accepted": 0, "alerts_triggered": 0}
+        
+        peaks: Dict[Tuple[str, str], float] = {}
+        latest: Dict[Tuple[str, str], Tuple[datetime, float]] = {}
+        for r in readings:
+            key = (r["user_id"], r["device_id"])
+            if r["power_watts"] > peaks.get(key, float("-inf")):
+                peaks[key] = r["power_watts"]
+            if key not in latest or r["timestamp"] >= latest[key][0]:
+                latest[key] = (r["timestamp"], r["power_watts"])
+        
+        with self.rollups.lock:
+            baselines = self.anomalies.snapshot(peaks)
+            try:
+                self.db.execute(insert(DeviceEnergyReading), readings)
+                self.rollups.ingest(
+                    self.db,
+                    ((r["user_id"], r["device_id"], r["timestamp"], r["power_watts"]) for r in readings)
+                )
+                triggered = sum(
+                    self._check_alerts(device_id, power, user_id)
+                    for (user_id, device_id), power in peaks.items()
+                )
+                triggered += self._raise_anomalies(self.anomalies.observe_many(
+                    (r["user_id"], r["device_id"], r["timestamp"], r["power_watts"])
+                    for r in sorted(readings, key=lambda r: r["timestamp"])
+                ))
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                self.rollups.rolled_back()
+                self.anomalies.restore(baselines)
+                self._alerts = None  # Triggered flags may not have been stored
+                raise
+            self.rollups.committed()
+            self._update_latest_power([(user_id, device_id, t, w) for (user_id, device_id), (t, w) in latest.items()])
+        
+        logger.debug(f"Recorded {len(readings)} energy readings for {len(peaks)} devices")
+        return {"accepted": len(readings), "alerts_triggered": triggered}
+    
     def get_device_readings(
         self,
         device_id: str,
@@ -68,34 +273,60 @@ class EnergyMonitor:
         
         return query.order_by(DeviceEnergyReading.timestamp).all()
     
+    def _latest_power_cache(self) -> Dict[Tuple[str, str], Tuple[datetime, float]]:
+        """Latest reading per (user, device), loaded from the database once"""
+        with self.rollups.lock:
+            if self._latest_power is None:
+                # Get latest reading for each device
+                subquery = self.db.query(
+                    DeviceEnergyReading.user_id,
+                    DeviceEnergyReading.device_id,
+                    func.max(DeviceEnergyReading.timestamp).label('max_timestamp')
+                ).group_by(DeviceEnergyReading.user_id, DeviceEnergyReading.device_id).subquery()
+                
+                rows = self.db.query(
+                    DeviceEnergyReading.user_id, DeviceEnergyReading.device_id,
+                    DeviceEnergyReading.timestamp, DeviceEnergyReading.power_watts
+                ).join(
+                    subquery,
+                    (DeviceEnergyReading.user_id == subquery.c.user_id) &
+                    (DeviceEnergyReading.device_id == subquery.c.device_id) &
+                    (DeviceEnergyReading.timestamp == subquery.c.max_timestamp)
+                ).all()
+                self._latest_power = {(user_id, device_id): (t, w) for user_id, device_id, t, w in rows}
+            return self._latest_power
+    
+    def _update_latest_power(self, samples: List[Tuple[str, str, datetime, float]]):
+        """Keep the newest reading per device and publish it (rollups lock held)"""
+        cache = self._latest_power_cache()
+        bus = get_event_bus()
+        for user_id, device_id, timestamp, power_watts in samples:
+            current = cache.get((user_id, device_id))
+            if current is not None and timestamp < current[0]:
+                continue  # A late reading is not the current power
+            cache[(user_id, device_id)] = (timestamp, power_watts)
+            bus.publish(ENERGY_READING, device_id, {
+                "user_id": user_id,
+                "power_watts": power_watts,
+                "reading_timestamp": timestamp.isoformat()
+            }, source="energy")
+    
+    def get_latest_power(self) -> Dict[Tuple[str, str], Tuple[datetime, float]]:
+        """Latest (timestamp, watts) of every device, keyed by (user_id, device_id)"""
+        with self.rollups.lock:
+            return dict(self._latest_power_cache())
+    
     def get_current_power(self, device_id: str, user_id: str = "default") -> Optional[float]:
         """Get current power consumption for a device"""
-        reading = self.db.query(DeviceEnergyReading).filter(
-            DeviceEnergyReading.device_id == device_id,
-            DeviceEnergyReading.user_id == user_id
-        ).order_by(DeviceEnergyReading.timestamp.desc()).first()
-        
-        return reading.power_watts if reading else None
+        latest = self._latest_power_cache().get((user_id, device_id))
+        return latest[1] if latest else None
     
     def get_total_power(self, user_id: str = "default") -> float:
         """Get total current power consumption across all devices"""
-        # Get latest reading for each device
-        from sqlalchemy import func
-        
-        subquery = self.db.query(
-            DeviceEnergyReading.device_id,
-            func.max(DeviceEnergyReading.timestamp).label('max_timestamp')
-        ).filter(
-            DeviceEnergyReading.user_id == user_id
-        ).group_by(DeviceEnergyReading.device_id).subquery()
-        
-        readings = self.db.query(DeviceEnergyReading).join(
-            subquery,
-            (DeviceEnergyReading.device_id == subquery.c.device_id) &
-            (DeviceEnergyReading.timestamp == subquery.c.max_timestamp)
-        ).all()
-        
-        return sum(r.power_watts for r in readings) if readings else 0.0
+        return sum(
+            power_watts for (owner, _), (_, power_watts) in self._latest_power_cache().items()
+            if owner == user_id
+        )
     
     def calculate_energy_consumption(
         self,
@@ -104,10 +335,27 @@ class EnergyMonitor:
         end_time: datetime,
         user_id: str = "default"
     ) -> Dict[str, float]:
-        """Calculate energy consumption for a time period"""
-        readings = self.get_device_readings(device_id, start_time, end_time, user_id)
-        
-        if not readings:
+        """Calculate energy consumption for a time period
+        
+        Read from the finest rollup tier still retained for ``start_time``,
+        so the period is effectively rounded to that tier's buckets.
+        """
+        tier = self.rollups.tier_for(start_time)
+        model = tier.model
+        row = self.db.query(
+            func.sum(model.energy_kwh),
+            func.sum(model.sum_power_watts),
+            func.sum(model.sample_count),
+            func.max(model.max_power_watts)
+        ).filter(
+            model.device_id == device_id,
+            model.user_id == user_id,
+            model.bucket_start >= tier.floor(start_time),
+            model.bucket_start <= end_time
+        ).one()
+        total_kwh, sum_power, samples, peak_power = row
+        
+        if not samples:
             return {
                 "total_kwh": 0.0,
                 "average_power_watts": 0.0,
@@ -115,48 +363,42 @@ class EnergyMonitor:
                 "hours": 0.0
             }
         
-        # Calculate total energy (integrate power over time)
-        total_energy = 0.0
-        peak_power = 0.0
-        
-        for i in range(len(readings) - 1):
-            current = readings[i]
-            next_reading = readings[i + 1]
-            
-            # Time difference in hours
-            time_diff = (next_reading.timestamp - current.timestamp).total_seconds() / 3600
-            
-            # Average power during this interval
-            avg_power = (current.power_watts + next_reading.power_watts) / 2
-            
-            # Energy = power * time
-            total_energy += avg_power * time_diff
-            
-            peak_power = max(peak_power, current.power_watts, next_reading.power_watts)
-        
         total_hours = (end_time - start_time).total_seconds() / 3600
-        avg_power = sum(r.power_watts for r in readings) / len(readings) if readings else 0.0
         
         return {
-            "total_kwh": total_energy / 1000,  # Convert to kWh
-            "average_power_watts": avg_power,
-            "peak_power_watts": peak_power,
+            "total_kwh": total_kwh or 0.0,
+            "average_power_watts": sum_power / samples,
+            "peak_power_watts": peak_power or 0.0,
             "hours": total_hours
         }
     
     def get_daily_summary(self, date: datetime, user_id: str = "default") -> Dict[str, Any]:
         """Get daily energy summary"""
-        start_time = date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_time = start_time + timedelta(days=1)
-        
-        # Get all device readings for the day
-        readings = self.db.query(DeviceEnergyReading).filter(
-            DeviceEnergyReading.user_id == user_id,
-            DeviceEnergyReading.timestamp >= start_time,
-            DeviceEnergyReading.timestamp < end_time
+        start_time = DAY.floor(date)
+        
+        if start_time < DAY.floor(datetime.utcnow()):
+            summary = self.db.query(EnergySummary).filter(
+                EnergySummary.user_id == user_id,
+                EnergySummary.date == start_time
+            ).first()
+            if summary and self.summarizer.is_current(summary):
+                return {
+                    "date": date.date().isoformat(),
+                    "total_kwh": summary.total_kwh,
+                    "total_cost": summary.total_cost,
+                    "device_breakdown": dict(summary.device_breakdown or {}),
+                    "peak_power_watts": summary.peak_power_watts or 0.0
+                }
+        
+        # Today (or a day not summarized yet): one day-tier row per device
+        rollups = self.db.query(
+            EnergyRollupDay.device_id, EnergyRollupDay.energy_kwh, EnergyRollupDay.max_power_watts
+        ).filter(
+            EnergyRollupDay.user_id == user_id,
+            EnergyRollupDay.bucket_start == start_time
         ).all()
         
-        if not readings:
+        if not rollups:
             return {
                 "date": date.date().isoformat(),
                 "total_kwh": 0.0,
@@ -165,36 +407,13 @@ class EnergyMonitor:
                 "peak_power_watts": 0.0
             }
         
-        # Group by device
-        device_energy = {}
-        peak_power = 0.0
-        
-        devices = set(r.device_id for r in readings)
-        for device_id in devices:
-            device_readings = [r for r in readings if r.device_id == device_id]
-            device_readings.sort(key=lambda x: x.timestamp)
-            
-            # Calculate energy for this device
-            device_total = 0.0
-            for i in range(len(device_readings) - 1):
-                current = device_readings[i]
-                next_reading = device_readings[i + 1]
-                time_diff = (next_reading.timestamp - current.timestamp).total_seconds() / 3600
-                avg_power = (current.power_watts + next_reading.power_watts) / 2
-                device_total += avg_power * time_diff
-            
-            device_energy[device_id] = device_total / 1000  # Convert to kWh
-            peak_power = max(peak_power, max(r.power_watts for r in device_readings))
+        device_energy = {device_id: energy_kwh for device_id, energy_kwh, _ in rollups}
+        peak_power = max(max_power or 0.0 for _, _, max_power in rollups)
         
         total_kwh = sum(device_energy.values())
         
         # Get cost per kWh from profile or use default
-        profile = self.db.query(DeviceEnergyProfile).filter(
-            DeviceEnergyProfile.user_id == user_id
-        ).first()
-        cost_per_kwh = profile.cost_per_kwh if profile else self.default_cost_per_kwh
-        
-        total_cost = total_kwh * cost_per_kwh
+        total_cost = total_kwh * self._cost_per_kwh(user_id)
         
         return {
             "date": date.date().isoformat(),
@@ -204,6 +423,12 @@ class EnergyMonitor:
             "peak_power_watts": peak_power
         }
     
+    def _cost_per_kwh(self, user_id: str) -> float:
+        profile = self.db.query(DeviceEnergyProfile).filter(
+            DeviceEnergyProfile.user_id == user_id
+        ).first()
+        return profile.cost_per_kwh if profile else self.default_cost_per_kwh
+    
     def create_device_profile(
         self,
         device_id: str,
@@ -263,52 +488,148 @@ class EnergyMonitor:
         
         self.db.add(alert)
         self.db.commit()
+        self._alerts = None  # Reload the index on the next reading
         
         logger.info(f"Created energy alert: {device_id} - {alert_type}")
         return alert
     
-    def _check_alerts(self, device_id: str, power_watts: float, user_id: str):
-        """Check if any alerts should be triggered"""
-        alerts = self.db.query(EnergyAlert).filter(
-            EnergyAlert.device_id == device_id,
-            EnergyAlert.user_id == user_id,
-            EnergyAlert.is_active == True
-        ).all()
+    def _alert_index(self) -> Dict[Tuple[str, str], List[AlertRule]]:
+        """Active alerts by (user, device), loaded once and kept in memory"""
+        if self._alerts is None:
+            index: Dict[Tuple[str, str], List[AlertRule]] = {}
+            rows = self.db.query(
+                EnergyAlert.id, EnergyAlert.user_id, EnergyAlert.device_id, EnergyAlert.alert_type,
+                EnergyAlert.threshold_value, EnergyAlert.triggered_at
+            ).filter(EnergyAlert.is_active == True, EnergyAlert.alert_type != "anomaly").all()
+            for alert_id, user_id, device_id, alert_type, threshold, triggered_at in rows:
+                index.setdefault((user_id, device_id), []).append(
+                    AlertRule(alert_id, alert_type, threshold, triggered_at is not None)
+                )
+            self._alerts = index
+        return self._alerts
+    
+    def _check_alerts(self, device_id: str, power_watts: float, user_id: str) -> int:
+        """Check if any alerts should be triggered; returns how many fired
         
-        for alert in alerts:
+        Stages the update on the session; the caller commits.
+        """
+        triggered = 0
+        for alert in self._alert_index().get((user_id, device_id), ()):
             if alert.alert_type == "high_consumption" and power_watts > alert.threshold_value:
-                if not alert.triggered_at:
-                    alert.triggered_at = datetime.utcnow()
-                    self.db.commit()
+                if not alert.triggered:
+                    alert.triggered = True
+                    self.db.execute(
+                        update(EnergyAlert).where(EnergyAlert.id == alert.alert_id).values(triggered_at=datetime.utcnow())
+                    )
+                    triggered += 1
                     logger.warning(f"Energy alert triggered: {device_id} = {power_watts}W (threshold: {alert.threshold_value}W)")
+        return triggered
+    
+    def _raise_anomalies(self, anomalies: List[Anomaly]) -> int:
+        """Stage one ``anomaly`` EnergyAlert per anomaly; the caller commits"""
+        if not anomalies:
+            return 0
+        self.db.execute(insert(EnergyAlert), [
+            {
+                "device_id": a.device_id,
+                "alert_type": "anomaly",
+                "threshold_value": a.bound_watts,  # The crossed bound, in watts
+                "is_active": True,
+                "triggered_at": a.timestamp,
+                "user_id": a.user_id,
+                "created_at": datetime.utcnow()
+            }
+            for a in anomalies
+        ])
+        for a in anomalies:
+            logger.warning(
+                f"Energy anomaly: {a.device_id} = {a.power_watts}W "
+                f"(expected {a.expected_watts:.1f}W ± {a.std_watts:.1f}W, z={a.z_score:.1f})"
+            )
+        return len(anomalies)
     
     def get_energy_insights(self, days: int = 7, user_id: str = "default") -> Dict[str, Any]:
-        """Get energy consumption insights"""
+        """Get energy consumption insights
+        
+        Closed days come from ``energy_summaries``; only days without a
+        current summary are read from the day tier. Both are loaded into
+        NumPy arrays and per-day totals, peaks and per-device totals are
+        computed from a days x devices matrix instead of one query per day.
+        """
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
+        dates = [start_date + timedelta(days=i) for i in range(max(days, 0))]
+        first_day = DAY.floor(start_date)
         
-        # Get daily summaries
+        summaries = {
+            summary.date: summary
+            for summary in EnergySummarizer.load(self.db, user_id, first_day, len(dates))
+            if self.summarizer.is_current(summary)
+        }
+        query = self.db.query(
+            EnergyRollupDay.device_id, EnergyRollupDay.bucket_start,
+            EnergyRollupDay.energy_kwh, EnergyRollupDay.max_power_watts
+        ).filter(
+            EnergyRollupDay.user_id == user_id,
+            EnergyRollupDay.bucket_start >= first_day,
+            EnergyRollupDay.bucket_start < first_day + timedelta(days=len(dates))
+        )
+        if summaries:
+            query = query.filter(EnergyRollupDay.bucket_start.notin_(list(summaries)))
+        rows = query.order_by(EnergyRollupDay.device_id, EnergyRollupDay.bucket_start).all()
+        rows += [
+            (device_id, day, energy_kwh, summary.peak_power_watts)
+            for day, summary in summaries.items()
+            for device_id, energy_kwh in (summary.device_breakdown or {}).items()
+        ]
+        
+        device_ids: List[str] = []
+        energy = np.zeros((len(dates), 0))
+        present = np.zeros((len(dates), 0), dtype=bool)
+        peaks = np.zeros(len(dates))
+        if rows:
+            device_col, day_col, energy_col, peak_col = zip(*rows)
+            device_ids, device_index = np.unique(np.array(device_col, dtype=object), return_inverse=True)
+            device_ids = device_ids.tolist()
+            day_index = (
+                np.array(day_col, dtype="datetime64[D]") - np.datetime64(first_day.date(), "D")
+            ).astype(np.int64)
+            
+            energy = np.zeros((len(dates), len(device_ids)))
+            present = np.zeros_like(energy, dtype=bool)
+            energy[day_index, device_index] = np.array(energy_col, dtype=np.float64)
+            present[day_index, device_index] = True
+            np.maximum.at(peaks, day_index, np.array([p or 0.0 for p in peak_col], dtype=np.float64))
+        
+        daily_kwh = energy.sum(axis=1)
+        device_kwh = energy.sum(axis=0)
+        cost_per_kwh = self._cost_per_kwh(user_id) if rows else self.default_cost_per_kwh
+        daily_cost = np.where(present.any(axis=1), daily_kwh * cost_per_kwh, 0.0)
+        for day, summary in summaries.items():
+            daily_cost[(day - first_day).days] = summary.total_cost or 0.0  # Cost as of the day
+        
+        # Daily summaries, same shape as get_daily_summary
         daily_summaries = []
-        for i in range(days):
-            date = start_date + timedelta(days=i)
-            summary = self.get_daily_summary(date, user_id)
-            daily_summaries.append(summary)
-        
-        total_kwh = sum(s["total_kwh"] for s in daily_summaries)
+        for i, date in enumerate(dates):
+            daily_summaries.append({
+                "date": date.date().isoformat(),
+                "total_kwh": float(daily_kwh[i]),
+                "total_cost": float(daily_cost[i]),
+                "device_breakdown": {
+                    device_ids[j]: float(energy[i, j]) for j in np.flatnonzero(present[i])
+                },
+                "peak_power_watts": float(peaks[i])
+            })
+        
+        total_kwh = float(daily_kwh.sum())
         total_cost = sum(s["total_cost"] for s in daily_summaries)
         avg_daily_kwh = total_kwh / days if days > 0 else 0.0
         
         # Find peak day
         peak_day = max(daily_summaries, key=lambda x: x["total_kwh"]) if daily_summaries else None
         
-        # Device breakdown
-        device_totals = {}
-        for summary in daily_summaries:
-            for device_id, kwh in summary["device_breakdown"].items():
-                device_totals[device_id] = device_totals.get(device_id, 0) + kwh
-        
         # Top consuming devices
-        top_devices = sorted(device_totals.items(), key=lambda x: x[1], reverse=True)[:5]
+        top = np.argsort(-device_kwh, kind="stable")[:5]
         
         return {
             "period_days": days,
@@ -317,7 +638,6 @@ class EnergyMonitor:
             "average_daily_kwh": avg_daily_kwh,
             "average_daily_cost": total_cost / days if days > 0 else 0.0,
             "peak_day": peak_day,
-            "top_devices": [{"device_id": d[0], "total_kwh": d[1]} for d in top_devices],
+            "top_devices": [{"device_id": device_ids[j], "total_kwh": float(device_kwh[j])} for j in top],
             "daily_summaries": daily_summaries
         }
-
@@ -0,0 +1,338 @@
+"""Energy rollups - raw readings downsampled into 1-minute, 1-hour and 1-day tiers"""
+
+import logging
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from home_assistant_platform.config.settings import settings
+from home_assistant_platform.core.energy.models import (
+    DeviceEnergyReading, EnergyRollupDay, EnergyRollupHour, EnergyRollupMinute, EnergySummary
+)
+
+logger = logging.getLogger(__name__)
+
+# (user_id, device_id, timestamp, power_watts)
+Sample = Tuple[str, str, datetime, float]
+
+
+@dataclass(frozen=True)
+class RollupTier:
+    """One downsampling resolution"""
+    name: str
+    model: type
+    width: timedelta
+    retention_setting: str
+    floor: Callable[[datetime], datetime]
+    
+    @property
+    def retention_days(self) -> int:
+        return getattr(settings, self.retention_setting)
+
+
+MINUTE = RollupTier("1m", EnergyRollupMinute, timedelta(minutes=1), "energy_minute_retention_days",
+                    lambda t: t.replace(second=0, microsecond=0))
+HOUR = RollupTier("1h", EnergyRollupHour, timedelta(hours=1), "energy_hour_retention_days",
+                  lambda t: t.replace(minute=0, second=0, microsecond=0))
+DAY = RollupTier("1d", EnergyRollupDay, timedelta(days=1), "energy_day_retention_days",
+                 lambda t: t.replace(hour=0, minute=0, second=0, microsecond=0))
+TIERS = (MINUTE, HOUR, DAY)
+
+
+def interval_kwh(start: datetime, start_watts: float, end: datetime, end_watts: float) -> float:
+    """Trapezoidal energy between two readings, in kWh"""
+    hours = (end - start).total_seconds() / 3600
+    return (start_watts + end_watts) / 2 * hours / 1000
+
+
+@dataclass
+class BucketStats:
+    """Aggregates of the samples falling into one bucket"""
+    energy_kwh: float = 0.0
+    min_power: Optional[float] = None
+    max_power: Optional[float] = None
+    sum_power: float = 0.0
+    count: int = 0
+    peak_time: Optional[datetime] = None
+    last_timestamp: Optional[datetime] = None
+    last_power: Optional[float] = None
+    
+    def add(self, timestamp: datetime, power: float, energy_kwh: float):
+        self.energy_kwh += energy_kwh
+        self.sum_power += power
+        self.count += 1
+        if self.min_power is None or power < self.min_power:
+            self.min_power = power
+        if self.max_power is None or power > self.max_power:
+            self.max_power = power
+            self.peak_time = timestamp
+        if self.last_timestamp is None or timestamp >= self.last_timestamp:
+            self.last_timestamp = timestamp
+            self.last_power = power
+    
+    def apply_to(self, row):
+        """Merge into a stored rollup row"""
+        row.energy_kwh = (row.energy_kwh or 0.0) + self.energy_kwh
+        row.sum_power_watts = (row.sum_power_watts or 0.0) + self.sum_power
+        row.sample_count = (row.sample_count or 0) + self.count
+        if row.min_power_watts is None or self.min_power < row.min_power_watts:
+            row.min_power_watts = self.min_power
+        if row.max_power_watts is None or self.max_power > row.max_power_watts:
+            row.max_power_watts = self.max_power
+            row.peak_time = self.peak_time
+        if row.last_timestamp is None or self.last_timestamp >= row.last_timestamp:
+            row.last_timestamp = self.last_timestamp
+            row.last_power_watts = self.last_power
+
+
+class EnergyRollups:
+    """Maintains the rollup tiers incrementally as readings arrive
+    
+    Each reading closes the interval since the device's previous reading and
+    its trapezoidal energy is credited to the buckets holding the later
+    reading. Intervals spanning midnight are not counted, as in the daily
+    integration summaries have always used. A reading older than the
+    device's latest one rebuilds that device-day from the raw table.
+    
+    Methods only stage changes on the given session; callers hold ``lock``
+    around staging and their commit so concurrent writers don't lose updates,
+    then call ``committed`` (or ``rolled_back``) so the in-memory state only
+    ever reflects stored rows. Summaries of past days whose totals change are
+    flagged ``needs_recompute`` in the same transaction.
+    """
+    
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._last: Dict[Tuple[str, str], Tuple[datetime, float]] = {}  # Latest sample per (user, device)
+        self._staged_last: Dict[Tuple[str, str], Tuple[datetime, float]] = {}
+    
+    def committed(self):
+        """Apply the in-memory state of the changes the caller just committed"""
+        self._last.update(self._staged_last)
+        self._staged_last.clear()
+    
+    def rolled_back(self):
+        """Forget the in-memory state of the changes the caller rolled back"""
+        self._staged_last.clear()
+    
+    def ingest(self, session: Session, samples: Iterable[Sample]) -> None:
+        """Fold samples into every tier (their raw rows are already on the session)"""
+        by_device: Dict[Tuple[str, str], List[Tuple[datetime, float]]] = defaultdict(list)
+        for user_id, device_id, timestamp, power in samples:
+            by_device[(user_id, device_id)].append((timestamp, power))
+        
+        late_days: Set[Tuple[str, str, datetime]] = set()
+        buckets: Dict[RollupTier, Dict[Tuple[str, str, datetime], BucketStats]] = {tier: {} for tier in TIERS}
+        for key, points in by_device.items():
+            points.sort(key=itemgetter(0))
+            previous = self._previous(session, key)
+            for timestamp, power in points:
+                if previous and timestamp < previous[0]:
+                    late_days.add((key[0], key[1], DAY.floor(timestamp)))
+                    continue
+                energy = 0.0
+                if previous and DAY.floor(previous[0]) == DAY.floor(timestamp):
+                    energy = interval_kwh(previous[0], previous[1], timestamp, power)
+                for tier in TIERS:
+                    bucket = (key[0], key[1], tier.floor(timestamp))
+                    stats = buckets[tier].get(bucket)
+                    if stats is None:
+                        stats = buckets[tier][bucket] = BucketStats()
+                    stats.add(timestamp, power, energy)
+                previous = (timestamp, power)
+            if previous:
+                self._staged_last[key] = previous
+        
+        for tier, tier_buckets in buckets.items():
+            self._merge(session, tier, tier_buckets)
+        self._mark_changed(session, ((user_id, day) for user_id, _, day in list(buckets[DAY]) + list(late_days)))
+        
+        if late_days:
+            raw_cutoff = self._cutoff(settings.energy_raw_retention_days, DAY)
+            session.flush()
+            for user_id, device_id, day in late_days:
+                if raw_cutoff and day < raw_cutoff:
+                    logger.warning(f"Late energy reading for {device_id} on {day.date()} is past raw retention; "
+                                   f"rollups not updated")
+                    continue
+                self.rebuild(session, day, day + timedelta(days=1), user_id=user_id, device_id=device_id)
+    
+    def rebuild(
+        self,
+        session: Session,
+        start: datetime,
+        end: datetime,
+        user_id: Optional[str] = None,
+        device_id: Optional[str] = None
+    ) -> int:
+        """Recompute every tier for whole days in [start, end) from raw readings
+        
+        Returns the number of raw readings folded in.
+        """
+        start, end = DAY.floor(start), DAY.floor(end - timedelta(microseconds=1)) + timedelta(days=1)
+        for tier in TIERS:
+            query = session.query(tier.model).filter(
+                tier.model.bucket_start >= start,
+                tier.model.bucket_start < end
+            )
+            if user_id is not None:
+                query = query.filter(tier.model.user_id == user_id)
+            if device_id is not None:
+                query = query.filter(tier.model.device_id == device_id)
+            query.delete(synchronize_session=False)
+        
+        query = session.query(
+            DeviceEnergyReading.user_id, DeviceEnergyReading.device_id,
+            DeviceEnergyReading.timestamp, DeviceEnergyReading.power_watts
+        ).filter(
+            DeviceEnergyReading.timestamp >= start,
+            DeviceEnergyReading.timestamp < end
+        )
+        if user_id is not None:
+            query = query.filter(DeviceEnergyReading.user_id == user_id)
+        if device_id is not None:
+            query = query.filter(DeviceEnergyReading.device_id == device_id)
+        samples = query.order_by(
+            DeviceEnergyReading.user_id, DeviceEnergyReading.device_id, DeviceEnergyReading.timestamp
+        ).all()
+        
+        buckets: Dict[RollupTier, Dict[Tuple[str, str, datetime], BucketStats]] = {tier: {} for tier in TIERS}
+        previous: Optional[Sample] = None
+        for sample in samples:
+            user, device, timestamp, power = sample
+            energy = 0.0
+            if (previous and previous[:2] == (user, device)
+                    and DAY.floor(previous[2]) == DAY.floor(timestamp)):
+                energy = interval_kwh(previous[2], previous[3], timestamp, power)
+            for tier in TIERS:
+                bucket = (user, device, tier.floor(timestamp))
+                stats = buckets[tier].get(bucket)
+                if stats is None:
+                    stats = buckets[tier][bucket] = BucketStats()
+                stats.add(timestamp, power, energy)
+            previous = sample
+        for tier, tier_buckets in buckets.items():
+            self._merge(session, tier, tier_buckets, known_new=True)
+        self._mark_changed(session, ((user, day) for user, _, day in buckets[DAY]))
+        if user_id is not None:  # Days left without readings changed too
+            self._mark_changed(session, ((user_id, start + timedelta(days=i)) for i in range((end - start).days)))
+        
+        # The latest sample is re-read from the rebuilt minute tier on next ingest
+        for cache in (self._last, self._staged_last):
+            for key in list(cache):
+                if (user_id is None or key[0] == user_id) and (device_id is None or key[1] == device_id):
+                    del cache[key]
+        return len(samples)
+    
+    def _mark_changed(self, session: Session, days: Iterable[Tuple[str, datetime]]):
+        """Flag the summaries of past days whose totals changed, for the summarizer"""
+        today = DAY.floor(datetime.utcnow())
+        by_user: Dict[str, Set[datetime]] = defaultdict(set)
+        for user_id, day in days:
+            if day < today:
+                by_user[user_id].add(day)
+        for user_id, user_days in by_user.items():
+            session.query(EnergySummary).filter(
+                EnergySummary.user_id == user_id,
+                EnergySummary.date.in_(user_days),
+                EnergySummary.needs_recompute.is_(False)
+            ).update({EnergySummary.needs_recompute: True}, synchronize_session=False)
+    
+    def backfill(self, session: Session) -> int:
+        """Build the tiers from raw readings when they have never been populated"""
+        if session.query(EnergyRollupDay.id).first() is not None:
+            return 0
+        bounds = session.query(DeviceEnergyReading.timestamp).order_by(DeviceEnergyReading.timestamp).first()
+        if bounds is None:
+            return 0
+        
+        # One day at a time keeps memory bounded on large raw tables
+        day = DAY.floor(bounds[0])
+        end = DAY.floor(datetime.utcnow()) + timedelta(days=1)
+        folded = 0
+        while day < end:
+            folded += self.rebuild(session, day, day + timedelta(days=1))
+            day += timedelta(days=1)
+        logger.info(f"Backfilled energy rollups from {folded} raw readings")
+        return folded
+    
+    def apply_retention(self, session: Session, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Delete raw readings and rollup rows older than their tier's retention"""
+        now = now or datetime.utcnow()
+        deleted = {}
+        
+        cutoff = self._cutoff(settings.energy_raw_retention_days, None, now)
+        if cutoff:
+            deleted["raw"] = session.query(DeviceEnergyReading).filter(
+                DeviceEnergyReading.timestamp < cutoff
+            ).delete(synchronize_session=False)
+        
+        for tier in TIERS:
+            cutoff = self._cutoff(tier.retention_days, tier, now)
+            if cutoff:
+                deleted[tier.name] = session.query(tier.model).filter(
+                    tier.model.bucket_start < cutoff
+                ).delete(synchronize_session=False)
+        return deleted
+    
+    def tier_for(self, start: datetime, now: Optional[datetime] = None) -> RollupTier:
+        """Finest tier whose retention still covers ``start``"""
+        for tier in TIERS:
+            cutoff = self._cutoff(tier.retention_days, tier, now)
+            if not cutoff or start >= cutoff:
+                return tier
+        return DAY
+    
+    @staticmethod
+    def _cutoff(days: int, tier: Optional[RollupTier], now: Optional[datetime] = None) -> Optional[datetime]:
+        if not days:
+            return None
+        cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+        return tier.floor(cutoff) if tier else cutoff
+    
+    def _previous(self, session: Session, key: Tuple[str, str]) -> Optional[Tuple[datetime, float]]:
+        """Latest sample of a device, from memory or the minute tier"""
+        previous = self._staged_last.get(key) or self._last.get(key)
+        if previous is None:
+            row = session.query(
+                EnergyRollupMinute.last_timestamp, EnergyRollupMinute.last_power_watts
+            ).filter(
+                EnergyRollupMinute.user_id == key[0],
+                EnergyRollupMinute.device_id == key[1]
+            ).order_by(EnergyRollupMinute.bucket_start.desc()).first()
+            if row and row[0] is not None:
+                previous = self._staged_last[key] = (row[0], row[1])
+        return previous
+    
+    def _merge(
+        self,
+        session: Session,
+        tier: RollupTier,
+        buckets: Dict[Tuple[str, str, datetime], BucketStats],
+        known_new: bool = False
+    ):
+        """Upsert bucket aggregates into a tier with one lookup query"""
+        if not buckets:
+            return
+        model = tier.model
+        existing = {}
+        if not known_new:
+            devices = {device_id for _, device_id, _ in buckets}
+            starts = [bucket_start for _, _, bucket_start in buckets]
+            rows = session.query(model).filter(
+                model.device_id.in_(devices),
+                model.bucket_start >= min(starts),
+                model.bucket_start <= max(starts)
+            )
+            existing = {(row.user_id, row.device_id, row.bucket_start): row for row in rows}
+        
+        for key, stats in buckets.items():
+            row = existing.get(key)
+            if row is None:
+                row = model(user_id=key[0], device_id=key[1], bucket_start=key[2],
+                            energy_kwh=0.0, sum_power_watts=0.0, sample_count=0)
+                session.add(row)
+            stats.apply_to(row)
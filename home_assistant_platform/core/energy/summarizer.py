@@ -0,0 +1,127 @@
+"""Energy summarizer - materializes closed days into energy_summaries"""
+
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from sqlalchemy import and_, exists, inspect, text
+from sqlalchemy.orm import Session
+from home_assistant_platform.core.database import get_engine, init_store
+from home_assistant_platform.core.energy.models import (
+    ENERGY_SUMMARY_ADDED_COLUMNS, EnergyRollupDay, EnergySummary
+)
+from home_assistant_platform.core.energy.rollups import DAY, EnergyRollups
+
+logger = logging.getLogger(__name__)
+
+
+class EnergySummarizer:
+    """Writes one EnergySummary per user and completed day
+    
+    A day is closed once it is over (in stored, UTC time). Each pass closes
+    days that have day-tier rollups but no summary yet (which backfills
+    history on first start), and recomputes closed days whose rollups
+    changed because of late readings. Those are flagged ``needs_recompute``
+    along with the rollup change, so they stay stale (and readers serve them
+    live) until the next pass, even across restarts.
+    """
+    
+    def __init__(self, rollups: EnergyRollups, cost_per_kwh: Callable[[str], float]):
+        self.rollups = rollups
+        self.cost_per_kwh = cost_per_kwh
+    
+    @staticmethod
+    def ensure_schema():
+        """Add the columns missing from an energy_summaries table created by an older version"""
+        init_store("energy")
+        engine = get_engine("energy")
+        existing = {column["name"] for column in inspect(engine).get_columns("energy_summaries")}
+        missing = [name for name in ENERGY_SUMMARY_ADDED_COLUMNS if name not in existing]
+        if not missing:
+            return
+        with engine.begin() as connection:
+            for name in missing:
+                connection.execute(text(
+                    f"ALTER TABLE energy_summaries ADD COLUMN {name} {ENERGY_SUMMARY_ADDED_COLUMNS[name]}"
+                ))
+        logger.info(f"Added energy summary columns: {', '.join(missing)}")
+    
+    @staticmethod
+    def is_current(summary: EnergySummary) -> bool:
+        """Whether a stored summary can be served"""
+        return summary.date < DAY.floor(datetime.utcnow()) and not summary.needs_recompute
+    
+    def run(self, session: Session) -> int:
+        """Close missing and changed days; returns the number of days written"""
+        today = DAY.floor(datetime.utcnow())
+        # Writers flag summaries under the lock; holding it keeps a concurrent flag from being cleared
+        with self.rollups.lock:
+            try:
+                days = self._pending(session, today)
+                for user_id, day in sorted(days, key=lambda key: key[1]):
+                    self.close_day(session, user_id, day)
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+        
+        if days:
+            logger.info(f"Summarized {len(days)} energy day(s)")
+        return len(days)
+    
+    @staticmethod
+    def _pending(session: Session, today: datetime) -> Set[Tuple[str, datetime]]:
+        """Closed days without a summary or with a flagged one"""
+        missing = session.query(EnergyRollupDay.user_id, EnergyRollupDay.bucket_start).filter(
+            EnergyRollupDay.bucket_start < today,
+            ~exists().where(and_(
+                EnergySummary.user_id == EnergyRollupDay.user_id,
+                EnergySummary.date == EnergyRollupDay.bucket_start
+            ))
+        ).distinct().all()
+        flagged = session.query(EnergySummary.user_id, EnergySummary.date).filter(
+            EnergySummary.needs_recompute.is_(True)
+        ).all()
+        return {(user_id, day) for user_id, day in missing} | {(user_id, day) for user_id, day in flagged}
+    
+    def close_day(self, session: Session, user_id: str, day: datetime) -> Optional[EnergySummary]:
+        """Write (or refresh) the summary of one day from the day tier"""
+        rows = session.query(
+            EnergyRollupDay.device_id, EnergyRollupDay.energy_kwh,
+            EnergyRollupDay.max_power_watts, EnergyRollupDay.peak_time
+        ).filter(
+            EnergyRollupDay.user_id == user_id,
+            EnergyRollupDay.bucket_start == day
+        ).all()
+        summary = session.query(EnergySummary).filter(
+            EnergySummary.user_id == user_id,
+            EnergySummary.date == day
+        ).first()
+        
+        if not rows:
+            if summary:
+                session.delete(summary)
+            return None
+        
+        breakdown: Dict[str, float] = {device_id: energy_kwh for device_id, energy_kwh, _, _ in rows}
+        peak = max(rows, key=lambda row: row[2] or 0.0)
+        total_kwh = sum(breakdown.values())
+        
+        if summary is None:
+            summary = EnergySummary(user_id=user_id, date=day)
+            session.add(summary)
+        summary.total_kwh = total_kwh
+        summary.total_cost = total_kwh * self.cost_per_kwh(user_id)
+        summary.device_breakdown = breakdown
+        summary.peak_power_watts = peak[2] or 0.0
+        summary.peak_time = peak[3]
+        summary.needs_recompute = False
+        return summary
+    
+    @staticmethod
+    def load(session: Session, user_id: str, start: datetime, days: int) -> List[EnergySummary]:
+        """Stored summaries for ``days`` days from ``start``"""
+        return session.query(EnergySummary).filter(
+            EnergySummary.user_id == user_id,
+            EnergySummary.date >= start,
+            EnergySummary.date < start + (DAY.width * days)
+        ).all()
@@ -23,6 +23,10 @@ async def lifespan(app: FastAPI):
     
     # Initialize components
     try:
+        # Create every database schema once, before any manager opens a session
+        from home_assistant_platform.core.database import init_databases, run_in_db_thread
+        init_databases()
+        
         # Import and initialize components here
         from home_assistant_platform.core.licensing.license_validator import LicenseValidator
         from home_assistant_platform.core.plugin_manager.docker_manager import DockerManager
@@ -41,15 +45,27 @@ async def lifespan(app: FastAPI):
         # Initialize automation components with unified device manager
         from home_assistant_platform.core.devices.unified_manager import UnifiedDeviceManager
         app.state.device_manager = UnifiedDeviceManager()
+        await app.state.device_manager.start()  # Saved devices load in the background
         app.state.pattern_learner = PatternLearner()
+        app.state.pattern_learner.start()
         app.state.suggestion_engine = SuggestionEngine()
         app.state.automation_executor = AutomationExecutor(app.state.device_manager)
         app.state.automation_scheduler = AutomationScheduler(app.state.automation_executor)
         
         # Start automation scheduler
         await app.state.automation_scheduler.start()
+        
+        # Start event-triggered automations (fed by the device event bus)
+        from home_assistant_platform.core.automation.event_triggers import EventTriggerEngine
+        app.state.event_trigger_engine = EventTriggerEngine(app.state.automation_executor)
+        await app.state.event_trigger_engine.start()
         logger.info("Automation system initialized")
         
+        # Live push channel (/api/v1/stream), fed by the same event bus
+        from home_assistant_platform.core.streaming.hub import StreamHub
+        app.state.stream_hub = StreamHub()
+        app.state.stream_hub.start()
+        
         # Initialize scene manager
         from home_assistant_platform.core.automation.scene_manager import SceneManager
         app.state.scene_manager = SceneManager(app.state.device_manager)
@@ -116,6 +132,8 @@ async def lifespan(app: FastAPI):
             # Initialize energy monitor
             from home_assistant_platform.core.energy.monitor import EnergyMonitor
             app.state.energy_monitor = EnergyMonitor()
+            await app.state.energy_monitor.start()
+            app.state.stream_hub.seed_power(await run_in_db_thread(app.state.energy_monitor.get_latest_power))
             logger.info("Energy monitoring system initialized")
             
             # Initialize webhook manager
@@ -202,14 +220,31 @@ async def lifespan(app: FastAPI):
         app.state.voice_manager.cleanup()
     if hasattr(app.state, 'automation_scheduler'):
         await app.state.automation_scheduler.stop()
+    if hasattr(app.state, 'event_trigger_engine'):
+        await app.state.event_trigger_engine.stop()
+    if hasattr(app.state, 'automation_executor'):
+        app.state.automation_executor.close()
+    if hasattr(app.state, 'stream_hub'):
+        app.state.stream_hub.stop()
+    if hasattr(app.state, 'device_manager') and hasattr(app.state.device_manager, 'stop'):
+        await app.state.device_manager.stop()  # Saves pending device changes
+    if hasattr(app.state, 'pattern_learner'):
+        # Flushes queued actions before the engines are disposed
+        await asyncio.to_thread(app.state.pattern_learner.stop)
     if hasattr(app.state, 'reminder_scheduler'):
         await app.state.reminder_scheduler.stop()
+    if hasattr(app.state, 'energy_monitor'):
+        await app.state.energy_monitor.stop()
     if hasattr(app.state, 'docker_manager'):
         await app.state.docker_manager.cleanup()
         
         # Cleanup webhook manager
         if hasattr(app.state, 'webhook_manager'):
             await app.state.webhook_manager.cleanup()
+    
+    from home_assistant_platform.core.database import shutdown_db_executor, dispose_engines
+    shutdown_db_executor()
+    dispose_engines()
 
 
 # Create FastAPI application
@@ -5,14 +5,15 @@ from datetime import datetime
 from typing import Optional, Dict, List, Any
 from sqlalchemy import Column, String, Float, Integer, Boolean, DateTime, Text, JSON
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
-from home_assistant_platform.config.settings import settings
+from home_assistant_platform.core.database import (
+    register_store, get_scoped_session, session_dependency
+)
 import os
 
 logger = logging.getLogger(__name__)
 
 Base = declarative_base()
+register_store("media", Base.metadata)
 
 
 class MediaDevice(Base):
@@ -98,9 +99,9 @@ class MediaSession(Base):
 # Database setup
 def get_media_db():
     """Get database session for media system"""
-    db_path = settings.data_dir / "media.db"
-    engine = create_engine(f"sqlite:///{db_path}", echo=False)
-    Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
-    return Session()
+    return get_scoped_session("media")
+
+
+# FastAPI dependency yielding a per-request session
+get_media_session = session_dependency("media")
 
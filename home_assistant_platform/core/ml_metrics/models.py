@@ -5,13 +5,14 @@ from datetime import datetime
 from typing import Dict, Optional, Any
 from sqlalchemy import Column, String, Float, Integer, Boolean, DateTime, Text, JSON
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
-from home_assistant_platform.config.settings import settings
+from home_assistant_platform.core.database import (
+    register_store, get_scoped_session, session_dependency
+)
 
 logger = logging.getLogger(__name__)
 
 Base = declarative_base()
+register_store("ml_metrics", Base.metadata)
 
 
 class ModelPerformance(Base):
@@ -127,9 +128,9 @@ class ModelComparison(Base):
 # Database setup
 def get_metrics_db():
     """Get database session for metrics"""
-    db_path = settings.data_dir / "ml_metrics.db"
-    engine = create_engine(f"sqlite:///{db_path}", echo=False)
-    Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
-    return Session()
+    return get_scoped_session("ml_metrics")
+
+
+# FastAPI dependency yielding a per-request session
+get_metrics_session = session_dependency("ml_metrics")
 
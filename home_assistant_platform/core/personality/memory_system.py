@@ -5,13 +5,14 @@ from datetime import datetime
 from typing import List, Dict, Optional, Any
 from sqlalchemy import Column, String, Float, Integer, Boolean, DateTime, Text, JSON
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
-from home_assistant_platform.config.settings import settings
+from home_assistant_platform.core.database import (
+    register_store, get_scoped_session, session_dependency
+)
 
 logger = logging.getLogger(__name__)
 
 Base = declarative_base()
+register_store("memory", Base.metadata)
 
 
 class Memory(Base):
@@ -54,11 +55,11 @@ class ConversationContext(Base):
 # Database setup
 def get_memory_db():
     """Get database session for memory system"""
-    db_path = settings.data_dir / "memory.db"
-    engine = create_engine(f"sqlite:///{db_path}", echo=False)
-    Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
-    return Session()
+    return get_scoped_session("memory")
+
+
+# FastAPI dependency yielding a per-request session
+get_memory_session = session_dependency("memory")
 
 
 class MemorySystem:
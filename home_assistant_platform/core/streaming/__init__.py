@@ -0,0 +1 @@
+"""Live event streaming to dashboards and other clients"""
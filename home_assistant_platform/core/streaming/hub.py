@@ -0,0 +1,230 @@
+"""Stream hub - pushes live power, device and automation events to clients"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Hashable, Iterable, List, Mapping, Optional, Set, Tuple
+from home_assistant_platform.config.settings import settings
+from home_assistant_platform.core.automation.event_bus import (
+    EventBus, DeviceEvent, get_event_bus,
+    DEVICE_STATE_CHANGE, DEVICE_COMMAND, DEVICE_ADDED, DEVICE_REMOVED,
+    ENERGY_READING, AUTOMATION_EXECUTED
+)
+
+logger = logging.getLogger(__name__)
+
+POWER = "power"
+DEVICES = "devices"
+AUTOMATIONS = "automations"
+TOPICS = (POWER, DEVICES, AUTOMATIONS)
+
+EVENT_TOPICS = {
+    ENERGY_READING: POWER,
+    DEVICE_STATE_CHANGE: DEVICES,
+    DEVICE_COMMAND: DEVICES,
+    DEVICE_ADDED: DEVICES,
+    DEVICE_REMOVED: DEVICES,
+    AUTOMATION_EXECUTED: AUTOMATIONS,
+}
+
+
+@dataclass(eq=False)
+class StreamClient:
+    """One connected client and the messages waiting for it
+    
+    Pending messages are keyed by what they describe (a device's power, a
+    device's state), so a client that reads slower than events arrive gets
+    the latest value instead of a growing backlog. Automation executions
+    are not conflated; past ``max_pending`` the oldest message is dropped.
+    """
+    topics: Set[str]
+    device_ids: Optional[Set[str]] = None
+    user_id: Optional[str] = None
+    max_pending: int = 1000
+    pending: "OrderedDict[Hashable, Dict[str, Any]]" = field(default_factory=OrderedDict)
+    ready: asyncio.Event = field(default_factory=asyncio.Event)
+    dropped: int = 0
+    
+    def wants(self, message: Dict[str, Any]) -> bool:
+        if message["topic"] not in self.topics:
+            return False
+        if self.user_id is not None and message.get("user_id", self.user_id) != self.user_id:
+            return False
+        device_id = message.get("device_id")
+        return self.device_ids is None or device_id is None or device_id in self.device_ids
+    
+    def push(self, key: Hashable, message: Dict[str, Any]):
+        if key in self.pending:
+            del self.pending[key]  # Newer value replaces the queued one
+        elif len(self.pending) >= self.max_pending:
+            self.pending.popitem(last=False)
+            self.dropped += 1
+        self.pending[key] = message
+        self.ready.set()
+    
+    async def next_batch(self, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Wait for messages; returns them in arrival order (empty on timeout)"""
+        if not self.pending:
+            self.ready.clear()
+            try:
+                await asyncio.wait_for(self.ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        batch = list(self.pending.values())
+        self.pending.clear()
+        return batch
+
+
+class StreamHub:
+    """Latest-value cache of live events and fan-out to stream clients
+    
+    Subscribes to the event bus, so every publisher (energy monitor, device
+    managers, automation executor) is covered without polling the database.
+    New clients get a snapshot of the cached values matching their filters,
+    then live updates. Runs on the event loop only.
+    """
+    
+    def __init__(self, event_bus: Optional[EventBus] = None):
+        self.event_bus = event_bus or get_event_bus()
+        self.latest: Dict[Tuple[str, Hashable], Dict[str, Any]] = {}
+        self.power: Dict[str, Dict[str, float]] = {}  # user -> device -> watts
+        self.clients: Set[StreamClient] = set()
+        self._sequence = 0
+        self.running = False
+    
+    def start(self, latest_power: Optional[Mapping[Tuple[str, str], Tuple[datetime, float]]] = None):
+        """Start receiving events
+        
+        ``latest_power`` maps (user_id, device_id) to the latest (timestamp,
+        watts), as kept by the energy monitor; it seeds the power values so
+        clients connecting before a device's next reading still get them.
+        """
+        if self.running:
+            return
+        self.running = True
+        self.event_bus.bind_loop()
+        self.event_bus.subscribe(self.handle_event)
+        if latest_power:
+            self.seed_power(latest_power)
+        logger.info("Stream hub started")
+    
+    def seed_power(self, latest_power: Mapping[Tuple[str, str], Tuple[datetime, float]]):
+        """Cache stored power values of devices that have no live reading yet"""
+        for (user_id, device_id), (timestamp, power_watts) in latest_power.items():
+            if (POWER, (user_id, device_id)) in self.latest:
+                continue  # A live reading is newer
+            self.handle_event(DeviceEvent(ENERGY_READING, device_id, {
+                "user_id": user_id,
+                "power_watts": power_watts,
+                "reading_timestamp": timestamp.isoformat()
+            }, source="energy", timestamp=timestamp))
+    
+    def stop(self):
+        """Stop receiving events and wake up connected clients"""
+        self.running = False
+        self.event_bus.unsubscribe(self.handle_event)
+        for client in self.clients:
+            client.ready.set()
+    
+    def connect(
+        self,
+        topics: Optional[Iterable[str]] = None,
+        device_ids: Optional[Iterable[str]] = None,
+        user_id: Optional[str] = None
+    ) -> StreamClient:
+        """Register a client and queue the current snapshot for it"""
+        client = StreamClient(
+            topics=self.parse_topics(topics),
+            device_ids=set(device_ids) if device_ids else None,
+            user_id=user_id,
+            max_pending=settings.stream_max_pending
+        )
+        self.clients.add(client)
+        self._snapshot(client)
+        return client
+    
+    def update(self, client: StreamClient, topics: Optional[Iterable[str]], device_ids: Optional[Iterable[str]]):
+        """Change a client's filters and queue a fresh snapshot"""
+        client.topics = self.parse_topics(topics)
+        client.device_ids = set(device_ids) if device_ids else None
+        client.pending.clear()
+        self._snapshot(client)
+    
+    def _snapshot(self, client: StreamClient):
+        for key, message in self.latest.items():
+            if client.wants(message):
+                client.push(key, message)
+    
+    def disconnect(self, client: StreamClient):
+        self.clients.discard(client)
+    
+    @staticmethod
+    def parse_topics(topics: Optional[Iterable[str]]) -> Set[str]:
+        """Validate topic names (all topics when empty)"""
+        names = {t.strip() for topic in topics or () for t in topic.split(",") if t.strip()}
+        unknown = names - set(TOPICS)
+        if unknown:
+            raise ValueError(f"Unknown topics: {', '.join(sorted(unknown))} (expected {', '.join(TOPICS)})")
+        return names or set(TOPICS)
+    
+    def handle_event(self, event: DeviceEvent):
+        """Bus subscriber - cache the event and fan it out"""
+        topic = EVENT_TOPICS.get(event.event_type)
+        if topic is None:
+            return
+        message = {"topic": topic, **event.to_dict()}
+        
+        if topic == POWER:
+            user_id = message.get("user_id", "default")
+            devices = self.power.setdefault(user_id, {})
+            devices[event.device_id] = message.get("power_watts") or 0.0
+            self._publish((POWER, (user_id, event.device_id)), message)
+            self._publish_total(user_id, message["timestamp"])
+        elif topic == DEVICES:
+            key = (DEVICES, event.device_id)
+            if event.event_type == DEVICE_REMOVED:
+                self.latest.pop(key, None)
+                self._fan_out(key, message)
+                for user_id, devices in self.power.items():
+                    if devices.pop(event.device_id, None) is not None:
+                        self.latest.pop((POWER, (user_id, event.device_id)), None)
+                        self._publish_total(user_id, message["timestamp"])
+            elif event.event_type == DEVICE_COMMAND:
+                self._fan_out((DEVICES, event.device_id, DEVICE_COMMAND), message)
+            else:
+                previous = self.latest.get(key, {})
+                self._publish(key, {**previous, **message})
+        else:
+            self._sequence += 1
+            self.latest[(AUTOMATIONS, message.get("automation_id"))] = message
+            self._fan_out((AUTOMATIONS, self._sequence), message)
+    
+    def _publish_total(self, user_id: str, timestamp: str):
+        devices = self.power.get(user_id, {})
+        self._publish((POWER, (user_id, None)), {
+            "topic": POWER,
+            "event_type": "power_total",
+            "user_id": user_id,
+            "device_id": None,
+            "timestamp": timestamp,
+            "total_power_watts": sum(devices.values()),
+            "devices": len(devices)
+        })
+    
+    def _publish(self, key: Tuple[str, Hashable], message: Dict[str, Any]):
+        self.latest[key] = message
+        self._fan_out(key, message)
+    
+    def _fan_out(self, key: Hashable, message: Dict[str, Any]):
+        for client in self.clients:
+            if client.wants(message):
+                client.push(key, message)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "clients": len(self.clients),
+            "cached_values": len(self.latest),
+            "dropped_messages": sum(client.dropped for client in self.clients)
+        }
@@ -5,15 +5,16 @@ from datetime import datetime
 from typing import Optional, Dict, List, Any
 from sqlalchemy import Column, String, Float, Integer, Boolean, DateTime, Text, JSON
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
 from sqlalchemy import UniqueConstraint
-from home_assistant_platform.config.settings import settings
+from home_assistant_platform.core.database import (
+    register_store, get_scoped_session, session_dependency
+)
 import bcrypt
 
 logger = logging.getLogger(__name__)
 
 Base = declarative_base()
+register_store("users", Base.metadata)
 
 
 class User(Base):
@@ -86,11 +87,11 @@ class VoiceProfile(Base):
 # Database setup
 def get_users_db():
     """Get database session for users system"""
-    db_path = settings.data_dir / "users.db"
-    engine = create_engine(f"sqlite:///{db_path}", echo=False)
-    Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
-    return Session()
+    return get_scoped_session("users")
+
+
+# FastAPI dependency yielding a per-request session
+get_users_session = session_dependency("users")
 
 
 def hash_password(password: str) -> str:
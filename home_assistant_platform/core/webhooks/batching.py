@@ -0,0 +1,103 @@
+"""Webhook batching - buffers events for webhooks that deliver in batches"""
+
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Set, Tuple
+from home_assistant_platform.core.webhooks.models import MODE_COALESCE
+from home_assistant_platform.core.webhooks.subscriptions import CompiledWebhook
+
+logger = logging.getLogger(__name__)
+
+
+def _coalesce_value(value: Any) -> Any:
+    """Hashable form of a coalesce key value (lists and dicts by their JSON)"""
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+@dataclass
+class _Batch:
+    webhook: CompiledWebhook
+    timer: Optional[asyncio.TimerHandle] = None
+    payloads: "OrderedDict[Tuple[str, Any], Dict[str, Any]]" = field(default_factory=OrderedDict)
+    event_types: Set[str] = field(default_factory=set)
+    events: int = 0
+    
+    @property
+    def event_type(self) -> str:
+        """What the batch is logged as triggered by"""
+        return next(iter(self.event_types)) if len(self.event_types) == 1 else "batch"
+
+
+class BatchBuffer:
+    """Per-webhook event buffers for the batch and coalesce delivery modes
+    
+    The first event for a webhook opens a window of ``batch_window_ms``.
+    When it closes, or once ``batch_max_size`` payloads are waiting, the
+    buffered payloads go to the delivery queue as one JSON array, so a
+    burst of events becomes one request and one log row. In coalesce mode
+    an event replaces the buffered one with the same ``coalesce_key`` value
+    in its data, leaving only the latest state of each device. Buffers are
+    in memory until their window closes; ``close`` flushes them on shutdown.
+    """
+    
+    def __init__(self, queue):
+        self.queue = queue
+        self._batches: Dict[int, _Batch] = {}
+        self._flushes: Set[asyncio.Task] = set()
+        self.stats = {"events": 0, "coalesced": 0, "batches": 0}
+    
+    def __len__(self) -> int:
+        """Payloads waiting in open windows"""
+        return sum(len(batch.payloads) for batch in self._batches.values())
+    
+    async def add(self, webhook: CompiledWebhook, event_type: str, event_data: Dict[str, Any], payload: Dict[str, Any]):
+        """Buffer one rendered event for a batching webhook"""
+        batch = self._batches.get(webhook.id)
+        if batch is None:
+            batch = self._batches[webhook.id] = _Batch(webhook)
+            batch.timer = asyncio.get_running_loop().call_later(
+                webhook.batch_window_ms / 1000, self._window_closed, webhook.id
+            )
+        batch.webhook = webhook  # Latest settings apply to the whole batch
+        batch.events += 1
+        batch.event_types.add(event_type)
+        self.stats["events"] += 1
+        
+        value = event_data.get(webhook.coalesce_key) if webhook.delivery_mode == MODE_COALESCE else None
+        key = ("key", _coalesce_value(value)) if value is not None else ("event", batch.events)
+        if key in batch.payloads:
+            self.stats["coalesced"] += 1
+            del batch.payloads[key]  # Re-added at the end: payloads stay in order of their latest event
+        batch.payloads[key] = payload
+        
+        if len(batch.payloads) >= webhook.batch_max_size:
+            await self.flush(webhook.id)
+    
+    async def flush(self, webhook_id: int) -> bool:
+        """Queue a webhook's buffered payloads now; returns whether there were any"""
+        batch = self._batches.pop(webhook_id, None)
+        if batch is None:
+            return False
+        if batch.timer:
+            batch.timer.cancel()
+        self.stats["batches"] += 1
+        await self.queue.enqueue([(batch.webhook, batch.event_type, list(batch.payloads.values()))])
+        logger.debug(f"Queued batch of {len(batch.payloads)} for webhook {webhook_id} ({batch.events} events)")
+        return True
+    
+    async def close(self):
+        """Flush every open window"""
+        for webhook_id in list(self._batches):
+            await self.flush(webhook_id)
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+    
+    def _window_closed(self, webhook_id: int):
+        task = asyncio.create_task(self.flush(webhook_id))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
@@ -0,0 +1,332 @@
+"""Webhook delivery queue - SQLite outbox drained by a fixed worker pool"""
+
+import asyncio
+import logging
+import random
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+from sqlalchemy import func
+from home_assistant_platform.config.settings import settings
+from home_assistant_platform.core.database import run_in_db_thread
+from home_assistant_platform.core.webhooks.models import (
+    WebhookDelivery, get_webhooks_db, DELIVERY_PENDING, DELIVERY_IN_FLIGHT, DELIVERY_DEAD
+)
+from home_assistant_platform.core.webhooks.subscriptions import CompiledWebhook
+
+logger = logging.getLogger(__name__)
+
+
+def destination_host(url: str) -> str:
+    """Host (and port) a webhook URL sends to"""
+    return urlsplit(url).netloc.lower() or url
+
+
+def _percentiles(values: Iterable[float]) -> Dict[str, Optional[float]]:
+    ordered = sorted(values)
+    if not ordered:
+        return {"p50": None, "p95": None}
+    pick = lambda q: round(ordered[int(round(q * (len(ordered) - 1)))], 3)
+    return {"p50": pick(0.5), "p95": pick(0.95)}
+
+
+class DeliveryQueue:
+    """Durable outbox for webhook requests
+    
+    Events are written to ``webhook_deliveries`` before anything is sent,
+    so a restart loses nothing: rows left ``in_flight`` by a crash go back
+    to ``pending`` on ``start``. A scheduler claims due rows, never more
+    than ``per_host_limit`` at once for one destination host, and hands
+    them to ``workers`` worker tasks that make a single attempt each. A
+    failed attempt is rescheduled with jittered exponential backoff (the
+    row waits in SQLite, no task sleeps); after the webhook's
+    ``retry_count`` attempts it becomes a dead letter that can be retried
+    by hand.
+    """
+    
+    LATENCY_SAMPLES = 1000
+    
+    def __init__(
+        self,
+        manager,
+        workers: Optional[int] = None,
+        per_host_limit: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+        poll_interval: Optional[float] = None
+    ):
+        self.manager = manager
+        self.db = get_webhooks_db()
+        self.workers = settings.webhook_workers if workers is None else workers
+        self.per_host_limit = settings.webhook_per_host_limit if per_host_limit is None else per_host_limit
+        self.backoff_base = settings.webhook_backoff_base if backoff_base is None else backoff_base
+        self.backoff_max = settings.webhook_backoff_max if backoff_max is None else backoff_max
+        self.poll_interval = settings.webhook_poll_interval if poll_interval is None else poll_interval
+        self.stats = {"enqueued": 0, "delivered": 0, "failed_attempts": 0, "dead": 0}
+        self._in_flight: Counter = Counter()  # host -> requests being sent
+        self._delivery_latency: Deque[float] = deque(maxlen=self.LATENCY_SAMPLES)  # Seconds from enqueue to success
+        self._attempt_latency: Deque[float] = deque(maxlen=self.LATENCY_SAMPLES)  # Milliseconds per request
+        self._jobs: Optional[asyncio.Queue] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self.running = False
+    
+    async def start(self):
+        """Recover interrupted deliveries and start the scheduler and workers"""
+        if self.running:
+            return
+        self.running = True
+        recovered = await run_in_db_thread(self._recover)
+        if recovered:
+            logger.info(f"Requeued {recovered} interrupted webhook deliveries")
+        self._jobs = asyncio.Queue()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._schedule_loop())]
+        self._tasks += [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+    
+    async def stop(self):
+        """Stop the workers; unfinished deliveries resume on the next start"""
+        self.running = False
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._in_flight.clear()
+    
+    async def enqueue(self, entries: List[Tuple[CompiledWebhook, str, Dict[str, Any]]]) -> List[int]:
+        """Store ``(webhook, event_type, payload)`` requests; returns their ids"""
+        if not entries:
+            return []
+        ids = await run_in_db_thread(self._insert, entries)
+        self.stats["enqueued"] += len(ids)
+        self._wake()
+        return ids
+    
+    async def retry(self, delivery_id: int) -> bool:
+        """Send a dead letter again, starting over its attempts"""
+        requeued = await run_in_db_thread(self._requeue, delivery_id)
+        if requeued:
+            self._wake()
+        return requeued
+    
+    def backoff(self, attempts: int) -> float:
+        """Seconds to wait after ``attempts`` failed attempts
+        
+        Exponential with "equal jitter": half the delay is fixed, the other
+        half random, so retries of a burst spread out instead of hitting a
+        recovering endpoint together.
+        """
+        delay = min(self.backoff_max, self.backoff_base * 2 ** max(attempts - 1, 0))
+        return delay / 2 + random.uniform(0, delay / 2)
+    
+    def list_dead(self, webhook_id: Optional[int] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Dead letters, newest first"""
+        with self.db() as db:
+            query = db.query(WebhookDelivery).filter(WebhookDelivery.status == DELIVERY_DEAD)
+            if webhook_id:
+                query = query.filter(WebhookDelivery.webhook_id == webhook_id)
+            return [
+                {
+                    "id": row.id,
+                    "webhook_id": row.webhook_id,
+                    "event_type": row.event_type,
+                    "attempts": row.attempts,
+                    "last_error": row.last_error,
+                    "created_at": row.created_at.isoformat()
+                }
+                for row in query.order_by(WebhookDelivery.id.desc()).limit(limit)
+            ]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth by state, outcome counters and latency percentiles"""
+        with self.db() as db:
+            depth = dict(
+                db.query(WebhookDelivery.status, func.count(WebhookDelivery.id))
+                .group_by(WebhookDelivery.status).all()
+            )
+        return {
+            "queue": {status: depth.get(status, 0) for status in (DELIVERY_PENDING, DELIVERY_IN_FLIGHT, DELIVERY_DEAD)},
+            "in_flight_by_host": dict(self._in_flight),
+            **self.stats,
+            "delivery_latency_s": _percentiles(self._delivery_latency),
+            "attempt_latency_ms": _percentiles(self._attempt_latency)
+        }
+    
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+    
+    # Database work (runs on the DB thread pool)
+    
+    def _recover(self) -> int:
+        with self.db() as db:
+            count = (
+                db.query(WebhookDelivery)
+                .filter(WebhookDelivery.status == DELIVERY_IN_FLIGHT)
+                .update({"status": DELIVERY_PENDING}, synchronize_session=False)
+            )
+            db.commit()
+            return count
+    
+    def _insert(self, entries: List[Tuple[CompiledWebhook, str, Dict[str, Any]]]) -> List[int]:
+        now = datetime.utcnow()
+        with self.db() as db:
+            try:
+                rows = [
+                    WebhookDelivery(
+                        webhook_id=webhook.id,
+                        event_type=event_type,
+                        payload=payload,
+                        host=destination_host(webhook.url),
+                        status=DELIVERY_PENDING,
+                        attempts=0,
+                        next_attempt_at=now,
+                        created_at=now
+                    )
+                    for webhook, event_type, payload in entries
+                ]
+                db.add_all(rows)
+                db.commit()
+                return [row.id for row in rows]
+            except Exception as e:
+                logger.error(f"Error queueing webhook deliveries: {e}", exc_info=True)
+                db.rollback()
+                return []
+    
+    def _claim(self, capacity: int, in_flight: Dict[str, int]) -> List[Dict[str, Any]]:
+        """Mark up to ``capacity`` due deliveries in flight, within the host limits"""
+        saturated = [host for host, count in in_flight.items() if count >= self.per_host_limit]
+        with self.db() as db:
+            try:
+                query = db.query(WebhookDelivery).filter(
+                    WebhookDelivery.status == DELIVERY_PENDING,
+                    WebhookDelivery.next_attempt_at <= datetime.utcnow()
+                )
+                if saturated:
+                    query = query.filter(WebhookDelivery.host.notin_(saturated))
+                rows = query.order_by(WebhookDelivery.next_attempt_at).limit(capacity * 4).all()
+                
+                hosts = Counter(in_flight)
+                claimed = []
+                for row in rows:
+                    if len(claimed) == capacity:
+                        break
+                    if hosts[row.host] >= self.per_host_limit:
+                        continue
+                    hosts[row.host] += 1
+                    row.status = DELIVERY_IN_FLIGHT
+                    claimed.append({
+                        "id": row.id,
+                        "webhook_id": row.webhook_id,
+                        "event_type": row.event_type,
+                        "payload": row.payload,
+                        "host": row.host,
+                        "created_at": row.created_at
+                    })
+                db.commit()
+                return claimed
+            except Exception as e:
+                logger.error(f"Error claiming webhook deliveries: {e}", exc_info=True)
+                db.rollback()
+                return []
+    
+    def _finish(
+        self,
+        job: Dict[str, Any],
+        webhook: Optional[CompiledWebhook],
+        result: Optional[Dict[str, Any]]
+    ) -> Optional[str]:
+        """Record an attempt; returns the outcome (delivered, retry or dead)"""
+        with self.db() as db:
+            try:
+                row = db.get(WebhookDelivery, job["id"])
+                if row is None:
+                    return None
+                if webhook is not None:
+                    row.attempts += 1
+                
+                if result is not None and result["success"]:
+                    outcome = "delivered"
+                    db.delete(row)
+                elif webhook is None or row.attempts >= webhook.retry_count:
+                    outcome = "dead"
+                    row.status = DELIVERY_DEAD
+                    row.last_error = result["error_message"] if result else "Webhook deleted or disabled"
+                else:
+                    outcome = "retry"
+                    row.status = DELIVERY_PENDING
+                    row.last_error = result["error_message"]
+                    row.next_attempt_at = datetime.utcnow() + timedelta(seconds=self.backoff(row.attempts))
+                db.commit()
+                return outcome
+            except Exception as e:
+                logger.error(f"Error recording webhook delivery {job['id']}: {e}", exc_info=True)
+                db.rollback()
+                return None
+    
+    def _requeue(self, delivery_id: int) -> bool:
+        with self.db() as db:
+            row = db.get(WebhookDelivery, delivery_id)
+            if row is None or row.status != DELIVERY_DEAD:
+                return False
+            row.status = DELIVERY_PENDING
+            row.attempts = 0
+            row.next_attempt_at = datetime.utcnow()
+            db.commit()
+            return True
+    
+    # Event loop tasks
+    
+    async def _schedule_loop(self):
+        while self.running:
+            self._wakeup.clear()
+            capacity = self.workers - sum(self._in_flight.values())
+            claimed = []
+            if capacity > 0:
+                claimed = await run_in_db_thread(self._claim, capacity, dict(self._in_flight))
+                for job in claimed:
+                    self._in_flight[job["host"]] += 1
+                    self._jobs.put_nowait(job)
+            if claimed and len(claimed) < capacity:
+                continue  # More may be due for other hosts
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def _worker(self):
+        while self.running:
+            job = await self._jobs.get()
+            try:
+                await self._process(job)
+            except Exception as e:
+                logger.error(f"Error delivering webhook {job['webhook_id']}: {e}", exc_info=True)
+            finally:
+                self._in_flight[job["host"]] -= 1
+                if self._in_flight[job["host"]] <= 0:
+                    del self._in_flight[job["host"]]
+                self._wake()
+    
+    async def _process(self, job: Dict[str, Any]):
+        webhook = await self.manager.subscriptions.get_async(job["webhook_id"])
+        result = None
+        if webhook is not None:
+            result = await self.manager.send(webhook, job["payload"])
+            self._attempt_latency.append(result["response_time_ms"])
+        
+        outcome = await run_in_db_thread(self._finish, job, webhook, result)
+        if outcome in ("delivered", "dead") and webhook is not None:
+            self.manager.log_delivery(webhook, job["payload"], result, job["event_type"])
+        if result is not None and not result["success"]:
+            self.stats["failed_attempts"] += 1
+        if outcome == "delivered":
+            self.stats["delivered"] += 1
+            self._delivery_latency.append((datetime.utcnow() - job["created_at"]).total_seconds())
+        elif outcome == "dead":
+            self.stats["dead"] += 1
+            logger.warning(f"Webhook {job['webhook_id']} delivery {job['id']} moved to dead letters")
@@ -1,7 +1,6 @@
 """Event dispatcher for webhook triggers"""
 
 import logging
-import asyncio
 from typing import Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
@@ -12,7 +11,6 @@ class EventDispatcher:
     
     def __init__(self, webhook_manager=None):
         self.webhook_manager = webhook_manager
-        self._pending_tasks = []
     
     async def dispatch_event(
         self,
@@ -20,28 +18,18 @@ class EventDispatcher:
         event_data: Dict[str, Any],
         user_id: str = "default"
     ):
-        """Dispatch an event to all relevant webhooks"""
+        """Dispatch an event to the webhooks subscribed to it
+        
+        Subscribers come from the webhook manager's in-memory index, so
+        nothing is read from the database; the matching webhooks are written
+        to the delivery queue in one transaction and sent by its workers.
+        """
         if not self.webhook_manager:
             return
         
-        # Get all webhooks
-        webhooks = self.webhook_manager.list_webhooks(user_id)
-        
-        # Trigger relevant webhooks asynchronously
-        for webhook in webhooks:
-            if webhook.enabled:
-                task = asyncio.create_task(
-                    self.webhook_manager.trigger_webhook(
-                        webhook.id,
-                        event_type,
-                        event_data,
-                        user_id
-                    )
-                )
-                self._pending_tasks.append(task)
-        
-        # Clean up completed tasks
-        self._pending_tasks = [t for t in self._pending_tasks if not t.done()]
+        webhooks = await self.webhook_manager.subscriptions.match_async(event_type, user_id)
+        if webhooks:
+            await self.webhook_manager.enqueue(webhooks, event_type, event_data)
     
     async def device_changed(
         self,
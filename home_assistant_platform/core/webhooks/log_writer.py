@@ -0,0 +1,162 @@
+"""Webhook log writer - buffers delivery logs and writes them in batches"""
+
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func, insert
+from home_assistant_platform.config.settings import settings
+from home_assistant_platform.core.database import get_engine, run_in_db_thread
+from home_assistant_platform.core.webhooks.models import WebhookLog, WEBHOOK_LOG_INDEX, get_webhooks_db
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookLogWriter:
+    """Buffered writer for ``webhook_logs``
+    
+    ``write`` only appends to an in-memory buffer. A background task writes
+    the buffer in one multi-row insert on the DB thread pool every
+    ``flush_interval_ms``, or as soon as ``batch_size`` rows are waiting,
+    so a burst of deliveries costs one commit instead of one per row.
+    Rows a failed write could not save are retried with the next batch, up
+    to ``MAX_BUFFERED`` rows. Every ``PRUNE_INTERVAL`` logs older than
+    ``retention_days`` are deleted, and each webhook keeps at most its
+    newest ``max_rows`` logs (0 disables either limit).
+    """
+    
+    PRUNE_INTERVAL = 3600  # Seconds between retention passes
+    MAX_BUFFERED = 10_000  # Rows kept while the database is failing
+    
+    def __init__(
+        self,
+        flush_interval_ms: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        retention_days: Optional[int] = None,
+        max_rows: Optional[int] = None
+    ):
+        self.db = get_webhooks_db()
+        self.flush_interval_ms = settings.webhook_log_flush_ms if flush_interval_ms is None else flush_interval_ms
+        self.batch_size = settings.webhook_log_batch_size if batch_size is None else batch_size
+        self.retention_days = settings.webhook_log_retention_days if retention_days is None else retention_days
+        self.max_rows = settings.webhook_log_max_rows if max_rows is None else max_rows
+        self.stats = {"written": 0, "dropped": 0, "pruned": 0}
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self.flush_task: Optional[asyncio.Task] = None
+        self.running = False
+    
+    def __len__(self) -> int:
+        """Rows waiting to be written"""
+        return len(self._buffer)
+    
+    def write(self, entry: Dict[str, Any]):
+        """Buffer one ``webhook_logs`` row (column name -> value)"""
+        entry.setdefault("created_at", datetime.utcnow())
+        with self._lock:
+            self._buffer.append(entry)
+            full = len(self._buffer) >= self.batch_size
+        if full and self._wakeup is not None:
+            self._wakeup.set()
+    
+    async def start(self):
+        """Make sure the log index exists and start the flush task"""
+        if self.running:
+            return
+        self.running = True
+        await run_in_db_thread(self.ensure_index)
+        self._wakeup = asyncio.Event()
+        self.flush_task = asyncio.create_task(self._flush_loop())
+    
+    async def stop(self):
+        """Stop the flush task and write what is still buffered"""
+        self.running = False
+        if self.flush_task:
+            self.flush_task.cancel()
+            try:
+                await self.flush_task
+            except asyncio.CancelledError:
+                pass
+            self.flush_task = None
+        await run_in_db_thread(self.flush)
+    
+    def ensure_index(self):
+        """Create the (webhook_id, created_at) index on databases made before it existed"""
+        WEBHOOK_LOG_INDEX.create(get_engine("webhooks"), checkfirst=True)
+    
+    def flush(self) -> int:
+        """Write the buffered rows in one transaction; returns how many"""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+        
+        with self.db() as db:
+            try:
+                db.execute(insert(WebhookLog), rows)
+                db.commit()
+            except Exception as e:
+                logger.error(f"Error writing {len(rows)} webhook logs: {e}", exc_info=True)
+                db.rollback()
+                with self._lock:
+                    self._buffer = rows + self._buffer  # Retry with the next flush
+                    overflow = len(self._buffer) - self.MAX_BUFFERED
+                    if overflow > 0:
+                        del self._buffer[:overflow]
+                        self.stats["dropped"] += overflow
+                return 0
+        self.stats["written"] += len(rows)
+        return len(rows)
+    
+    def prune(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Delete logs past the age limit and beyond each webhook's row limit"""
+        deleted = {"expired": 0, "excess": 0}
+        with self.db() as db:
+            try:
+                if self.retention_days:
+                    cutoff = (now or datetime.utcnow()) - timedelta(days=self.retention_days)
+                    deleted["expired"] = db.query(WebhookLog).filter(
+                        WebhookLog.created_at < cutoff
+                    ).delete(synchronize_session=False)
+                
+                if self.max_rows:
+                    over = db.query(WebhookLog.webhook_id).group_by(WebhookLog.webhook_id).having(
+                        func.count(WebhookLog.id) > self.max_rows
+                    ).all()
+                    for (webhook_id,) in over:
+                        # Id of the newest log past the limit; it and everything older goes
+                        boundary = db.query(WebhookLog.id).filter(
+                            WebhookLog.webhook_id == webhook_id
+                        ).order_by(WebhookLog.id.desc()).offset(self.max_rows).limit(1).scalar()
+                        deleted["excess"] += db.query(WebhookLog).filter(
+                            WebhookLog.webhook_id == webhook_id,
+                            WebhookLog.id <= boundary
+                        ).delete(synchronize_session=False)
+                db.commit()
+            except Exception as e:
+                logger.error(f"Error pruning webhook logs: {e}", exc_info=True)
+                db.rollback()
+                return {"expired": 0, "excess": 0}
+        
+        self.stats["pruned"] += sum(deleted.values())
+        if any(deleted.values()):
+            logger.info(f"Webhook log retention removed {deleted}")
+        return deleted
+    
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        last_prune = None
+        while self.running:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await run_in_db_thread(self.flush)
+            
+            now = loop.time()
+            if last_prune is None or now - last_prune >= self.PRUNE_INTERVAL:
+                last_prune = now
+                await run_in_db_thread(self.prune)
@@ -2,16 +2,23 @@
 
 import logging
 from datetime import datetime
-from typing import Dict, Optional, Any, List
-from sqlalchemy import Column, String, Float, Integer, Boolean, DateTime, Text, JSON
+from typing import Callable, Dict, Optional, Any, List
+from sqlalchemy import Column, String, Float, Integer, Boolean, DateTime, Text, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
-from home_assistant_platform.config.settings import settings
+from home_assistant_platform.core.database import (
+    register_store, get_scoped_session, session_dependency
+)
 
 logger = logging.getLogger(__name__)
 
 Base = declarative_base()
+register_store("webhooks", Base.metadata)
+
+# Delivery modes: one request per event, or buffered events sent as a JSON array
+MODE_IMMEDIATE = "immediate"
+MODE_BATCH = "batch"  # Every event of the window
+MODE_COALESCE = "coalesce"  # Latest event per coalesce_key value (e.g. per device)
+DELIVERY_MODES = (MODE_IMMEDIATE, MODE_BATCH, MODE_COALESCE)
 
 
 class Webhook(Base):
@@ -39,12 +46,27 @@ class Webhook(Base):
     timeout = Column(Integer, default=10)  # Request timeout in seconds
     retry_count = Column(Integer, default=3)
     
+    # Delivery
+    delivery_mode = Column(String, default=MODE_IMMEDIATE)
+    batch_window_ms = Column(Integer, default=1000)  # How long events are buffered
+    batch_max_size = Column(Integer, default=100)  # Buffered events that close the window early
+    coalesce_key = Column(String, default="device_id")  # Event data field naming the device
+    
     # Metadata
     user_id = Column(String, default="default")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+# Columns added after release; create_all does not add them to existing tables
+WEBHOOK_ADDED_COLUMNS = {
+    "delivery_mode": f"VARCHAR DEFAULT '{MODE_IMMEDIATE}'",
+    "batch_window_ms": "INTEGER DEFAULT 1000",
+    "batch_max_size": "INTEGER DEFAULT 100",
+    "coalesce_key": "VARCHAR DEFAULT 'device_id'",
+}
+
+
 class WebhookLog(Base):
     """Webhook execution log"""
     __tablename__ = "webhook_logs"
@@ -72,12 +94,68 @@ class WebhookLog(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+# Serves the per-webhook log listing and count-based retention
+WEBHOOK_LOG_INDEX = Index("idx_webhook_logs_webhook_created", WebhookLog.webhook_id, WebhookLog.created_at)
+
+
+# Delivery states (delivered requests are removed from the outbox)
+DELIVERY_PENDING = "pending"
+DELIVERY_IN_FLIGHT = "in_flight"
+DELIVERY_DEAD = "dead"
+
+
+class WebhookDelivery(Base):
+    """Outbound webhook request waiting in the delivery outbox"""
+    __tablename__ = "webhook_deliveries"
+    __table_args__ = (Index("ix_webhook_deliveries_due", "status", "next_attempt_at"),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    webhook_id = Column(Integer, nullable=False, index=True)
+    event_type = Column(String)
+    payload = Column(JSON)  # Rendered when the event was enqueued
+    host = Column(String)  # Destination host, for per-host concurrency limits
+    
+    # Scheduling
+    status = Column(String, default=DELIVERY_PENDING)
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    last_error = Column(Text)
+    
+    # Metadata
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+# Change notifications - the subscription index subscribes to these
+_change_listeners: List[Callable[[Optional[int]], None]] = []
+
+
+def add_webhook_change_listener(callback: Callable[[Optional[int]], None]):
+    """Register a callback invoked with the id of a changed webhook (None = all)"""
+    if callback not in _change_listeners:
+        _change_listeners.append(callback)
+
+
+def remove_webhook_change_listener(callback: Callable[[Optional[int]], None]):
+    """Unregister a change callback"""
+    if callback in _change_listeners:
+        _change_listeners.remove(callback)
+
+
+def notify_webhooks_changed(webhook_id: Optional[int] = None):
+    """Tell listeners that a webhook was created, updated or deleted"""
+    for callback in list(_change_listeners):
+        try:
+            callback(webhook_id)
+        except Exception as e:
+            logger.error(f"Error in webhook change listener: {e}", exc_info=True)
+
+
 # Database setup
 def get_webhooks_db():
     """Get database session for webhooks"""
-    db_path = settings.data_dir / "webhooks.db"
-    engine = create_engine(f"sqlite:///{db_path}", echo=False)
-    Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
-    return Session()
+    return get_scoped_session("webhooks")
+
+
+# FastAPI dependency yielding a per-request session
+get_webhooks_session = session_dependency("webhooks")
 
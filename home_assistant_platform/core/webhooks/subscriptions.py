@@ -0,0 +1,176 @@
+"""Webhook subscriptions - enabled webhooks indexed by the events they fire on"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+from home_assistant_platform.core.database import run_in_db_thread
+from home_assistant_platform.core.webhooks.models import (
+    Webhook, get_webhooks_db, add_webhook_change_listener, remove_webhook_change_listener, MODE_IMMEDIATE
+)
+
+logger = logging.getLogger(__name__)
+
+# Built-in event types and the flag that subscribes a webhook to each
+TRIGGER_FLAGS = {
+    "device_change": "trigger_on_device_change",
+    "scene_activate": "trigger_on_scene_activate",
+    "automation_run": "trigger_on_automation_run",
+    "voice_command": "trigger_on_voice_command",
+}
+
+
+@dataclass(frozen=True)
+class CompiledWebhook:
+    """Everything needed to deliver one webhook, detached from the session"""
+    id: int
+    name: str
+    url: str
+    method: str
+    headers: Dict[str, str]
+    payload_template: Optional[str]
+    secret: Optional[str]
+    timeout: int
+    retry_count: int
+    user_id: str
+    event_types: FrozenSet[str]
+    delivery_mode: str = MODE_IMMEDIATE
+    batch_window_ms: int = 1000
+    batch_max_size: int = 100
+    coalesce_key: str = "device_id"
+
+
+def event_types(webhook: Webhook) -> FrozenSet[str]:
+    """Event types a webhook fires on"""
+    types = {event for event, flag in TRIGGER_FLAGS.items() if getattr(webhook, flag)}
+    if webhook.trigger_on_custom_event:
+        types.update(webhook.custom_event_types or [])
+    return frozenset(types)
+
+
+def compile_webhook(webhook: Webhook) -> CompiledWebhook:
+    return CompiledWebhook(
+        id=webhook.id,
+        name=webhook.name,
+        url=webhook.url,
+        method=webhook.method or "POST",
+        headers=dict(webhook.headers or {}),
+        payload_template=webhook.payload_template,
+        secret=webhook.secret,
+        timeout=webhook.timeout or 10,
+        retry_count=webhook.retry_count or 1,
+        user_id=webhook.user_id or "default",
+        event_types=event_types(webhook),
+        delivery_mode=webhook.delivery_mode or MODE_IMMEDIATE,
+        batch_window_ms=webhook.batch_window_ms if webhook.batch_window_ms is not None else 1000,
+        batch_max_size=webhook.batch_max_size or 100,
+        coalesce_key=webhook.coalesce_key or "device_id"
+    )
+
+
+class SubscriptionIndex:
+    """In-memory index of enabled webhooks keyed by (user, event type)
+    
+    Loaded once, then kept current by ``notify_webhooks_changed``: every
+    create/update/delete path calls it, and only the changed webhook is
+    reloaded on the next lookup. Dispatching an event is a dict lookup
+    returning just the webhooks subscribed to it.
+    """
+    
+    def __init__(self):
+        self.db = get_webhooks_db()
+        self._lock = threading.RLock()
+        self._webhooks: Dict[int, CompiledWebhook] = {}  # Enabled webhooks only
+        self._by_event: Dict[Tuple[str, str], Dict[int, CompiledWebhook]] = {}
+        self._stale: Set[int] = set()
+        self._loaded = False
+        add_webhook_change_listener(self.invalidate)
+    
+    def close(self):
+        """Stop listening for webhook changes"""
+        remove_webhook_change_listener(self.invalidate)
+    
+    @property
+    def current(self) -> bool:
+        """Whether lookups can be answered without the database"""
+        return self._loaded and not self._stale
+    
+    def invalidate(self, webhook_id: Optional[int] = None):
+        """Reload one webhook (or all, when None) on the next lookup"""
+        with self._lock:
+            if webhook_id is None:
+                self._loaded = False
+                self._stale.clear()
+            else:
+                self._stale.add(webhook_id)
+    
+    def match(self, event_type: str, user_id: str = "default") -> List[CompiledWebhook]:
+        """Enabled webhooks of a user subscribed to an event type"""
+        if not self.current:
+            self.refresh()
+        return list(self._by_event.get((user_id, event_type), {}).values())
+    
+    async def match_async(self, event_type: str, user_id: str = "default") -> List[CompiledWebhook]:
+        """Like ``match``, but reloads on the DB thread pool after a change"""
+        if not self.current:
+            await run_in_db_thread(self.refresh)
+        return self.match(event_type, user_id)
+    
+    def get(self, webhook_id: int) -> Optional[CompiledWebhook]:
+        """An enabled webhook by id"""
+        if not self.current:
+            self.refresh()
+        return self._webhooks.get(webhook_id)
+    
+    async def get_async(self, webhook_id: int) -> Optional[CompiledWebhook]:
+        if not self.current:
+            await run_in_db_thread(self.refresh)
+        return self.get(webhook_id)
+    
+    def refresh(self):
+        """Load what changed since the last lookup"""
+        with self._lock:
+            if not self._loaded:
+                self._load(None)
+            elif self._stale:
+                self._load(list(self._stale))
+    
+    def _load(self, webhook_ids: Optional[List[int]]):
+        """Load and index webhooks from the database (lock held)"""
+        with self.db() as db:
+            query = db.query(Webhook).filter(Webhook.enabled == True)
+            if webhook_ids is not None:
+                query = query.filter(Webhook.id.in_(webhook_ids))
+            compiled = [compile_webhook(webhook) for webhook in query.all()]
+        
+        # Build new mappings and swap them in, so lock-free readers never see a partial index
+        if webhook_ids is None:
+            webhooks: Dict[int, CompiledWebhook] = {}
+            by_event: Dict[Tuple[str, str], Dict[int, CompiledWebhook]] = {}
+        else:
+            webhooks = dict(self._webhooks)
+            by_event = {key: dict(subscribers) for key, subscribers in self._by_event.items()}
+            for webhook_id in webhook_ids:
+                previous = webhooks.pop(webhook_id, None)
+                if previous is not None:
+                    for event_type in previous.event_types:
+                        by_event.get((previous.user_id, event_type), {}).pop(webhook_id, None)
+        
+        for webhook in compiled:
+            webhooks[webhook.id] = webhook
+            for event_type in webhook.event_types:
+                by_event.setdefault((webhook.user_id, event_type), {})[webhook.id] = webhook
+        
+        self._webhooks, self._by_event = webhooks, by_event
+        if webhook_ids is None:
+            self._loaded = True
+            self._stale.clear()
+        else:
+            self._stale.difference_update(webhook_ids)
+        logger.debug(f"Indexed {len(compiled)} webhooks")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "webhooks": len(self._webhooks),
+            "subscriptions": sum(len(subscribers) for subscribers in self._by_event.values())
+        }
@@ -0,0 +1,175 @@
+"""Webhook payload templates - compiled once in a shared sandbox and cached"""
+
+import hashlib
+import json
+import logging
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from jinja2 import Template, TemplateSyntaxError
+from jinja2.sandbox import SandboxedEnvironment
+
+logger = logging.getLogger(__name__)
+
+# One sandbox for every webhook: templates are user input and must not reach Python internals
+environment = SandboxedEnvironment()
+
+_SLOT = re.compile(r"\{\{(.*?)\}\}", re.S)
+_QUOTED = "\ue000"  # Marks a {{ }} slot inside a JSON string
+_BARE = "\ue001"  # Marks a {{ }} slot standing in for a JSON value
+_END = "\ue002"
+_MARKER = re.compile(f"[{_QUOTED}{_BARE}](\\d+){_END}")
+_SEPARATOR = "\ue003"  # Between slot values in a single render
+
+Builder = Callable[[List[str]], Any]
+
+
+class TemplateError(ValueError):
+    """Raised when a payload template does not compile"""
+
+
+class PayloadTemplate:
+    """A compiled payload template
+    
+    Templates that are JSON with ``{{ }}`` substitutions (no ``{% %}``
+    blocks) are parsed once into a tree of constants and slots. Rendering
+    then evaluates every slot in a single pass and fills the tree, building
+    the payload dict without parsing the whole output. Slots inside a JSON
+    string are inserted as text (escaping is no longer the template's
+    problem); bare slots (``{"level": {{ event_data.brightness }}}``) are
+    parsed as JSON values, as the full render would. Every other template
+    is rendered to text and parsed.
+    """
+    
+    def __init__(self, source: str):
+        self.source = source
+        try:
+            self.template = environment.from_string(source)
+            compiled = _compile_json(source)
+        except TemplateSyntaxError as e:
+            raise TemplateError(f"Invalid payload template (line {e.lineno}): {e.message}") from e
+        self.fast = compiled is not None
+        if compiled is not None:
+            self._slots, self._build, self._count = compiled
+    
+    def render(self, context: Dict[str, Any]) -> Any:
+        if not self.fast:
+            return json.loads(self.template.render(context))
+        values = self._slots.render(context).split(_SEPARATOR) if self._count else []
+        if len(values) != self._count:
+            return json.loads(self.template.render(context))  # A value contained the separator
+        return self._build(values)
+
+
+def _compile_json(source: str) -> Optional[Tuple[Template, Builder, int]]:
+    """Slot template, tree builder and slot count for a JSON template, or None if it is not one"""
+    if "{%" in source or "{#" in source or "{{-" in source or "-}}" in source:
+        return None
+    marked = _mark_slots(source)
+    if marked is None:
+        return None
+    text, expressions = marked
+    try:
+        structure = json.loads(text)
+    except ValueError:
+        return None
+    slots = environment.from_string(_SEPARATOR.join("{{ " + expression + " }}" for expression in expressions))
+    return slots, _compile_node(structure), len(expressions)
+
+
+def _mark_slots(source: str) -> Optional[Tuple[str, List[str]]]:
+    """Replace each ``{{ }}`` with a marker that keeps the text parseable as JSON"""
+    parts: List[str] = []
+    expressions: List[str] = []
+    in_string = escaped = False
+    i = 0
+    while i < len(source):
+        if source.startswith("{{", i):
+            match = _SLOT.match(source, i)
+            if match is None:
+                return None
+            marker = f"{_QUOTED if in_string else _BARE}{len(expressions)}{_END}"
+            parts.append(marker if in_string else f'"{marker}"')
+            expressions.append(match.group(1).strip())
+            i = match.end()
+            continue
+        char = source[i]
+        if escaped:
+            escaped = False
+        elif in_string and char == "\\":
+            escaped = True
+        elif char == '"':
+            in_string = not in_string
+        parts.append(char)
+        i += 1
+    return "".join(parts), expressions
+
+
+def _compile_node(node: Any) -> Builder:
+    """Function building ``node`` from the rendered slot values"""
+    if isinstance(node, dict):
+        items = [(_compile_node(key), _compile_node(value)) for key, value in node.items()]
+        return lambda values: {key(values): value(values) for key, value in items}
+    if isinstance(node, list):
+        builders = [_compile_node(value) for value in node]
+        return lambda values: [build(values) for build in builders]
+    if not isinstance(node, str) or not _MARKER.search(node):
+        return lambda values: node
+    
+    whole = _MARKER.fullmatch(node)
+    if whole:
+        index = int(whole.group(1))
+        if node[0] == _BARE:
+            return lambda values: json.loads(values[index])
+        return lambda values: values[index]
+    
+    # Text around slots: alternate literal parts and slot indexes
+    pieces = _MARKER.split(node)
+    literals, indexes = pieces[0::2], [int(index) for index in pieces[1::2]]
+    
+    def build(values: List[str]) -> str:
+        parts = [literals[0]]
+        for index, literal in zip(indexes, literals[1:]):
+            parts.append(values[index])
+            parts.append(literal)
+        return "".join(parts)
+    
+    return build
+
+
+def template_hash(source: str) -> str:
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def validate_template(source: Optional[str]):
+    """Raise ``TemplateError`` if a payload template does not compile"""
+    if source:
+        PayloadTemplate(source)
+
+
+class TemplateCache:
+    """Compiled payload templates keyed by webhook id and template hash
+    
+    A webhook keeps one entry; editing its template changes the hash, so
+    the next delivery compiles the new source in place of the old one.
+    """
+    
+    def __init__(self):
+        self._templates: Dict[int, Tuple[str, PayloadTemplate]] = {}
+        self.stats = {"hits": 0, "compiles": 0}
+    
+    def get(self, webhook_id: int, source: str) -> PayloadTemplate:
+        digest = template_hash(source)
+        cached = self._templates.get(webhook_id)
+        if cached is not None and cached[0] == digest:
+            self.stats["hits"] += 1
+            return cached[1]
+        template = PayloadTemplate(source)
+        self._templates[webhook_id] = (digest, template)
+        self.stats["compiles"] += 1
+        return template
+    
+    def discard(self, webhook_id: int):
+        self._templates.pop(webhook_id, None)
+    
+    def __len__(self) -> int:
+        return len(self._templates)
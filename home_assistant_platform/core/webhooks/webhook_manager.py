@@ -6,8 +6,17 @@ import aiohttp
 import time
 from typing import Dict, Optional, Any, List
 from datetime import datetime
-from jinja2 import Template
-from home_assistant_platform.core.webhooks.models import Webhook, WebhookLog, get_webhooks_db
+from sqlalchemy import inspect, text
+from home_assistant_platform.core.database import get_engine, init_store, run_in_db_thread
+from home_assistant_platform.core.webhooks.models import (
+    Webhook, WebhookLog, WebhookDelivery, get_webhooks_db, notify_webhooks_changed,
+    DELIVERY_MODES, MODE_IMMEDIATE, WEBHOOK_ADDED_COLUMNS
+)
+from home_assistant_platform.core.webhooks.batching import BatchBuffer
+from home_assistant_platform.core.webhooks.delivery_queue import DeliveryQueue
+from home_assistant_platform.core.webhooks.log_writer import WebhookLogWriter
+from home_assistant_platform.core.webhooks.subscriptions import CompiledWebhook, SubscriptionIndex
+from home_assistant_platform.core.webhooks.templates import TemplateCache, validate_template
 
 logger = logging.getLogger(__name__)
 
@@ -18,13 +27,38 @@ class WebhookManager:
     def __init__(self):
         self.db = get_webhooks_db()
         self.session: Optional[aiohttp.ClientSession] = None
+        self.subscriptions = SubscriptionIndex()
+        self.queue = DeliveryQueue(self)
+        self.templates = TemplateCache()
+        self.batches = BatchBuffer(self.queue)
+        self.logs = WebhookLogWriter()
     
     async def initialize(self):
-        """Initialize async session"""
+        """Initialize async session and start the delivery workers and log writer"""
+        await run_in_db_thread(self.ensure_schema)
         self.session = aiohttp.ClientSession()
+        await self.logs.start()
+        await self.queue.start()
+    
+    def ensure_schema(self):
+        """Add the columns missing from a webhooks table created by an older version"""
+        init_store("webhooks")
+        engine = get_engine("webhooks")
+        existing = {column["name"] for column in inspect(engine).get_columns("webhooks")}
+        missing = [name for name in WEBHOOK_ADDED_COLUMNS if name not in existing]
+        if not missing:
+            return
+        with engine.begin() as connection:
+            for name in missing:
+                connection.execute(text(f"ALTER TABLE webhooks ADD COLUMN {name} {WEBHOOK_ADDED_COLUMNS[name]}"))
+        logger.info(f"Added webhook columns: {', '.join(missing)}")
     
     async def cleanup(self):
-        """Cleanup async session"""
+        """Flush open batches and logs, stop the delivery workers and cleanup async session"""
+        await self.batches.close()
+        await self.queue.stop()
+        await self.logs.stop()
+        self.subscriptions.close()
         if self.session:
             await self.session.close()
     
@@ -45,9 +79,19 @@ class WebhookManager:
         enabled: bool = True,
         timeout: int = 10,
         retry_count: int = 3,
+        delivery_mode: str = MODE_IMMEDIATE,
+        batch_window_ms: int = 1000,
+        batch_max_size: int = 100,
+        coalesce_key: str = "device_id",
         user_id: str = "default"
     ) -> Webhook:
-        """Create a new webhook"""
+        """Create a new webhook
+        
+        Raises ``ValueError`` (``TemplateError`` for the payload template) for
+        invalid settings.
+        """
+        validate_template(payload_template)
+        self._validate_delivery(delivery_mode, batch_window_ms, batch_max_size)
         with self.db() as db:
             webhook = Webhook(
                 name=name,
@@ -65,13 +109,46 @@ class WebhookManager:
                 enabled=enabled,
                 timeout=timeout,
                 retry_count=retry_count,
+                delivery_mode=delivery_mode,
+                batch_window_ms=batch_window_ms,
+                batch_max_size=batch_max_size,
+                coalesce_key=coalesce_key,
                 user_id=user_id
             )
             db.add(webhook)
             db.commit()
             db.refresh(webhook)
             logger.info(f"Created webhook: {name} -> {url}")
-            return webhook
+        notify_webhooks_changed(webhook.id)
+        return webhook
+    
+    def update_webhook(self, webhook_id: int, user_id: str = "default", **changes) -> Optional[Webhook]:
+        """Update a webhook's fields (None values are left unchanged)"""
+        validate_template(changes.get("payload_template"))
+        self._validate_delivery(
+            changes.get("delivery_mode"), changes.get("batch_window_ms"), changes.get("batch_max_size")
+        )
+        with self.db() as db:
+            webhook = db.query(Webhook).filter_by(id=webhook_id, user_id=user_id).first()
+            if not webhook:
+                return None
+            for field, value in changes.items():
+                if value is not None:
+                    setattr(webhook, field, value)
+            db.commit()
+            db.refresh(webhook)
+            logger.info(f"Updated webhook: {webhook.name}")
+        notify_webhooks_changed(webhook_id)
+        return webhook
+    
+    @staticmethod
+    def _validate_delivery(mode: Optional[str], window_ms: Optional[int], max_size: Optional[int]):
+        if mode is not None and mode not in DELIVERY_MODES:
+            raise ValueError(f"Unknown delivery mode {mode!r}, expected one of {', '.join(DELIVERY_MODES)}")
+        if window_ms is not None and window_ms < 0:
+            raise ValueError("batch_window_ms must not be negative")
+        if max_size is not None and max_size < 1:
+            raise ValueError("batch_max_size must be at least 1")
     
     def list_webhooks(self, user_id: str = "default") -> List[Webhook]:
         """List all webhooks"""
@@ -90,42 +167,53 @@ class WebhookManager:
         event_data: Dict[str, Any],
         user_id: str = "default"
     ) -> bool:
-        """Trigger a webhook"""
-        webhook = self.get_webhook(webhook_id, user_id)
-        if not webhook or not webhook.enabled:
+        """Queue an event for a webhook if it is enabled and subscribed to it"""
+        webhook = await self.subscriptions.get_async(webhook_id)
+        if not webhook or webhook.user_id != user_id or event_type not in webhook.event_types:
             return False
         
-        # Check if webhook should be triggered for this event
-        should_trigger = False
-        if event_type == "device_change" and webhook.trigger_on_device_change:
-            should_trigger = True
-        elif event_type == "scene_activate" and webhook.trigger_on_scene_activate:
-            should_trigger = True
-        elif event_type == "automation_run" and webhook.trigger_on_automation_run:
-            should_trigger = True
-        elif event_type == "voice_command" and webhook.trigger_on_voice_command:
-            should_trigger = True
-        elif event_type in webhook.custom_event_types and webhook.trigger_on_custom_event:
-            should_trigger = True
-        
-        if not should_trigger:
-            return False
-        
-        # Execute webhook
-        return await self._execute_webhook(webhook, event_type, event_data)
+        return await self.deliver(webhook, event_type, event_data)
     
-    async def _execute_webhook(
+    async def deliver(self, webhook: CompiledWebhook, event_type: str, event_data: Dict[str, Any]) -> bool:
+        """Queue an event for a webhook already matched to it"""
+        return await self.enqueue([webhook], event_type, event_data) > 0
+    
+    async def enqueue(
         self,
-        webhook: Webhook,
+        webhooks: List[CompiledWebhook],
         event_type: str,
         event_data: Dict[str, Any]
-    ) -> bool:
-        """Execute a webhook request"""
-        if not self.session:
-            await self.initialize()
+    ) -> int:
+        """Render an event for each webhook and hand it to the delivery queue
         
-        # Prepare payload
-        payload = self._prepare_payload(webhook, event_type, event_data)
+        Immediate webhooks get a queued delivery each; batching webhooks
+        buffer the event until their window closes. Returns how many
+        webhooks accepted the event; a webhook whose payload cannot be
+        rendered or buffered is logged and skipped.
+        """
+        entries = []
+        batched = 0
+        for webhook in webhooks:
+            try:
+                payload = self._prepare_payload(webhook, event_type, event_data)
+            except Exception as e:
+                logger.error(f"Error rendering payload for webhook {webhook.name}: {e}")
+                continue
+            if webhook.delivery_mode == MODE_IMMEDIATE:
+                entries.append((webhook, event_type, payload))
+                continue
+            try:
+                await self.batches.add(webhook, event_type, event_data, payload)
+            except Exception as e:
+                logger.error(f"Error buffering event for webhook {webhook.name}: {e}", exc_info=True)
+                continue
+            batched += 1
+        return len(await self.queue.enqueue(entries)) + batched
+    
+    async def send(self, webhook: CompiledWebhook, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Make one request to a webhook (retries are scheduled by the queue)"""
+        if not self.session:
+            self.session = aiohttp.ClientSession()
         
         # Prepare headers
         headers = webhook.headers.copy() if webhook.headers else {}
@@ -133,74 +221,51 @@ class WebhookManager:
         if webhook.secret:
             headers["X-Webhook-Secret"] = webhook.secret
         
-        # Execute request with retries
-        success = False
-        error_message = None
-        response_status = None
-        response_body = None
-        response_time_ms = 0
-        
-        for attempt in range(webhook.retry_count):
-            try:
-                start_time = time.time()
-                
-                async with self.session.request(
-                    method=webhook.method,
-                    url=webhook.url,
-                    json=payload,
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=webhook.timeout)
-                ) as response:
-                    response_time_ms = (time.time() - start_time) * 1000
-                    response_status = response.status
-                    response_body = await response.text()
-                    
-                    if response.status < 400:
-                        success = True
-                        break
-                    else:
-                        error_message = f"HTTP {response.status}: {response_body[:200]}"
-            
-            except asyncio.TimeoutError:
-                error_message = f"Timeout after {webhook.timeout}s"
-            except Exception as e:
-                error_message = str(e)
-            
-            if attempt < webhook.retry_count - 1:
-                await asyncio.sleep(2 ** attempt)  # Exponential backoff
-        
-        # Log execution
-        self._log_webhook(
-            webhook,
-            payload,
-            headers,
-            response_status,
-            response_body,
-            response_time_ms,
-            success,
-            error_message,
-            event_type
-        )
-        
-        return success
+        result = {
+            "success": False,
+            "headers": headers,
+            "response_status": None,
+            "response_body": None,
+            "response_time_ms": 0,
+            "error_message": None
+        }
+        start_time = time.time()
+        try:
+            async with self.session.request(
+                method=webhook.method,
+                url=webhook.url,
+                json=payload,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=webhook.timeout)
+            ) as response:
+                result["response_status"] = response.status
+                result["response_body"] = await response.text()
+                if response.status < 400:
+                    result["success"] = True
+                else:
+                    result["error_message"] = f"HTTP {response.status}: {result['response_body'][:200]}"
+        except asyncio.TimeoutError:
+            result["error_message"] = f"Timeout after {webhook.timeout}s"
+        except Exception as e:
+            result["error_message"] = str(e)
+        result["response_time_ms"] = (time.time() - start_time) * 1000
+        return result
     
     def _prepare_payload(
         self,
-        webhook: Webhook,
+        webhook: CompiledWebhook,
         event_type: str,
         event_data: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Prepare webhook payload"""
         if webhook.payload_template:
-            # Use Jinja2 template
-            template = Template(webhook.payload_template)
-            payload_str = template.render(
-                event_type=event_type,
-                event_data=event_data,
-                timestamp=datetime.utcnow().isoformat()
-            )
-            import json
-            return json.loads(payload_str)
+            # Use the webhook's Jinja2 template, compiled once per version
+            template = self.templates.get(webhook.id, webhook.payload_template)
+            return template.render({
+                "event_type": event_type,
+                "event_data": event_data,
+                "timestamp": datetime.utcnow().isoformat()
+            })
         else:
             # Default payload
             return {
@@ -210,35 +275,29 @@ class WebhookManager:
                 "webhook_name": webhook.name
             }
     
-    def _log_webhook(
+    def log_delivery(
         self,
-        webhook: Webhook,
-        request_payload: Dict,
-        request_headers: Dict,
-        response_status: Optional[int],
-        response_body: Optional[str],
-        response_time_ms: float,
-        success: bool,
-        error_message: Optional[str],
+        webhook: CompiledWebhook,
+        request_payload: Any,
+        result: Optional[Dict[str, Any]],
         triggered_by: str
     ):
-        """Log webhook execution"""
-        with self.db() as db:
-            log = WebhookLog(
-                webhook_id=webhook.id,
-                url=webhook.url,
-                method=webhook.method,
-                request_payload=request_payload,
-                request_headers=request_headers,
-                response_status=response_status,
-                response_body=response_body[:1000] if response_body else None,  # Limit size
-                response_time_ms=response_time_ms,
-                success=success,
-                error_message=error_message,
-                triggered_by=triggered_by
-            )
-            db.add(log)
-            db.commit()
+        """Log the final outcome of a delivery (written in the next batch)"""
+        result = result or {}
+        response_body = result.get("response_body")
+        self.logs.write({
+            "webhook_id": webhook.id,
+            "url": webhook.url,
+            "method": webhook.method,
+            "request_payload": request_payload,
+            "request_headers": result.get("headers"),
+            "response_status": result.get("response_status"),
+            "response_body": response_body[:1000] if response_body else None,  # Limit size
+            "response_time_ms": result.get("response_time_ms", 0),
+            "success": result.get("success", False),
+            "error_message": result.get("error_message"),
+            "triggered_by": triggered_by
+        })
     
     def get_webhook_logs(
         self,
@@ -246,7 +305,7 @@ class WebhookManager:
         limit: int = 100,
         user_id: str = "default"
     ) -> List[WebhookLog]:
-        """Get webhook execution logs"""
+        """Get webhook execution logs (the last ``webhook_log_flush_ms`` may not be written yet)"""
         with self.db() as db:
             query = db.query(WebhookLog)
             if webhook_id:
@@ -260,7 +319,10 @@ class WebhookManager:
             if not webhook:
                 return False
             db.delete(webhook)
+            db.query(WebhookDelivery).filter_by(webhook_id=webhook_id).delete()
             db.commit()
             logger.info(f"Deleted webhook: {webhook.name}")
-            return True
+        self.templates.discard(webhook_id)
+        notify_webhooks_changed(webhook_id)
+        return True
 
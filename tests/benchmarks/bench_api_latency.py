@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Benchmark: /api/v1/devices latency while /api/v1/energy/insights runs concurrently
+
+Seeds a temporary energy database, then hammers the insights endpoint in the
+background while timing device-list requests. Runs twice: once with blocking
+manager calls executed inline on the event loop (the old behaviour) and once
+with them offloaded to the DB thread pool.
+
+Usage:
+    python tests/benchmarks/bench_api_latency.py [--devices 50] [--days 30]
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from home_assistant_platform.config.settings import settings  # noqa: E402
+
+settings.base_dir = Path(tempfile.mkdtemp(prefix="hipi-bench-"))
+settings.data_dir.mkdir(parents=True, exist_ok=True)
+
+import httpx  # noqa: E402
+from home_assistant_platform.core import database  # noqa: E402
+from home_assistant_platform.core.api import energy as energy_api  # noqa: E402
+from home_assistant_platform.core.energy.models import DeviceEnergyReading  # noqa: E402
+from home_assistant_platform.core.energy.rollups import EnergyRollups  # noqa: E402
+from home_assistant_platform.core.main import app  # noqa: E402
+
+
+def seed_readings(devices: int, days: int, interval_minutes: int):
+    """Insert synthetic readings for every device over the period"""
+    session = database.new_session("energy")
+    start = datetime.now() - timedelta(days=days)
+    steps = days * 24 * 60 // interval_minutes
+    rows = []
+    for d in range(devices):
+        for i in range(steps):
+            rows.append({
+                "device_id": f"plug_{d}",
+                "device_name": f"Plug {d}",
+                "power_watts": 50.0 + (i % 60),
+                "timestamp": start + timedelta(minutes=i * interval_minutes),
+                "user_id": "default",
+            })
+    session.bulk_insert_mappings(DeviceEnergyReading, rows)
+    session.commit()
+    EnergyRollups().backfill(session)  # Summaries read the rollup tiers
+    session.commit()
+    session.close()
+    return len(rows)
+
+
+async def _inline(func, *args, **kwargs):
+    """Old behaviour: run the blocking call directly on the event loop"""
+    return func(*args, **kwargs)
+
+
+async def measure(client: httpx.AsyncClient, requests: int, days: int):
+    """Time /devices requests while insights run in the background"""
+    stop = asyncio.Event()
+
+    async def insights_load():
+        while not stop.is_set():
+            await client.get("/api/v1/energy/insights", params={"days": days})
+            await asyncio.sleep(0)  # A real socket would yield here
+
+    background = [asyncio.create_task(insights_load()) for _ in range(2)]
+    await asyncio.sleep(0.05)
+
+    # Requests follow a fixed schedule and latency is measured from the
+    # scheduled send time, so time spent waiting for a blocked event loop
+    # counts against the request (no coordinated omission).
+    latencies = []
+    period = 0.02
+    begin = time.perf_counter()
+    for i in range(requests):
+        scheduled = begin + i * period
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        response = await client.get("/api/v1/devices")
+        latencies.append((time.perf_counter() - scheduled) * 1000)
+        assert response.status_code == 200
+
+    stop.set()
+    await asyncio.gather(*background)
+
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "max": latencies[-1],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--interval", type=int, default=15, help="Minutes between readings")
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    database.init_databases()
+    count = seed_readings(args.devices, args.days, args.interval)
+    print(f"Seeded {count} readings for {args.devices} devices over {args.days} days")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/api/v1/devices")  # Warm up device manager
+
+        offloaded = energy_api.run_in_db_thread
+        energy_api.run_in_db_thread = _inline
+        blocking = await measure(client, args.requests, args.days)
+        energy_api.run_in_db_thread = offloaded
+        pooled = await measure(client, args.requests, args.days)
+
+    print(f"{'mode':<12}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, stats in (("inline", blocking), ("thread-pool", pooled)):
+        print(f"{name:<12}{stats['p50']:>10.1f}{stats['p99']:>10.1f}{stats['max']:>10.1f}")
+
+    database.shutdown_db_executor()
+    database.dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
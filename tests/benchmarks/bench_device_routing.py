@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Benchmark: device command dispatch through the registry routing table
+
+Registers a bridge manager owning most of the devices plus several small
+managers, then measures manager lookups and full turn_on dispatches per
+second for random devices. The linear column repeats the lookup with the
+previous scan over every registered manager for comparison.
+
+Usage:
+    python tests/benchmarks/bench_device_routing.py [--devices 10000] [--managers 20] [--commands 50000]
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from home_assistant_platform.core.automation.device_manager import DeviceManager  # noqa: E402
+from home_assistant_platform.core.devices.device_registry import DeviceRegistry  # noqa: E402
+from home_assistant_platform.core.devices.state_store import DeviceStateStore  # noqa: E402
+
+
+class StubManager(DeviceManager):
+    """Manager that accepts every command without I/O"""
+
+    def __init__(self, source_name: str, device_ids):
+        self.source_name = source_name
+        self.devices = {device_id: {"id": device_id, "state": "off"} for device_id in device_ids}
+
+    async def turn_on_device(self, device_id: str) -> bool:
+        return device_id in self.devices
+
+    async def turn_off_device(self, device_id: str) -> bool:
+        return device_id in self.devices
+
+    async def get_device_state(self, device_id: str):
+        return self.devices.get(device_id)
+
+    def list_devices(self):
+        return list(self.devices.values())
+
+
+def linear_lookup(registry: DeviceRegistry, device_id: str):
+    """Previous lookup: source of the device, then a scan of the managers"""
+    source = registry.store.source(device_id)
+    for manager in registry.device_managers:
+        if getattr(manager, "source_name", None) == source:
+            return manager
+    return None
+
+
+def timed(label: str, count: int, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<26}{count:>10}{elapsed:>10.3f}{count / elapsed:>14.0f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=10000)
+    parser.add_argument("--managers", type=int, default=20, help="Small managers besides the bridge")
+    parser.add_argument("--commands", type=int, default=50000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    registry = DeviceRegistry(DeviceStateStore(publish_events=False))
+    small = max(1, args.devices // 10 // max(1, args.managers))
+    for index in range(args.managers):
+        registry.register_manager(StubManager(f"wifi_{index}", (f"wifi_{index}_{i}" for i in range(small))), f"wifi_{index}")
+    bridge_devices = args.devices - small * args.managers
+    start = time.perf_counter()
+    registry.register_manager(StubManager("zigbee", (f"zigbee_{i}" for i in range(bridge_devices))), "zigbee")
+    print(f"registered {len(registry.routes)} devices ({bridge_devices} on the bridge) in "
+          f"{time.perf_counter() - start:.3f}s")
+
+    device_ids = list(registry.routes)
+    targets = [random.choice(device_ids) for _ in range(args.commands)]
+    print(f"{'path':<26}{'ops':>10}{'seconds':>10}{'ops/s':>14}")
+    timed("lookup (routing table)", len(targets), lambda: [registry.get_device_manager(d) for d in targets])
+    timed("lookup (linear scan)", len(targets), lambda: [linear_lookup(registry, d) for d in targets])
+
+    start = time.perf_counter()
+    for device_id in targets:
+        await registry.turn_on_device(device_id)
+    elapsed = time.perf_counter() - start
+    print(f"{'turn_on dispatch':<26}{len(targets):>10}{elapsed:>10.3f}{len(targets) / elapsed:>14.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
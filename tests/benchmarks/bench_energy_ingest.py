@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Benchmark: energy readings/second through the single and bulk ingest endpoints
+
+Posts synthetic smart-plug readings to /api/v1/energy/readings one request
+per reading, then to /api/v1/energy/readings/bulk as JSON arrays, NDJSON and
+line protocol. By default the process is pinned to one CPU core to
+approximate a Raspberry Pi budget (a Pi 4 core is roughly 3-5x slower than a
+desktop core, so scale the numbers accordingly).
+
+Usage:
+    python tests/benchmarks/bench_energy_ingest.py [--readings 20000] [--batch 1000] [--cores 1]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from home_assistant_platform.config.settings import settings  # noqa: E402
+
+settings.base_dir = Path(tempfile.mkdtemp(prefix="hipi-bench-"))
+settings.data_dir.mkdir(parents=True, exist_ok=True)
+
+import httpx  # noqa: E402
+from home_assistant_platform.core import database  # noqa: E402
+from home_assistant_platform.core.main import app  # noqa: E402
+
+
+def synthetic(count: int, devices: int, start: datetime):
+    """Readings spread over devices, a few seconds apart per device"""
+    return [
+        {
+            "device_id": f"plug_{i % devices}",
+            "power_watts": 20.0 + (i * 7) % 1800,
+            "voltage": 230.0,
+            "timestamp": (start + timedelta(seconds=5 * (i // devices))).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+def encode(readings, fmt: str):
+    if fmt == "json":
+        return json.dumps(readings).encode(), "application/json"
+    if fmt == "ndjson":
+        return "\n".join(json.dumps(r) for r in readings).encode(), "application/x-ndjson"
+    lines = [
+        f"energy,device_id={r['device_id']} power_watts={r['power_watts']},voltage={r['voltage']} "
+        f"{int(datetime.fromisoformat(r['timestamp']).timestamp())}"
+        for r in readings
+    ]
+    return "\n".join(lines).encode(), "text/plain"
+
+
+async def single(client: httpx.AsyncClient, readings):
+    for r in readings:
+        response = await client.post("/api/v1/energy/readings", json={
+            "device_id": r["device_id"], "power_watts": r["power_watts"], "voltage": r["voltage"]
+        })
+        assert response.status_code == 200, response.text
+
+
+async def bulk(client: httpx.AsyncClient, readings, batch: int, fmt: str, user_id: str):
+    for i in range(0, len(readings), batch):
+        body, content_type = encode(readings[i:i + batch], fmt)
+        response = await client.post(
+            "/api/v1/energy/readings/bulk", content=body,
+            params={"user_id": user_id, "precision": "s"}, headers={"content-type": content_type}
+        )
+        assert response.status_code == 200, response.text
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readings", type=int, default=20000)
+    parser.add_argument("--single", type=int, default=500, help="Readings sent one request each")
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--devices", type=int, default=40)
+    parser.add_argument("--cores", type=int, default=1, help="CPU cores to pin to (0 = no pinning)")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    if args.cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, set(sorted(os.sched_getaffinity(0))[:args.cores]))
+    database.init_databases()
+
+    start = datetime.utcnow() - timedelta(hours=6)
+    print(f"{'path':<28}{'readings':>10}{'seconds':>10}{'readings/s':>12}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        readings = synthetic(args.single, args.devices, start)
+        began = time.perf_counter()
+        await single(client, readings)
+        elapsed = time.perf_counter() - began
+        print(f"{'POST /readings (1 each)':<28}{len(readings):>10}{elapsed:>10.2f}{len(readings) / elapsed:>12.0f}")
+
+        readings = synthetic(args.readings, args.devices, start)
+        for fmt in ("json", "ndjson", "line"):
+            began = time.perf_counter()
+            await bulk(client, readings, args.batch, fmt, user_id=f"bench_{fmt}")
+            elapsed = time.perf_counter() - began
+            label = f"POST /readings/bulk ({fmt})"
+            print(f"{label:<28}{len(readings):>10}{elapsed:>10.2f}{len(readings) / elapsed:>12.0f}")
+
+    database.shutdown_db_executor()
+    database.dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
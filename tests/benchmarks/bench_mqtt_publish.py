@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Benchmark: MQTT command throughput against a local stand-in broker
+
+Starts the in-process stub broker from tests/utils, connects an
+MQTTDeviceManager and measures commands/second for sequential commands,
+concurrent commands and apply_batch. With --ack-delay the broker
+acknowledges slowly; the event-loop lag column shows the loop keeps running
+while publishes are in flight.
+
+Usage:
+    python tests/benchmarks/bench_mqtt_publish.py [--commands 2000] [--ack-delay 0.005]
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from home_assistant_platform.core.devices.mqtt_manager import MQTTDeviceManager  # noqa: E402
+from tests.utils.mqtt_broker import StubBroker  # noqa: E402
+
+
+async def max_loop_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """Largest delay between scheduled and actual wake-ups, in ms"""
+    worst = 0.0
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - expected)
+    return worst * 1000
+
+
+async def run(label: str, commands: int, scenario):
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(max_loop_lag(stop))
+    start = time.perf_counter()
+    ok = await scenario()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    lag = await lag_task
+    print(f"{label:<22}{commands / elapsed:>12.0f}{ok:>8}/{commands:<8}{lag:>12.1f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commands", type=int, default=2000)
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--ack-delay", type=float, default=0.005, help="Broker PUBACK delay in seconds")
+    parser.add_argument("--inflight", type=int, default=100)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    broker = StubBroker(ack_delay=args.ack_delay)
+    port = await broker.start()
+    manager = MQTTDeviceManager(broker_host="127.0.0.1", broker_port=port)
+    manager.max_inflight = args.inflight
+    assert await manager.turn_on_device("warmup"), "could not reach stub broker"
+
+    n = args.commands
+    device = [f"light_{i % args.devices}" for i in range(n)]
+
+    sequential_count = min(n, 200)  # One round-trip each; keep it short
+
+    async def sequential():
+        return sum([await manager.turn_on_device(device[i]) for i in range(sequential_count)])
+
+    async def concurrent():
+        return sum(await asyncio.gather(*(manager.turn_on_device(d) for d in device)))
+
+    async def batched():
+        commands = [{"device_id": d, "action": "set_brightness", "value": i % 100} for i, d in enumerate(device)]
+        return sum(await manager.apply_batch(commands))
+
+    print(f"broker ack delay {args.ack_delay * 1000:.1f} ms, in-flight window {args.inflight}, "
+          f"{args.devices} devices (apply_batch merges to one message per device)")
+    print(f"{'mode':<22}{'cmds/s':>12}{'acked':>17}{'loop lag ms':>12}")
+    await run("sequential (await)", sequential_count, sequential)
+    await run("concurrent (gather)", n, concurrent)
+    await run("apply_batch", n, batched)
+
+    manager.disconnect()
+    await broker.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
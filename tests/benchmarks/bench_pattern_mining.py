@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Benchmark: mining patterns for every device from a large action history
+
+Seeds a temporary automation database with synthetic device actions, then
+times the vectorized miner against the previous approach of one query and
+one Python counting loop per (user, device, action, value) group.
+
+Usage:
+    python tests/benchmarks/bench_pattern_mining.py [--actions 1000000] [--devices 200]
+"""
+
+import argparse
+import logging
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from home_assistant_platform.config.settings import settings  # noqa: E402
+
+settings.base_dir = Path(tempfile.mkdtemp(prefix="hipi-bench-"))
+settings.data_dir.mkdir(parents=True, exist_ok=True)
+
+from sqlalchemy import insert  # noqa: E402
+from home_assistant_platform.core import database  # noqa: E402
+from home_assistant_platform.core.automation.models import DeviceAction  # noqa: E402
+from home_assistant_platform.core.automation.pattern_miner import mine_patterns  # noqa: E402
+
+ACTIONS = ["turn_on", "turn_off", "set_brightness"]
+
+
+def seed_actions(count: int, devices: int, users: int):
+    """Insert synthetic actions; each device has a habitual hour plus noise"""
+    rng = random.Random(42)
+    now = datetime.now()
+    session = database.new_session("automation")
+    batch = []
+    for i in range(count):
+        device = rng.randrange(devices)
+        habit = rng.random() < 0.8
+        t = now - timedelta(days=rng.randrange(28), minutes=rng.randrange(1440))
+        if habit:
+            t = t.replace(hour=(device * 7) % 24, minute=rng.randrange(5))
+        action = ACTIONS[device % len(ACTIONS)] if habit else rng.choice(ACTIONS)
+        batch.append({
+            "device_id": f"device_{device}",
+            "device_type": "light",
+            "action": action,
+            "value": "50" if action == "set_brightness" else None,
+            "timestamp": t,
+            "day_of_week": t.weekday(),
+            "hour": t.hour,
+            "minute": t.minute,
+            "user_id": f"user_{device % users}",
+        })
+        if len(batch) == 50_000:
+            session.execute(insert(DeviceAction), batch)
+            batch = []
+    if batch:
+        session.execute(insert(DeviceAction), batch)
+    session.commit()
+    session.close()
+
+
+def per_group_python(days: int = 30) -> int:
+    """Previous approach: one query and Python counters per group"""
+    session = database.new_session("automation")
+    cutoff = datetime.now() - timedelta(days=days)
+    groups = session.query(
+        DeviceAction.user_id, DeviceAction.device_id, DeviceAction.action, DeviceAction.value
+    ).filter(DeviceAction.timestamp >= cutoff).distinct().all()
+    detected = 0
+    for user_id, device_id, action, value in groups:
+        rows = session.query(DeviceAction).filter(
+            DeviceAction.user_id == user_id,
+            DeviceAction.device_id == device_id,
+            DeviceAction.action == action,
+            DeviceAction.value.is_(None) if value is None else DeviceAction.value == value,
+            DeviceAction.timestamp >= cutoff
+        ).all()
+        hours = Counter(r.hour for r in rows)
+        windows = Counter(r.minute // 5 for r in rows)
+        weekdays = Counter(r.day_of_week for r in rows)
+        total = len(rows)
+        if total >= 3 and (hours.most_common(1)[0][1] / total * 0.5
+                           + windows.most_common(1)[0][1] / total * 0.3
+                           + max(weekdays.values()) / total * 0.2) >= 0.6:
+            detected += 1
+        session.expunge_all()
+    session.close()
+    return detected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--actions", type=int, default=1_000_000)
+    parser.add_argument("--devices", type=int, default=200)
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--skip-baseline", action="store_true", help="Only time the vectorized miner")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    database.init_databases()
+    start = time.perf_counter()
+    seed_actions(args.actions, args.devices, args.users)
+    print(f"Seeded {args.actions} actions for {args.devices} devices in {time.perf_counter() - start:.1f}s")
+
+    print(f"{'mode':<22}{'seconds':>10}{'actions/s':>14}{'patterns':>10}")
+    start = time.perf_counter()
+    summary = mine_patterns()
+    elapsed = time.perf_counter() - start
+    print(f"{'numpy (mine_patterns)':<22}{elapsed:>10.2f}{summary['actions'] / elapsed:>14.0f}{summary['patterns']:>10}")
+
+    if not args.skip_baseline:
+        start = time.perf_counter()
+        detected = per_group_python()
+        elapsed = time.perf_counter() - start
+        print(f"{'per-group python':<22}{elapsed:>10.2f}{summary['actions'] / elapsed:>14.0f}{detected:>10}")
+
+    database.dispose_engines()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Benchmark: webhook payload rendering
+
+Renders a device_change payload template the previous way (a new Jinja2
+Template per event, rendered to text and parsed with json.loads) and
+through the template cache, both for a JSON template with substitutions
+(direct-to-dict fast path) and for one using {% %} blocks. The last row
+of each group renders the cached template to text and parses it, which
+is what the fast path replaces.
+
+Usage:
+    python tests/benchmarks/bench_webhook_templates.py [--events 20000]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from jinja2 import Template
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from home_assistant_platform.core.webhooks.templates import TemplateCache  # noqa: E402
+
+JSON_TEMPLATE = (
+    '{"device": "{{ event_data.device_id }}", "state": "{{ event_data.state }}", '
+    '"brightness": {{ event_data.brightness }}, "time": "{{ timestamp }}"}'
+)
+BLOCK_TEMPLATE = (
+    '{"device": "{{ event_data.device_id }}", '
+    '"on": {% if event_data.state == "on" %}true{% else %}false{% endif %}}'
+)
+
+
+def timed(label: str, count: int, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<30}{count:>10}{elapsed:>10.3f}{count / elapsed:>14.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    args = parser.parse_args()
+
+    contexts = [
+        {
+            "event_type": "device_change",
+            "event_data": {"device_id": f"light_{i % 50}", "state": "on" if i % 2 else "off", "brightness": i % 100},
+            "timestamp": "2024-01-01T00:00:00"
+        }
+        for i in range(args.events)
+    ]
+    cache = TemplateCache()
+
+    print(f"{'path':<30}{'renders':>10}{'seconds':>10}{'renders/s':>14}")
+    for name, source in (("json", JSON_TEMPLATE), ("blocks", BLOCK_TEMPLATE)):
+        timed(f"{name}: compile per event", len(contexts),
+              lambda: [json.loads(Template(source).render(**c)) for c in contexts])
+        timed(f"{name}: cached", len(contexts),
+              lambda: [cache.get(1, source).render(c) for c in contexts])
+        timed(f"{name}: cached, text + parse", len(contexts),
+              lambda: [json.loads(cache.get(1, source).template.render(c)) for c in contexts])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Shared test fixtures"""
+
+import pytest
+
+from home_assistant_platform.config.settings import settings
+from home_assistant_platform.core import database
+from home_assistant_platform.core.automation.models import get_automation_db
+from home_assistant_platform.core.devices.models import get_devices_db
+from home_assistant_platform.core.energy.models import get_energy_db
+from home_assistant_platform.core.webhooks.models import get_webhooks_db
+
+
+@pytest.fixture
+def temp_databases(tmp_path, monkeypatch):
+    """Point every store at fresh databases in a temporary data directory"""
+    monkeypatch.setattr(settings, "base_dir", tmp_path)
+    (tmp_path / "data").mkdir()
+    database.reset_stores()
+    yield tmp_path
+    database.reset_stores()
+
+
+@pytest.fixture
+def automation_db(temp_databases):
+    """Session on a temporary automation store"""
+    return get_automation_db()
+
+
+@pytest.fixture
+def devices_db(temp_databases):
+    """Session on a temporary device store"""
+    return get_devices_db()
+
+
+@pytest.fixture
+def energy_db(temp_databases):
+    """Session on a temporary energy store"""
+    return get_energy_db()
+
+
+@pytest.fixture
+def webhooks_db(temp_databases):
+    """Session on a temporary webhook store"""
+    return get_webhooks_db()
@@ -42,6 +42,9 @@ def test_pattern_learning():
         # Small delay to ensure different timestamps
         time.sleep(0.1)
     
+    # Persist queued actions and run detection now instead of waiting for the worker
+    pattern_learner.flush()
+    
     print("\n2. Checking detected patterns...")
     patterns = pattern_learner.get_patterns(user_id="test_user")
     
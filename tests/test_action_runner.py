@@ -0,0 +1,166 @@
+"""Tests for parallel, per-device ordered action execution"""
+
+import asyncio
+import time
+
+from home_assistant_platform.core.automation.action_runner import ActionRunner, device_state_to_actions
+from home_assistant_platform.core.automation.device_manager import MockDeviceManager
+
+
+class SlowDeviceManager:
+    """Device manager whose commands each take a fixed round-trip"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _command(self, device_id, action):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        self.calls.append((device_id, action))
+        return True
+
+    async def turn_on_device(self, device_id):
+        return await self._command(device_id, "turn_on")
+
+    async def turn_off_device(self, device_id):
+        return await self._command(device_id, "turn_off")
+
+    async def set_brightness(self, device_id, brightness):
+        return await self._command(device_id, "set_brightness")
+
+    async def set_color(self, device_id, color):
+        return await self._command(device_id, "set_color")
+
+    async def set_temperature(self, device_id, temperature):
+        return await self._command(device_id, "set_temperature")
+
+
+def scene_actions(lights):
+    return [
+        action
+        for i in range(lights)
+        for action in device_state_to_actions({
+            "device_id": f"light_{i}", "state": "on", "brightness": 40, "color": "blue"
+        })
+    ]
+
+
+async def test_devices_run_concurrently_in_order():
+    """Latency is per device, not per scene, and each device keeps its order"""
+    manager = SlowDeviceManager()
+    runner = ActionRunner(manager, max_concurrency=20)
+
+    start = time.perf_counter()
+    results = await runner.run_raw(scene_actions(20))
+    elapsed = time.perf_counter() - start
+
+    assert all(result.success for result in results)
+    assert elapsed < 0.5  # Sequential would take 60 x 50ms = 3s
+    for i in range(20):
+        device_calls = [action for device_id, action in manager.calls if device_id == f"light_{i}"]
+        assert device_calls == ["turn_on", "set_brightness", "set_color"]
+
+
+async def test_concurrency_limit():
+    """No more devices are commanded at once than the configured limit"""
+    manager = SlowDeviceManager(delay=0.01)
+    runner = ActionRunner(manager, max_concurrency=3)
+
+    await runner.run_raw(scene_actions(10))
+
+    assert manager.max_in_flight == 3
+
+
+async def test_results_include_timing_and_errors():
+    """Results keep the input order and report timing for the execution log"""
+    runner = ActionRunner(SlowDeviceManager(delay=0.01))
+
+    results = await runner.run_raw([
+        {"device_id": "light_1", "action": "turn_on"},
+        {"device_id": "light_1", "action": "explode"},
+    ])
+    log = [result.to_log() for result in results]
+
+    assert log[0]["success"] and log[0]["duration_ms"] >= 10
+    assert not log[1]["success"] and "Unknown action type" in log[1]["error"]
+    assert log[1]["started_ms"] >= log[0]["duration_ms"]
+
+
+class SlowMockDeviceManager(MockDeviceManager):
+    """MockDeviceManager (inheriting the base apply_batch) with a round-trip per command"""
+
+    def __init__(self, delay=0.02):
+        super().__init__()
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _round_trip(self):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+
+    async def turn_on_device(self, device_id):
+        await self._round_trip()
+        return await super().turn_on_device(device_id)
+
+    async def set_brightness(self, device_id, brightness):
+        await self._round_trip()
+        return await super().set_brightness(device_id, brightness)
+
+
+async def test_base_device_manager_uses_the_per_device_runner():
+    """Managers that don't override apply_batch keep the concurrency limit and per-action timing"""
+    manager = SlowMockDeviceManager()
+    runner = ActionRunner(manager, max_concurrency=2)
+    lights = ["living_room_light", "bedroom_light", "kitchen_light"]
+
+    results = await runner.run_raw([
+        {"device_id": light, "device_type": "light", "action": action, "value": "40"}
+        for light in lights
+        for action in ("turn_on", "set_brightness")
+    ])
+
+    assert all(result.success for result in results)
+    assert manager.max_in_flight == 2
+    assert all(manager.devices[light]["brightness"] == 40 for light in lights)
+    first, second = results[0], results[1]  # living_room_light, in order
+    assert first.duration_ms < 2 * manager.delay * 1000
+    assert second.started_ms >= first.started_ms + first.duration_ms
+    assert results[4].started_ms >= manager.delay * 1000  # kitchen_light waited for a slot
+
+
+class BatchingDeviceManager:
+    """Device manager merging commands itself, with a per-device round-trip"""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.batches = []
+
+    async def apply_batch(self, commands):
+        self.batches.append([(c["device_id"], c["action"]) for c in commands])
+        await asyncio.sleep(self.delays[commands[0]["device_id"]])
+        return [True] * len(commands)
+
+
+async def test_batching_manager_gets_per_device_batches_and_timing():
+    """Each device's actions go out as one batch, timed on their own"""
+    manager = BatchingDeviceManager({"light_0": 0.01, "light_1": 0.08})
+    runner = ActionRunner(manager)
+
+    results = await runner.run_raw(scene_actions(2) + [{"device_id": "light_0", "action": "explode"}])
+
+    assert sorted(manager.batches) == [
+        [("light_0", "turn_on"), ("light_0", "set_brightness"), ("light_0", "set_color")],
+        [("light_1", "turn_on"), ("light_1", "set_brightness"), ("light_1", "set_color")],
+    ]
+    fast, slow, invalid = results[0], results[3], results[6]
+    assert all(result.success for result in results[:6]) and not invalid.success
+    assert results[1].duration_ms == fast.duration_ms < 50 <= slow.duration_ms
+    assert invalid.duration_ms == 0.0 and "Unknown action" in invalid.error
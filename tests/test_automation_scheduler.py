@@ -0,0 +1,91 @@
+"""Tests for the heap-based automation scheduler"""
+
+import asyncio
+from datetime import datetime, time, timedelta
+
+from home_assistant_platform.core.automation.scheduler import (
+    AutomationScheduler, TimeTrigger, parse_time_trigger
+)
+
+
+class RecordingExecutor:
+    """Executor stand-in that records fired automations"""
+
+    def __init__(self):
+        self.fired = []
+
+    async def execute_automation(self, automation_id, trigger_data=None):
+        self.fired.append((automation_id, trigger_data["scheduled_for"]))
+        return True
+
+
+def test_parse_time_trigger_supports_seconds():
+    """Trigger times keep sub-minute precision"""
+    trigger = parse_time_trigger(1, "test", {"time": "07:30:15", "days_of_week": [0, 2]})
+    assert trigger.at == time(7, 30, 15)
+    assert trigger.days_of_week == frozenset({0, 2})
+    assert parse_time_trigger(2, "bad", {"time": "not-a-time"}) is None
+    assert parse_time_trigger(3, "none", {}) is None
+    assert parse_time_trigger(4, "bad days", {"time": "07:30", "days_of_week": ["mon"]}) is None
+    assert parse_time_trigger(5, "bad days", {"time": "07:30", "days_of_week": 3}) is None
+
+
+def test_next_fire_respects_days_of_week():
+    """Next slot skips days that are not allowed"""
+    trigger = TimeTrigger(automation_id=1, name="t", at=time(8, 0), days_of_week=frozenset({0}))
+    wednesday = datetime(2024, 1, 3, 9, 0)
+    assert trigger.next_fire(wednesday) == datetime(2024, 1, 8, 8, 0)
+
+
+def test_next_fire_is_strictly_after():
+    """A slot equal to the reference time is not returned again"""
+    trigger = TimeTrigger(automation_id=1, name="t", at=time(8, 0))
+    slot = datetime(2024, 1, 3, 8, 0)
+    assert trigger.next_fire(slot) == slot + timedelta(days=1)
+
+
+async def test_slot_fires_exactly_once(automation_db):
+    """Repeated wake-ups at the same instant fire the slot once"""
+    executor = RecordingExecutor()
+    scheduler = AutomationScheduler(executor)
+    start = datetime(2024, 1, 3, 7, 59, 59)
+    scheduler._schedule(TimeTrigger(automation_id=7, name="t", at=time(8, 0)), start)
+
+    now = datetime(2024, 1, 3, 8, 0, 0, 500000)
+    await scheduler._fire_due(now)
+    await scheduler._fire_due(now)
+    await scheduler._fire_due(now + timedelta(seconds=30))
+    await asyncio.sleep(0)
+
+    assert executor.fired == [(7, "2024-01-03T08:00:00")]
+    assert scheduler.next_deadline() == datetime(2024, 1, 4, 8, 0)
+
+
+async def test_reschedule_does_not_refire_slot(automation_db):
+    """Re-registering a trigger after it fired keeps the slot marker"""
+    executor = RecordingExecutor()
+    scheduler = AutomationScheduler(executor)
+    start = datetime(2024, 1, 3, 7, 59)
+    scheduler._schedule(TimeTrigger(automation_id=7, name="t", at=time(8, 0)), start)
+    now = datetime(2024, 1, 3, 8, 0, 1)
+    await scheduler._fire_due(now)
+
+    previous = scheduler.triggers.pop(7)
+    scheduler._schedule(TimeTrigger(automation_id=7, name="t", at=time(8, 0)), start, previous)
+    await scheduler._fire_due(now)
+    await asyncio.sleep(0)
+
+    assert len(executor.fired) == 1
+
+
+async def test_missed_slot_is_skipped(automation_db):
+    """Slots missed beyond the grace window are not fired late"""
+    executor = RecordingExecutor()
+    scheduler = AutomationScheduler(executor)
+    scheduler._schedule(TimeTrigger(automation_id=7, name="t", at=time(8, 0)), datetime(2024, 1, 3, 7, 0))
+
+    await scheduler._fire_due(datetime(2024, 1, 3, 9, 0))
+    await asyncio.sleep(0)
+
+    assert executor.fired == []
+    assert scheduler.next_deadline() == datetime(2024, 1, 4, 8, 0)
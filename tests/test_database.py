@@ -0,0 +1,85 @@
+"""Tests for the shared database layer"""
+
+import threading
+import pytest
+from sqlalchemy import Column, Integer, String, text
+from sqlalchemy.orm import declarative_base
+
+from home_assistant_platform.config.settings import settings
+from home_assistant_platform.core import database
+
+
+TestBase = declarative_base()
+
+
+class Item(TestBase):
+    __tablename__ = "items"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Register a throwaway store backed by a temporary data directory"""
+    monkeypatch.setattr(settings, "base_dir", tmp_path)
+    (tmp_path / "data").mkdir()
+    name = f"test_store_{id(tmp_path)}"
+    database.register_store(name, TestBase.metadata)
+    yield name
+    database.dispose_engines(name)
+
+
+def test_one_engine_per_store(store):
+    """Engines are created once and reused"""
+    assert database.get_engine(store) is database.get_engine(store)
+    assert database.get_scoped_session(store) is database.get_scoped_session(store)
+
+
+def test_wal_mode_enabled(store):
+    """Every connection is switched to WAL"""
+    with database.get_engine(store).connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+
+
+def test_scoped_session_is_thread_local(store):
+    """Each thread gets its own Session from the registry"""
+    registry = database.get_scoped_session(store)
+    sessions = []
+
+    def worker():
+        sessions.append(registry())
+        registry.remove()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+
+    assert sessions[0] is not registry()
+
+
+def test_session_dependency_round_trip(store):
+    """The FastAPI dependency yields a usable per-request session"""
+    dependency = database.session_dependency(store)
+    gen = dependency()
+    session = next(gen)
+    session.add(Item(name="lamp"))
+    session.commit()
+    gen.close()
+
+    assert database.get_scoped_session(store).query(Item).count() == 1
+
+
+def test_reset_stores_follows_the_data_directory(store, tmp_path, monkeypatch):
+    """After a reset, engines and schemas are recreated under the current base_dir"""
+    database.init_store(store)
+    first = database.get_engine(store)
+
+    monkeypatch.setattr(settings, "base_dir", tmp_path / "other")
+    (tmp_path / "other" / "data").mkdir(parents=True)
+    database.reset_stores()
+    database.init_store(store)
+
+    assert database.get_engine(store) is not first
+    assert (tmp_path / "other" / "data" / f"{store}.db").exists()
+    assert database.get_scoped_session(store).query(Item).count() == 0
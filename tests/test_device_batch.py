@@ -0,0 +1,76 @@
+"""Tests for batched device commands"""
+
+import json
+from fastapi.testclient import TestClient
+
+from home_assistant_platform.core.devices.mqtt_manager import MQTTDeviceManager
+from home_assistant_platform.core.main import app
+
+
+class FakeMessageInfo:
+    rc = 0
+
+    def wait_for_publish(self, timeout=None):
+        pass
+
+    def is_published(self):
+        return True
+
+
+class FakeClient:
+    """paho client stand-in recording publishes"""
+
+    def __init__(self):
+        self.published = []
+
+    def publish(self, topic, payload, qos=0):
+        self.published.append((topic, json.loads(payload)))
+        return FakeMessageInfo()
+
+
+async def test_mqtt_batch_merges_commands_per_device():
+    """One message per device carries all of its attributes"""
+    manager = MQTTDeviceManager(broker_host="localhost")
+    manager.client = FakeClient()
+    manager.connected = True
+
+    results = await manager.apply_batch([
+        {"device_id": "lamp", "action": "turn_on"},
+        {"device_id": "lamp", "action": "set_brightness", "value": 40},
+        {"device_id": "lamp", "action": "set_color", "value": "red"},
+        {"device_id": "strip", "action": "turn_off"},
+        {"device_id": "strip", "action": "set_temperature", "value": 20},
+    ])
+
+    assert results == [True, True, True, True, False]
+    assert manager.client.published == [
+        ("homeassistant/lamp/set", {"state": "ON", "brightness": 40, "color": "red"}),
+        ("homeassistant/strip/set", {"state": "OFF"}),
+    ]
+
+
+def test_batch_endpoint():
+    """POST /devices/batch applies every command and reports each result"""
+    client = TestClient(app)
+    response = client.post("/api/v1/devices/batch", json={"commands": [
+        {"device_id": "kitchen_light", "action": "turn_on"},
+        {"device_id": "kitchen_light", "action": "set_brightness", "value": "30"},
+        {"device_id": "thermostat", "action": "set_temperature", "value": 68},
+    ]})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["success"]
+    assert [r["success"] for r in data["results"]] == [True, True, True]
+
+    device = client.get("/api/v1/devices/kitchen_light").json()["device"]
+    assert device["state"] == "on"
+    assert device["brightness"] == 30
+
+
+def test_batch_endpoint_rejects_unknown_action():
+    """Invalid commands fail the whole request before anything is sent"""
+    client = TestClient(app)
+    response = client.post("/api/v1/devices/batch", json={"commands": [
+        {"device_id": "kitchen_light", "action": "explode"},
+    ]})
+    assert response.status_code == 400
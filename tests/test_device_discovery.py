@@ -0,0 +1,146 @@
+"""Tests for concurrent, cached device discovery"""
+
+import asyncio
+import sys
+import time
+import types
+
+from home_assistant_platform.core.devices.discovery import DiscoveryOrchestrator
+from home_assistant_platform.core.devices.unified_manager import UnifiedDeviceManager
+from home_assistant_platform.core.devices.wifi_discovery import HueScanner, WiFiDeviceDiscovery
+from tests.utils.fake_network import FakeNetwork, FakeScanner
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def network_with(**counts):
+    network = FakeNetwork()
+    for source, count in counts.items():
+        for i in range(count):
+            network.add(source, f"{source}_{i}")
+    return network
+
+
+async def test_scanners_run_concurrently():
+    network = network_with(tplink=3, hue=2, zigbee=1)
+    scanners = [FakeScanner(network, name, latency=0.2) for name in ("tplink", "hue", "zigbee")]
+    discovery = DiscoveryOrchestrator(scanners, ttl=60, timeout=5)
+
+    started = time.perf_counter()
+    devices = await discovery.discover()
+
+    assert time.perf_counter() - started < 0.5
+    assert network.max_active_scans == 3
+    assert len(devices) == 6
+
+
+async def test_failing_and_hanging_scanners_do_not_block_others():
+    network = network_with(tplink=2, hue=2)
+    discovery = DiscoveryOrchestrator([
+        FakeScanner(network, "tplink"),
+        FakeScanner(network, "hue", hang=True),
+        FakeScanner(network, "zigbee", fail=True),
+    ], ttl=60, timeout=0.1)
+
+    devices = await discovery.discover()
+
+    assert {d["id"] for d in devices} == {"tplink_0", "tplink_1"}
+    assert discovery.stats["scan_failures"] == 2
+    assert not discovery.is_fresh("hue")
+
+
+async def test_results_are_cached_for_the_ttl():
+    clock = FakeClock()
+    network = network_with(tplink=2)
+    scanner = FakeScanner(network, "tplink")
+    discovery = DiscoveryOrchestrator([scanner], ttl=60, clock=clock)
+
+    await discovery.discover()
+    network.add("tplink", "tplink_new")
+    assert len(await discovery.discover()) == 2
+    assert scanner.scans == 1
+
+    clock.now += 61
+    assert len(await discovery.discover()) == 3
+    assert len(await discovery.discover(force=True)) == 3
+    assert scanner.scans == 3
+
+
+async def test_concurrent_callers_share_one_scan():
+    network = network_with(hue=1)
+    scanner = FakeScanner(network, "hue", latency=0.05)
+    discovery = DiscoveryOrchestrator([scanner], ttl=60)
+
+    results = await asyncio.gather(*(discovery.discover() for _ in range(5)))
+
+    assert scanner.scans == 1
+    assert all(len(devices) == 1 for devices in results)
+
+
+async def test_refresh_only_probes_stale_devices():
+    clock = FakeClock()
+    network = network_with(tplink=3)
+    scanner = FakeScanner(network, "tplink")
+    discovery = DiscoveryOrchestrator([scanner], ttl=60, clock=clock)
+    await discovery.discover()
+
+    clock.now += 30
+    discovery.devices["tplink_0"].seen_at = clock.now  # Seen recently, e.g. by a state update
+    clock.now += 40
+    network.remove("tplink", "tplink_2")
+
+    assert await discovery.refresh() == {"probed": 2, "refreshed": 1, "lost": 1}
+    assert sorted(scanner.probed) == ["tplink_1", "tplink_2"]
+    assert set(discovery.devices) == {"tplink_0", "tplink_1"}
+    assert scanner.scans == 1
+
+
+async def test_hue_bridge_calls_run_off_the_event_loop(monkeypatch):
+    class Bridge:
+        def __init__(self, ip):
+            self.ip = ip
+
+        def connect(self):
+            time.sleep(0.2)  # Blocking HTTP in phue
+
+        def get_light(self, light_id=None):
+            lights = {"1": {"name": "Desk", "state": {"on": True, "bri": 200}}}
+            return lights if light_id is None else lights[str(light_id)]
+
+    monkeypatch.setitem(sys.modules, "phue", types.SimpleNamespace(Bridge=Bridge))
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    devices = await HueScanner("10.0.0.2").scan()
+    task.cancel()
+
+    assert ticks >= 5
+    assert devices[0].info["id"] == "hue_1" and devices[0].info["brightness"] == 200
+    assert (await HueScanner().probe(devices[0])).info["state"] == "on"
+
+
+async def test_unified_manager_registers_from_one_scan():
+    network = network_with(tplink=2, hue=1)
+    scanners = [FakeScanner(network, "tplink"), FakeScanner(network, "hue")]
+    manager = UnifiedDeviceManager()
+    manager._discovery = WiFiDeviceDiscovery(scanners, ttl=60)
+
+    devices = await manager.discover_wifi_devices()
+
+    assert len(devices) == 3
+    assert [s.scans for s in scanners] == [1, 1]
+    assert manager.registry.get_device_manager("tplink_1").source_name == "tplink"
+    assert manager.registry.get_device_manager("hue_0").source_name == "hue"
+    assert manager.registry.get_device("hue_0")["source"] == "hue"
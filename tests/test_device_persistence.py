@@ -0,0 +1,86 @@
+"""Tests for the persisted device registry and warm start"""
+
+import asyncio
+
+from home_assistant_platform.config.settings import settings
+from home_assistant_platform.core.automation.device_manager import MockDeviceManager
+from home_assistant_platform.core.devices.device_registry import DeviceRegistry
+from home_assistant_platform.core.devices.models import DeviceRecord
+from home_assistant_platform.core.devices.persistence import DevicePersistence
+from home_assistant_platform.core.devices.state_store import DeviceStateStore
+from home_assistant_platform.core.devices.unified_manager import UnifiedDeviceManager
+from home_assistant_platform.core.devices.wifi_discovery import WiFiDeviceDiscovery
+from tests.utils.fake_network import FakeNetwork, FakeScanner
+
+
+def new_registry():
+    return DeviceRegistry(DeviceStateStore(publish_events=False))
+
+
+def test_changes_are_saved_once_per_flush(devices_db):
+    registry = new_registry()
+    persistence = DevicePersistence(registry)
+    registry.register_manager(MockDeviceManager(), "mock")
+    for brightness in range(50):
+        registry.store.update("kitchen_light", {"brightness": brightness})
+    registry.add_device({"id": "garage_door", "name": "Garage Door", "type": "cover"})
+
+    assert persistence.flush() == 5
+    assert persistence.flush() == 0
+    record = devices_db.get(DeviceRecord, "kitchen_light")
+    assert record.state["brightness"] == 49 and "version" not in record.state
+    assert record.source == "mock" and record.device_type == "light"
+    assert "set_brightness" in record.capabilities
+    assert devices_db.get(DeviceRecord, "garage_door").capabilities == []
+
+    registry.remove_device("garage_door")
+    persistence.flush()
+    devices_db.expire_all()
+    assert devices_db.get(DeviceRecord, "garage_door") is None
+
+
+async def test_warm_start_restores_and_routes(devices_db):
+    first = new_registry()
+    persistence = DevicePersistence(first)
+    first.add_device({"id": "mqtt_plug", "name": "Plug", "state": "on"}, source="mqtt")
+    first.add_device({"id": "lamp", "name": "Lamp", "state": "off"}, source="manual")
+    persistence.flush()
+
+    restarted = new_registry()
+    seen = []
+    restarted.store.subscribe(lambda *change: seen.append(change))
+    restarted.add_device({"id": "lamp", "name": "Lamp", "state": "on"}, source="manual")  # Live before load
+    restarted_persistence = DevicePersistence(restarted)
+
+    assert await restarted_persistence.warm_start() == ["mqtt_plug"]
+    assert restarted.get_device("mqtt_plug")["state"] == "on"
+    assert restarted.get_device("lamp")["state"] == "on"  # Live state wins
+    assert len(seen) == 1  # Restoring publishes nothing
+
+    mqtt = MockDeviceManager()
+    restarted.register_manager(mqtt, "mqtt")
+    assert restarted.get_device_manager("mqtt_plug") is mqtt  # Before it re-announces
+
+
+async def test_startup_reconciles_with_discovery(devices_db, monkeypatch):
+    network = FakeNetwork()
+    network.add("tplink", "tplink_kept")
+    saved = new_registry()
+    persistence = DevicePersistence(saved)
+    for device_id in ("tplink_kept", "tplink_gone"):
+        saved.add_device({"id": device_id, "name": device_id}, source="tplink")
+    persistence.flush()
+
+    monkeypatch.setattr(settings, "device_startup_discovery", True)
+    manager = UnifiedDeviceManager()
+    manager._discovery = WiFiDeviceDiscovery([FakeScanner(network, "tplink"), FakeScanner(network, "hue")])
+    await manager.start()
+    await asyncio.wait_for(manager.startup_task, timeout=5)
+
+    assert manager.registry.get_device("tplink_gone")["available"] is False
+    assert manager.registry.get_device("tplink_kept")["available"] is True
+    assert manager.registry.get_device_manager("tplink_kept").source_name == "tplink"
+
+    await manager.stop()
+    devices_db.expire_all()
+    assert devices_db.get(DeviceRecord, "tplink_gone").state["available"] is False
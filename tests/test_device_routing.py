@@ -0,0 +1,95 @@
+"""Tests for device-to-manager routing in the registry"""
+
+import pytest
+
+from home_assistant_platform.core.automation.device_manager import DeviceManager, MockDeviceManager
+from home_assistant_platform.core.devices.device_registry import DeviceRegistry
+from home_assistant_platform.core.devices.state_store import DeviceStateStore
+
+
+class BridgeManager(DeviceManager):
+    """Manager owning many devices that reports discoveries into the store"""
+
+    def __init__(self, count=0, prefix="zigbee"):
+        self.devices = {f"{prefix}_{i}": {"id": f"{prefix}_{i}", "state": "off"} for i in range(count)}
+        self.state_store = None
+        self.commands = []
+
+    def announce(self, device_id):
+        self.devices[device_id] = {"id": device_id, "state": "off"}
+        self.state_store.update(device_id, self.devices[device_id], source="zigbee")
+
+    async def turn_on_device(self, device_id):
+        self.commands.append(device_id)
+        return device_id in self.devices
+
+    async def turn_off_device(self, device_id):
+        return device_id in self.devices
+
+    async def get_device_state(self, device_id):
+        return self.devices.get(device_id)
+
+    def list_devices(self):
+        return list(self.devices.values())
+
+
+@pytest.fixture
+def registry():
+    registry = DeviceRegistry(DeviceStateStore(publish_events=False))
+    registry.register_manager(MockDeviceManager(), "mock")
+    return registry
+
+
+async def test_commands_reach_the_owning_manager(registry):
+    bridge = BridgeManager(count=2000)
+    registry.register_manager(bridge, "zigbee")
+
+    assert registry.get_device_manager("zigbee_1999") is bridge
+    assert isinstance(registry.get_device_manager("kitchen_light"), MockDeviceManager)
+    assert await registry.turn_on_device("zigbee_42")
+    assert bridge.commands == ["zigbee_42"]
+    assert registry.get_device("zigbee_42")["state"] == "on"
+
+
+async def test_unknown_devices_are_not_routed(registry):
+    registry.add_device({"id": "garage_door", "name": "Garage Door"})
+
+    assert registry.get_device_manager("garage_door") is None
+    assert registry.get_device_manager("nope") is None
+    assert not await registry.turn_on_device("garage_door")
+    assert await registry.apply_batch([{"device_id": "nope", "action": "turn_on"}]) == [False]
+
+
+async def test_discovered_and_removed_devices_update_routes(registry):
+    bridge = BridgeManager()
+    registry.register_manager(bridge, "zigbee")
+    bridge.announce("zigbee_new")
+    assert registry.get_device_manager("zigbee_new") is bridge
+
+    registry.remove_device("zigbee_new")
+    assert registry.get_device_manager("zigbee_new") is None
+    assert "zigbee_new" not in registry._owned["zigbee"]
+
+
+def test_bulk_routing_and_unregister(registry):
+    bridge = BridgeManager()
+    registry.register_manager(bridge, "zigbee")
+    registry.route_devices("zigbee", [f"zigbee_{i}" for i in range(5)] + ["kitchen_light"])
+    assert registry.get_device_manager("kitchen_light") is bridge  # Claimed by the bridge
+    with pytest.raises(ValueError):
+        registry.route_devices("hue", ["bulb"])
+
+    registry.unregister_manager("zigbee")
+    assert registry.get_device_manager("zigbee_3") is None
+    assert registry.get_device_manager("kitchen_light") is None
+    assert isinstance(registry.get_device_manager("living_room_light"), MockDeviceManager)
+    assert bridge not in registry.device_managers and bridge.state_store is None
+
+
+def test_reregistering_a_source_replaces_its_manager(registry):
+    first, second = BridgeManager(count=3), BridgeManager(count=3)
+    registry.register_manager(first, "zigbee")
+    registry.register_manager(second, "zigbee")
+
+    assert registry.get_device_manager("zigbee_0") is second
+    assert first not in registry.device_managers
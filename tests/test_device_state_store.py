@@ -0,0 +1,150 @@
+"""Tests for the versioned device state store"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from home_assistant_platform.core.api.devices import router as devices_router
+from home_assistant_platform.core.automation import event_bus
+from home_assistant_platform.core.automation.device_manager import MockDeviceManager
+from home_assistant_platform.core.automation.event_bus import (
+    EventBus, DEVICE_ADDED, DEVICE_STATE_CHANGE, DEVICE_REMOVED
+)
+from home_assistant_platform.core.devices.device_registry import DeviceRegistry
+from home_assistant_platform.core.devices.state_store import DeviceStateStore, StaleVersionError
+
+
+@pytest.fixture
+def events(monkeypatch):
+    """Events published on a fresh global bus"""
+    bus = EventBus()
+    monkeypatch.setattr(event_bus, "_event_bus", bus)
+    received = []
+    bus.subscribe(received.append)
+    return received
+
+
+async def test_versions_are_monotonic(events):
+    store = DeviceStateStore()
+    assert store.put("lamp", {"state": "off", "brightness": 0}) == 1
+    assert store.put("fan", {"state": "off"}) == 2
+    assert store.update("lamp", {"state": "on"}) == 3
+    assert store.update("lamp", {"state": "on", "version": 99}) == 3  # Nothing changed
+
+    assert store.get("lamp") == {"state": "on", "brightness": 0, "version": 3}
+    assert store.version == 3
+    assert [e.event_type for e in events] == [DEVICE_ADDED, DEVICE_ADDED, DEVICE_STATE_CHANGE]
+    assert events[-1].data["previous_state"] == "off"
+    assert events[-1].data["changes"] == {"state": "on"}
+
+
+def test_compare_and_set(events):
+    store = DeviceStateStore()
+    store.put("lamp", {"state": "off"}, expected_version=0)
+    with pytest.raises(StaleVersionError):
+        store.put("lamp", {"state": "off"}, expected_version=0)  # Already exists
+
+    version = store.update("lamp", {"state": "on"}, expected_version=1)
+    with pytest.raises(StaleVersionError) as raised:
+        store.update("lamp", {"state": "off"}, expected_version=1)
+    assert raised.value.current == version
+    assert store.get("lamp")["state"] == "on"
+
+
+async def test_diff_returns_changes_and_removals(events):
+    store = DeviceStateStore()
+    for device_id in ("a", "b", "c"):
+        store.put(device_id, {"state": "off"})
+    seen = store.version
+    store.update("b", {"state": "on"})
+    store.remove("c")
+    store.put("d", {"state": "off"})
+
+    delta = store.diff(seen)
+    assert [d["version"] for d in delta["devices"]] == [4, 6]
+    assert delta["removed"] == ["c"]
+    assert delta["version"] == 6 and delta["full"] is False
+    assert store.diff(store.version)["devices"] == []
+    assert events[-2].event_type == DEVICE_REMOVED
+
+
+def test_diff_is_full_when_tombstones_are_forgotten(monkeypatch):
+    monkeypatch.setattr(DeviceStateStore, "MAX_TOMBSTONES", 1)
+    store = DeviceStateStore(publish_events=False)
+    for device_id in ("a", "b", "c"):
+        store.put(device_id, {"state": "off"})
+    store.remove("a")
+    store.remove("b")
+
+    assert store.diff(3)["full"] is True
+    assert store.diff(4) == {"version": 5, "devices": [], "removed": ["b"], "full": False}
+
+
+def test_diff_is_full_for_versions_from_a_previous_process():
+    store = DeviceStateStore(publish_events=False)
+    for device_id in ("a", "b", "c", "d", "e"):
+        store.put(device_id, {"state": "off"})
+
+    delta = store.diff(500)
+    assert delta["full"] is True and delta["version"] == 5
+    assert [device["version"] for device in delta["devices"]] == [1, 2, 3, 4, 5]
+
+
+def test_listeners_see_every_change():
+    store = DeviceStateStore(publish_events=False)
+    seen = []
+    store.subscribe(lambda device_id, state, previous, version: seen.append((device_id, previous, version)))
+    store.put("lamp", {"state": "off"})
+    store.update("lamp", {"state": "on"})
+    store.remove("lamp")
+
+    assert seen == [("lamp", None, 1), ("lamp", {"state": "off"}, 2), ("lamp", {"state": "on"}, 3)]
+
+
+async def test_registry_commands_update_the_store(events):
+    registry = DeviceRegistry()
+    registry.register_manager(MockDeviceManager(), "mock")
+    before = registry.store.version
+
+    assert await registry.turn_on_device("kitchen_light")
+    assert await registry.set_brightness("kitchen_light", 40)
+    device = registry.get_device("kitchen_light")
+    assert (device["state"], device["brightness"]) == ("on", 40)
+    assert device["version"] > before
+    assert registry.store.diff(before)["devices"] == [device]
+
+
+async def test_manager_state_is_merged_not_replaced(events):
+    registry = DeviceRegistry()
+    registry.register_manager(MockDeviceManager(), "mock")
+    registry.store.update("thermostat", {"room": "hall"}, source="api")
+
+    state = await registry.get_device_state("thermostat")
+    assert state["room"] == "hall"
+    assert state["temperature"] == 72
+
+
+def test_api_delta_and_conflict(events):
+    registry = DeviceRegistry()
+    registry.register_manager(MockDeviceManager(), "mock")
+    app = FastAPI()
+    app.include_router(devices_router, prefix="/devices")
+    app.state.device_manager = type("Manager", (), {"registry": registry})()
+    client = TestClient(app)
+
+    listing = client.get("/devices").json()
+    assert listing["count"] == 4
+    version = listing["version"]
+
+    updated = client.patch("/devices/thermostat/state", json={"state": {"temperature": 65}, "expected_version": 4})
+    assert updated.status_code == 200
+    assert updated.json()["device"]["version"] == version + 1
+
+    conflict = client.patch("/devices/thermostat/state", json={"state": {"temperature": 60}, "expected_version": 4})
+    assert conflict.status_code == 409
+    assert conflict.json()["detail"]["current_version"] == version + 1
+    assert client.patch("/devices/garage/state", json={"state": {"state": "on"}}).status_code == 404
+
+    delta = client.get("/devices", params={"since_version": version}).json()
+    assert [d["id"] for d in delta["devices"]] == ["thermostat"]
+    assert delta["removed"] == [] and delta["count"] == 1
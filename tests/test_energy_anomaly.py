@@ -0,0 +1,126 @@
+"""Tests for online energy anomaly detection"""
+
+import random
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+
+from home_assistant_platform.core.energy.anomaly import AnomalyDetector, OnlineStats
+from home_assistant_platform.core.energy.models import EnergyAlert
+from home_assistant_platform.core.energy.monitor import EnergyMonitor
+
+
+def steady(start, count, watts=100.0, step=timedelta(minutes=1), seed=1):
+    rng = random.Random(seed)
+    return [(start + step * i, watts + rng.uniform(-5, 5)) for i in range(count)]
+
+
+def test_online_stats_match_numpy():
+    values = np.random.default_rng(0).normal(50, 12, 500)
+    stats = OnlineStats()
+    for value in values:
+        stats.update(float(value))
+
+    assert stats.count == 500
+    assert stats.mean == pytest.approx(values.mean())
+    assert stats.std == pytest.approx(values.std())
+
+
+def test_ewma_follows_drift():
+    stats = OnlineStats()
+    for _ in range(200):
+        stats.update(100.0, alpha=0.1)
+    for _ in range(100):
+        stats.update(200.0, alpha=0.1)
+
+    assert stats.mean == pytest.approx(200.0, abs=0.1)
+
+
+def test_spike_is_flagged_once_per_cooldown():
+    detector = AnomalyDetector(sigma=3.0, min_samples=20, cooldown=timedelta(minutes=15))
+    start = datetime(2024, 5, 6, 12, 0)
+    samples = steady(start, 60)
+
+    assert detector.observe_many(("default", "fridge", t, w) for t, w in samples) == []
+    spike = detector.observe("default", "fridge", start + timedelta(minutes=60), 900.0)
+    assert spike is not None and spike.z_score > 3
+    assert spike.expected_watts == pytest.approx(100.0, abs=3)
+    assert detector.observe("default", "fridge", start + timedelta(minutes=61), 900.0) is None  # Cooldown
+
+
+def test_hour_of_week_baseline():
+    """A load that always runs at the same hour is normal for that hour"""
+    detector = AnomalyDetector(sigma=3.0, min_samples=5, cooldown=timedelta(0))
+    start = datetime(2024, 5, 6)  # A Monday
+    flagged = []
+    for week in range(8):
+        for hour in range(24):
+            t = start + timedelta(weeks=week, hours=hour)
+            watts = 2000.0 if hour == 18 else 60.0 + hour % 3
+            if detector.observe("default", "oven", t, watts):
+                flagged.append((week, hour))
+
+    assert all(week < 5 for week, _ in flagged)  # Until the 18:00 slot has history
+    assert detector.observe("default", "oven", start + timedelta(weeks=8, hours=18), 2000.0) is None
+    assert detector.observe("default", "oven", start + timedelta(weeks=8, hours=19), 2000.0) is not None
+
+
+def test_anomalies_are_persisted(energy_db):
+    monitor = EnergyMonitor()
+    monitor.anomalies = AnomalyDetector(sigma=3.0, min_samples=20)
+    start = datetime.utcnow() - timedelta(hours=2)
+    for t, w in steady(start, 30):
+        monitor.record_reading("fridge", w, timestamp=t)
+    monitor.record_reading("fridge", 1500.0, timestamp=start + timedelta(minutes=30))
+
+    alerts = monitor.get_anomalies()
+    assert len(alerts) == 1
+    assert alerts[0].device_id == "fridge"
+    assert alerts[0].triggered_at == start + timedelta(minutes=30)
+    assert 100 < alerts[0].threshold_value <= 1500.0
+    assert monitor._alert_index() == {}  # Anomalies are not alert rules
+
+
+def test_bulk_readings_count_anomalies(energy_db):
+    monitor = EnergyMonitor()
+    monitor.anomalies = AnomalyDetector(sigma=3.0, min_samples=20)
+    start = datetime.utcnow() - timedelta(hours=2)
+    readings = [
+        {"device_id": "tv", "device_name": "tv", "power_watts": w, "timestamp": t, "user_id": "default",
+         "energy_kwh": None, "voltage": None, "current": None}
+        for t, w in steady(start, 40) + [(start + timedelta(minutes=40), 800.0)]
+    ]
+    readings.reverse()  # Scored in timestamp order regardless
+
+    assert monitor.record_readings(readings) == {"accepted": 41, "alerts_triggered": 1}
+    assert energy_db.query(EnergyAlert).filter(EnergyAlert.alert_type == "anomaly").count() == 1
+
+
+def test_replay_reports_thresholds_without_writing(energy_db):
+    monitor = EnergyMonitor()
+    start = datetime.utcnow() - timedelta(days=1)
+    for t, w in steady(start, 100):
+        monitor.record_reading("heater", w, timestamp=t)
+    for minute in (100, 130, 160):
+        monitor.record_reading("heater", 400.0 + minute, timestamp=start + timedelta(minutes=minute))
+    alerts_before = energy_db.query(EnergyAlert).count()
+
+    result = monitor.replay_anomalies(days=2, sigmas=[2.0, 3.0, 1000.0])
+
+    assert result["readings"] == 103
+    flagged = [t["flagged_readings"] for t in result["thresholds"]]
+    assert flagged == sorted(flagged, reverse=True)
+    assert flagged[1] >= 3 and flagged[2] == 0
+    assert {a["device_id"] for a in result["anomalies"]} == {"heater"}
+    assert energy_db.query(EnergyAlert).count() == alerts_before
+
+
+def test_warm_start_rebuilds_baselines(energy_db):
+    start = datetime.utcnow() - timedelta(hours=3)
+    first = EnergyMonitor()
+    for t, w in steady(start, 40):
+        first.record_reading("fridge", w, timestamp=t)
+
+    restarted = EnergyMonitor()
+    assert restarted.warm_anomaly_detector() == 40
+    assert restarted.anomalies.baselines[("default", "fridge")].overall.count == 40
@@ -0,0 +1,102 @@
+"""Tests for bulk energy ingest"""
+
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+
+from home_assistant_platform.core.energy.ingest import IngestError, parse_payload
+from home_assistant_platform.core.energy.models import DeviceEnergyReading, EnergyAlert
+from home_assistant_platform.core.energy.monitor import EnergyMonitor
+from home_assistant_platform.core.main import app
+
+
+@pytest.fixture
+def client(energy_db):
+    app.state.energy_monitor = EnergyMonitor()
+    yield TestClient(app)
+    del app.state.energy_monitor
+
+
+def test_parse_formats():
+    """JSON, NDJSON and line protocol normalize to the same readings"""
+    as_json = b'[{"device_id": "plug 1", "power_watts": 55.5, "timestamp": "2024-05-01T10:00:00Z", "voltage": 230}]'
+    as_ndjson = b'{"device_id": "plug 1", "power_watts": "55.5", "timestamp": 1714557600, "voltage": 230}\n\n'
+    as_lines = b"# comment\nenergy,device_id=plug\\ 1 power_watts=55.5,voltage=230i 1714557600000\n"
+
+    parsed = [
+        parse_payload(as_json, "application/json"),
+        parse_payload(as_ndjson, "application/x-ndjson"),
+        parse_payload(as_lines, "text/plain; charset=utf-8", precision="ms"),
+    ]
+
+    for readings in parsed:
+        assert readings == [{
+            "device_id": "plug 1", "device_name": "plug 1", "power_watts": 55.5,
+            "timestamp": datetime(2024, 5, 1, 10, 0), "user_id": "default",
+            "energy_kwh": None, "voltage": 230.0, "current": None,
+        }]
+
+
+def test_parse_reports_every_bad_reading():
+    body = b'{"device_id": "a", "power_watts": 1}\n{"power_watts": 2}\n{"device_id": "c", "power_watts": "x"}\nnot json\n'
+    with pytest.raises(IngestError) as excinfo:
+        parse_payload(body, "application/x-ndjson")
+    assert excinfo.value.errors == ["line 4: invalid JSON: Expecting value: line 1 column 1 (char 0)"]
+
+    with pytest.raises(IngestError) as excinfo:
+        parse_payload(body.rsplit(b"\n", 2)[0], "application/x-ndjson")
+    assert excinfo.value.errors == ["line 2: device_id is required", "line 3: power_watts must be a number"]
+
+
+def test_out_of_range_timestamps_are_reported():
+    with pytest.raises(IngestError) as excinfo:
+        parse_payload(b'[{"device_id": "a", "power_watts": 1, "timestamp": 1e20}]', "application/json")
+    assert excinfo.value.errors == ["reading 0: timestamp is out of range"]
+
+    for timestamp in (b"99999999999999999999999999999", b"1" + b"0" * 400):
+        with pytest.raises(IngestError) as excinfo:
+            parse_payload(b"energy,device_id=a power_watts=1 " + timestamp, "text/plain", precision="s")
+        assert excinfo.value.errors == ["line 1: timestamp is out of range"]
+
+
+def test_numbers_too_large_for_a_float_are_reported():
+    body = b'[{"device_id": "a", "power_watts": 1' + b"0" * 400 + b', "voltage": 230}]'
+    with pytest.raises(IngestError) as excinfo:
+        parse_payload(body, "application/json")
+    assert excinfo.value.errors == ["reading 0: power_watts is out of range"]
+
+
+def test_batch_updates_rollups_and_alerts(energy_db):
+    """A batch is stored in one transaction and checks alerts from memory"""
+    monitor = EnergyMonitor()
+    monitor.create_alert("heater", "high_consumption", 1500.0)
+    day = (datetime.utcnow() - timedelta(days=1)).replace(hour=12, minute=0, second=0, microsecond=0)
+    readings = [
+        {"device_id": device_id, "device_name": device_id, "power_watts": watts,
+         "timestamp": day + timedelta(minutes=i), "user_id": "default",
+         "energy_kwh": None, "voltage": None, "current": None}
+        for i, watts in enumerate([1000.0, 2000.0, 1000.0])
+        for device_id in ("heater", "lamp")
+    ]
+
+    result = monitor.record_readings(readings)
+
+    assert result == {"accepted": 6, "alerts_triggered": 1}
+    assert energy_db.query(DeviceEnergyReading).count() == 6
+    assert energy_db.query(EnergyAlert).one().triggered_at is not None
+    assert monitor.get_daily_summary(day)["device_breakdown"]["lamp"] == pytest.approx(1500 * 2 / 60 / 1000)
+
+    # Already triggered alerts stay quiet
+    assert monitor.record_readings(readings[:2])["alerts_triggered"] == 0
+
+
+def test_bulk_endpoint(client, energy_db):
+    lines = "\n".join(f"energy,device_id=plug_{i % 3} power_watts={i}.5" for i in range(30))
+    response = client.post("/api/v1/energy/readings/bulk", content=lines, headers={"content-type": "text/plain"})
+    assert response.status_code == 200
+    assert response.json() == {"success": True, "accepted": 30, "alerts_triggered": 0}
+
+    response = client.post("/api/v1/energy/readings/bulk", json=[{"device_id": "plug_0"}])
+    assert response.status_code == 400
+    assert response.json()["detail"]["errors"] == ["reading 0: power_watts is required"]
+    assert energy_db.query(DeviceEnergyReading).count() == 30
@@ -0,0 +1,128 @@
+"""Regression tests for the single-pass energy insights"""
+
+import random
+from datetime import datetime, timedelta
+import pytest
+
+from home_assistant_platform.core.energy.models import DeviceEnergyProfile, DeviceEnergyReading, EnergySummary
+from home_assistant_platform.core.energy.monitor import EnergyMonitor
+
+
+def raw_daily_summary(session, date, user_id, default_cost_per_kwh):
+    """Reference: integrate one day's raw readings, as summaries were computed before the rollups"""
+    start_time = date.replace(hour=0, minute=0, second=0, microsecond=0)
+    readings = session.query(DeviceEnergyReading).filter(
+        DeviceEnergyReading.user_id == user_id,
+        DeviceEnergyReading.timestamp >= start_time,
+        DeviceEnergyReading.timestamp < start_time + timedelta(days=1)
+    ).all()
+    device_energy = {}
+    for device_id in {r.device_id for r in readings}:
+        points = sorted((r.timestamp, r.power_watts) for r in readings if r.device_id == device_id)
+        device_energy[device_id] = sum(
+            (p0 + p1) / 2 * (t1 - t0).total_seconds() / 3600 for (t0, p0), (t1, p1) in zip(points, points[1:])
+        ) / 1000
+    profile = session.query(DeviceEnergyProfile).filter(DeviceEnergyProfile.user_id == user_id).first()
+    total_kwh = sum(device_energy.values())
+    return {
+        "date": date.date().isoformat(),
+        "total_kwh": total_kwh,
+        "total_cost": total_kwh * (profile.cost_per_kwh if profile else default_cost_per_kwh),
+        "device_breakdown": device_energy,
+        "peak_power_watts": max((r.power_watts for r in readings), default=0.0)
+    }
+
+
+def per_day_insights(monitor, days, user_id="default"):
+    """Reference: the previous per-day implementation over raw readings"""
+    start_date = datetime.now() - timedelta(days=days)
+    daily_summaries = [
+        raw_daily_summary(monitor.db, start_date + timedelta(days=i), user_id, monitor.default_cost_per_kwh)
+        for i in range(days)
+    ]
+    total_kwh = sum(s["total_kwh"] for s in daily_summaries)
+    total_cost = sum(s["total_cost"] for s in daily_summaries)
+    device_totals = {}
+    for summary in daily_summaries:
+        for device_id, kwh in summary["device_breakdown"].items():
+            device_totals[device_id] = device_totals.get(device_id, 0) + kwh
+    top_devices = sorted(device_totals.items(), key=lambda x: x[1], reverse=True)[:5]
+    return {
+        "period_days": days,
+        "total_kwh": total_kwh,
+        "total_cost": total_cost,
+        "average_daily_kwh": total_kwh / days if days > 0 else 0.0,
+        "average_daily_cost": total_cost / days if days > 0 else 0.0,
+        "peak_day": max(daily_summaries, key=lambda x: x["total_kwh"]) if daily_summaries else None,
+        "top_devices": [{"device_id": d[0], "total_kwh": d[1]} for d in top_devices],
+        "daily_summaries": daily_summaries
+    }
+
+
+def seed(monitor, devices=7, days=6, seed=3):
+    """Readings every few minutes with gaps, some devices idle on some days"""
+    rng = random.Random(seed)
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+    readings = []
+    for d in range(devices):
+        for day in range(days):
+            if rng.random() < 0.2:
+                continue
+            t = start + timedelta(days=day, minutes=rng.randint(0, 120))
+            while t.date() == (start + timedelta(days=day)).date():
+                readings.append({
+                    "device_id": f"device_{d}", "device_name": f"device_{d}",
+                    "power_watts": round(rng.uniform(0, 50 * (d + 1)), 2), "timestamp": t, "user_id": "default",
+                    "energy_kwh": None, "voltage": None, "current": None,
+                })
+                t += timedelta(minutes=rng.randint(1, 45))
+    readings.sort(key=lambda r: r["timestamp"])
+    monitor.record_readings(readings)
+
+
+def assert_insights_equal(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key in ("period_days", "total_kwh", "total_cost", "average_daily_kwh", "average_daily_cost"):
+        assert actual[key] == pytest.approx(expected[key])
+    assert [d["device_id"] for d in actual["top_devices"]] == [d["device_id"] for d in expected["top_devices"]]
+    for got, want in zip(actual["top_devices"], expected["top_devices"]):
+        assert got["total_kwh"] == pytest.approx(want["total_kwh"])
+    assert len(actual["daily_summaries"]) == len(expected["daily_summaries"])
+    for got, want in zip(actual["daily_summaries"] + [actual["peak_day"]],
+                         expected["daily_summaries"] + [expected["peak_day"]]):
+        assert got["date"] == want["date"]
+        assert got["total_kwh"] == pytest.approx(want["total_kwh"])
+        assert got["total_cost"] == pytest.approx(want["total_cost"])
+        assert got["peak_power_watts"] == pytest.approx(want["peak_power_watts"])
+        assert got["device_breakdown"].keys() == want["device_breakdown"].keys()
+        for device_id, kwh in want["device_breakdown"].items():
+            assert got["device_breakdown"][device_id] == pytest.approx(kwh)
+
+
+@pytest.mark.parametrize("days", [1, 3, 7, 10])
+def test_insights_match_per_day_summaries(energy_db, days):
+    monitor = EnergyMonitor()
+    seed(monitor)
+    monitor.create_device_profile("device_0", "Device 0", cost_per_kwh=0.3)
+
+    assert_insights_equal(monitor.get_energy_insights(days=days), per_day_insights(monitor, days))
+
+
+@pytest.mark.parametrize("days", [1, 3, 7])
+def test_insights_match_with_summaries(energy_db, days):
+    monitor = EnergyMonitor()
+    seed(monitor)
+    monitor.create_device_profile("device_0", "Device 0", cost_per_kwh=0.3)
+    monitor.summarize()
+
+    assert energy_db.query(EnergySummary).count() > 0
+    assert_insights_equal(monitor.get_energy_insights(days=days), per_day_insights(monitor, days))
+
+
+def test_insights_without_readings(energy_db):
+    monitor = EnergyMonitor()
+    insights = monitor.get_energy_insights(days=3)
+
+    assert_insights_equal(insights, per_day_insights(monitor, 3))
+    assert insights["top_devices"] == []
+    assert monitor.get_energy_insights(days=0)["peak_day"] is None
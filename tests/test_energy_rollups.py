@@ -0,0 +1,156 @@
+"""Tests for the energy rollup tiers"""
+
+import random
+from datetime import datetime, timedelta
+import pytest
+
+from home_assistant_platform.config.settings import settings
+from home_assistant_platform.core.energy.models import (
+    DeviceEnergyReading, EnergyRollupDay, EnergyRollupHour, EnergyRollupMinute, EnergySummary
+)
+from home_assistant_platform.core.energy.monitor import EnergyMonitor
+
+
+def raw_daily_kwh(readings, day):
+    """Reference: the per-day trapezoidal integration over raw readings"""
+    totals = {}
+    for device_id in {r[0] for r in readings}:
+        points = sorted((t, p) for d, t, p in readings if d == device_id and t.date() == day.date())
+        totals[device_id] = sum(
+            (p0 + p1) / 2 * (t1 - t0).total_seconds() / 3600 for (t0, p0), (t1, p1) in zip(points, points[1:])
+        ) / 1000
+    return {d: kwh for d, kwh in totals.items() if any(r[0] == d and r[1].date() == day.date() for r in readings)}
+
+
+def synthetic_readings(start, devices=3, count=150, seed=1):
+    rng = random.Random(seed)
+    readings = []
+    for d in range(devices):
+        t = start
+        for _ in range(count):
+            t += timedelta(seconds=rng.randint(60, 1200))
+            readings.append((f"plug_{d}", t, round(rng.uniform(0, 2000), 1)))
+    return readings
+
+
+def test_summary_matches_raw_integration(energy_db):
+    """Day totals from the rollups equal integrating the raw readings"""
+    monitor = EnergyMonitor()
+    start = (datetime.utcnow() - timedelta(days=2)).replace(hour=20, minute=0, second=0, microsecond=0)
+    readings = synthetic_readings(start)
+    for device_id, t, power in sorted(readings, key=lambda r: r[1]):
+        monitor.record_reading(device_id, power, timestamp=t)
+
+    for day in (start, start + timedelta(days=1)):
+        summary = monitor.get_daily_summary(day)
+        expected = raw_daily_kwh(readings, day)
+        assert summary["device_breakdown"].keys() == expected.keys()
+        for device_id, kwh in expected.items():
+            assert summary["device_breakdown"][device_id] == pytest.approx(kwh)
+        assert summary["peak_power_watts"] == max(p for _, t, p in readings if t.date() == day.date())
+
+
+def test_tiers_are_consistent(energy_db):
+    """Minute and hour tiers add up to the day tier"""
+    monitor = EnergyMonitor()
+    day = (datetime.utcnow() - timedelta(days=1)).replace(hour=1, minute=0, second=0, microsecond=0)
+    for i in range(120):
+        monitor.record_reading("heater", 1000.0 + i, timestamp=day + timedelta(seconds=30 * i))
+
+    day_row = energy_db.query(EnergyRollupDay).one()
+    minutes = energy_db.query(EnergyRollupMinute).all()
+    hours = energy_db.query(EnergyRollupHour).all()
+
+    assert len(minutes) == 60 and len(hours) == 1
+    assert sum(m.energy_kwh for m in minutes) == pytest.approx(day_row.energy_kwh)
+    assert hours[0].energy_kwh == pytest.approx(day_row.energy_kwh)
+    assert day_row.sample_count == 120
+    assert (day_row.min_power_watts, day_row.max_power_watts) == (1000.0, 1119.0)
+    assert day_row.average_power_watts == pytest.approx(1059.5)
+    assert day_row.peak_time == day + timedelta(seconds=30 * 119)
+    assert day_row.energy_kwh == pytest.approx(sum((2000.0 + 2 * i + 1) / 2 * 30 / 3600 for i in range(119)) / 1000)
+
+
+def test_late_reading_rebuilds_the_day(energy_db):
+    """A reading older than the device's latest one is integrated in order"""
+    monitor = EnergyMonitor()
+    day = (datetime.utcnow() - timedelta(days=1)).replace(hour=10, minute=0, second=0, microsecond=0)
+    monitor.record_reading("tv", 100.0, timestamp=day)
+    monitor.record_reading("tv", 100.0, timestamp=day + timedelta(hours=2))
+    monitor.record_reading("tv", 300.0, timestamp=day + timedelta(hours=1))  # Arrives late
+
+    summary = monitor.get_daily_summary(day)
+
+    assert summary["device_breakdown"]["tv"] == pytest.approx(0.4)  # 200W avg for 2h
+    assert energy_db.query(EnergyRollupMinute).count() == 3
+
+
+def test_chain_survives_restart(energy_db):
+    """A new monitor continues integrating from the stored latest sample"""
+    day = (datetime.utcnow() - timedelta(days=1)).replace(hour=8, minute=0, second=0, microsecond=0)
+    EnergyMonitor().record_reading("fridge", 150.0, timestamp=day)
+    EnergyMonitor().record_reading("fridge", 150.0, timestamp=day + timedelta(hours=1))
+
+    assert EnergyMonitor().get_daily_summary(day)["total_kwh"] == pytest.approx(0.15)
+
+
+def test_failed_commit_leaves_no_in_memory_state(energy_db, monkeypatch):
+    """A rolled back reading is not integrated from, scored or marked for summary"""
+    monitor = EnergyMonitor()
+    day = (datetime.utcnow() - timedelta(days=2)).replace(hour=8, minute=0, second=0, microsecond=0)
+    monitor.record_reading("fridge", 150.0, timestamp=day)
+    monitor.summarize()
+    commit = monitor.db.commit
+
+    def failing_commit():
+        monkeypatch.setattr(monitor.db, "commit", commit)
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(monitor.db, "commit", failing_commit)
+    with pytest.raises(RuntimeError):
+        monitor.record_readings([{
+            "device_id": "fridge", "device_name": "fridge", "power_watts": 900.0, "energy_kwh": None,
+            "voltage": None, "current": None, "timestamp": day + timedelta(days=1), "user_id": "default"
+        }])
+    assert not energy_db.query(EnergySummary).one().needs_recompute
+    assert monitor.anomalies.baselines[("default", "fridge")].overall.count == 1
+
+    monitor.record_reading("fridge", 150.0, timestamp=day + timedelta(hours=2))
+    assert monitor.get_daily_summary(day)["total_kwh"] == pytest.approx(0.3)
+
+
+def test_backfill_and_consumption(energy_db):
+    """Raw readings written before the rollups existed are folded in once"""
+    day = (datetime.utcnow() - timedelta(days=1)).replace(hour=6, minute=0, second=0, microsecond=0)
+    energy_db.bulk_insert_mappings(DeviceEnergyReading, [
+        {"device_id": "pump", "power_watts": 500.0, "timestamp": day + timedelta(minutes=10 * i), "user_id": "default"}
+        for i in range(7)
+    ])
+    energy_db.commit()
+    monitor = EnergyMonitor()
+
+    assert monitor.backfill_rollups() == 7
+    assert monitor.backfill_rollups() == 0
+
+    consumption = monitor.calculate_energy_consumption("pump", day, day + timedelta(hours=1))
+    assert consumption["total_kwh"] == pytest.approx(0.5)
+    assert consumption["peak_power_watts"] == 500.0
+    assert consumption["average_power_watts"] == 500.0
+
+
+def test_retention_per_tier(energy_db, monkeypatch):
+    """Each tier keeps its own history length; 0 keeps forever"""
+    monkeypatch.setattr(settings, "energy_raw_retention_days", 1)
+    monkeypatch.setattr(settings, "energy_minute_retention_days", 2)
+    monkeypatch.setattr(settings, "energy_hour_retention_days", 3)
+    monkeypatch.setattr(settings, "energy_day_retention_days", 0)
+    monitor = EnergyMonitor()
+    now = datetime.utcnow().replace(minute=30, second=0, microsecond=0)
+    for days_ago in (4, 3, 2, 1, 0):
+        monitor.record_reading("lamp", 40.0, timestamp=now - timedelta(days=days_ago, minutes=1))
+
+    deleted = monitor.apply_retention(now)
+
+    assert deleted == {"raw": 4, "1m": 3, "1h": 1}
+    assert energy_db.query(DeviceEnergyReading).count() == 1
+    assert energy_db.query(EnergyRollupDay).count() == 5
@@ -0,0 +1,116 @@
+"""Tests for the materialized daily energy summaries"""
+
+import sqlite3
+from datetime import datetime, timedelta
+import pytest
+
+from home_assistant_platform.core.energy.models import EnergyRollupDay, EnergySummary
+from home_assistant_platform.core.energy.monitor import EnergyMonitor
+
+
+def yesterday(hour):
+    return (datetime.utcnow() - timedelta(days=1)).replace(hour=hour, minute=0, second=0, microsecond=0)
+
+
+def test_closed_days_are_summarized(energy_db):
+    monitor = EnergyMonitor()
+    day = yesterday(8)
+    monitor.record_reading("fridge", 150.0, timestamp=day)
+    monitor.record_reading("fridge", 150.0, timestamp=day + timedelta(hours=2))
+    monitor.record_reading("fridge", 50.0, timestamp=datetime.utcnow())  # Today stays open
+
+    assert monitor.summarize() == 1
+    summary = energy_db.query(EnergySummary).one()
+    assert summary.date == day.replace(hour=0)
+    assert summary.total_kwh == pytest.approx(0.3)
+    assert summary.total_cost == pytest.approx(0.3 * monitor.default_cost_per_kwh)
+    assert summary.device_breakdown == {"fridge": pytest.approx(0.3)}
+    assert summary.peak_power_watts == 150.0
+    assert monitor.summarize() == 0  # Nothing left to close
+
+
+def test_missing_days_are_backfilled(energy_db):
+    """Days rolled up before summaries existed are closed on the first pass"""
+    monitor = EnergyMonitor()
+    for days_ago in (1, 2, 3):
+        day = yesterday(6) - timedelta(days=days_ago - 1)
+        monitor.record_reading("tv", 100.0, timestamp=day)
+        monitor.record_reading("tv", 100.0, timestamp=day + timedelta(hours=1))
+
+    restarted = EnergyMonitor()
+    assert restarted.summarize() == 3
+    assert energy_db.query(EnergySummary).count() == 3
+
+
+def test_late_reading_recomputes_the_day(energy_db):
+    monitor = EnergyMonitor()
+    day = yesterday(10)
+    monitor.record_reading("tv", 100.0, timestamp=day)
+    monitor.record_reading("tv", 100.0, timestamp=day + timedelta(hours=2))
+    monitor.summarize()
+
+    monitor.record_reading("tv", 300.0, timestamp=day + timedelta(hours=1))  # Arrives late
+    assert monitor.get_daily_summary(day)["total_kwh"] == pytest.approx(0.4)  # Served live until resummarized
+
+    assert monitor.summarize() == 1
+    energy_db.expire_all()
+    assert energy_db.query(EnergySummary).one().total_kwh == pytest.approx(0.4)
+
+
+def test_changed_days_stay_stale_across_a_restart(energy_db):
+    """A day changed by a late reading is recomputed even if the process restarts first"""
+    monitor = EnergyMonitor()
+    day = yesterday(10)
+    monitor.record_reading("tv", 100.0, timestamp=day)
+    monitor.record_reading("tv", 100.0, timestamp=day + timedelta(hours=2))
+    monitor.summarize()
+    monitor.record_reading("tv", 300.0, timestamp=day + timedelta(hours=1))  # Arrives late
+
+    restarted = EnergyMonitor()
+    assert restarted.get_daily_summary(day)["total_kwh"] == pytest.approx(0.4)
+    assert restarted.summarize() == 1
+    energy_db.expire_all()
+    summary = energy_db.query(EnergySummary).one()
+    assert (summary.total_kwh, summary.needs_recompute) == (pytest.approx(0.4), False)
+    assert restarted.summarize() == 0
+
+
+async def test_existing_summaries_table_gets_the_recompute_flag(temp_databases):
+    """Databases created before the flag existed are upgraded at startup"""
+    with sqlite3.connect(temp_databases / "data" / "energy.db") as connection:
+        connection.execute(
+            "CREATE TABLE energy_summaries (id INTEGER PRIMARY KEY, date DATETIME NOT NULL, "
+            "total_kwh FLOAT NOT NULL, total_cost FLOAT, device_breakdown JSON, peak_power_watts FLOAT, "
+            "peak_time DATETIME, user_id VARCHAR)"
+        )
+        connection.execute(
+            "INSERT INTO energy_summaries (date, total_kwh, user_id) VALUES ('2024-01-01 00:00:00.000000', 1.5, 'default')"
+        )
+
+    monitor = EnergyMonitor()
+    await monitor.start()
+    try:
+        summary = monitor.db.query(EnergySummary).one()
+        assert (summary.total_kwh, summary.needs_recompute) == (1.5, False)
+        assert monitor.get_daily_summary(datetime(2024, 1, 1))["total_kwh"] == 1.5
+        monitor.summarizer.ensure_schema()  # Already upgraded
+    finally:
+        await monitor.stop()
+
+
+def test_closed_days_are_served_from_summaries(energy_db):
+    monitor = EnergyMonitor()
+    day = yesterday(12)
+    monitor.record_reading("heater", 1000.0, timestamp=day)
+    monitor.record_reading("heater", 1000.0, timestamp=day + timedelta(hours=1))
+    monitor.summarize()
+
+    # Rollups are no longer read for the closed day
+    energy_db.query(EnergyRollupDay).delete()
+    energy_db.commit()
+
+    assert monitor.get_daily_summary(day)["total_kwh"] == pytest.approx(1.0)
+    insights = monitor.get_energy_insights(days=2)
+    assert insights["total_kwh"] == pytest.approx(1.0)
+    assert insights["top_devices"] == [{"device_id": "heater", "total_kwh": pytest.approx(1.0)}]
+
@@ -0,0 +1,110 @@
+"""Tests for the event bus and event-triggered automations"""
+
+import asyncio
+import pytest
+
+from home_assistant_platform.core.automation.device_manager import MockDeviceManager
+from home_assistant_platform.core.automation.event_bus import EventBus, DEVICE_STATE_CHANGE
+from home_assistant_platform.core.automation.event_triggers import EventTriggerEngine
+from home_assistant_platform.core.automation.rule_cache import CompiledRule
+
+
+class RecordingExecutor:
+    """Executor stand-in that records fired automations"""
+
+    def __init__(self):
+        self.fired = []
+
+    async def execute_automation(self, automation_id, trigger_data=None):
+        self.fired.append((automation_id, trigger_data))
+        return True
+
+
+def event_rule(automation_id, **trigger_config):
+    return CompiledRule(
+        automation_id=automation_id,
+        name=f"rule {automation_id}",
+        trigger_type="event",
+        trigger_config={"event_type": DEVICE_STATE_CHANGE, **trigger_config},
+        actions=()
+    )
+
+
+@pytest.fixture
+def engine():
+    bus = EventBus()
+    executor = RecordingExecutor()
+    engine = EventTriggerEngine(executor, bus)
+    bus.subscribe(engine.handle_event)
+    return engine
+
+
+async def test_routes_by_event_type_and_device(engine):
+    """Only automations indexed for the device (or any device) fire"""
+    engine.set_rules([
+        event_rule(1, device_id="door"),
+        event_rule(2, device_id="window"),
+        event_rule(3),
+        event_rule(4, device_id="door", state="open"),
+    ])
+
+    engine.event_bus.publish(DEVICE_STATE_CHANGE, "door", {"state": "closed"})
+    await asyncio.sleep(0)
+
+    assert sorted(a for a, _ in engine.executor.fired) == [1, 3]
+    assert engine.executor.fired[0][1]["device_id"] == "door"
+
+
+async def test_debounce_fires_once_with_latest_event(engine):
+    """A burst of events fires once after the quiet period"""
+    engine.set_rules([event_rule(1, device_id="sensor", debounce_seconds=0.05)])
+
+    for value in range(5):
+        engine.event_bus.publish(DEVICE_STATE_CHANGE, "sensor", {"state": str(value)})
+    await asyncio.sleep(0.1)
+
+    assert len(engine.executor.fired) == 1
+    assert engine.executor.fired[0][1]["state"] == "4"
+
+
+async def test_throttle_limits_execution_rate(engine):
+    """Events inside the throttle window are dropped"""
+    engine.set_rules([event_rule(1, device_id="sensor", throttle_seconds=60)])
+
+    for _ in range(10):
+        engine.event_bus.publish(DEVICE_STATE_CHANGE, "sensor", {"state": "on"})
+    await asyncio.sleep(0)
+
+    assert len(engine.executor.fired) == 1
+
+
+async def test_publish_from_other_thread_is_delivered_on_loop(engine):
+    """Events published off-loop (MQTT thread) reach the engine"""
+    engine.set_rules([event_rule(1, device_id="sensor")])
+    engine.event_bus.bind_loop()
+
+    await asyncio.to_thread(engine.event_bus.publish, DEVICE_STATE_CHANGE, "sensor", {"state": "on"})
+    await asyncio.sleep(0.01)
+
+    assert [a for a, _ in engine.executor.fired] == [1]
+
+
+async def test_registry_publishes_state_changes(monkeypatch):
+    """DeviceRegistry commands publish state change events"""
+    from home_assistant_platform.core.automation import event_bus
+    from home_assistant_platform.core.devices.device_registry import DeviceRegistry
+
+    bus = EventBus()
+    monkeypatch.setattr(event_bus, "_event_bus", bus)
+    events = []
+    bus.subscribe(events.append, DEVICE_STATE_CHANGE)
+
+    registry = DeviceRegistry()
+    registry.register_manager(MockDeviceManager(), "mock")
+    await registry.turn_on_device("kitchen_light")
+    await registry.turn_on_device("kitchen_light")  # No change, no event
+
+    assert len(events) == 1
+    assert events[0].device_id == "kitchen_light"
+    assert events[0].data["state"] == "on"
+    assert events[0].data["previous_state"] == "off"
@@ -0,0 +1,98 @@
+"""Tests for the non-blocking MQTT publish path"""
+
+import asyncio
+import socket
+import time
+import pytest
+
+from home_assistant_platform.core.devices.mqtt_manager import MQTTDeviceManager
+from tests.utils.mqtt_broker import StubBroker
+
+
+@pytest.fixture
+async def broker_factory():
+    """Start stub brokers and a manager connected to them"""
+    started = []
+
+    async def start(**broker_options):
+        broker = StubBroker(**broker_options)
+        port = await broker.start()
+        manager = MQTTDeviceManager(broker_host="127.0.0.1", broker_port=port)
+        manager.publish_timeout = 1.0
+        started.append((broker, manager))
+        return broker, manager
+
+    yield start
+    for broker, manager in started:
+        manager.disconnect()
+        await broker.stop()
+
+
+async def test_publish_is_acknowledged(broker_factory):
+    """Commands resolve once the broker acknowledges them"""
+    broker, manager = await broker_factory()
+
+    assert await manager.turn_on_device("lamp")
+    assert await manager.set_brightness("lamp", 30)
+    assert [topic for topic, _ in broker.published] == ["homeassistant/lamp/set"] * 2
+
+
+async def test_slow_broker_does_not_block_loop(broker_factory):
+    """The event loop keeps running while waiting for acknowledgements"""
+    _, manager = await broker_factory(ack_delay=0.3)
+    assert await manager.turn_on_device("warmup")
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    results = await asyncio.gather(*(manager.turn_on_device(f"lamp_{i}") for i in range(20)))
+    elapsed = time.perf_counter() - start
+    task.cancel()
+
+    assert all(results)
+    assert elapsed < 1.0  # Acknowledgements overlap instead of 20 x 300ms
+    assert ticks >= 10
+
+
+async def test_publish_times_out(broker_factory):
+    """A broker that never acknowledges fails the command after the timeout"""
+    _, manager = await broker_factory(drop_acks=True)
+    manager.publish_timeout = 0.2
+
+    start = time.perf_counter()
+    assert not await manager.turn_on_device("lamp")
+    assert time.perf_counter() - start < 1.0
+    assert manager._pending == {}
+
+
+async def test_inflight_window_is_bounded(broker_factory):
+    """No more than max_inflight publishes wait for acknowledgement at once"""
+    broker, manager = await broker_factory(ack_delay=0.05)
+    manager.max_inflight = 3
+
+    results = await asyncio.gather(*(manager.turn_off_device(f"lamp_{i}") for i in range(12)))
+
+    assert all(results)
+    assert broker.max_unacked <= 3
+
+
+async def test_failed_connect_is_retried(broker_factory):
+    """A broker that was down on the first command is connected on a later one"""
+    broker, manager = await broker_factory()
+    with socket.socket() as closed:
+        closed.bind(("127.0.0.1", 0))
+        port, manager.broker_port = manager.broker_port, closed.getsockname()[1]
+
+    assert not await manager.turn_on_device("lamp")
+    assert manager.client is None
+
+    manager.broker_port = port
+    assert await manager.turn_on_device("lamp")
+    assert [topic for topic, _ in broker.published] == ["homeassistant/lamp/set"]
@@ -0,0 +1,114 @@
+"""Tests for incremental pattern learning"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+import pytest
+
+from home_assistant_platform.core import database
+from home_assistant_platform.core.automation import pattern_learner
+from home_assistant_platform.core.automation.models import DeviceAction, Pattern
+from home_assistant_platform.core.automation.pattern_learner import HISTORY_DAYS, ActionStats, PatternLearner
+
+
+def test_stats_histograms_and_expiry():
+    """Occurrences land in hour, window and weekday buckets and age out by day"""
+    stats = ActionStats(device_type="light")
+    start = datetime(2024, 1, 1, 19, 2)  # A Monday
+    for day in range(HISTORY_DAYS + 2):
+        stats.add(start + timedelta(days=day))
+    
+    assert stats.count == HISTORY_DAYS + 2
+    assert stats.hours[19] == stats.count and stats.windows[0] == stats.count
+    
+    stats.expire((start + timedelta(days=HISTORY_DAYS + 1)).toordinal())
+    
+    assert stats.count == HISTORY_DAYS
+    assert stats.hours[19] == HISTORY_DAYS
+    assert sum(stats.weekdays) == HISTORY_DAYS
+    assert stats.weekdays[0] == 4  # The first Monday has expired
+
+
+def test_confidence_from_counters(automation_db):
+    """A habit at the same time every weekday is detected as a pattern"""
+    learner = PatternLearner(autostart=False)
+    key = ("default", "porch_light", "turn_on", None)
+    stats = learner.stats[key] = ActionStats(device_type="light")
+    monday = datetime(2024, 1, 1, 7, 31)
+    for week in range(2):
+        for day in range(5):
+            stats.add(monday + timedelta(weeks=week, days=day))
+    
+    pattern = learner._pattern_from_stats(key, stats)
+    
+    assert pattern["conditions"] == {"hour": 7, "minute": 30, "days_of_week": [0, 1, 2, 3, 4]}
+    assert pattern["confidence"] == pytest.approx(1.0)
+    assert pattern["occurrence_count"] == 10
+
+
+def test_record_is_buffered_until_flush(automation_db):
+    """Recording only touches memory; flush writes actions and patterns in one batch"""
+    learner = PatternLearner(autostart=False)
+    for _ in range(4):
+        learner.record_action("living_room_light", "light", "turn_on", user_id="test_user")
+    
+    assert automation_db.query(DeviceAction).count() == 0
+    assert learner.flush() == 4
+    assert automation_db.query(DeviceAction).count() == 4
+    
+    patterns = learner.get_patterns(user_id="test_user")
+    assert [(p.device_id, p.occurrence_count) for p in patterns] == [("living_room_light", 4)]
+    
+    # Another action updates the same pattern row
+    learner.record_action("living_room_light", "light", "turn_on", user_id="test_user")
+    learner.flush()
+    automation_db.expire_all()
+    assert automation_db.query(Pattern).one().occurrence_count == 5
+
+
+def test_warm_start_counts_stored_history(automation_db):
+    """A new learner resumes from the actions already in the database"""
+    first = PatternLearner(autostart=False)
+    for _ in range(3):
+        first.record_action("fan", "switch", "turn_off")
+    first.flush()
+    
+    second = PatternLearner(autostart=False)
+    second.record_action("fan", "switch", "turn_off")
+    second.flush()
+    
+    assert second.stats[("default", "fan", "turn_off", None)].count == 4
+
+
+def test_recording_does_not_wait_for_warm_start(automation_db, monkeypatch):
+    """The history query runs without the lock record_action takes"""
+    query_started, release = threading.Event(), threading.Event()
+    
+    def slow_session(name):
+        query_started.set()
+        release.wait(5)
+        return database.new_session(name)
+    
+    monkeypatch.setattr(pattern_learner, "new_session", slow_session)
+    learner = PatternLearner(autostart=False)
+    flusher = threading.Thread(target=learner.flush)
+    flusher.start()
+    assert query_started.wait(5)
+    
+    start = time.perf_counter()
+    learner.record_action("fan", "switch", "turn_off")
+    assert time.perf_counter() - start < 1
+    
+    release.set()
+    flusher.join(5)
+    assert learner.stats[("default", "fan", "turn_off", None)].count == 1
+    assert automation_db.query(DeviceAction).count() == 1
+
+
+def test_worker_flushes_on_stop(automation_db):
+    """Stopping the background worker persists what is still queued"""
+    learner = PatternLearner()
+    learner.record_action("tv", "media", "turn_on")
+    learner.stop()
+    
+    assert automation_db.query(DeviceAction).count() == 1
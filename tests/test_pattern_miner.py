@@ -0,0 +1,74 @@
+"""Tests for the vectorized pattern miner"""
+
+from datetime import datetime, timedelta
+import pytest
+
+from home_assistant_platform.core.automation.models import DeviceAction, Pattern
+from home_assistant_platform.core.automation.pattern_learner import ActionStats, PatternLearner
+from home_assistant_platform.core.automation.pattern_miner import mine_patterns
+
+
+def seed(db, device_id, action, times, value=None, user_id="default"):
+    db.bulk_insert_mappings(DeviceAction, [
+        {
+            "device_id": device_id, "device_type": "light", "action": action, "value": value,
+            "timestamp": t, "day_of_week": t.weekday(), "hour": t.hour, "minute": t.minute,
+            "user_id": user_id
+        }
+        for t in times
+    ])
+    db.commit()
+
+
+def test_mined_patterns_match_incremental_learner(automation_db):
+    """Batch mining scores every group exactly like the incremental learner"""
+    base = datetime.now().replace(hour=7, minute=33, second=0, microsecond=0) - timedelta(days=20)
+    habits = {
+        ("default", "porch", "turn_on", None): [base + timedelta(days=d) for d in range(14)],
+        ("alice", "heater", "set_temperature", "21"): [
+            base + timedelta(days=d, hours=h) for d in range(6) for h in (0, 0, 1)
+        ],
+        ("default", "fan", "turn_off", None): [base + timedelta(days=d, hours=3 * d) for d in range(8)],
+    }
+    for (user_id, device_id, action, value), times in habits.items():
+        seed(automation_db, device_id, action, times, value=value, user_id=user_id)
+
+    summary = mine_patterns(chunk_size=7)  # Several chunks
+
+    learner = PatternLearner(autostart=False)
+    expected = {}
+    for key, times in habits.items():
+        stats = ActionStats(device_type="light")
+        for t in times:
+            stats.add(t)
+        pattern = learner._pattern_from_stats(key, stats)
+        if pattern:
+            expected[(key[0], key[1])] = pattern
+
+    mined = {(p.user_id, p.device_id): p for p in automation_db.query(Pattern)}
+    assert summary["actions"] == sum(len(t) for t in habits.values())
+    assert summary["groups"] == 3
+    assert set(mined) == set(expected) and len(mined) == 2
+    for key, pattern in expected.items():
+        assert mined[key].conditions == pattern["conditions"]
+        assert mined[key].confidence == pytest.approx(pattern["confidence"])
+        assert mined[key].occurrence_count == pattern["occurrence_count"]
+        assert mined[key].last_occurrence == pattern["last_occurrence"]
+
+
+def test_mining_updates_existing_patterns(automation_db):
+    """Re-mining updates the stored row instead of adding a duplicate"""
+    base = datetime.now().replace(hour=22, minute=0, second=0, microsecond=0) - timedelta(days=10)
+    seed(automation_db, "tv", "turn_off", [base + timedelta(days=d) for d in range(4)])
+    assert mine_patterns()["created"] == 1
+
+    seed(automation_db, "tv", "turn_off", [base + timedelta(days=d) for d in range(4, 8)])
+    summary = mine_patterns()
+
+    assert (summary["created"], summary["updated"]) == (0, 1)
+    automation_db.expire_all()
+    assert automation_db.query(Pattern).one().occurrence_count == 8
+
+
+def test_mining_empty_history(automation_db):
+    assert mine_patterns()["patterns"] == 0
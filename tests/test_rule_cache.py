@@ -0,0 +1,94 @@
+"""Tests for the compiled automation rule cache"""
+
+from datetime import datetime, time
+
+from home_assistant_platform.core.automation.executor import AutomationExecutor
+from home_assistant_platform.core.automation.models import (
+    Automation, notify_automations_changed
+)
+from home_assistant_platform.core.automation.rule_cache import (
+    RuleCache, compile_action, compile_conditions
+)
+
+
+def add_automation(db, **overrides):
+    fields = dict(
+        name="Evening lights",
+        trigger_type="time",
+        trigger_config={"time": "19:00"},
+        actions=[{"device_id": "light_1", "action": "set_brightness", "value": "80"}],
+        is_enabled=True,
+        is_active=True
+    )
+    fields.update(overrides)
+    automation = Automation(**fields)
+    db.add(automation)
+    db.commit()
+    return automation
+
+
+def test_compile_action_converts_values():
+    """Values are converted once and invalid actions are flagged"""
+    assert compile_action({"device_id": "t", "action": "set_temperature", "value": "21.5"}).value == 21.5
+    assert compile_action({"device_id": "l", "action": "set_brightness", "value": "80"}).value == 80
+    assert compile_action({"action": "turn_on"}).error
+    assert compile_action({"device_id": "l", "action": "explode"}).error
+    assert compile_action({"device_id": "l", "action": "set_brightness", "value": "bright"}).error
+
+
+def test_compile_conditions():
+    """Condition times and weekdays are parsed into typed fields"""
+    conditions = compile_conditions({"time": "18:30", "days_of_week": [0, 4]})
+    assert conditions.not_before == time(18, 30)
+    assert conditions.days_mask == 0b10001
+
+    assert conditions.check(datetime(2024, 1, 5, 19, 0))  # Friday
+    assert not conditions.check(datetime(2024, 1, 5, 18, 0))  # Too early
+    assert not conditions.check(datetime(2024, 1, 3, 19, 0))  # Wednesday
+    assert not compile_conditions({"days_of_week": []}).check(datetime(2024, 1, 5))
+
+
+def test_cache_is_reused_until_invalidated(automation_db):
+    """Plans are served from memory until a change notification"""
+    automation = add_automation(automation_db)
+    cache = RuleCache()
+    try:
+        rule = cache.get(automation.id)
+        assert rule.actions[0].value == 80
+        assert [r.automation_id for r in cache.by_trigger("time")] == [automation.id]
+
+        # Changes without a notification are not seen
+        automation.is_enabled = False
+        automation_db.commit()
+        assert cache.get(automation.id) == rule
+
+        notify_automations_changed(automation.id)
+        assert cache.get(automation.id) is None
+        assert cache.by_trigger("time") == []
+    finally:
+        cache.close()
+
+
+def test_new_automations_visible_after_notification(automation_db):
+    """Rules created after the index was built are picked up"""
+    cache = RuleCache()
+    try:
+        assert cache.by_trigger("event") == []
+        automation = add_automation(automation_db, trigger_type="event", trigger_config={"event_type": "motion"})
+        notify_automations_changed(automation.id)
+        assert [r.name for r in cache.by_trigger("event")] == ["Evening lights"]
+    finally:
+        cache.close()
+
+
+def test_closed_executor_stops_listening(automation_db):
+    """Closing an executor unregisters its rule cache from change notifications"""
+    automation = add_automation(automation_db)
+    executor = AutomationExecutor()
+    rule = executor.rules.get(automation.id)
+    executor.close()
+
+    automation.is_enabled = False
+    automation_db.commit()
+    notify_automations_changed(automation.id)
+    assert executor.rules.get(automation.id) == rule
@@ -0,0 +1,153 @@
+"""Tests for the live stream hub and /stream endpoint"""
+
+from datetime import datetime, timedelta
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from home_assistant_platform.config.settings import settings
+from home_assistant_platform.core.api.stream import router as stream_router
+from home_assistant_platform.core.automation import event_bus
+from home_assistant_platform.core.automation.event_bus import (
+    EventBus, ENERGY_READING, AUTOMATION_EXECUTED, DEVICE_STATE_CHANGE, DEVICE_REMOVED
+)
+from home_assistant_platform.core.energy.monitor import EnergyMonitor
+from home_assistant_platform.core.streaming.hub import StreamHub
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    """A fresh global event bus"""
+    bus = EventBus()
+    monkeypatch.setattr(event_bus, "_event_bus", bus)
+    return bus
+
+
+def power(bus, device_id, watts, user_id="default"):
+    bus.publish(ENERGY_READING, device_id, {"user_id": user_id, "power_watts": watts}, source="energy")
+
+
+async def test_snapshot_then_live_updates(bus):
+    hub = StreamHub(bus)
+    hub.start()
+    power(bus, "fridge", 150.0)
+    power(bus, "tv", 90.0)
+
+    client = hub.connect(["power"])
+    snapshot = await client.next_batch(timeout=0)
+    totals = [m for m in snapshot if m["event_type"] == "power_total"]
+    assert {m["device_id"] for m in snapshot if m["event_type"] == ENERGY_READING} == {"fridge", "tv"}
+    assert totals[-1]["total_power_watts"] == 240.0
+
+    power(bus, "tv", 10.0)
+    live = await client.next_batch(timeout=1)
+    assert [m.get("power_watts") for m in live] == [10.0, None]
+    assert live[1]["total_power_watts"] == 160.0
+
+
+async def test_filters(bus):
+    hub = StreamHub(bus)
+    hub.start()
+    lamp = hub.connect(["devices"], device_ids=["lamp"])
+    other_user = hub.connect(["power"], user_id="guest")
+
+    bus.publish(DEVICE_STATE_CHANGE, "lamp", {"state": "on"})
+    bus.publish(DEVICE_STATE_CHANGE, "fan", {"state": "on"})
+    power(bus, "fridge", 150.0)
+
+    assert [m["device_id"] for m in await lamp.next_batch(timeout=0)] == ["lamp"]
+    assert await other_user.next_batch(timeout=0) == []
+    with pytest.raises(ValueError):
+        hub.connect(["weather"])
+
+
+async def test_slow_client_gets_latest_values(bus, monkeypatch):
+    monkeypatch.setattr(settings, "stream_max_pending", 5)
+    hub = StreamHub(bus)
+    hub.start()
+    client = hub.connect()
+
+    for watts in range(100):
+        power(bus, "heater", float(watts))
+    batch = await client.next_batch(timeout=0)
+    assert [m.get("power_watts") for m in batch] == [99.0, None]
+
+    for execution in range(8):
+        bus.publish(AUTOMATION_EXECUTED, data={"automation_id": 1, "execution_id": execution})
+    batch = await client.next_batch(timeout=0)
+    assert [m["execution_id"] for m in batch] == [3, 4, 5, 6, 7]
+    assert client.dropped == 3
+
+
+async def test_device_state_is_merged_and_removed(bus):
+    hub = StreamHub(bus)
+    hub.start()
+    bus.publish(DEVICE_STATE_CHANGE, "lamp", {"state": "on", "brightness": 80})
+    bus.publish(DEVICE_STATE_CHANGE, "lamp", {"state": "off"})
+    assert hub.latest[("devices", "lamp")]["brightness"] == 80
+
+    bus.publish(DEVICE_REMOVED, "lamp")
+    assert ("devices", "lamp") not in hub.latest
+
+
+async def test_removed_device_leaves_the_power_total(bus):
+    hub = StreamHub(bus)
+    hub.start()
+    power(bus, "lamp", 40.0)
+    power(bus, "tv", 10.0)
+
+    bus.publish(DEVICE_REMOVED, "lamp")
+    assert hub.power["default"] == {"tv": 10.0}
+    assert ("power", ("default", "lamp")) not in hub.latest
+    assert hub.latest[("power", ("default", None))]["total_power_watts"] == 10.0
+
+
+async def test_hub_is_seeded_with_stored_power(bus, energy_db):
+    now = datetime.utcnow()
+    EnergyMonitor().record_reading("fridge", 150.0, timestamp=now)
+    EnergyMonitor().record_reading("tv", 80.0, timestamp=now)
+
+    hub = StreamHub(bus)
+    hub.start(EnergyMonitor().get_latest_power())
+    client = hub.connect(["power"])
+    snapshot = await client.next_batch(timeout=0)
+    assert {m["device_id"]: m["power_watts"] for m in snapshot if m["device_id"]} == {"fridge": 150.0, "tv": 80.0}
+    assert [m["total_power_watts"] for m in snapshot if m["event_type"] == "power_total"] == [230.0]
+
+    power(bus, "tv", 10.0)
+    hub.seed_power(EnergyMonitor().get_latest_power())  # Live values are newer than stored ones
+    assert hub.power["default"] == {"fridge": 150.0, "tv": 10.0}
+
+
+async def test_energy_monitor_publishes_and_serves_power_from_memory(bus, energy_db):
+    hub = StreamHub(bus)
+    hub.start()
+    monitor = EnergyMonitor()
+    now = datetime.utcnow()
+    monitor.record_reading("fridge", 150.0, timestamp=now - timedelta(minutes=2))
+    monitor.record_reading("fridge", 120.0, timestamp=now)
+    monitor.record_reading("fridge", 300.0, timestamp=now - timedelta(minutes=1))  # Late, not current
+    monitor.record_reading("tv", 80.0, timestamp=now)
+
+    assert hub.power["default"] == {"fridge": 120.0, "tv": 80.0}
+    assert monitor.get_current_power("fridge") == 120.0
+    assert monitor.get_total_power() == 200.0
+    assert EnergyMonitor().get_total_power() == 200.0  # Loaded from the database
+
+
+def test_websocket_stream(bus):
+    app = FastAPI()
+    app.include_router(stream_router)
+    with TestClient(app) as client:
+        with client.websocket_connect("/stream?topics=power&device_id=plug_1") as ws:
+            power(bus, "plug_2", 5.0)
+            power(bus, "plug_1", 42.0)
+            messages = [ws.receive_json()]
+            while messages[-1]["device_id"] is None:  # Totals pass the device filter
+                messages.append(ws.receive_json())
+            assert (messages[-1]["device_id"], messages[-1]["power_watts"]) == ("plug_1", 42.0)
+            assert ws.receive_json()["total_power_watts"] == 47.0
+
+            bus.publish(AUTOMATION_EXECUTED, data={"automation_id": 7, "execution_id": 1})
+            ws.send_json({"topics": ["automations"]})  # The new snapshot includes the execution
+            assert ws.receive_json()["automation_id"] == 7
@@ -0,0 +1,157 @@
+"""Tests for batched and coalesced webhook delivery"""
+
+import asyncio
+import sqlite3
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from home_assistant_platform.core import database
+from home_assistant_platform.core.api.webhooks import router as webhooks_router
+from home_assistant_platform.core.webhooks.delivery_queue import DeliveryQueue
+from home_assistant_platform.core.webhooks.event_dispatcher import EventDispatcher
+from home_assistant_platform.core.webhooks.models import WebhookDelivery, WebhookLog
+from home_assistant_platform.core.webhooks.webhook_manager import WebhookManager
+
+
+@pytest.fixture
+async def manager(webhooks_db):
+    manager = WebhookManager()
+    manager.queue = DeliveryQueue(manager, poll_interval=0.01)
+    manager.batches.queue = manager.queue
+    manager.sent = []
+
+    async def send(webhook, payload):
+        manager.sent.append(payload)
+        return {"success": True, "headers": {}, "response_status": 200, "response_body": "",
+                "response_time_ms": 1.0, "error_message": None}
+
+    manager.send = send
+    yield manager
+    await manager.cleanup()
+
+
+async def dim(dispatcher, device_id, steps):
+    for brightness in range(steps):
+        await dispatcher.device_changed(device_id, "on", brightness=brightness)
+
+
+async def wait_until(condition, timeout=3.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+async def test_batch_mode_sends_a_window_as_one_array(manager, webhooks_db):
+    manager.create_webhook("batched", "http://a", trigger_on_device_change=True,
+                           delivery_mode="batch", batch_window_ms=1000)
+    manager.create_webhook("each", "http://b", trigger_on_device_change=True)
+    await manager.queue.start()
+    dispatcher = EventDispatcher(manager)
+
+    await dim(dispatcher, "lamp", 50)
+    await wait_until(lambda: manager.queue.stats["delivered"] == 51)
+
+    batches = [payload for payload in manager.sent if isinstance(payload, list)]
+    assert len(batches) == 1 and len(manager.sent) == 51
+    assert [p["event_data"]["brightness"] for p in batches[0]] == list(range(50))
+    await database.run_in_db_thread(manager.logs.flush)
+    log = webhooks_db.query(WebhookLog).filter_by(url="http://a").one()
+    assert log.triggered_by == "device_change" and len(log.request_payload) == 50
+
+
+async def test_coalesce_mode_keeps_the_latest_state_per_device(manager, webhooks_db):
+    webhook = manager.create_webhook("latest", "http://a", trigger_on_device_change=True, trigger_on_custom_event=True,
+                                     custom_event_types=["doorbell"], delivery_mode="coalesce", batch_window_ms=200)
+    await manager.queue.start()
+    dispatcher = EventDispatcher(manager)
+
+    await dim(dispatcher, "lamp", 50)
+    await dim(dispatcher, "hall", 10)
+    await dispatcher.custom_event("doorbell", {"pressed": True})
+    await dispatcher.custom_event("doorbell", {"pressed": True})
+    await dispatcher.device_changed("lamp", "off")
+    await wait_until(lambda: manager.queue.stats["delivered"] == 1)
+
+    [payload] = manager.sent
+    assert [(p["event_data"].get("device_id"), p["event_data"].get("state")) for p in payload] == [
+        ("hall", "on"), (None, None), (None, None), ("lamp", "off")
+    ]
+    assert payload[0]["event_data"]["brightness"] == 9
+    assert manager.batches.stats == {"events": 63, "coalesced": 59, "batches": 1}
+    await database.run_in_db_thread(manager.logs.flush)
+    assert webhooks_db.query(WebhookLog).filter_by(webhook_id=webhook.id).one().triggered_by == "batch"
+
+
+async def test_coalesce_key_values_that_are_lists_or_dicts(manager, webhooks_db):
+    manager.create_webhook("zones", "http://a", trigger_on_custom_event=True, custom_event_types=["motion"],
+                           delivery_mode="coalesce", batch_window_ms=60_000, coalesce_key="zones")
+    manager.create_webhook("each", "http://b", trigger_on_custom_event=True, custom_event_types=["motion"])
+    dispatcher = EventDispatcher(manager)
+
+    for zones in (["hall", "porch"], {"floor": 1}, ["hall", "porch"], {"floor": 1}, ["porch"]):
+        await dispatcher.custom_event("motion", {"zones": zones})
+
+    assert manager.batches.stats["coalesced"] == 2 and len(manager.batches) == 3
+    assert webhooks_db.query(WebhookDelivery).count() == 5  # The immediate webhook still got every event
+
+
+async def test_max_batch_size_closes_the_window_early(manager, webhooks_db):
+    manager.create_webhook("batched", "http://a", trigger_on_device_change=True,
+                           delivery_mode="batch", batch_window_ms=60_000, batch_max_size=20)
+    dispatcher = EventDispatcher(manager)
+
+    await dim(dispatcher, "lamp", 45)
+    assert [len(row.payload) for row in webhooks_db.query(WebhookDelivery)] == [20, 20]
+    assert len(manager.batches) == 5
+
+    await manager.batches.close()  # Shutdown flushes what is left
+    webhooks_db.expire_all()
+    assert [len(row.payload) for row in webhooks_db.query(WebhookDelivery)] == [20, 20, 5]
+
+
+def test_api_configures_delivery_mode(webhooks_db):
+    manager = WebhookManager()
+    app = FastAPI()
+    app.include_router(webhooks_router)
+    app.state.webhook_manager = manager
+    client = TestClient(app)
+
+    created = client.post("/webhooks", json={"name": "dimmer", "url": "http://a", "trigger_on_device_change": True,
+                                             "delivery_mode": "coalesce", "batch_window_ms": 2000})
+    assert created.status_code == 200
+    webhook_id = created.json()["id"]
+    assert client.get(f"/webhooks/{webhook_id}").json()["delivery"] == {
+        "mode": "coalesce", "batch_window_ms": 2000, "batch_max_size": 100, "coalesce_key": "device_id"
+    }
+    assert manager.subscriptions.get(webhook_id).delivery_mode == "coalesce"
+
+    assert client.post("/webhooks", json={"name": "x", "url": "http://a", "delivery_mode": "sometimes"}).status_code == 400
+    assert client.put(f"/webhooks/{webhook_id}", json={"batch_max_size": 0}).status_code == 400
+    manager.subscriptions.close()
+
+
+async def test_existing_webhooks_table_gets_the_delivery_columns(temp_databases):
+    """Databases created before the delivery modes are upgraded at startup"""
+    with sqlite3.connect(temp_databases / "data" / "webhooks.db") as connection:
+        connection.execute(
+            "CREATE TABLE webhooks (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, url VARCHAR NOT NULL, "
+            "method VARCHAR, headers JSON, payload_template TEXT, secret VARCHAR, "
+            "trigger_on_device_change BOOLEAN, trigger_on_scene_activate BOOLEAN, "
+            "trigger_on_automation_run BOOLEAN, trigger_on_voice_command BOOLEAN, "
+            "trigger_on_custom_event BOOLEAN, custom_event_types JSON, enabled BOOLEAN, timeout INTEGER, "
+            "retry_count INTEGER, user_id VARCHAR, created_at DATETIME, updated_at DATETIME)"
+        )
+        connection.execute("INSERT INTO webhooks (name, url, enabled, user_id) VALUES ('old', 'http://a', 1, 'default')")
+
+    manager = WebhookManager()
+    await manager.initialize()
+    try:
+        [old] = manager.list_webhooks()
+        assert (old.delivery_mode, old.batch_window_ms, old.coalesce_key) == ("immediate", 1000, "device_id")
+        assert manager.create_webhook("new", "http://b", delivery_mode="batch").delivery_mode == "batch"
+        manager.ensure_schema()  # Already upgraded
+    finally:
+        await manager.cleanup()
@@ -0,0 +1,160 @@
+"""Tests for the persisted webhook delivery queue"""
+
+import asyncio
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from home_assistant_platform.core import database
+from home_assistant_platform.core.webhooks.delivery_queue import DeliveryQueue
+from home_assistant_platform.core.webhooks.models import (
+    WebhookDelivery, WebhookLog, DELIVERY_IN_FLIGHT
+)
+from home_assistant_platform.core.webhooks.webhook_manager import WebhookManager
+
+
+@pytest.fixture
+async def manager(webhooks_db):
+    manager = WebhookManager()
+    manager.queue = DeliveryQueue(manager, workers=4, per_host_limit=2, backoff_base=0, poll_interval=0.01)
+    yield manager
+    await manager.cleanup()
+
+
+def fake_send(manager, outcomes=None, gate=None):
+    """Replace HTTP with scripted results; records (host, payload) per attempt"""
+    calls, active = [], {}
+
+    async def send(webhook, payload):
+        host = webhook.url.split("/")[2]
+        calls.append((host, payload))
+        active[host] = active.get(host, 0) + 1
+        active["max_" + host] = max(active.get("max_" + host, 0), active[host])
+        if gate is not None:
+            await gate.wait()
+        active[host] -= 1
+        success = outcomes.pop(0) if outcomes else True
+        return {"success": success, "headers": {}, "response_status": 200 if success else 503,
+                "response_body": "", "response_time_ms": 5.0,
+                "error_message": None if success else "HTTP 503: busy"}
+
+    manager.send = send
+    return calls, active
+
+
+async def wait_until(condition, timeout=3.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+async def test_failed_attempts_are_rescheduled_then_logged_once(manager, webhooks_db):
+    calls, _ = fake_send(manager, outcomes=[False, False, True])
+    webhook = manager.create_webhook("hook", "http://a.example/in", trigger_on_device_change=True, retry_count=3)
+    await manager.queue.start()
+
+    assert await manager.trigger_webhook(webhook.id, "device_change", {"device_id": "lamp"})
+    await wait_until(lambda: manager.queue.stats["delivered"] == 1)
+
+    assert len(calls) == 3 and calls[0][1]["event_data"] == {"device_id": "lamp"}
+    assert webhooks_db.query(WebhookDelivery).count() == 0
+    await database.run_in_db_thread(manager.logs.flush)
+    logs = webhooks_db.query(WebhookLog).all()
+    assert len(logs) == 1 and logs[0].success
+    stats = await database.run_in_db_thread(manager.queue.get_stats)
+    assert stats["failed_attempts"] == 2
+    assert stats["queue"] == {"pending": 0, "in_flight": 0, "dead": 0}
+    assert stats["attempt_latency_ms"]["p95"] == 5.0
+    assert stats["delivery_latency_s"]["p50"] is not None
+
+
+async def test_exhausted_deliveries_become_dead_letters(manager, webhooks_db):
+    calls, _ = fake_send(manager, outcomes=[False, False, True])
+    webhook = manager.create_webhook("hook", "http://a.example/in", trigger_on_device_change=True, retry_count=2)
+    await manager.queue.start()
+
+    await manager.trigger_webhook(webhook.id, "device_change", {})
+    await wait_until(lambda: manager.queue.stats["dead"] == 1)
+    dead = await database.run_in_db_thread(manager.queue.list_dead)
+    assert len(dead) == 1
+    assert dead[0]["attempts"] == 2 and dead[0]["last_error"] == "HTTP 503: busy"
+    await database.run_in_db_thread(manager.logs.flush)
+    assert not webhooks_db.query(WebhookLog).one().success
+
+    assert await manager.queue.retry(dead[0]["id"])
+    assert not await manager.queue.retry(dead[0]["id"])  # No longer dead
+    await wait_until(lambda: manager.queue.stats["delivered"] == 1)
+    assert len(calls) == 3
+
+
+async def test_per_host_limit_leaves_workers_for_other_hosts(manager):
+    gate = asyncio.Event()
+    calls, active = fake_send(manager, gate=gate)
+    slow = manager.create_webhook("slow", "http://slow.example/in", trigger_on_device_change=True)
+    fast = manager.create_webhook("fast", "http://fast.example/in", trigger_on_device_change=True)
+    await manager.queue.start()
+
+    for _ in range(5):
+        await manager.deliver(manager.subscriptions.get(slow.id), "device_change", {})
+    await manager.deliver(manager.subscriptions.get(fast.id), "device_change", {})
+    await wait_until(lambda: active.get("fast.example") == 1)
+
+    assert active["slow.example"] == 2  # Two workers still idle
+    gate.set()
+    await wait_until(lambda: manager.queue.stats["delivered"] == 6)
+    assert active["max_slow.example"] == 2
+
+
+async def test_deliveries_interrupted_by_a_restart_are_resumed(manager, webhooks_db):
+    calls, _ = fake_send(manager)
+    webhook = manager.create_webhook("hook", "http://a.example/in", trigger_on_device_change=True)
+    webhooks_db.add(WebhookDelivery(webhook_id=webhook.id, event_type="device_change",
+                                    payload={"n": 1}, host="a.example", status=DELIVERY_IN_FLIGHT))
+    webhooks_db.commit()
+
+    await manager.queue.start()
+    await wait_until(lambda: manager.queue.stats["delivered"] == 1)
+    assert calls == [("a.example", {"n": 1})]
+
+
+async def test_deleted_webhook_deliveries_are_dropped(manager, webhooks_db):
+    calls, _ = fake_send(manager)
+    webhook = manager.create_webhook("hook", "http://a.example/in", trigger_on_device_change=True)
+    await manager.deliver(manager.subscriptions.get(webhook.id), "device_change", {})  # Queue not started
+
+    manager.delete_webhook(webhook.id)
+    assert webhooks_db.query(WebhookDelivery).count() == 0
+
+
+def test_backoff_is_jittered_and_capped(webhooks_db):
+    queue = DeliveryQueue(None, backoff_base=2, backoff_max=30)
+    for attempts, delay in ((1, 2), (2, 4), (3, 8), (10, 30)):
+        samples = [queue.backoff(attempts) for _ in range(50)]
+        assert all(delay / 2 <= s <= delay for s in samples)
+        assert len(set(samples)) > 1
+
+
+async def test_send_against_a_real_endpoint(manager, webhooks_db):
+    received = []
+
+    async def handler(request):
+        received.append((await request.json(), request.headers.get("X-Webhook-Secret")))
+        return web.Response(status=200 if len(received) > 1 else 500, text="ok")
+
+    app = web.Application()
+    app.router.add_post("/hook", handler)
+    async with TestServer(app) as server:
+        webhook = manager.create_webhook("hook", str(server.make_url("/hook")), secret="s3cret",
+                                         trigger_on_device_change=True)
+        await manager.initialize()
+        manager.queue.poll_interval = 0.01
+        await manager.trigger_webhook(webhook.id, "device_change", {"device_id": "lamp"})
+        await wait_until(lambda: manager.queue.stats["delivered"] == 1)
+
+    assert len(received) == 2
+    assert received[0][0]["event_data"] == {"device_id": "lamp"} and received[0][1] == "s3cret"
+    await database.run_in_db_thread(manager.logs.flush)
+    log = webhooks_db.query(WebhookLog).one()
+    assert log.success and log.response_status == 200
@@ -0,0 +1,83 @@
+"""Tests for the buffered webhook log writer and log retention"""
+
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import inspect, text
+
+from home_assistant_platform.core import database
+from home_assistant_platform.core.webhooks.log_writer import WebhookLogWriter
+from home_assistant_platform.core.webhooks.models import WebhookLog
+
+
+def entry(webhook_id=1, **fields):
+    return {"webhook_id": webhook_id, "url": "http://a", "success": True, "triggered_by": "device_change", **fields}
+
+
+async def wait_until(condition, timeout=3.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+def test_rows_are_buffered_until_flushed(webhooks_db):
+    writer = WebhookLogWriter()
+    for i in range(250):
+        writer.write(entry(response_status=200 + i % 2, request_payload={"n": i}))
+    assert len(writer) == 250
+    assert webhooks_db.query(WebhookLog).count() == 0
+
+    assert writer.flush() == 250
+    assert writer.flush() == 0
+    assert webhooks_db.query(WebhookLog).count() == 250
+    assert webhooks_db.query(WebhookLog).order_by(WebhookLog.id.desc()).first().request_payload == {"n": 249}
+    assert writer.stats["written"] == 250
+
+
+async def test_background_flush_by_time_and_by_size(webhooks_db):
+    by_time = WebhookLogWriter(flush_interval_ms=20, batch_size=1000)
+    await by_time.start()
+    by_time.write(entry())
+    await wait_until(lambda: by_time.stats["written"] == 1)
+    await by_time.stop()
+
+    by_size = WebhookLogWriter(flush_interval_ms=60_000, batch_size=10)
+    await by_size.start()
+    for _ in range(9):
+        by_size.write(entry())
+    await asyncio.sleep(0.05)
+    assert by_size.stats["written"] == 0
+    by_size.write(entry())
+    await wait_until(lambda: by_size.stats["written"] == 10)
+
+    by_size.write(entry())
+    await by_size.stop()  # Writes what is left
+    assert webhooks_db.query(WebhookLog).count() == 12
+
+
+def test_retention_by_age_and_per_webhook_count(webhooks_db):
+    writer = WebhookLogWriter(retention_days=7, max_rows=5)
+    now = datetime.utcnow()
+    for days in (30, 10, 1):
+        writer.write(entry(webhook_id=1, created_at=now - timedelta(days=days)))
+    for i in range(8):
+        writer.write(entry(webhook_id=2, request_payload={"n": i}, created_at=now))
+    writer.flush()
+
+    assert writer.prune(now) == {"expired": 2, "excess": 3}
+    assert webhooks_db.query(WebhookLog).filter_by(webhook_id=1).count() == 1
+    kept = webhooks_db.query(WebhookLog).filter_by(webhook_id=2).order_by(WebhookLog.id).all()
+    assert [log.request_payload["n"] for log in kept] == [3, 4, 5, 6, 7]
+    assert writer.prune(now) == {"expired": 0, "excess": 0}
+
+
+def test_log_index_is_added_to_existing_databases(webhooks_db):
+    engine = database.get_engine("webhooks")
+    database.init_store("webhooks")
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX idx_webhook_logs_webhook_created"))
+
+    WebhookLogWriter().ensure_index()
+    indexes = {index["name"]: index["column_names"] for index in inspect(engine).get_indexes("webhook_logs")}
+    assert indexes["idx_webhook_logs_webhook_created"] == ["webhook_id", "created_at"]
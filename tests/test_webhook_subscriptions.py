@@ -0,0 +1,88 @@
+"""Tests for indexed webhook subscription routing"""
+
+import pytest
+from sqlalchemy import event
+
+from home_assistant_platform.core import database
+from home_assistant_platform.core.webhooks.event_dispatcher import EventDispatcher
+from home_assistant_platform.core.webhooks.webhook_manager import WebhookManager
+
+
+@pytest.fixture
+def manager(webhooks_db):
+    manager = WebhookManager()
+    manager.delivered = []
+
+    async def enqueue(webhooks, event_type, event_data):
+        manager.delivered.extend((webhook.id, event_type) for webhook in webhooks)
+        return len(webhooks)
+
+    manager.enqueue = enqueue
+    yield manager
+    manager.subscriptions.close()
+
+
+def count_queries():
+    statements = []
+    event.listen(database.get_engine("webhooks"), "before_cursor_execute",
+                 lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_index_matches_subscribed_webhooks(manager):
+    lights = manager.create_webhook("lights", "http://a", trigger_on_device_change=True)
+    custom = manager.create_webhook("custom", "http://b", trigger_on_custom_event=True,
+                                    custom_event_types=["doorbell", "device_change"])
+    manager.create_webhook("off", "http://c", trigger_on_device_change=True, enabled=False)
+    manager.create_webhook("flags only", "http://d", custom_event_types=["doorbell"])
+    manager.create_webhook("guest", "http://e", trigger_on_device_change=True, user_id="guest")
+
+    index = manager.subscriptions
+    assert {w.id for w in index.match("device_change")} == {lights.id, custom.id}
+    assert [w.id for w in index.match("doorbell")] == [custom.id]
+    assert index.match("scene_activate") == []
+    assert len(index.match("device_change", user_id="guest")) == 1
+
+
+def test_index_follows_updates_and_deletes(manager):
+    webhook = manager.create_webhook("lights", "http://a", trigger_on_device_change=True)
+    index = manager.subscriptions
+    assert len(index.match("device_change")) == 1
+
+    manager.update_webhook(webhook.id, trigger_on_device_change=False, trigger_on_scene_activate=True)
+    assert index.match("device_change") == []
+    assert index.match("scene_activate")[0].url == "http://a"
+
+    manager.update_webhook(webhook.id, url="http://new")
+    assert index.match("scene_activate")[0].url == "http://new"
+
+    manager.update_webhook(webhook.id, enabled=False)
+    assert index.get(webhook.id) is None
+    manager.update_webhook(webhook.id, enabled=True)
+    assert index.get(webhook.id) is not None
+
+    manager.delete_webhook(webhook.id)
+    assert index.match("scene_activate") == []
+
+
+async def test_dispatch_reads_nothing_once_indexed(manager):
+    subscribed = manager.create_webhook("lights", "http://a", trigger_on_device_change=True)
+    for i in range(20):
+        manager.create_webhook(f"scenes {i}", "http://b", trigger_on_scene_activate=True)
+    dispatcher = EventDispatcher(manager)
+    await dispatcher.device_changed("lamp", "on")  # Loads the index
+
+    statements = count_queries()
+    for _ in range(50):
+        await dispatcher.device_changed("lamp", "off", previous_state="on")
+
+    assert statements == []
+    assert manager.delivered == [(subscribed.id, "device_change")] * 51
+
+
+async def test_manual_trigger_checks_subscription(manager):
+    webhook = manager.create_webhook("lights", "http://a", trigger_on_device_change=True)
+
+    assert not await manager.trigger_webhook(webhook.id, "scene_activate", {})
+    assert not await manager.trigger_webhook(webhook.id, "device_change", {}, user_id="guest")
+    assert await manager.trigger_webhook(webhook.id, "device_change", {})
@@ -0,0 +1,70 @@
+"""Tests for cached, sandboxed webhook payload templates"""
+
+import json
+import pytest
+from jinja2 import Template
+from jinja2.exceptions import SecurityError
+
+from home_assistant_platform.core.webhooks.templates import PayloadTemplate, TemplateCache, TemplateError
+from home_assistant_platform.core.webhooks.webhook_manager import WebhookManager
+
+CONTEXT = {
+    "event_type": "device_change",
+    "event_data": {"device_id": "lamp", "state": "on", "brightness": 80},
+    "timestamp": "2024-01-01T00:00:00"
+}
+
+
+@pytest.mark.parametrize("source", [
+    '{"device": "{{ event_data.device_id }}", "state": "{{ event_data.state }}", "time": "{{ timestamp }}"}',
+    '{"level": {{ event_data.brightness }}, "data": {{ event_data | tojson }}, "tags": ["{{ event_type }}", 1]}',
+    '{"text": "{{ event_data.device_id }} is {{ event_data.state|upper }}", "{{ event_type }}": true}',
+])
+def test_json_templates_render_directly_like_a_full_render(source):
+    template = PayloadTemplate(source)
+    assert template.fast
+    assert template.render(CONTEXT) == json.loads(Template(source).render(CONTEXT))
+
+
+def test_other_templates_are_rendered_and_parsed():
+    source = '{"on": {% if event_data.state == "on" %}true{% else %}false{% endif %}}'
+    template = PayloadTemplate(source)
+    assert not template.fast
+    assert template.render(CONTEXT) == {"on": True}
+
+
+def test_substituted_strings_are_escaped():
+    template = PayloadTemplate('{"name": "{{ event_data.name }}"}')
+    assert template.render({"event_data": {"name": 'Say "hi" \\o/'}}) == {"name": 'Say "hi" \\o/'}
+
+
+def test_templates_are_sandboxed():
+    template = PayloadTemplate('{"x": "{{ event_data.__class__.__mro__[1].__subclasses__() }}"}')
+    with pytest.raises(SecurityError):
+        template.render(CONTEXT)
+
+
+def test_cache_compiles_each_template_version_once():
+    cache = TemplateCache()
+    first = cache.get(1, '{"a": "{{ event_type }}"}')
+    for _ in range(100):
+        assert cache.get(1, '{"a": "{{ event_type }}"}') is first
+    assert cache.get(1, '{"b": "{{ event_type }}"}') is not first  # Template edited
+    cache.get(2, '{"a": "{{ event_type }}"}')
+
+    assert cache.stats == {"hits": 100, "compiles": 3}
+    assert len(cache) == 2
+
+
+def test_invalid_templates_are_rejected_at_create(webhooks_db):
+    manager = WebhookManager()
+    with pytest.raises(TemplateError):
+        manager.create_webhook("bad", "http://a", payload_template='{"a": "{{ event_data.x }"}')
+    webhook = manager.create_webhook("good", "http://a", payload_template='{"id": "{{ event_data.device_id }}"}',
+                                     trigger_on_device_change=True)
+    with pytest.raises(TemplateError):
+        manager.update_webhook(webhook.id, payload_template="{% if %}")
+
+    compiled = manager.subscriptions.get(webhook.id)
+    assert manager._prepare_payload(compiled, "device_change", CONTEXT["event_data"]) == {"id": "lamp"}
+    manager.subscriptions.close()
@@ -0,0 +1,66 @@
+"""Fake network of smart devices for discovery tests
+
+``FakeNetwork`` holds the devices that currently answer, per protocol.
+``FakeScanner`` discovers them with a configurable latency and can be
+made to fail or hang; it counts scans and probes and the network records
+how many scans overlapped.
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from home_assistant_platform.core.devices.discovery import DiscoveredDevice, Scanner
+
+
+class FakeNetwork:
+    """Devices reachable per protocol"""
+
+    def __init__(self):
+        self.devices: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.active_scans = 0
+        self.max_active_scans = 0
+
+    def add(self, source: str, device_id: str, **info):
+        self.devices.setdefault(source, {})[device_id] = {
+            "id": device_id, "name": device_id, "state": "off", "source": source, **info
+        }
+
+    def remove(self, source: str, device_id: str):
+        self.devices.get(source, {}).pop(device_id, None)
+
+
+class FakeScanner(Scanner):
+    """Scanner answering from a FakeNetwork"""
+
+    def __init__(self, network: FakeNetwork, name: str, latency: float = 0.0,
+                 fail: bool = False, hang: bool = False):
+        self.network = network
+        self.name = name
+        self.latency = latency
+        self.fail = fail
+        self.hang = hang
+        self.scans = 0
+        self.probed: List[str] = []
+
+    async def scan(self) -> List[DiscoveredDevice]:
+        self.scans += 1
+        self.network.active_scans += 1
+        self.network.max_active_scans = max(self.network.max_active_scans, self.network.active_scans)
+        try:
+            await asyncio.sleep(3600 if self.hang else self.latency)
+            if self.fail:
+                raise OSError(f"{self.name} network unreachable")
+            return [
+                DiscoveredDevice(info=dict(info), source=self.name, handle=info["id"])
+                for info in self.network.devices.get(self.name, {}).values()
+            ]
+        finally:
+            self.network.active_scans -= 1
+
+    async def probe(self, device: DiscoveredDevice) -> Optional[DiscoveredDevice]:
+        self.probed.append(device.device_id)
+        await asyncio.sleep(self.latency)
+        info = self.network.devices.get(self.name, {}).get(device.device_id)
+        if info is None:
+            return None
+        return DiscoveredDevice(info=dict(info), source=self.name, handle=device.handle)
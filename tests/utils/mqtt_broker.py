@@ -0,0 +1,113 @@
+"""Minimal in-process MQTT 3.1.1 broker for tests and benchmarks
+
+Only what the platform's MQTT client needs: CONNECT, SUBSCRIBE, PUBLISH
+(QoS 0/1), PINGREQ and DISCONNECT. Messages are acknowledged but not routed
+to subscribers. ``ack_delay`` simulates a slow broker and ``drop_acks``
+one that never acknowledges.
+"""
+
+import asyncio
+import struct
+from typing import List, Optional, Tuple
+
+CONNECT, CONNACK, PUBLISH, PUBACK = 1, 2, 3, 4
+SUBSCRIBE, SUBACK, PINGREQ, PINGRESP, DISCONNECT = 8, 9, 12, 13, 14
+
+
+class StubBroker:
+    """Acknowledging MQTT broker listening on localhost"""
+
+    def __init__(self, ack_delay: float = 0.0, drop_acks: bool = False):
+        self.ack_delay = ack_delay
+        self.drop_acks = drop_acks
+        self.published: List[Tuple[str, bytes]] = []
+        self.unacked = 0
+        self.max_unacked = 0
+        self.port: Optional[int] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._tasks = set()
+        self._handlers = set()
+        self._writers = set()
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+        for task in list(self._tasks):
+            task.cancel()
+        for writer in list(self._writers):
+            writer.close()
+        await asyncio.gather(*self._handlers, *self._tasks, return_exceptions=True)
+        if self._server:
+            await self._server.wait_closed()
+
+    async def _read_packet(self, reader: asyncio.StreamReader) -> Tuple[int, int, bytes]:
+        header = (await reader.readexactly(1))[0]
+        length, multiplier = 0, 1
+        while True:
+            byte = (await reader.readexactly(1))[0]
+            length += (byte & 0x7F) * multiplier
+            if not byte & 0x80:
+                break
+            multiplier *= 128
+        body = await reader.readexactly(length) if length else b""
+        return header >> 4, header & 0x0F, body
+
+    async def _ack_later(self, writer: asyncio.StreamWriter, packet: bytes):
+        await asyncio.sleep(self.ack_delay)
+        self.unacked -= 1
+        if not writer.is_closing():
+            writer.write(packet)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._handlers.add(asyncio.current_task())
+        self._writers.add(writer)
+        try:
+            while True:
+                packet_type, flags, body = await self._read_packet(reader)
+                if packet_type == CONNECT:
+                    writer.write(bytes([CONNACK << 4, 2, 0, 0]))
+                elif packet_type == PUBLISH:
+                    topic_len = struct.unpack("!H", body[:2])[0]
+                    topic = body[2:2 + topic_len].decode()
+                    qos = (flags >> 1) & 0x03
+                    offset = 2 + topic_len
+                    if qos:
+                        packet_id = body[offset:offset + 2]
+                        offset += 2
+                    self.published.append((topic, body[offset:]))
+                    if qos and not self.drop_acks:
+                        ack = bytes([PUBACK << 4, 2]) + packet_id
+                        self.unacked += 1
+                        self.max_unacked = max(self.max_unacked, self.unacked)
+                        if self.ack_delay:
+                            task = asyncio.create_task(self._ack_later(writer, ack))
+                            self._tasks.add(task)
+                            task.add_done_callback(self._tasks.discard)
+                        else:
+                            self.unacked -= 1
+                            writer.write(ack)
+                elif packet_type == SUBSCRIBE:
+                    packet_id = body[:2]
+                    granted, offset = [], 2
+                    while offset < len(body):
+                        topic_len = struct.unpack("!H", body[offset:offset + 2])[0]
+                        offset += 2 + topic_len
+                        granted.append(body[offset])
+                        offset += 1
+                    writer.write(bytes([(SUBACK << 4), 2 + len(granted)]) + packet_id + bytes(granted))
+                elif packet_type == PINGREQ:
+                    writer.write(bytes([PINGRESP << 4, 0]))
+                elif packet_type == DISCONNECT:
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            self._handlers.discard(asyncio.current_task())
+            writer.close()